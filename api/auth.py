@@ -1,23 +1,46 @@
-from flask import jsonify, request
+from flask import g, jsonify, request
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from functools import wraps
+import math
 from api.response_handler import ApiResponse, ErrorCode
-from config import Config
+from services.api_key_service import check_request_rate, get_api_key_policy
 
-# Get API keys from configuration
-API_KEYS = Config.API_KEYS
+def too_many_requests(message, code, retry_after, details=None):
+    """Build a 429 response with a Retry-After header in whole seconds"""
+    response, status_code = ApiResponse.error(
+        message=message,
+        code=code,
+        details=details,
+        status_code=429
+    )
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, status_code
+
+def quota_exceeded_response(error):
+    """Build the 429 response for a QuotaExceeded raised while serving a request"""
+    return too_many_requests(str(error), ErrorCode.QUOTA_EXCEEDED, error.retry_after,
+                             details={"limit": error.limit})
 
 def require_api_key(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         api_key = request.headers.get('X-API-Key')
-        if api_key and api_key in API_KEYS:
-            return f(*args, **kwargs)
-        return ApiResponse.error(
-            message="Invalid or missing API key",
-            code=ErrorCode.INVALID_API_KEY,
-            status_code=401
-        )
+        policy = get_api_key_policy(api_key) if api_key else None
+        if policy is None:
+            return ApiResponse.error(
+                message="Invalid or missing API key",
+                code=ErrorCode.INVALID_API_KEY,
+                status_code=401
+            )
+        
+        retry_after = check_request_rate(policy)
+        if retry_after > 0:
+            return too_many_requests("Request rate limit exceeded for this API key",
+                                     ErrorCode.RATE_LIMITED, retry_after)
+        
+        # Download limits are enforced where a miss reaches the crawler (services.pdf_service)
+        g.api_key_policy = policy
+        return f(*args, **kwargs)
     return decorated_function
 
 def authenticate_user(username, password):
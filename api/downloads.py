@@ -0,0 +1,41 @@
+from flask import Blueprint, request, send_file
+from api.response_handler import ApiResponse, ErrorCode
+from services.download_url_service import resolve_signed_path
+from services.tier_service import touch_hot_file
+import os
+import time
+
+# Registered outside the API prefix, without API keys or request logging
+downloads_bp = Blueprint('downloads', __name__)
+
+
+@downloads_bp.route('/<path:path>', methods=['GET', 'HEAD'])
+def get_signed_file(path):
+    """
+    Serve a PDF by a signed URL from create_download_url
+
+    The signature is the only check, so serving a cached file costs a stat and
+    a sendfile; the response may be cached until the URL expires.
+    """
+    pdf_path = resolve_signed_path(path, request.args.get('expires'), request.args.get('sig'))
+    if pdf_path is None:
+        return ApiResponse.error(
+            message="Invalid or expired download URL",
+            code=ErrorCode.INSUFFICIENT_PERMISSIONS,
+            status_code=403
+        )
+    try:
+        stat = os.stat(pdf_path)
+    except OSError:
+        # Evicted from the hot tier since the URL was issued; resolving the PMID again fetches it
+        return ApiResponse.error(
+            message="File no longer available, request a new download URL",
+            code=ErrorCode.PDF_NOT_FOUND,
+            status_code=404
+        )
+    touch_hot_file(pdf_path, stat)
+
+    max_age = max(0, int(request.args['expires']) - int(time.time()))
+    response = send_file(pdf_path, mimetype='application/pdf', max_age=max_age, conditional=True)
+    response.cache_control.public = True
+    return response
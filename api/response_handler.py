@@ -1,8 +1,10 @@
-from flask import jsonify
+from flask import Response
 from typing import Dict, Any, Optional, Union, List, Type
 from pydantic import BaseModel
 from http import HTTPStatus
 from enum import Enum, auto
+from functools import lru_cache
+from utils.json_utils import dumps, get_app_json_encoder
 
 class ErrorCode(Enum):
     """
@@ -23,6 +25,10 @@ class ErrorCode(Enum):
     MISSING_PARAMETER = "MISSING_PARAMETER"
     INVALID_PARAMETER = "INVALID_PARAMETER"
     
+    # Per-key limits
+    RATE_LIMITED = "RATE_LIMITED"
+    QUOTA_EXCEEDED = "QUOTA_EXCEEDED"
+    
     # Resource errors
     NOT_FOUND = "NOT_FOUND"
     ALREADY_EXISTS = "ALREADY_EXISTS"
@@ -39,12 +45,28 @@ class ErrorCode(Enum):
     # Generic error
     GENERIC_ERROR = "ERROR"
 
+def _json_response(body: bytes) -> Response:
+    """Wrap encoded JSON in a new response object"""
+    return Response(body, mimetype='application/json')
+
+@lru_cache(maxsize=1024)
+def _encode_static(encoder, status: str, code: str, message: str) -> bytes:
+    """
+    Encode a response body without details once and reuse the bytes
+    
+    Bodies without details are mostly the fixed 401/404 messages, so the
+    cache stays small; the LRU bound covers messages that embed an ID. The
+    encoder is part of the key, as apps may configure different ones.
+    """
+    return encoder({"status": status, "code": code, "message": message, "details": None})
+
 class ApiResponse:
     """
     Unified API response handler
     
     This class provides a standardized way to create API responses
-    with consistent structure and format.
+    with consistent structure and format. Bodies are encoded with the
+    configured JSON encoder (see utils.json_utils), pydantic models included.
     """
     
     @staticmethod
@@ -60,18 +82,16 @@ class ApiResponse:
             status_code: HTTP status code
             
         Returns:
-            tuple: (jsonified response, status code)
+            tuple: (JSON response, status code)
         """
-        if isinstance(data, BaseModel):
-            data = data.dict()
-        
+        # Pydantic models are encoded by the JSON encoder without an intermediate dict
         response = {
             "status": "success",
             "message": message,
             "data": data
         }
         
-        return jsonify(response), status_code
+        return _json_response(dumps(response)), status_code
     
     @staticmethod
     def error(message: str, 
@@ -88,11 +108,14 @@ class ApiResponse:
             status_code: HTTP status code
             
         Returns:
-            tuple: (jsonified response, status code)
+            tuple: (JSON response, status code)
         """
         # Convert ErrorCode enum to string if needed
         if isinstance(code, ErrorCode):
             code = code.value
+        
+        if details is None:
+            return _json_response(_encode_static(get_app_json_encoder(), "error", code, message)), status_code
             
         response = {
             "status": "error",
@@ -101,7 +124,7 @@ class ApiResponse:
             "details": details
         }
         
-        return jsonify(response), status_code
+        return _json_response(dumps(response)), status_code
     
     @staticmethod
     def warning(message: str,
@@ -118,8 +141,11 @@ class ApiResponse:
             status_code: HTTP status code (usually 200 for warnings)
             
         Returns:
-            tuple: (jsonified response, status code)
+            tuple: (JSON response, status code)
         """
+        if details is None:
+            return _json_response(_encode_static(get_app_json_encoder(), "warning", code, message)), status_code
+        
         response = {
             "status": "warning",
             "code": code,
@@ -127,7 +153,7 @@ class ApiResponse:
             "details": details
         }
         
-        return jsonify(response), status_code
+        return _json_response(dumps(response)), status_code
     
     @classmethod
     def from_model(cls, 
@@ -141,9 +167,9 @@ class ApiResponse:
             status_code: HTTP status code
             
         Returns:
-            tuple: (jsonified response, status code)
+            tuple: (JSON response, status code)
         """
-        return jsonify(model_instance.dict()), status_code
+        return _json_response(dumps(model_instance)), status_code
         
     @staticmethod
     def from_pydantic(model_class: Type[BaseModel], 
@@ -158,7 +184,7 @@ class ApiResponse:
             status_code: HTTP status code
             
         Returns:
-            tuple: (jsonified response, status code)
+            tuple: (JSON response, status code)
         """
         model_instance = model_class(**data)
-        return jsonify(model_instance.dict()), status_code
\ No newline at end of file
+        return _json_response(dumps(model_instance)), status_code
\ No newline at end of file
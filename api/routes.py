@@ -1,16 +1,150 @@
-from flask import Blueprint, current_app, url_for, send_file, send_from_directory
+from flask import Blueprint, Response as FlaskResponse, current_app, g, request, stream_with_context, url_for, send_file, send_from_directory
 from spectree import Response
-from api.schemas import PDFResponse, ErrorResponse
-from api.auth import require_api_key
+from api.schemas import PDFResponse, ErrorResponse, MCPContextQuery, MCPContextBatchRequest, SearchQuery, ArticlesQuery, ArticlesExportQuery, ChangesQuery, DOILookupRequest, PrefetchRequest
+from api.auth import quota_exceeded_response, require_api_key
+from services.api_key_service import POLICY_FIELDS, QuotaExceeded, get_usage
 from services.pdf_service import get_pdf_by_pmid
-from services.db_service import get_article_by_pmid
+from services.db_service import get_article_by_pmid, get_articles_by_pmids, list_articles, list_changes
+from services.download_scheduler import get_scheduler, schedule_download
+from services.doi_service import DOIResolutionError, get_pdf_by_doi, resolve_doi, resolve_dois
+from services.search_service import search_articles
+from services.health_service import get_health_monitor
+from services.admission_service import get_admission_controller, track_request_end, track_request_start
+from services.access_stats_service import add_access_stats, record_access
+from services.export_service import get_export_filename, get_export_mimetype, iter_export
+from services.pmid_status_service import get_pmid_status
+from services.download_url_service import DELIVERY_STREAM, DELIVERY_URL, create_download_url
+from services.upstream_service import NCBI_UPSTREAM, UpstreamUnavailable, get_metrics as get_upstream_metrics
+from services.text_service import get_article_text_path, iter_article_text
+from utils.text_utils import EXTRACTOR_VERSION, TextExtractionError
+from utils.mcp_utils import MCP_CONTEXT_FIELDS, create_article_metadata, create_mcp_context, iter_mcp_context_ndjson, select_mcp_fields
+from utils.json_utils import dumps
+from utils.deadline import DeadlineExceeded, parse_deadline
+from utils.admission import Overloaded
+from utils.pmid_status import FAILED, UNKNOWN, parse_pmid
 from api.response_handler import ApiResponse
 from utils.error_codes import ErrorCodes
 from api.extensions import spec
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from sqlalchemy.exc import SQLAlchemyError
+import gzip
+import math
 import os
 
 api_bp = Blueprint('api', __name__)
 
+api_bp.before_request(track_request_start)
+api_bp.teardown_request(track_request_end)
+
+
+@api_bp.after_request
+def _add_cache_header(response):
+    """Report whether a PDF was served from storage or downloaded (logged for analysis)"""
+    cache = g.get('pdf_cache')
+    if cache:
+        response.headers['X-Cache'] = cache
+    return response
+
+def _send_pdf(pmid, pdf_info):
+    """Build the PDF response for the result of get_pdf_by_pmid"""
+    g.pdf_cache = pdf_info.get("cache")
+    record_access(pmid)
+    delivery = request.args.get('delivery') or current_app.config.get('PDF_DELIVERY', DELIVERY_STREAM)
+    if delivery == DELIVERY_URL and pdf_info.get("pdf_path"):
+        # Cold hits are still streamed below, which puts them in the hot tier for the next URL
+        download = create_download_url(pdf_info["pdf_path"])
+        response_data = {
+            "pmid": pmid,
+            "pdf_url": download["url"],
+            "expires_at": download["expires_at"],
+            "title": pdf_info.get('title', ''),
+            "authors": pdf_info.get('authors', ''),
+            "journal": pdf_info.get('journal', ''),
+            "year": pdf_info.get('year')
+        }
+        return ApiResponse.success(data=response_data)
+
+    if pdf_info.get("pdf_stream") is not None:
+        # Cold tier hit: stream the bytes while they are cached in the hot tier
+        headers = {
+            "Content-Disposition": f"attachment; filename={pmid}.pdf",
+            "Content-Length": str(pdf_info["size"])
+        }
+        if pdf_info.get("content_hash"):
+            headers["ETag"] = f'"{pdf_info["content_hash"]}"'
+        return FlaskResponse(pdf_info["pdf_stream"], mimetype='application/pdf', headers=headers)
+
+    return send_file(
+        pdf_info["pdf_path"],
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f"{pmid}.pdf",
+        # The content hash is a strong ETag, so conditional requests skip the body
+        etag=pdf_info.get("content_hash") or True
+    )
+
+def _invalid_pmid(pmid):
+    """Build the 400 response for a PMID that is not a positive integer, or None if it is valid"""
+    if parse_pmid(pmid) is not None:
+        return None
+    return ApiResponse.error(
+        message=f"Invalid PMID: {pmid}",
+        code=ErrorCodes.INVALID_PARAMETER.name,
+        details={"pmid": pmid},
+        status_code=400
+    )
+
+def _request_deadline():
+    """Deadline of the current request from X-Request-Deadline, capped by the config"""
+    default = current_app.config.get('REQUEST_DEADLINE_DEFAULT')
+    maximum = current_app.config.get('REQUEST_DEADLINE_MAX')
+    try:
+        return parse_deadline(request.headers.get('X-Request-Deadline'), default, maximum)
+    except ValueError:
+        # Malformed values are ignored like other optional headers
+        return parse_deadline(None, default, maximum)
+
+def _deadline_exceeded(error, details):
+    """Build the response for a download that outlived the request's deadline"""
+    if error.continuing:
+        response, status_code = ApiResponse.warning(
+            message=f"PDF download still in progress: {str(error)}",
+            code=ErrorCodes.PDF_DOWNLOAD_PENDING.name,
+            details=details,
+            status_code=202
+        )
+    else:
+        response, status_code = ApiResponse.error(
+            message=f"Download cancelled: {str(error)}",
+            code=ErrorCodes.DEADLINE_EXCEEDED.name,
+            details=details,
+            status_code=504
+        )
+    response.headers['Retry-After'] = '10'
+    return response, status_code
+
+def _upstream_unavailable(error, details):
+    """Build the 503 response for a download that failed because an upstream is down"""
+    code = ErrorCodes.PUBMED_SERVICE_ERROR if error.upstream == NCBI_UPSTREAM else ErrorCodes.EXTERNAL_SERVICE_ERROR
+    response, status_code = ApiResponse.error(
+        message=f"Upstream {error.upstream} unavailable ({error.category}): {str(error)}",
+        code=code.name,
+        details={**details, "upstream": error.upstream, "failure": error.category},
+        status_code=503
+    )
+    response.headers['Retry-After'] = str(max(1, int(error.retry_after)))
+    return response, status_code
+
+def _overloaded(error, details):
+    """Build the 503 response for a miss refused by admission control"""
+    response, status_code = ApiResponse.error(
+        message=str(error),
+        code=ErrorCodes.SERVICE_OVERLOADED.name,
+        details={**details, "reason": error.reason},
+        status_code=503
+    )
+    response.headers['Retry-After'] = str(max(1, math.ceil(error.retry_after)))
+    return response, status_code
 
 @api_bp.route('/pdf/<pmid>', methods=['GET'])
 @require_api_key
@@ -26,36 +160,26 @@ def get_pdf(pmid):
     If the PDF exists in the local database, returns the link / the PDF file stream.
     If not, attempts to download it using PubCrawler.
     """
+    invalid = _invalid_pmid(pmid)
+    if invalid:
+        return invalid
+    
     try:
         # Use get_pdf_by_pmid function to get PDF information
         # This function checks the database and uses PubCrawler to download if not found
-        pdf_info = get_pdf_by_pmid(pmid)
+        pdf_info = get_pdf_by_pmid(pmid, _request_deadline())
         
         if pdf_info:
-            # PDF retrieved successfully, build URL and return
-            # pdf_url = url_for('static', filename=f'pdfs/{os.path.relpath(pdf_info["pdf_path"], current_app.config["PDF_ROOT_PATH"])}', _external=True)
-            
-            # response_data = {
-            #     "pmid": pmid,
-            #     "pdf_url": pdf_url,
-            #     "title": pdf_info.get('title', ''),
-            #     "authors": pdf_info.get('authors', ''),
-            #     "journal": pdf_info.get('journal', ''),
-            #     "year": pdf_info.get('year')
-            # }
-            # return ApiResponse.success(data=response_data)
-            return send_file(
-                pdf_info["pdf_path"],
-                mimetype='application/pdf',
-                as_attachment=True,
-                download_name=f"{pmid}.pdf"
-            )
+            return _send_pdf(pmid, pdf_info)
 
         else:
             # Failed to retrieve PDF
             # Check if download was already attempted
-            article = get_article_by_pmid(pmid)
-            if article and article.download_attempted:
+            status = get_pmid_status(pmid)
+            if status is None:
+                article = get_article_by_pmid(pmid)
+                status = FAILED if article and article.download_attempted else None
+            if status == FAILED:
                 error_message = f"PDF not available for PMID: {pmid}"
             else:
                 error_message = f"Failed to retrieve PDF for PMID: {pmid}"
@@ -67,6 +191,485 @@ def get_pdf(pmid):
                 status_code=404
             )
             
+    except QuotaExceeded as e:
+        return quota_exceeded_response(e)
+    except UpstreamUnavailable as e:
+        return _upstream_unavailable(e, {"pmid": pmid})
+    except Overloaded as e:
+        return _overloaded(e, {"pmid": pmid})
+    except DeadlineExceeded as e:
+        return _deadline_exceeded(e, {"pmid": pmid})
+    except Exception as e:
+        return ApiResponse.error(
+            message=f"An error occurred: {str(e)}",
+            code=ErrorCodes.INTERNAL_SERVER_ERROR.name,
+            details={"pmid": pmid},
+            status_code=500
+        )
+
+@api_bp.route('/pdf/doi/<path:doi>', methods=['GET'])
+@require_api_key
+@spec.validate(tags=['PDF'])
+def get_pdf_by_doi_route(doi):
+    """
+    Get PDF by DOI
+    
+    The DOI is resolved to a PMID through the local database, or PubMed if it
+    is not stored yet, and then served or downloaded like a PMID request.
+    """
+    try:
+        pmid, pdf_info = get_pdf_by_doi(doi, _request_deadline())
+        if pmid is None:
+            return ApiResponse.error(
+                message=f"No PMID found for DOI: {doi}",
+                code=ErrorCodes.ARTICLE_NOT_FOUND.name,
+                details={"doi": doi},
+                status_code=404
+            )
+        if pdf_info:
+            return _send_pdf(pmid, pdf_info)
+        
+        return ApiResponse.error(
+            message=f"PDF not available for DOI: {doi}",
+            code=ErrorCodes.PDF_NOT_AVAILABLE.name,
+            details={"doi": doi, "pmid": pmid},
+            status_code=404
+        )
+    except DOIResolutionError as e:
+        return ApiResponse.error(
+            message=str(e),
+            code=ErrorCodes.PUBMED_SERVICE_ERROR.name,
+            details={"doi": doi},
+            status_code=502
+        )
+    except QuotaExceeded as e:
+        return quota_exceeded_response(e)
+    except UpstreamUnavailable as e:
+        return _upstream_unavailable(e, {"doi": doi})
+    except Overloaded as e:
+        return _overloaded(e, {"doi": doi})
+    except DeadlineExceeded as e:
+        return _deadline_exceeded(e, {"doi": doi})
+    except Exception as e:
+        return ApiResponse.error(
+            message=f"An error occurred: {str(e)}",
+            code=ErrorCodes.INTERNAL_SERVER_ERROR.name,
+            details={"doi": doi},
+            status_code=500
+        )
+
+@api_bp.route('/doi/<path:doi>', methods=['GET'])
+@require_api_key
+@spec.validate(tags=['DOI'])
+def get_pmid_by_doi(doi):
+    """
+    Resolve a DOI to a PMID
+    
+    Stored articles are resolved locally, other DOIs are looked up in PubMed.
+    """
+    try:
+        pmid = resolve_doi(doi)
+    except DOIResolutionError as e:
+        return ApiResponse.error(
+            message=str(e),
+            code=ErrorCodes.PUBMED_SERVICE_ERROR.name,
+            details={"doi": doi},
+            status_code=502
+        )
+    
+    if pmid is None:
+        return ApiResponse.error(
+            message=f"No PMID found for DOI: {doi}",
+            code=ErrorCodes.ARTICLE_NOT_FOUND.name,
+            details={"doi": doi},
+            status_code=404
+        )
+    return ApiResponse.success(data={"doi": doi, "pmid": pmid})
+
+@api_bp.route('/doi/lookup', methods=['POST'])
+@require_api_key
+@spec.validate(json=DOILookupRequest, tags=['DOI'])
+def lookup_dois():
+    """
+    Resolve many DOIs to PMIDs
+    
+    All DOIs are looked up in the local database with one query. With
+    `remote` enabled, up to DOI_REMOTE_LOOKUP_MAX misses per request are
+    looked up in PubMed. `source` is 'local', 'pubmed', 'error' (PubMed
+    could not be queried) or null (unresolved).
+    """
+    body = request.context.json
+    max_dois = current_app.config.get('DOI_BATCH_MAX', 1000)
+    if len(body.dois) > max_dois:
+        return ApiResponse.error(
+            message=f"At most {max_dois} DOIs can be resolved at once",
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"count": len(body.dois), "max": max_dois},
+            status_code=400
+        )
+    
+    resolved = resolve_dois(body.dois, remote=body.remote)
+    results = [{"doi": doi, **resolved[doi]} for doi in body.dois]
+    return ApiResponse.success(data={
+        "results": results,
+        "resolved": sum(1 for result in results if result["pmid"])
+    })
+
+@api_bp.route('/prefetch', methods=['POST'])
+@require_api_key
+@spec.validate(json=PrefetchRequest, tags=['PDF'])
+def prefetch():
+    """
+    Queue PDF downloads without waiting for them
+    
+    PMIDs that were already downloaded or attempted are skipped. Queued
+    downloads run behind interactive requests in the `batch` or `background`
+    class and count against the API key's download limits.
+    """
+    body = request.context.json
+    max_pmids = current_app.config.get('PREFETCH_BATCH_MAX', 1000)
+    if len(body.pmids) > max_pmids:
+        return ApiResponse.error(
+            message=f"At most {max_pmids} PMIDs can be prefetched at once",
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"count": len(body.pmids), "max": max_pmids},
+            status_code=400
+        )
+    
+    pmids = list(dict.fromkeys(body.pmids))
+    invalid = [pmid for pmid in pmids if parse_pmid(pmid) is None]
+    if invalid:
+        return ApiResponse.error(
+            message=f"Invalid PMIDs: {', '.join(invalid[:10])}",
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"invalid": invalid},
+            status_code=400
+        )
+    
+    # Only PMIDs the status set cannot answer are looked up
+    statuses = {pmid: get_pmid_status(pmid) for pmid in pmids}
+    untracked = [pmid for pmid, status in statuses.items() if status is None]
+    articles = get_articles_by_pmids(untracked) if untracked else {}
+    queued = [pmid for pmid in pmids if statuses[pmid] == UNKNOWN
+              or (statuses[pmid] is None and (pmid not in articles or not articles[pmid].download_attempted))]
+    for pmid in queued:
+        schedule_download(pmid, body.priority, g.api_key_policy)
+    return ApiResponse.success(data={
+        "queued": len(queued),
+        "skipped": len(pmids) - len(queued),
+        "priority": body.priority
+    }, status_code=202)
+
+@api_bp.route('/downloads/queue', methods=['GET'])
+@require_api_key
+@spec.validate(tags=['PDF'])
+def get_download_queue():
+    """
+    Get the download queue of the serving worker per priority class
+    
+    Reports queued and running downloads, and the average and 95th
+    percentile wait (seconds) of recently dispatched downloads.
+    """
+    return ApiResponse.success(data=get_scheduler().stats())
+
+@api_bp.route('/upstreams', methods=['GET'])
+@require_api_key
+@spec.validate(tags=['PDF'])
+def get_upstreams():
+    """
+    Get the circuit breaker states of the serving worker
+    
+    One breaker per upstream (NCBI and each publisher domain) with its state
+    (closed, open, half_open), recent error rate, open and reject counts and
+    failures per class, plus the classified download failures.
+    """
+    return ApiResponse.success(data=get_upstream_metrics())
+
+@api_bp.route('/admission', methods=['GET'])
+@require_api_key
+@spec.validate(tags=['PDF'])
+def get_admission():
+    """
+    Get the admission control state of the serving worker
+    
+    Reports the current limit on requests waiting for downloads, waiting and
+    in-flight requests, admitted and refused misses per reason, and the
+    standing queue delay of the last interval (seconds).
+    """
+    return ApiResponse.success(data=get_admission_controller().stats())
+
+@api_bp.route('/articles', methods=['GET'])
+@require_api_key
+@spec.validate(query=ArticlesQuery, tags=['Articles'])
+def get_articles():
+    """
+    List article metadata with filters
+    
+    Filters on journal, year, has_pdf, download_attempted and updated_at
+    ranges are combined with AND. Pages are fetched with keyset pagination:
+    pass the returned `next_cursor` as `cursor` to get the next page, it is
+    null on the last page. A cursor is only valid with the same filters.
+    """
+    params = request.context.query
+    max_limit = current_app.config.get('ARTICLES_PAGE_MAX', 1000)
+    if params.limit > max_limit:
+        return ApiResponse.error(
+            message=f"At most {max_limit} articles can be requested per page",
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"limit": params.limit, "max": max_limit},
+            status_code=400
+        )
+    
+    filters = params.dict(exclude={'limit'})
+    try:
+        articles, next_cursor = list_articles(limit=params.limit, **filters)
+    except ValueError as e:
+        return ApiResponse.error(
+            message=str(e),
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"cursor": params.cursor},
+            status_code=400
+        )
+    except SQLAlchemyError as e:
+        return ApiResponse.error(
+            message=f"Database error: {str(e)}",
+            code=ErrorCodes.DATABASE_ERROR.name,
+            status_code=500
+        )
+    
+    return ApiResponse.success(data={
+        "articles": add_access_stats([article.to_dict() for article in articles]),
+        "count": len(articles),
+        "next_cursor": next_cursor
+    })
+
+@api_bp.route('/articles/export', methods=['GET'])
+@require_api_key
+@spec.validate(query=ArticlesExportQuery, tags=['Articles'])
+def export_articles():
+    """
+    Export article metadata in bulk
+    
+    Streams all articles matching the filters of /articles in id order, as
+    NDJSON or CSV rows of the /articles fields, or as Parquet or an Arrow IPC
+    stream (requires pyarrow). With `compression`, the file is gzip or zstd
+    (requires zstandard) compressed while it is sent.
+    """
+    params = request.context.query
+    filters = params.dict(exclude={'format', 'compression'})
+    try:
+        chunks = iter_export(params.format, params.compression, **filters)
+    except ValueError as e:
+        return ApiResponse.error(
+            message=str(e),
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"format": params.format, "compression": params.compression},
+            status_code=400
+        )
+    
+    headers = {"Content-Disposition": f"attachment; filename={get_export_filename(params.format, params.compression)}"}
+    return FlaskResponse(stream_with_context(chunks), headers=headers,
+                         mimetype=get_export_mimetype(params.format, params.compression))
+
+@api_bp.route('/changes', methods=['GET'])
+@require_api_key
+@spec.validate(query=ChangesQuery, tags=['Articles'])
+def get_changes():
+    """
+    Get articles changed since a change feed cursor
+    
+    Returns articles in (updated_at, id) order with their /articles fields.
+    Pass `next_cursor` as `cursor` to continue; it stays the same when
+    nothing changed. Start a new mirror without a cursor (or with `since`).
+    With `wait`, the request is held for up to that many seconds (at most
+    CHANGE_FEED_MAX_WAIT) until a change arrives. Changes are returned once
+    they are CHANGE_FEED_SETTLE_SECONDS old.
+    """
+    params = request.context.query
+    config = current_app.config
+    max_limit = config.get('CHANGE_FEED_PAGE_MAX', 10000)
+    if params.limit > max_limit:
+        return ApiResponse.error(
+            message=f"At most {max_limit} changes can be requested per page",
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"limit": params.limit, "max": max_limit},
+            status_code=400
+        )
+    
+    try:
+        changes, next_cursor = list_changes(
+            params.cursor, params.since, params.limit,
+            settle_seconds=config.get('CHANGE_FEED_SETTLE_SECONDS', 2),
+            wait=min(params.wait, config.get('CHANGE_FEED_MAX_WAIT', 30)),
+            poll_interval=config.get('CHANGE_FEED_POLL_INTERVAL', 1.0)
+        )
+    except ValueError as e:
+        return ApiResponse.error(
+            message=str(e),
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"cursor": params.cursor},
+            status_code=400
+        )
+    except SQLAlchemyError as e:
+        return ApiResponse.error(
+            message=f"Database error: {str(e)}",
+            code=ErrorCodes.DATABASE_ERROR.name,
+            status_code=500
+        )
+    
+    return ApiResponse.success(data={
+        "changes": changes,
+        "count": len(changes),
+        "next_cursor": next_cursor,
+        "has_more": len(changes) == params.limit
+    })
+
+@api_bp.route('/text/<pmid>', methods=['GET'])
+@require_api_key
+@spec.validate(tags=['Text'])
+def get_text(pmid):
+    """
+    Get the full text of an article by PMID
+    
+    Text is extracted from the stored PDF once and cached compressed. Clients
+    that accept gzip receive the cached bytes as is. Returns 202 while a
+    first extraction is still running.
+    """
+    invalid = _invalid_pmid(pmid)
+    if invalid:
+        return invalid
+    
+    try:
+        pdf_info = get_pdf_by_pmid(pmid, _request_deadline())
+        if not pdf_info:
+            return ApiResponse.error(
+                message=f"PDF not available for PMID: {pmid}",
+                code=ErrorCodes.PDF_NOT_AVAILABLE.name,
+                details={"pmid": pmid},
+                status_code=404
+            )
+        if pdf_info.get("pdf_stream") is not None:
+            # Text extraction fetches the cold copy itself
+            pdf_info["pdf_stream"].close()
+        
+        article = get_article_by_pmid(pmid)
+        text_path = get_article_text_path(article, timeout=current_app.config.get('TEXT_EXTRACTION_WAIT', 0.5))
+        if article.content_hash:
+            etag = f"{article.content_hash}-text-v{EXTRACTOR_VERSION}"
+        else:
+            # Legacy articles have no hash; the text is rewritten on every re-extraction
+            stat = os.stat(text_path)
+            etag = f"{stat.st_size}-{stat.st_mtime_ns}-text-v{EXTRACTOR_VERSION}"
+        
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = send_file(text_path, mimetype='text/plain', etag=etag)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            def decompress():
+                with gzip.open(text_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(64 * 1024), b''):
+                        yield chunk
+            response = FlaskResponse(decompress(), mimetype='text/plain')
+            response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+    
+    except FuturesTimeoutError:
+        response, status_code = ApiResponse.warning(
+            message=f"Text extraction in progress for PMID: {pmid}",
+            code=ErrorCodes.TEXT_EXTRACTION_PENDING.name,
+            details={"pmid": pmid},
+            status_code=202
+        )
+        response.headers['Retry-After'] = '10'
+        return response, status_code
+    except TextExtractionError as e:
+        return ApiResponse.error(
+            message=f"Text extraction failed: {str(e)}",
+            code=ErrorCodes.TEXT_EXTRACTION_FAILED.name,
+            details={"pmid": pmid},
+            status_code=422
+        )
+    except QuotaExceeded as e:
+        return quota_exceeded_response(e)
+    except UpstreamUnavailable as e:
+        return _upstream_unavailable(e, {"pmid": pmid})
+    except Overloaded as e:
+        return _overloaded(e, {"pmid": pmid})
+    except DeadlineExceeded as e:
+        return _deadline_exceeded(e, {"pmid": pmid})
+    except Exception as e:
+        return ApiResponse.error(
+            message=f"An error occurred: {str(e)}",
+            code=ErrorCodes.INTERNAL_SERVER_ERROR.name,
+            details={"pmid": pmid},
+            status_code=500
+        )
+
+def _parse_mcp_fields(fields):
+    """Validate requested MCP context fields, returning the unknown ones"""
+    return [name for name in (fields or []) if name not in MCP_CONTEXT_FIELDS]
+
+@api_bp.route('/mcp/<pmid>', methods=['GET'])
+@require_api_key
+@spec.validate(query=MCPContextQuery, tags=['MCP'])
+def get_mcp_context(pmid):
+    """
+    Get the MCP context of an article by PMID
+    
+    Returns the article metadata and, if selected, its full text. Use
+    `fields` to choose the context fields, `max_text_length` to cap the text
+    and `stream=true` to receive NDJSON with the text in chunks.
+    """
+    invalid = _invalid_pmid(pmid)
+    if invalid:
+        return invalid
+    
+    params = request.context.query
+    fields = [name.strip() for name in params.fields.split(',') if name.strip()] if params.fields else None
+    unknown = _parse_mcp_fields(fields)
+    if unknown:
+        return ApiResponse.error(
+            message=f"Unknown context fields: {', '.join(unknown)}",
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"fields": unknown, "allowed": list(MCP_CONTEXT_FIELDS)},
+            status_code=400
+        )
+    
+    try:
+        article = get_article_by_pmid(pmid)
+        if not article:
+            return ApiResponse.error(
+                message=f"Article not found for PMID: {pmid}",
+                code=ErrorCodes.ARTICLE_NOT_FOUND.name,
+                details={"pmid": pmid},
+                status_code=404
+            )
+        
+        timeout = current_app.config.get('TEXT_EXTRACTION_WAIT', 0.5)
+        context = create_mcp_context(pmid, article=article, query=params.query)
+        
+        if params.stream:
+            lines = iter_mcp_context_ndjson(
+                context, article, fields, params.max_text_length,
+                current_app.config.get('MCP_TEXT_CHUNK_SIZE', 64 * 1024), timeout
+            )
+            return FlaskResponse(stream_with_context(lines), mimetype='application/x-ndjson')
+        
+        if article.has_pdf and (fields is None or 'pdf_content' in fields):
+            context.pdf_content = ''.join(iter_article_text(article, max_length=params.max_text_length, timeout=timeout))
+        
+        return ApiResponse.success(data=select_mcp_fields(context, fields))
+    
+    except FuturesTimeoutError:
+        response, status_code = ApiResponse.warning(
+            message=f"Text extraction in progress for PMID: {pmid}",
+            code=ErrorCodes.TEXT_EXTRACTION_PENDING.name,
+            details={"pmid": pmid},
+            status_code=202
+        )
+        response.headers['Retry-After'] = '10'
+        return response, status_code
     except Exception as e:
         return ApiResponse.error(
             message=f"An error occurred: {str(e)}",
@@ -75,7 +678,153 @@ def get_pdf(pmid):
             status_code=500
         )
 
+@api_bp.route('/mcp/contexts', methods=['POST'])
+@require_api_key
+@spec.validate(json=MCPContextBatchRequest, tags=['MCP'])
+def get_mcp_contexts():
+    """
+    Stream MCP contexts for many PMIDs as NDJSON
+    
+    Metadata for all PMIDs is loaded with one query. Each context starts with
+    a 'context' line, followed by 'pdf_content' chunk lines and an 'end' line
+    when the text is selected. Unknown PMIDs produce an 'error' line.
+    """
+    body = request.context.json
+    max_pmids = current_app.config.get('MCP_BATCH_MAX_PMIDS', 500)
+    if len(body.pmids) > max_pmids:
+        return ApiResponse.error(
+            message=f"At most {max_pmids} PMIDs can be requested at once",
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"count": len(body.pmids), "max": max_pmids},
+            status_code=400
+        )
+    unknown = _parse_mcp_fields(body.fields)
+    if unknown:
+        return ApiResponse.error(
+            message=f"Unknown context fields: {', '.join(unknown)}",
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"fields": unknown, "allowed": list(MCP_CONTEXT_FIELDS)},
+            status_code=400
+        )
+    
+    # Invalid PMIDs get the not-found line without reaching the database
+    articles = get_articles_by_pmids([pmid for pmid in body.pmids if parse_pmid(pmid) is not None])
+    chunk_size = current_app.config.get('MCP_TEXT_CHUNK_SIZE', 64 * 1024)
+    timeout = current_app.config.get('TEXT_EXTRACTION_WAIT', 0.5)
+    
+    def generate():
+        for pmid in body.pmids:
+            article = articles.get(pmid)
+            if article is None:
+                yield dumps({'type': 'error', 'pmid': pmid, 'code': ErrorCodes.ARTICLE_NOT_FOUND.name,
+                             'message': f"Article not found for PMID: {pmid}"}) + b'\n'
+                continue
+            context = create_mcp_context(pmid, article=article, query=body.query)
+            yield from iter_mcp_context_ndjson(context, article, body.fields, body.max_text_length,
+                                               chunk_size, timeout)
+    
+    return FlaskResponse(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@api_bp.route('/search', methods=['GET'])
+@require_api_key
+@spec.validate(query=SearchQuery, tags=['Search'])
+def search():
+    """
+    Search the full text of locally stored articles
+    
+    Results are ranked with BM25 over the extracted text and include the
+    article metadata. Articles become searchable shortly after their text
+    has been extracted.
+    """
+    params = request.context.query
+    max_results = current_app.config.get('SEARCH_RESULTS_MAX', 100)
+    if params.limit > max_results:
+        return ApiResponse.error(
+            message=f"At most {max_results} results can be requested at once",
+            code=ErrorCodes.INVALID_PARAMETER.name,
+            details={"limit": params.limit, "max": max_results},
+            status_code=400
+        )
+    
+    try:
+        results, total = search_articles(params.q, params.limit)
+        data = {
+            "query": params.q,
+            "total": total,
+            "results": [
+                {
+                    "pmid": pmid,
+                    "score": round(score, 4),
+                    "article_metadata": create_article_metadata(pmid, article) if article else None
+                }
+                for pmid, score, article in results
+            ]
+        }
+        return ApiResponse.success(data=data)
+    except Exception as e:
+        return ApiResponse.error(
+            message=f"An error occurred: {str(e)}",
+            code=ErrorCodes.INTERNAL_SERVER_ERROR.name,
+            details={"query": params.q},
+            status_code=500
+        )
+
+@api_bp.route('/usage', methods=['GET'])
+@require_api_key
+@spec.validate(tags=['Usage'])
+def get_key_usage():
+    """
+    Get the policy and today's usage of the calling API key
+    
+    Usage is counted per UTC day on the serving host: accepted and
+    rate-limited requests, downloads (cache misses) and downloads rejected
+    by the concurrency limit or the daily budget. Null limits are unlimited.
+    """
+    policy = g.api_key_policy
+    return ApiResponse.success(data={
+        "name": policy["name"],
+        "policy": {field: policy[field] for field in POLICY_FIELDS},
+        "usage": get_usage(policy)
+    })
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return ApiResponse.success(data={"status": "healthy"})
\ No newline at end of file
+    """
+    Health report for operators
+    
+    Returns the last background check of the database, connection pool,
+    storage, free disk space and upstream breakers, with 503 when the
+    replica is not ready.
+    """
+    report = get_health_monitor().report()
+    if not report['ready']:
+        return ApiResponse.error(
+            message=ErrorCodes.get_message(ErrorCodes.SERVICE_UNAVAILABLE),
+            code=ErrorCodes.SERVICE_UNAVAILABLE.name,
+            details=report,
+            status_code=503
+        )
+    return ApiResponse.success(data=report)
+
+@api_bp.route('/health/live', methods=['GET'])
+def liveness_probe():
+    """Liveness probe: the process answers requests, dependencies are not checked"""
+    return ApiResponse.success(data={"status": "alive"})
+
+@api_bp.route('/health/ready', methods=['GET'])
+def readiness_probe():
+    """
+    Readiness probe: 503 when the database or storage check failed, or when
+    the checks stopped reporting. Served from the last background check,
+    which the first probe of a worker runs itself.
+    """
+    report = get_health_monitor().report()
+    data = {"status": report['status'], "age": report['age']}
+    if not report['ready']:
+        return ApiResponse.error(
+            message=ErrorCodes.get_message(ErrorCodes.SERVICE_UNAVAILABLE),
+            code=ErrorCodes.SERVICE_UNAVAILABLE.name,
+            details=data,
+            status_code=503
+        )
+    return ApiResponse.success(data=data)
\ No newline at end of file
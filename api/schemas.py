@@ -1,10 +1,65 @@
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
+from datetime import datetime
 
 # Request models
 class PMIDRequest(BaseModel):
     pmid: str = Field(..., description="PubMed ID")
 
+class MCPContextQuery(BaseModel):
+    query: Optional[str] = Field(None, description="User query to embed in the context")
+    fields: Optional[str] = Field(None, description="Comma-separated context fields to include (query, pmid, article_metadata, pdf_content)")
+    max_text_length: Optional[int] = Field(None, ge=0, description="Maximum number of pdf_content characters")
+    stream: bool = Field(False, description="Stream the context as NDJSON instead of a single JSON response")
+
+class MCPContextBatchRequest(BaseModel):
+    pmids: List[str] = Field(..., min_items=1, description="PubMed IDs")
+    query: Optional[str] = Field(None, description="User query to embed in each context")
+    fields: Optional[List[str]] = Field(None, description="Context fields to include (query, pmid, article_metadata, pdf_content)")
+    max_text_length: Optional[int] = Field(None, ge=0, description="Maximum number of pdf_content characters per context")
+
+class SearchQuery(BaseModel):
+    q: str = Field(..., min_length=1, description="Free-text query over the extracted article text")
+    limit: int = Field(20, ge=1, description="Maximum number of results")
+
+class DOILookupRequest(BaseModel):
+    dois: List[str] = Field(..., min_items=1, description="DOIs to resolve")
+    remote: bool = Field(True, description="Query PubMed for DOIs that are not stored locally")
+
+class PrefetchRequest(BaseModel):
+    pmids: List[str] = Field(..., min_items=1, description="PubMed IDs to download in the background")
+    priority: str = Field('batch', regex='^(batch|background)$', description="Priority class: batch or background")
+
+class ArticlesQuery(BaseModel):
+    journal: Optional[str] = Field(None, description="Exact journal name")
+    year: Optional[int] = Field(None, description="Publication year")
+    year_from: Optional[int] = Field(None, description="Minimum publication year")
+    year_to: Optional[int] = Field(None, description="Maximum publication year")
+    has_pdf: Optional[bool] = Field(None, description="Whether a PDF is stored")
+    download_attempted: Optional[bool] = Field(None, description="Whether a download was attempted")
+    updated_from: Optional[datetime] = Field(None, description="Minimum update time (inclusive, ISO 8601)")
+    updated_to: Optional[datetime] = Field(None, description="Maximum update time (exclusive, ISO 8601)")
+    cursor: Optional[str] = Field(None, description="next_cursor of the previous page")
+    limit: int = Field(100, ge=1, description="Maximum number of articles per page")
+
+class ArticlesExportQuery(BaseModel):
+    format: str = Field('ndjson', regex='^(ndjson|csv|parquet|arrow)$', description="Export format: ndjson, csv, parquet or arrow")
+    compression: Optional[str] = Field(None, regex='^(gzip|zstd)$', description="Compress the export with gzip or zstd")
+    journal: Optional[str] = Field(None, description="Exact journal name")
+    year: Optional[int] = Field(None, description="Publication year")
+    year_from: Optional[int] = Field(None, description="Minimum publication year")
+    year_to: Optional[int] = Field(None, description="Maximum publication year")
+    has_pdf: Optional[bool] = Field(None, description="Whether a PDF is stored")
+    download_attempted: Optional[bool] = Field(None, description="Whether a download was attempted")
+    updated_from: Optional[datetime] = Field(None, description="Minimum update time (inclusive, ISO 8601)")
+    updated_to: Optional[datetime] = Field(None, description="Maximum update time (exclusive, ISO 8601)")
+
+class ChangesQuery(BaseModel):
+    cursor: Optional[str] = Field(None, description="next_cursor of the previous response")
+    since: Optional[datetime] = Field(None, description="Start time (inclusive, ISO 8601) when no cursor is given")
+    limit: int = Field(1000, ge=1, description="Maximum number of changed articles")
+    wait: float = Field(0, ge=0, description="Seconds to wait for changes when there are none (long polling)")
+
 # Response models
 class ErrorResponse(BaseModel):
     code: str = Field(..., description="Error code")
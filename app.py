@@ -1,3 +1,6 @@
+import os
+import logging
+import weakref
 from flask import Flask
 from flask_jwt_extended import JWTManager
 from models import db
@@ -5,6 +8,11 @@ from config import Config
 from api.extensions import spec
 from utils.api_logger import api_logger
 
+logger = logging.getLogger(__name__)
+
+# Apps created in this process, for resetting their connection pools after fork
+_apps = weakref.WeakSet()
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
@@ -20,13 +28,80 @@ def create_app(config_class=Config):
     # Register blueprints
     from api.routes import api_bp
     app.register_blueprint(api_bp, url_prefix=Config.API_PREFIX)
+    from api.downloads import downloads_bp
+    app.register_blueprint(downloads_bp, url_prefix=app.config.get('SIGNED_URL_PREFIX', '/files'))
     
-    # Create database tables if they don't exist
-    with app.app_context():
-        db.create_all()
+    # Register maintenance CLI commands
+    from commands import register_commands
+    register_commands(app)
+    
+    # Create database tables if they don't exist. Production runs this once in the
+    # migrate/check step (initialization/check/check_main.py) instead of in every worker
+    if app.config.get('AUTO_CREATE_SCHEMA', True):
+        with app.app_context():
+            db.create_all()
     
+    _apps.add(app)
     return app
 
+def prepare_server(app):
+    """
+    Load state shared by the workers, once per server rather than in create_app
+    
+    gunicorn.conf.py calls this in the preloaded master before the workers are
+    forked: it loads the PMID status set and warms the caches from the hot
+    set. It never runs in CLI commands or the pre-start check, which may
+    start before the database and the schema exist.
+    
+    Args:
+        app (Flask): App loaded by the master
+    """
+    if app.config.get('PMID_STATUS_ENABLED', True) and app.config.get('PMID_STATUS_PRELOAD'):
+        from services.pmid_status_service import load_pmid_status
+        with app.app_context():
+            try:
+                load_pmid_status()
+            except Exception as e:
+                # Each worker loads the set on first use instead
+                db.session.rollback()
+                logger.warning(f"Preloading the PMID status set failed: {str(e)}")
+            finally:
+                db.session.remove()
+    # Finishes before the fork, so no worker inherits a connection or lock of the warmer
+    if app.config.get('HOT_SET_WARM_ON_START'):
+        from services.warmup_service import run_warmup
+        run_warmup(app)
+    # Workers get fresh connections; nothing the master used is shared with them
+    with app.app_context():
+        db.engine.dispose()
+
+def prepare_worker(app):
+    """
+    Warm the caches from a worker when the master has no app to do it (no --preload)
+    
+    gunicorn.conf.py calls this in the first worker only; the warmed database
+    buffer pool and page cache are shared by all of them.
+    
+    Args:
+        app (Flask): App loaded by the worker
+    """
+    if app.config.get('HOT_SET_WARM_ON_START'):
+        from services.warmup_service import start_warmup
+        start_warmup(app)
+
+def _reset_engine_pools():
+    """
+    Drop connections inherited from the parent process without closing them
+    
+    Workers forked from a preloaded gunicorn master must not share its pooled
+    MySQL connections.
+    """
+    for app in list(_apps):
+        db.get_engine(app).dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_engine_pools)
+
 if __name__ == '__main__':
     app = create_app()
     app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
\ No newline at end of file
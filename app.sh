@@ -14,4 +14,4 @@ export MYSQL_DB='pmid_pdf_db'
 export PDF_ROOT_PATH='/Users/jiaoyk/Downloads/articles'
 
 # Run the application with gunicorn
-gunicorn "app:create_app()" --bind 0.0.0.0:8091 -w 4 --reload --timeout 300 --log-level=debug
\ No newline at end of file
+gunicorn -c gunicorn.conf.py "app:create_app()" --bind 0.0.0.0:8091 --log-level=debug
\ No newline at end of file
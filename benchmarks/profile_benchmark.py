@@ -0,0 +1,214 @@
+"""
+Gunicorn profile benchmark on hit-heavy and miss-heavy request mixes
+
+Runs gunicorn with gunicorn.conf.py once per profile (sync, gthread, gevent)
+and drives GET /api/pdf/<pmid> with a fixed number of concurrent keep-alive
+clients. Hits are served from stored PDFs; misses go to a simulated crawler
+that waits --miss-latency seconds (an upstream download) and fails, so every
+miss reaches the crawler again. Reports throughput and latency percentiles
+for hits and misses separately.
+
+Mixes:
+    hit-heavy   95% hits
+    miss-heavy  40% hits
+
+The app uses a throwaway SQLite database and PDF root, so no MySQL or
+PubCrawler is needed. The gevent profile is skipped if gevent is not installed.
+
+Usage:
+    python benchmarks/profile_benchmark.py --cpus 2 --clients 64 --duration 10
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MIXES = {'hit-heavy': 0.95, 'miss-heavy': 0.40}
+
+HIT_PMIDS = 200
+PDF_BYTES = 200 * 1024
+
+
+def create_benchmark_app():
+    """App factory for gunicorn with stored articles and a simulated crawler"""
+    sys.path.insert(0, ROOT)
+    from config import Config
+    from app import create_app
+    import services.pdf_service as pdf_service
+
+    latency = float(os.environ['BENCHMARK_MISS_LATENCY'])
+
+    class SimulatedCrawler:
+        def process_pmid(self, pmid):
+            time.sleep(latency)
+            return {'success': False, 'has_pdf': False, 'error': 'Simulated miss'}
+
+    class BenchmarkConfig(type(Config)):
+        SQLALCHEMY_DATABASE_URI = os.environ['BENCHMARK_DATABASE_URI']
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+        PDF_ROOT_PATH = os.environ['BENCHMARK_PDF_ROOT']
+        AUTO_CREATE_SCHEMA = False
+        TEXT_EXTRACT_ON_DOWNLOAD = False
+        # All clients share one key; measure the server, not the per-key limits
+        API_KEY_DEFAULT_POLICY = {}
+
+    pdf_service.initialize_pubcrawler = SimulatedCrawler
+    return create_app(BenchmarkConfig)
+
+
+def prepare_data(work_dir):
+    """Create the database and the stored PDFs of the hit PMIDs"""
+    os.environ['BENCHMARK_MISS_LATENCY'] = '0'
+    app = create_benchmark_app()
+    from models import db, Article
+
+    pdf = b'%PDF-1.4\n' + b'0' * PDF_BYTES + b'\n1 0 obj << /Type /Page >> endobj\nstartxref\n0\n%%EOF\n'
+    with app.app_context():
+        db.create_all()
+        for pmid in range(1, HIT_PMIDS + 1):
+            directory = os.path.join(os.environ['BENCHMARK_PDF_ROOT'], str(pmid))
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, 'article.pdf'), 'wb') as f:
+                f.write(pdf)
+            db.session.add(Article(pmid=str(pmid), has_pdf=True, relative_path=str(pmid),
+                                   download_attempted=True))
+        db.session.commit()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, process, timeout=60):
+    started = time.time()
+    while time.time() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited: {process.stderr.read().decode()[-2000:]}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"gunicorn not ready after {timeout}s")
+
+
+def client(port, api_key, hit_ratio, deadline, results, seed):
+    """Send requests over one keep-alive connection until the deadline"""
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    while time.perf_counter() < deadline:
+        hit = rng.random() < hit_ratio
+        pmid = rng.randint(1, HIT_PMIDS) if hit else rng.randint(10 ** 7, 10 ** 8)
+        started = time.perf_counter()
+        try:
+            connection.request('GET', f'/api/pdf/{pmid}', headers={'X-API-Key': api_key})
+            response = connection.getresponse()
+            response.read()
+            ok = response.status == (200 if hit else 404)
+        except (OSError, http.client.HTTPException):
+            ok = False
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        results.append(('hit' if hit else 'miss', time.perf_counter() - started, ok))
+    connection.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_profile(profile, settings, mix, args, work_dir):
+    """Start gunicorn with a profile, drive one mix and return the results"""
+    port = free_port()
+    # The production environment preloads the app and does not reload
+    env = dict(os.environ, PYTHONPATH=ROOT, GUNICORN_PROFILE=profile, FM_ENV_CONFIG='production')
+    command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+               'benchmarks.profile_benchmark:create_benchmark_app()',
+               '--bind', f'127.0.0.1:{port}', '--log-level', 'error',
+               # Sized for --cpus instead of this host's CPU count
+               '--workers', str(settings['workers']), '--threads', str(settings.get('threads', 1))]
+    process = subprocess.Popen(command, cwd=work_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        wait_ready(port, process)
+        from config import Config
+        results = []
+        deadline = time.perf_counter() + args.duration
+        threads = [threading.Thread(target=client, args=(port, Config.API_KEYS[0], MIXES[mix],
+                                                         deadline, results, seed))
+                   for seed in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default='sync,gthread,gevent')
+    parser.add_argument('--mixes', default=','.join(MIXES))
+    parser.add_argument('--clients', type=int, default=64, help="Concurrent keep-alive clients")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per profile and mix")
+    parser.add_argument('--miss-latency', type=float, default=0.5, help="Simulated crawler seconds per miss")
+    parser.add_argument('--cpus', type=int, default=None, help="CPU count the profiles are sized for")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='profile-benchmark-')
+    os.environ.update(
+        BENCHMARK_DATABASE_URI=f"sqlite:///{os.path.join(work_dir, 'db.sqlite')}",
+        BENCHMARK_PDF_ROOT=os.path.join(work_dir, 'pdfs'),
+    )
+    sys.path.insert(0, ROOT)
+    os.chdir(work_dir)
+
+    try:
+        prepare_data(work_dir)
+        os.environ['BENCHMARK_MISS_LATENCY'] = str(args.miss_latency)
+        from config import Config
+        from config.gunicorn_profile import get_gunicorn_settings
+
+        print(f"{'profile':<8} {'mix':<11} {'workers':>7} {'threads':>7} {'req/s':>8} {'errors':>6} "
+              f"{'hit p50':>8} {'hit p99':>8} {'miss p50':>8} {'miss p99':>8}")
+        for profile in args.profiles.split(','):
+            if profile == 'gevent' and importlib.util.find_spec('gevent') is None:
+                print(f"{profile:<8} skipped, gevent is not installed")
+                continue
+            settings = get_gunicorn_settings(Config, profile=profile, cpu_count=args.cpus)
+            concurrency = settings.get('threads', 1) if profile != 'gevent' else settings['worker_connections']
+            for mix in args.mixes.split(','):
+                results = run_profile(profile, settings, mix, args, work_dir)
+                hits = [latency for kind, latency, ok in results if kind == 'hit' and ok]
+                misses = [latency for kind, latency, ok in results if kind == 'miss' and ok]
+                errors = sum(1 for _, _, ok in results if not ok)
+                print(f"{profile:<8} {mix:<11} {settings['workers']:>7} {concurrency:>7} "
+                      f"{len(results) / args.duration:>8.1f} {errors:>6} "
+                      f"{percentile(hits, 0.5) * 1000:>6.1f}ms {percentile(hits, 0.99) * 1000:>6.1f}ms "
+                      f"{percentile(misses, 0.5) * 1000:>6.0f}ms {percentile(misses, 0.99) * 1000:>6.0f}ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
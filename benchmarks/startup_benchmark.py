@@ -0,0 +1,159 @@
+"""
+Gunicorn startup time and per-worker memory benchmark
+
+Starts gunicorn in each startup mode and reports the time until every worker
+has loaded the app, and each worker's memory from /proc/<pid>/smaps_rollup:
+RSS, PSS (shared pages split between processes) and private (unshared) memory.
+
+Modes:
+    reload   previous run_gunicorn.sh: --reload, every worker creates the app
+             and runs db.create_all()
+    workers  every worker creates the app, the schema is left to the check step
+    preload  production: the master creates the app once, workers fork from it
+
+The app uses a throwaway SQLite database, so no MySQL is needed. Linux only.
+
+Usage:
+    python benchmarks/startup_benchmark.py --workers 4 --runs 3
+"""
+
+import os
+import sys
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'reload': {'args': ['--reload'], 'create_schema': True},
+    'workers': {'args': [], 'create_schema': False},
+    'preload': {'args': ['--preload'], 'create_schema': False},
+}
+
+# Written to the temporary gunicorn config: one marker file per initialized worker
+HOOKS = """
+import os
+
+def post_worker_init(worker):
+    open(os.path.join({marker_dir!r}, str(worker.pid)), 'w').close()
+"""
+
+
+def create_benchmark_app():
+    """App factory for gunicorn, configured from BENCHMARK_* environment variables"""
+    sys.path.insert(0, ROOT)
+    from config import Config
+    from app import create_app
+
+    class BenchmarkConfig(type(Config)):
+        SQLALCHEMY_DATABASE_URI = os.environ['BENCHMARK_DATABASE_URI']
+        PDF_ROOT_PATH = os.environ['BENCHMARK_PDF_ROOT']
+        AUTO_CREATE_SCHEMA = os.environ.get('BENCHMARK_CREATE_SCHEMA') == '1'
+
+    return create_app(BenchmarkConfig)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def read_memory(pid):
+    """Return RSS, PSS and private memory of a process in KiB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    private = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values.get('Rss', 0), values.get('Pss', 0), private
+
+
+def run_mode(mode, workers, work_dir, timeout=60):
+    """
+    Start gunicorn in a mode and measure it
+
+    Returns:
+        dict: Startup seconds and per-worker memory
+    """
+    marker_dir = tempfile.mkdtemp(dir=work_dir)
+    config_path = os.path.join(marker_dir, 'gunicorn_hooks.py')
+    with open(config_path, 'w') as f:
+        f.write(HOOKS.format(marker_dir=marker_dir))
+    database = os.path.join(work_dir, 'db.sqlite')
+    if os.path.exists(database):
+        os.remove(database)
+
+    port = free_port()
+    env = dict(os.environ,
+               PYTHONPATH=ROOT,
+               BENCHMARK_DATABASE_URI=f"sqlite:///{database}",
+               BENCHMARK_PDF_ROOT=os.path.join(work_dir, 'pdfs'),
+               BENCHMARK_CREATE_SCHEMA='1' if MODES[mode]['create_schema'] else '0')
+    command = [sys.executable, '-m', 'gunicorn', 'benchmarks.startup_benchmark:create_benchmark_app()',
+               '--bind', f'127.0.0.1:{port}', '-w', str(workers), '-c', config_path,
+               '--log-level', 'warning'] + MODES[mode]['args']
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=work_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        while len([name for name in os.listdir(marker_dir) if name.isdigit()]) < workers:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited: {process.stderr.read().decode()[-2000:]}")
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError(f"Workers not ready after {timeout}s")
+            time.sleep(0.01)
+        startup = time.perf_counter() - started
+
+        # Serve some requests so lazily initialized state is counted too
+        for _ in range(workers * 20):
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health').read()
+
+        pids = [int(name) for name in os.listdir(marker_dir) if name.isdigit()]
+        memory = [read_memory(pid) for pid in pids]
+        master = read_memory(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        shutil.rmtree(marker_dir, ignore_errors=True)
+
+    return {'startup': startup, 'workers': memory, 'master': master}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--modes', default=','.join(MODES), help="Comma-separated modes to run")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='startup-benchmark-')
+    os.makedirs(os.path.join(work_dir, 'pdfs'))
+    try:
+        print(f"{'mode':<8} {'startup s':>10} {'worker RSS MiB':>15} {'worker PSS MiB':>15} "
+              f"{'worker private MiB':>19} {'total PSS MiB':>14}")
+        for mode in args.modes.split(','):
+            results = [run_mode(mode, args.workers, work_dir) for _ in range(args.runs)]
+            # Median run by startup time
+            median = sorted(results, key=lambda result: result['startup'])[len(results) // 2]
+            startup = median['startup']
+            count = len(median['workers'])
+            rss = sum(memory[0] for memory in median['workers']) / count / 1024
+            pss = sum(memory[1] for memory in median['workers']) / count / 1024
+            private = sum(memory[2] for memory in median['workers']) / count / 1024
+            total = (sum(memory[1] for memory in median['workers']) + median['master'][1]) / 1024
+            print(f"{mode:<8} {startup:>10.2f} {rss:>15.1f} {pss:>15.1f} {private:>19.1f} {total:>14.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""
+Flask CLI commands for maintenance tasks
+
+Run with the application factory, e.g.:
+    FLASK_APP="app:create_app()" flask storage migrate-cas
+"""
+
+
+def register_commands(app):
+    """Register all command groups with the Flask app"""
+    from commands.apikeys import apikeys_cli
+    from commands.articles import articles_cli
+    from commands.export import export_cli
+    from commands.logs import logs_cli
+    from commands.schema import schema_cli
+    from commands.search import search_cli
+    from commands.storage import storage_cli
+    from commands.text import text_cli
+
+    app.cli.add_command(apikeys_cli)
+    app.cli.add_command(articles_cli)
+    app.cli.add_command(export_cli)
+    app.cli.add_command(logs_cli)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(storage_cli)
+    app.cli.add_command(text_cli)
@@ -0,0 +1,62 @@
+import secrets
+import click
+from datetime import datetime
+from flask.cli import AppGroup
+from models import db, ApiKey
+from services.api_key_service import POLICY_FIELDS, hash_api_key, get_usage, load_api_keys, prune_usage
+
+apikeys_cli = AppGroup('apikeys', help="API keys and their usage policies")
+
+
+@apikeys_cli.command('add')
+@click.argument('name')
+@click.option('--rps', 'requests_per_second', type=float, default=None, help="Requests per second")
+@click.option('--burst', type=int, default=None, help="Requests allowed at once above the rate")
+@click.option('--max-downloads', 'max_concurrent_downloads', type=int, default=None,
+              help="Concurrent downloads per host")
+@click.option('--daily-misses', 'daily_miss_budget', type=int, default=None,
+              help="Downloads per UTC day per host")
+def add(name, **policy):
+    """
+    Create a database API key and print it
+
+    Only the key's hash is stored, so the key cannot be shown again. Unset
+    limits use API_KEY_DEFAULT_POLICY. Requires API_KEY_SOURCE = 'database'.
+    """
+    api_key = secrets.token_urlsafe(32)
+    db.session.add(ApiKey(key_hash=hash_api_key(api_key), name=name, **policy))
+    db.session.commit()
+    click.echo(api_key)
+
+
+@apikeys_cli.command('disable')
+@click.argument('name')
+def disable(name):
+    """Reject a database API key (after API_KEY_CACHE_TTL)"""
+    api_key = ApiKey.query.filter_by(name=name).first()
+    if api_key is None:
+        raise click.ClickException(f"No API key named {name}")
+    api_key.enabled = False
+    db.session.commit()
+    click.echo(f"Disabled {name}")
+
+
+@apikeys_cli.command('list')
+@click.option('--day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help="UTC day of the usage counters (default: today)")
+def list_keys(day):
+    """Show the accepted keys with their policies and usage on this host"""
+    day = day.date() if day else None
+    for policy in sorted(load_api_keys().values(), key=lambda policy: policy['name']):
+        limits = ', '.join(f"{field}={policy[field]}" for field in POLICY_FIELDS)
+        usage = ', '.join(f"{field}={value}" for field, value in get_usage(policy, day).items())
+        click.echo(f"{policy['name']}: {limits}")
+        click.echo(f"    {(day or datetime.utcnow().date()).isoformat()}: {usage}")
+
+
+@apikeys_cli.command('prune-usage')
+@click.option('--days', type=click.IntRange(min=1), default=None,
+              help="Days of usage counters to keep, including today (default: API_KEY_USAGE_RETENTION_DAYS)")
+def prune_expired_usage(days):
+    """Delete usage counters older than the retention window on this host"""
+    click.echo(f"Deleted {prune_usage(days)} expired usage counters")
@@ -0,0 +1,45 @@
+import click
+from datetime import datetime
+from flask.cli import AppGroup
+from models import db, Article
+from utils.doi_utils import normalize_doi
+
+articles_cli = AppGroup('articles', help="Article metadata maintenance")
+
+
+@articles_cli.command('normalize-dois')
+@click.option('--batch-size', default=1000, show_default=True, help="Articles per database batch")
+def normalize_dois(batch_size):
+    """
+    Normalize stored DOIs so local DOI lookups match them
+
+    Lookups compare normalized DOIs (lowercase, no URL or 'doi:' prefix);
+    older rows stored them as crawled. Values that are not DOIs are left
+    as they are. The command can be re-run at any time.
+    """
+    updated = invalid = 0
+    last_id = 0
+    while True:
+        rows = (db.session.query(Article.id, Article.doi)
+                .filter(Article.id > last_id, Article.doi.isnot(None))
+                .order_by(Article.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        changes = []
+        for row in rows:
+            doi = normalize_doi(row.doi)
+            if doi is None:
+                invalid += 1
+            elif doi != row.doi:
+                changes.append({'id': row.id, 'doi': doi, 'updated_at': datetime.utcnow()})
+        if changes:
+            db.session.bulk_update_mappings(Article, changes)
+            updated += len(changes)
+        db.session.commit()
+        click.echo(f"Normalized {updated} DOIs up to id {last_id}")
+
+    click.echo(f"Done: {updated} DOIs normalized, {invalid} values that are not DOIs left unchanged")
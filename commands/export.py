@@ -0,0 +1,37 @@
+import click
+from flask.cli import AppGroup
+from services.export_service import EXPORT_COMPRESSIONS, EXPORT_FORMATS, iter_export
+
+export_cli = AppGroup('export', help="Bulk metadata exports")
+
+
+@export_cli.command('articles')
+@click.option('--output', '-o', default='-', show_default=True, help="Output file, - for stdout")
+@click.option('--format', 'export_format', type=click.Choice(EXPORT_FORMATS), default='ndjson', show_default=True)
+@click.option('--compression', type=click.Choice(EXPORT_COMPRESSIONS), default=None, help="Compress the output")
+@click.option('--journal', default=None, help="Exact journal name")
+@click.option('--year', type=int, default=None, help="Publication year")
+@click.option('--year-from', type=int, default=None, help="Minimum publication year")
+@click.option('--year-to', type=int, default=None, help="Maximum publication year")
+@click.option('--has-pdf/--no-pdf', default=None, help="Only articles with (or without) a stored PDF")
+@click.option('--updated-from', type=click.DateTime(), default=None, help="Minimum update time (inclusive)")
+@click.option('--updated-to', type=click.DateTime(), default=None, help="Maximum update time (exclusive)")
+def export_articles(output, export_format, compression, **filters):
+    """
+    Export article metadata as NDJSON, CSV, Parquet or Arrow
+
+    Same output and filters as GET /api/articles/export. Rows are streamed
+    from a server-side cursor, so memory use does not grow with the table.
+    """
+    try:
+        chunks = iter_export(export_format, compression, **filters)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    written = 0
+    with click.open_file(output, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    if output != '-':
+        click.echo(f"Wrote {written} bytes to {output}")
@@ -0,0 +1,57 @@
+import os
+import json
+import click
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from flask.cli import AppGroup
+from services.warmup_service import get_hot_set_path, write_hot_set
+from utils.api_logger import api_logger
+from utils.log_analysis import LogStats, analyze_file, find_log_files
+
+logs_cli = AppGroup('logs', help="API log analysis")
+
+
+@logs_cli.command('analyze')
+@click.option('--log-dir', default=None, help="Log root (default: the API logger's directory)")
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help="Parallel parser processes")
+@click.option('--top', default=20, show_default=True, help="Number of top PMIDs to report")
+@click.option('--json', 'as_json', is_flag=True, help="Print the report as JSON")
+@click.option('--write-hot-set', 'save_hot_set', is_flag=True, help="Write the most requested PMIDs to the hot-set file")
+@click.option('--hot-set-size', default=None, type=int, help="PMIDs in the hot set (default: HOT_SET_SIZE)")
+def analyze(log_dir, workers, top, as_json, save_hot_set, hot_set_size):
+    """
+    Report latency percentiles per outcome, top PMIDs and miss and repeat-failure rates
+
+    All api_calls.log files and rotated backups below the log root are
+    parsed in parallel, one file per process, and their counts merged.
+    """
+    files = find_log_files(log_dir or api_logger.log_dir)
+    if not files:
+        raise click.ClickException("No api_calls.log files found")
+
+    stats = LogStats()
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(files)))) as executor:
+        for file_stats in executor.map(analyze_file, files):
+            stats.merge(file_stats)
+    summary = stats.summary(top)
+
+    if as_json:
+        click.echo(json.dumps(summary, indent=2))
+    else:
+        click.echo(f"{summary['requests']} responses in {len(files)} files")
+        click.echo(f"{'outcome':<24} {'count':>10} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10}")
+        for outcome, data in summary['outcomes'].items():
+            latency = data['latency_ms']
+            click.echo(f"{outcome:<24} {data['count']:>10} {latency.get(0.5, 0):>10} "
+                       f"{latency.get(0.9, 0):>10} {latency.get(0.99, 0):>10}")
+        click.echo(f"Miss rate: {summary['miss_rate']}, repeat-failure rate: {summary['repeat_failure_rate']}")
+        click.echo("Top PMIDs: " + ", ".join(f"{pmid} ({count})" for pmid, count in summary['top_pmids']))
+
+    if save_hot_set:
+        size = hot_set_size or current_app.config.get('HOT_SET_SIZE', 10000)
+        # PMIDs that only ever failed have nothing to warm
+        pmids = [pmid for pmid, count in stats.pmid_requests.most_common()
+                 if stats.pmid_failures[pmid] < count][:size]
+        path = get_hot_set_path()
+        write_hot_set(path, pmids)
+        click.echo(f"Wrote {len(pmids)} PMIDs to {path}")
@@ -0,0 +1,16 @@
+import click
+from flask.cli import AppGroup
+from models import db
+from utils.schema_utils import upgrade_schema
+
+schema_cli = AppGroup('schema', help="Database schema maintenance")
+
+
+@schema_cli.command('upgrade')
+def upgrade():
+    """Create missing tables, columns and indexes"""
+    changes = upgrade_schema(db)
+    if not changes:
+        click.echo("Schema is up to date")
+    for table, change in changes.items():
+        click.echo(f"{table}: added columns {change['columns']}, created indexes {change['indexes']}")
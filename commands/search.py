@@ -0,0 +1,92 @@
+import os
+import gzip
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, Article
+from services.search_service import get_index_path, flush_pending
+from services.text_service import get_current_text_path
+from utils.search_index import IndexWriter, SearchIndex, tokenize, write_segment
+
+search_cli = AppGroup('search', help="Local full-text search index")
+
+
+@search_cli.command('rebuild')
+@click.option('--batch-size', default=500, show_default=True, help="Articles per database batch")
+@click.option('--segment-docs', default=50000, show_default=True, help="Articles per index segment")
+def rebuild(batch_size, segment_docs):
+    """
+    Rebuild the search index from all extracted article text
+
+    The new segments are swapped in at the end, the old index keeps serving
+    searches until then. Run `flask text extract` first to index articles
+    whose text has not been extracted yet.
+    """
+    max_segments = current_app.config.get('SEARCH_INDEX_MAX_SEGMENTS', 8)
+    last_id = 0
+    indexed = skipped = 0
+    documents = {}
+    segment_names = []
+
+    with IndexWriter(get_index_path(), max_segments=max_segments) as writer:
+        def write_pending():
+            path = writer.new_segment_path()
+            write_segment(path, documents)
+            segment_names.append(os.path.basename(path))
+            documents.clear()
+
+        while True:
+            articles = (Article.query
+                        .filter(Article.id > last_id, Article.has_pdf.is_(True))
+                        .order_by(Article.id)
+                        .limit(batch_size)
+                        .all())
+            if not articles:
+                break
+
+            for article in articles:
+                text_path = get_current_text_path(article)
+                if not text_path or not article.pmid.isdigit():
+                    skipped += 1
+                    continue
+                with gzip.open(text_path, 'rt', encoding='utf-8') as f:
+                    documents[int(article.pmid)] = tokenize(f.read())
+                indexed += 1
+                if len(documents) >= segment_docs:
+                    write_pending()
+
+            last_id = articles[-1].id
+            db.session.rollback()
+            click.echo(f"Indexed {indexed}, skipped {skipped} up to id {last_id}")
+
+        if documents:
+            write_pending()
+        writer.replace_all(segment_names)
+        if len(segment_names) > max_segments:
+            writer.merge()
+
+    click.echo(f"Done: {indexed} indexed, {skipped} without current text")
+
+
+@search_cli.command('update')
+def update():
+    """Index articles queued since the last flush"""
+    count = flush_pending(get_index_path(), current_app.config.get('SEARCH_INDEX_MAX_SEGMENTS', 8))
+    click.echo(f"Indexed {count} articles")
+
+
+@search_cli.command('compact')
+def compact():
+    """Merge all segments into one, dropping superseded documents"""
+    with IndexWriter(get_index_path()) as writer:
+        writer.merge()
+    click.echo("Index compacted")
+
+
+@search_cli.command('stats')
+def stats():
+    """Show index size"""
+    index = SearchIndex(get_index_path(), refresh_interval=0)
+    index.refresh()
+    for name, value in index.stats().items():
+        click.echo(f"{name}: {value}")
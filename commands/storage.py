@@ -0,0 +1,314 @@
+import os
+import time
+import click
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, Article
+from services.storage_service import (
+    compute_content_hash, get_article_pdf_path, get_shard_path, ingest_pdf, is_content_addressed,
+    link_tree, quarantine_pdf, resolve_pdf_path
+)
+from services.search_service import remove_from_index
+from services.tier_service import evict_hot_tier, get_cold_backend, get_cold_key
+from services.warmup_service import get_hot_set_path, warm_hot_set
+from utils.pdf_utils import verify_pdf_file
+
+storage_cli = AppGroup('storage', help="PDF storage maintenance")
+
+
+@storage_cli.command('migrate-cas')
+@click.option('--batch-size', default=500, show_default=True, help="Articles per database batch")
+@click.option('--workers', default=8, show_default=True, help="Parallel hashing threads")
+@click.option('--dry-run', is_flag=True, help="Only hash files and report duplicate savings")
+def migrate_cas(batch_size, workers, dry_run):
+    """
+    Hash existing PDFs and move them into the content-addressed layout
+
+    Only articles without a content hash are processed, so the command can be
+    interrupted and re-run. With PDF_STORAGE_LAYOUT='legacy' it just fills the
+    content_hash and size columns.
+    """
+    if not dry_run and not is_content_addressed():
+        click.echo("PDF_STORAGE_LAYOUT is not 'content_addressed'; only filling content_hash/size")
+
+    app = current_app._get_current_object()
+    seen_hashes = set()
+    processed = duplicates = saved_bytes = missing = 0
+    last_id = 0
+
+    def process(pdf_path):
+        with app.app_context():
+            if dry_run:
+                content_hash, size = compute_content_hash(pdf_path)
+                return {'content_hash': content_hash, 'size': size}
+            return ingest_pdf(pdf_path)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            articles = (Article.query
+                        .filter(Article.id > last_id,
+                                Article.has_pdf.is_(True),
+                                Article.content_hash.is_(None))
+                        .order_by(Article.id)
+                        .limit(batch_size)
+                        .all())
+            if not articles:
+                break
+            last_id = articles[-1].id
+
+            paths = [get_article_pdf_path(article) for article in articles]
+            present = [(article, path) for article, path in zip(articles, paths)
+                       if path and os.path.exists(path)]
+            missing += len(articles) - len(present)
+
+            for (article, _), file_info in zip(present, executor.map(process, [p for _, p in present])):
+                processed += 1
+                if file_info['content_hash'] in seen_hashes:
+                    duplicates += 1
+                    saved_bytes += file_info['size']
+                seen_hashes.add(file_info['content_hash'])
+                if not dry_run:
+                    article.content_hash = file_info['content_hash']
+                    article.size = file_info['size']
+
+            if dry_run:
+                # Skip over the batch instead of relying on content_hash being set
+                db.session.rollback()
+            else:
+                db.session.commit()
+            click.echo(f"Processed {processed} files ({duplicates} duplicates) up to id {last_id}")
+
+    click.echo(f"Done: {processed} files, {duplicates} duplicates, "
+               f"{saved_bytes / (1024 * 1024):.1f} MiB deduplicated, {missing} missing files")
+
+
+@storage_cli.command('verify')
+@click.option('--batch-size', default=500, show_default=True, help="Articles per database batch")
+@click.option('--workers', default=8, show_default=True, help="Parallel verification threads")
+@click.option('--force', is_flag=True, help="Re-verify files whose cached verdict is still current")
+def verify(batch_size, workers, force):
+    """
+    Verify stored PDFs, quarantining broken files and re-queuing their articles
+
+    Files whose size and mtime match the verdict stored on the article are
+    skipped unless --force is given.
+    """
+    min_pages = current_app.config.get('PDF_MIN_PAGES', 1)
+    checked = invalid = missing = 0
+    last_id = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            articles = (Article.query
+                        .filter(Article.id > last_id, Article.has_pdf.is_(True))
+                        .order_by(Article.id)
+                        .limit(batch_size)
+                        .all())
+            if not articles:
+                break
+            last_id = articles[-1].id
+
+            stale = []
+            for article in articles:
+                pdf_path = resolve_pdf_path(article)
+                try:
+                    stat = os.stat(pdf_path)
+                except (OSError, TypeError):
+                    missing += 1
+                    article.has_pdf = False
+                    remove_from_index(article.pmid)
+                    continue
+                if (not force and article.pdf_valid is not None
+                        and article.size == stat.st_size
+                        and article.file_mtime_ns == stat.st_mtime_ns):
+                    continue
+                stale.append((article, pdf_path, stat))
+
+            results = executor.map(lambda item: verify_pdf_file(item[1], min_pages), stale)
+            for (article, pdf_path, stat), result in zip(stale, results):
+                checked += 1
+                article.pdf_valid = result.valid
+                article.size = stat.st_size
+                article.file_mtime_ns = stat.st_mtime_ns
+                if not result.valid:
+                    invalid += 1
+                    click.echo(f"PMID {article.pmid}: {result.reason}")
+                    quarantine_pdf(article.pmid, pdf_path)
+                    article.has_pdf = False
+                    article.download_attempted = False
+                    remove_from_index(article.pmid)
+
+            db.session.commit()
+
+    click.echo(f"Done: {checked} files verified, {invalid} quarantined, {missing} missing")
+
+
+@storage_cli.command('migrate-layout')
+@click.option('--batch-size', default=500, show_default=True, help="Articles per database batch")
+@click.option('--workers', default=8, show_default=True, help="Parallel move threads")
+@click.option('--grace', default=30.0, show_default=True,
+              help="Seconds before old directories are removed, for requests that read the old path")
+@click.option('--dry-run', is_flag=True, help="Only count the directories to move")
+def migrate_layout(batch_size, workers, grace, dry_run):
+    """
+    Move existing article directories into the PDF_SHARD_LAYOUT layout while serving
+
+    Each directory is recreated at its shard path with hardlinks, then the
+    batch's relative_path values are committed and the old directories are
+    removed after --grace seconds, so a request always finds the files under
+    the path it read. Directories already in place are skipped, so the
+    command can be interrupted and re-run.
+    """
+    if not current_app.config.get('PDF_SHARD_LAYOUT'):
+        raise click.ClickException("PDF_SHARD_LAYOUT is not configured")
+
+    root = current_app.config['PDF_ROOT_PATH']
+    # Cold keys of per-PMID files follow relative_path; blobs keep theirs
+    backend = None if is_content_addressed() else get_cold_backend()
+    moved = skipped = 0
+    last_id = 0
+    pending_removal = deque()
+
+    def move(item):
+        source, target = item
+        source_dir = os.path.join(root, source)
+        target_dir = os.path.join(root, *target.split('/'))
+        pdf_path = os.path.join(source_dir, 'article.pdf')
+        if not os.path.isdir(source_dir) or (backend is not None and not os.path.exists(pdf_path)):
+            # Missing, or only in the cold tier under its old key: keep the old path
+            return False
+        if os.path.commonpath([os.path.abspath(source_dir), os.path.abspath(target_dir)]) == os.path.abspath(source_dir):
+            # The old directory holds the new one (e.g. the root itself) and must not be removed
+            return False
+        link_tree(source_dir, target_dir)
+        if backend is not None:
+            key = os.path.relpath(os.path.join(target_dir, 'article.pdf'), root)
+            if not backend.exists(key):
+                backend.put_file(key, pdf_path)
+        return True
+
+    def remove_old(wait=False):
+        while pending_removal and (wait or pending_removal[0][0] <= time.monotonic()):
+            due, directories = pending_removal.popleft()
+            time.sleep(max(0.0, due - time.monotonic()))
+            for directory in directories:
+                shutil.rmtree(directory, ignore_errors=True)
+                # Drop parents left empty, up to the storage root
+                parent = os.path.dirname(directory)
+                while os.path.abspath(parent) != os.path.abspath(root):
+                    try:
+                        os.rmdir(parent)
+                    except OSError:
+                        break
+                    parent = os.path.dirname(parent)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            articles = (Article.query
+                        .filter(Article.id > last_id, Article.relative_path.isnot(None))
+                        .order_by(Article.id)
+                        .limit(batch_size)
+                        .all())
+            if not articles:
+                break
+            last_id = articles[-1].id
+
+            todo = [(article, get_shard_path(article.pmid)) for article in articles]
+            todo = [(article, target) for article, target in todo
+                    if article.relative_path.replace(os.sep, '/') != target]
+            if dry_run:
+                moved += len(todo)
+                db.session.rollback()
+                continue
+
+            results = executor.map(move, [(article.relative_path, target) for article, target in todo])
+            old_dirs = []
+            for (article, target), done in zip(todo, results):
+                if done:
+                    old_dirs.append(os.path.join(root, article.relative_path))
+                    article.relative_path = target
+                    moved += 1
+                else:
+                    skipped += 1
+            db.session.commit()
+            pending_removal.append((time.monotonic() + grace, old_dirs))
+            remove_old()
+            click.echo(f"Moved {moved} directories ({skipped} skipped) up to id {last_id}")
+
+    remove_old(wait=True)
+    if dry_run:
+        click.echo(f"Done: {moved} directories to move")
+    else:
+        click.echo(f"Done: {moved} directories moved, {skipped} missing or only in the cold tier")
+
+
+@storage_cli.command('upload-cold')
+@click.option('--batch-size', default=500, show_default=True, help="Articles per database batch")
+@click.option('--workers', default=8, show_default=True, help="Parallel upload threads")
+def upload_cold(batch_size, workers):
+    """Copy stored PDFs that are missing from the cold tier into it"""
+    backend = get_cold_backend()
+    if backend is None:
+        raise click.ClickException("PDF_COLD_STORAGE is not configured")
+
+    root = current_app.config['PDF_ROOT_PATH']
+    uploaded = skipped = 0
+    last_id = 0
+
+    def upload(key):
+        path = os.path.join(root, key)
+        if not os.path.exists(path) or backend.exists(key):
+            return False
+        backend.put_file(key, path)
+        return True
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            articles = (Article.query
+                        .filter(Article.id > last_id, Article.has_pdf.is_(True))
+                        .order_by(Article.id)
+                        .limit(batch_size)
+                        .all())
+            if not articles:
+                break
+            last_id = articles[-1].id
+
+            keys = {get_cold_key(article) for article in articles} - {None}
+            for done in executor.map(upload, keys):
+                if done:
+                    uploaded += 1
+                else:
+                    skipped += 1
+            db.session.rollback()
+            click.echo(f"Uploaded {uploaded} files ({skipped} skipped) up to id {last_id}")
+
+    click.echo(f"Done: {uploaded} files uploaded, {skipped} already present or missing locally")
+
+
+@storage_cli.command('evict')
+def evict():
+    """Evict least recently used PDFs from the hot tier down to its quota"""
+    if get_cold_backend() is None or not current_app.config.get('PDF_HOT_TIER_QUOTA_BYTES'):
+        raise click.ClickException("PDF_COLD_STORAGE and PDF_HOT_TIER_QUOTA_BYTES must be configured")
+    stats = evict_hot_tier()
+    if stats is None:
+        click.echo("Another process is already evicting")
+    else:
+        click.echo(f"Hot tier usage {stats['usage']} bytes: evicted {stats['evicted']} files, "
+                   f"freed {stats['freed']} bytes")
+
+
+@storage_cli.command('warm')
+@click.option('--limit', default=None, type=int, help="PMIDs to warm (default: HOT_SET_SIZE)")
+@click.option('--max-bytes', default=None, type=int, help="Page cache budget (default: HOT_SET_WARM_MAX_BYTES)")
+def warm(limit, max_bytes):
+    """Warm the database and page cache for the PMIDs of the hot-set file"""
+    stats = warm_hot_set(limit, max_bytes)
+    if not stats['pmids']:
+        raise click.ClickException(f"No hot set at {get_hot_set_path()}; run `flask logs analyze --write-hot-set`")
+    click.echo(f"Warmed {stats['articles']} of {stats['pmids']} articles and {stats['files']} files "
+               f"({stats['bytes']} bytes)")
+
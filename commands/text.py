@@ -0,0 +1,70 @@
+import os
+import click
+from concurrent.futures import wait
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, Article
+from services.text_service import get_current_text_path, submit_extraction
+
+text_cli = AppGroup('text', help="Full-text extraction")
+
+CHECKPOINT_FILE = '.text-extraction.checkpoint'
+
+
+@text_cli.command('extract')
+@click.option('--batch-size', default=200, show_default=True, help="Articles per database batch")
+@click.option('--checkpoint', default=None, help="Checkpoint file (default: PDF_ROOT_PATH/.text-extraction.checkpoint)")
+@click.option('--restart', is_flag=True, help="Ignore the checkpoint and start from the first article")
+def extract(batch_size, checkpoint, restart):
+    """
+    Extract and cache the text of all stored PDFs
+
+    Work is spread over the TEXT_EXTRACTION_WORKERS process pool. The last
+    completed article id is written to a checkpoint after every batch, and
+    articles with up-to-date text are skipped, so an interrupted run resumes
+    where it stopped.
+    """
+    checkpoint = checkpoint or os.path.join(current_app.config['PDF_ROOT_PATH'], CHECKPOINT_FILE)
+    last_id = 0
+    if not restart and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            last_id = int(f.read().strip() or 0)
+        click.echo(f"Resuming after article id {last_id}")
+
+    extracted = skipped = failed = 0
+
+    while True:
+        articles = (Article.query
+                    .filter(Article.id > last_id, Article.has_pdf.is_(True))
+                    .order_by(Article.id)
+                    .limit(batch_size)
+                    .all())
+        if not articles:
+            break
+
+        futures = {}
+        for article in articles:
+            if get_current_text_path(article):
+                skipped += 1
+                continue
+            try:
+                futures[submit_extraction(article)] = article.pmid
+            except Exception as e:
+                failed += 1
+                click.echo(f"PMID {article.pmid}: {str(e)}")
+
+        wait(futures)
+        for future, pmid in futures.items():
+            if future.exception():
+                failed += 1
+                click.echo(f"PMID {pmid}: {str(future.exception())}")
+            else:
+                extracted += 1
+
+        last_id = articles[-1].id
+        db.session.rollback()
+        with open(checkpoint, 'w') as f:
+            f.write(str(last_id))
+        click.echo(f"Extracted {extracted}, skipped {skipped}, failed {failed} up to id {last_id}")
+
+    click.echo(f"Done: {extracted} extracted, {skipped} already current, {failed} failed")
@@ -68,8 +68,190 @@ class ConfigBase(object):
     # PDF storage configuration
     PDF_ROOT_PATH = PDF_ROOT_PATH
     
+    # PDF storage layout: 'legacy' keeps PubCrawler's per-PMID article.pdf files,
+    # 'content_addressed' stores sha256-named blobs under PDF_BLOB_DIR and
+    # links the per-PMID entries to them ('hardlink') or keeps only a DB pointer ('pointer')
+    PDF_STORAGE_LAYOUT = 'legacy'
+    PDF_BLOB_DIR = '.blobs'
+    PDF_BLOB_LINK_MODE = 'hardlink'
+    
+    # Sharded directories for new downloads under PDF_SHARD_DIR instead of PubCrawler's paths:
+    # 'pmid' fans out by the PMID's last digits (shards/678/345/12345678), 'hash' by an MD5 prefix
+    # of the PMID (shards/a1/b2/12345678), None keeps PubCrawler's layout. Existing trees are moved
+    # with `flask storage migrate-layout`
+    PDF_SHARD_LAYOUT = None
+    PDF_SHARD_DIR = 'shards'
+    PDF_SHARD_DEPTH = 2
+    PDF_SHARD_WIDTH = None  # Characters per level, defaults to 3 digits ('pmid') or 2 hex digits ('hash')
+    
+    # PDF verification: structural checks run after download and during bulk verification,
+    # verdicts are cached on Article and failing files are moved to PDF_QUARANTINE_DIR
+    PDF_VERIFY_ENABLED = True
+    PDF_MIN_PAGES = 1
+    PDF_QUARANTINE_DIR = '.quarantine'
+    
+    # Tiered storage: PDF_ROOT_PATH is a hot tier in front of an optional cold tier, e.g.
+    # {'type': 's3', 'bucket': 'articles', 'endpoint_url': 'http://minio:9000'} or
+    # {'type': 'directory', 'root': '/mnt/cold-articles'}. None disables tiering.
+    PDF_COLD_STORAGE = None
+    PDF_HOT_TIER_QUOTA_BYTES = 0  # 0 disables eviction
+    PDF_HOT_TIER_LOW_WATERMARK = 0.9  # Evict down to this fraction of the quota
+    PDF_HOT_TIER_EVICT_INTERVAL = 300  # Minimum seconds between hot tier scans per host
+    PDF_TIER_BACKGROUND_WORKERS = 4
+    
+    # Full-text extraction: runs in a process pool, text is cached as article.txt.gz next to the PDF
+    TEXT_EXTRACTION_WORKERS = 2
+    TEXT_EXTRACTION_WAIT = 0.5  # Seconds a request waits for extraction before answering 202; keep it short
+    TEXT_EXTRACT_ON_DOWNLOAD = True
+    
+    # JSON encoding: 'auto' uses orjson when installed, 'orjson' requires it, 'stdlib' forces json
+    JSON_ENCODER = 'auto'
+    
+    # MCP context endpoints
+    MCP_BATCH_MAX_PMIDS = 500
+    MCP_TEXT_CHUNK_SIZE = 64 * 1024  # Characters per streamed pdf_content line
+    
+    # Metadata query endpoint
+    ARTICLES_PAGE_MAX = 1000
+    
+    # Change feed (/api/changes): page size cap, long-poll limit and interval, and the age
+    # before a change is returned, covering transactions that commit after writing updated_at
+    CHANGE_FEED_PAGE_MAX = 10000
+    CHANGE_FEED_MAX_WAIT = 30
+    CHANGE_FEED_POLL_INTERVAL = 1.0
+    CHANGE_FEED_SETTLE_SECONDS = 2
+    
+    # PDF access stats: hits are counted per worker and added to article_access_stats in batched
+    # upserts every ACCESS_STATS_FLUSH_INTERVAL seconds, or once ACCESS_STATS_MAX_PENDING PMIDs are pending
+    ACCESS_STATS_ENABLED = True
+    ACCESS_STATS_FLUSH_INTERVAL = 30
+    ACCESS_STATS_MAX_PENDING = 10000
+    ACCESS_STATS_BATCH_SIZE = 500
+    
+    # Health checks: run in the background every HEALTH_CHECK_INTERVAL seconds; probes
+    # report not ready when the last run is older than HEALTH_STALE_AFTER
+    HEALTH_CHECK_INTERVAL = 5
+    HEALTH_STALE_AFTER = 30
+    HEALTH_POOL_SATURATION_DEGRADED = 0.9
+    HEALTH_MIN_FREE_BYTES = 1024 ** 3
+    
+    # Metadata export: rows fetched per server-side cursor batch (and per Parquet row group)
+    EXPORT_BATCH_SIZE = 5000
+    
+    # DOI resolution: local lookups first, PubMed for misses
+    DOI_BATCH_MAX = 1000
+    DOI_REMOTE_LOOKUP_MAX = 20  # PubMed lookups per batch request
+    DOI_REMOTE_TIMEOUT = 10
+    
+    # Local full-text search over extracted text (BM25, memory-mapped on-disk index)
+    SEARCH_INDEX_ENABLED = True
+    SEARCH_INDEX_PATH = None  # Defaults to PDF_ROOT_PATH/.search-index
+    SEARCH_INDEX_FLUSH_DOCS = 100  # Pending articles that trigger a new segment
+    SEARCH_INDEX_FLUSH_INTERVAL = 60  # Seconds before pending articles are flushed anyway
+    SEARCH_INDEX_MAX_SEGMENTS = 8
+    SEARCH_RESULTS_MAX = 100
+    
+    # Download scheduler: each worker downloads misses on DOWNLOAD_SCHEDULER_WORKERS threads, interactive
+    # misses ahead of batch and background prefetches, fair-queued per API key within each class
+    DOWNLOAD_SCHEDULER_WORKERS = 4
+    DOWNLOAD_SCHEDULER_RESERVED_INTERACTIVE = 1  # Threads that never take prefetch work
+    DOWNLOAD_SCHEDULER_WEIGHTS = {}  # API key name -> fair-queuing weight, default 1
+    PREFETCH_BATCH_MAX = 1000
+    
+    # PDF delivery: 'stream' sends the bytes, 'url' returns JSON with a signed, expiring URL (also per request
+    # with ?delivery=url) served without API key, database or logging under SIGNED_URL_PREFIX, or by a CDN
+    # at SIGNED_URL_BASE that checks the same HMAC-SHA256 signature
+    PDF_DELIVERY = 'stream'
+    SIGNED_URL_PREFIX = '/files'
+    SIGNED_URL_BASE = None
+    SIGNED_URL_SECRET = None  # Defaults to SECRET_KEY
+    SIGNED_URL_PREVIOUS_SECRETS = []  # Still accepted while rotating the secret
+    SIGNED_URL_TTL = 3600
+    SIGNED_URL_EXPIRY_STEP = 300  # Expiry rounded up to this, so repeated URLs can be cached
+    
+    # PMID status set: has_pdf/failed bitmaps over the PMID space in shared memory (2 bits per PMID up to
+    # PMID_STATUS_CAPACITY, 16 MB for 64 million), so unknown and failed PMIDs are answered without a query
+    PMID_STATUS_ENABLED = True
+    PMID_STATUS_PRELOAD = False  # Load in the preloaded gunicorn master (gunicorn.conf.py), so the workers share it
+    PMID_STATUS_CAPACITY = 64_000_000
+    PMID_STATUS_LOAD_BATCH = 50000  # Rows per fetch of the streaming load query
+    PMID_STATUS_REFRESH_INTERVAL = 60  # Seconds between picking up changes from other hosts and CLI commands
+    
+    # Hot set: the most requested PMIDs, written by `flask logs analyze --write-hot-set` and used to
+    # warm the database buffer pool and the page cache when gunicorn starts (gunicorn.conf.py), not in CLI commands
+    HOT_SET_FILE = None  # Defaults to PDF_ROOT_PATH/.hot-set
+    HOT_SET_SIZE = 10000
+    HOT_SET_WARM_ON_START = False  # On in production
+    HOT_SET_WARM_MAX_BYTES = 2 * 1024 ** 3
+    
+    # Admission control, per worker: misses that would start a download get 503 with Retry-After while
+    # ADMISSION_MAX_WAITING requests wait on downloads or ADMISSION_MAX_IN_FLIGHT requests are running (None:
+    # 3/4 and all of the worker's gunicorn concurrency), so threads stay free for hits. The waiting limit
+    # halves after each ADMISSION_INTERVAL in which the download queue, or the proxy queue timed by
+    # ADMISSION_REQUEST_START_HEADER, stayed above ADMISSION_TARGET_DELAY, and grows back once they drain
+    ADMISSION_ENABLED = True
+    ADMISSION_MAX_WAITING = None
+    ADMISSION_MIN_WAITING = 1
+    ADMISSION_MAX_IN_FLIGHT = None
+    ADMISSION_TARGET_DELAY = 1.0
+    ADMISSION_INTERVAL = 5.0
+    ADMISSION_RETRY_AFTER = 5
+    ADMISSION_REQUEST_START_HEADER = 'X-Request-Start'  # e.g. nginx: proxy_set_header X-Request-Start "t=${msec}"
+
+    # Request deadlines: clients set their budget in seconds with the X-Request-Deadline header, capped at
+    # REQUEST_DEADLINE_MAX (keep it well below GUNICORN_TIMEOUT). A download still running at the deadline
+    # gets a 202 and continues in the background ('continue'), or is stopped ('cancel')
+    REQUEST_DEADLINE_DEFAULT = 25
+    REQUEST_DEADLINE_MAX = 60
+    REQUEST_DEADLINE_ACTION = 'continue'
+    
+    # Circuit breakers per upstream (NCBI, each publisher domain), per worker process: a breaker opens when
+    # BREAKER_ERROR_RATE of the last BREAKER_WINDOW requests failed (timeouts, connection errors, 429, 5xx)
+    BREAKER_WINDOW = 20
+    BREAKER_MIN_CALLS = 10
+    BREAKER_ERROR_RATE = 0.5
+    BREAKER_OPEN_SECONDS = 30  # Before the first half-open probe, doubled after each failed probe
+    BREAKER_MAX_OPEN_SECONDS = 300
+    BREAKER_HALF_OPEN_PROBES = 1
+    
+    # Outbound rate limit: token buckets per upstream domain in front of all requests made through
+    # the requests library. 'host' shares them between the workers of one host (files under
+    # RATE_LIMIT_STATE_DIR, default /dev/shm), 'mysql' or 'redis' across the cluster, None disables
+    RATE_LIMIT_BACKEND = 'host'
+    RATE_LIMIT_STATE_DIR = None
+    RATE_LIMIT_REDIS_URL = None  # e.g. 'redis://localhost:6379/0'
+    RATE_LIMITS = {  # Requests per second; a host uses its most specific domain, '*' is per unlisted host
+        'ncbi.nlm.nih.gov': 3.0,
+        '*': 5.0,
+    }
+    RATE_LIMIT_NCBI_WITH_API_KEY = 10.0  # NCBI allowance when NCBI_API_KEY is set
+    RATE_LIMIT_BURST = 1.0  # Seconds of tokens a bucket can save up
+    RATE_LIMIT_MAX_WAIT = 30  # Longest wait for a token before the request fails
+    
     # Cache settings
     CACHE_TTL = 3600  # 1 hour cache expiration time
+    
+    # Run db.create_all() in create_app; disabled where the migrate/check step handles the schema
+    AUTO_CREATE_SCHEMA = True
+    
+    # Gunicorn server profile (gunicorn.conf.py): 'sync', 'gthread' or 'gevent' (needs gevent installed).
+    # Worker and thread counts left as None are derived from the CPU count
+    GUNICORN_PROFILE = 'gthread'
+    GUNICORN_WORKERS = None
+    GUNICORN_THREADS = None
+    GUNICORN_CONCURRENCY_PER_CPU = 16  # Concurrent requests per core for gthread/gevent, most wait on downloads
+    GUNICORN_WORKER_CONNECTIONS = 1000  # Per gevent worker
+    GUNICORN_MAX_REQUESTS = 5000  # Restart workers after this many requests to bound memory growth
+    GUNICORN_MAX_REQUESTS_JITTER = 500  # So workers do not all restart at once
+    GUNICORN_TIMEOUT = 300
+    GUNICORN_GRACEFUL_TIMEOUT = 120  # Time for in-flight downloads to finish on restart
+    GUNICORN_KEEPALIVE = 5
+    GUNICORN_PRELOAD = False
+    GUNICORN_RELOAD = True
+    
+    # Pre-start check (initialization/check/check_main.py)
+    STARTUP_CHECK_DB_RETRIES = 10
+    STARTUP_CHECK_DB_RETRY_INTERVAL = 3  # Seconds between database connection attempts
 
     # NCBI API configuration
     NCBI_API_KEY = NCBI_API_KEY
@@ -77,6 +259,22 @@ class ConfigBase(object):
 
     # API authentication
     API_KEYS = API_KEYS.split(',') if API_KEYS else ["test-key"]
+    
+    # Per-key policies: API_KEYS get API_KEY_DEFAULT_POLICY, API_KEY_POLICIES maps further keys to
+    # {'name': ..., <policy overrides>}; a None limit is unlimited. With API_KEY_SOURCE 'database',
+    # keys in the api_keys table (`flask apikeys add`) are accepted too. Limits are shared by the
+    # workers of a host through files under API_KEY_STATE_DIR (default /dev/shm)
+    API_KEY_SOURCE = 'config'
+    API_KEY_POLICIES = {}
+    API_KEY_DEFAULT_POLICY = {
+        'requests_per_second': 20.0,
+        'burst': 40,
+        'max_concurrent_downloads': 4,  # Per host
+        'daily_miss_budget': 5000,  # Downloads per UTC day, per host
+    }
+    API_KEY_CACHE_TTL = 60  # Seconds before keys are reloaded
+    API_KEY_STATE_DIR = None
+    API_KEY_USAGE_RETENTION_DAYS = 31  # Days of per-key usage counters kept, including today
 
 class ConfigLocal(ConfigBase):
     # Database configuration
@@ -139,6 +337,15 @@ class ConfigProduction(ConfigBase):
     
     # Production environment cache settings
     CACHE_TTL = 86400  # 24 hours cache expiration time
+    
+    # The schema is created and upgraded by the pre-start check, not by every worker
+    AUTO_CREATE_SCHEMA = False
+    
+    # Workers fork from a preloaded master; --reload would disable preloading
+    GUNICORN_PRELOAD = True
+    GUNICORN_RELOAD = False
+    PMID_STATUS_PRELOAD = True
+    HOT_SET_WARM_ON_START = True
 
 
 # Environment configuration mapping
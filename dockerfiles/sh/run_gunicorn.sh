@@ -12,16 +12,19 @@ check_mysql() {
 
 run_gunicorn() {
   local port=$1
-  gunicorn "app:create_app()" --bind 0.0.0.0:$port --timeout 300 -w 4 --reload
+  # Worker model, counts, timeouts, preload and reload come from gunicorn.conf.py
+  gunicorn -c gunicorn.conf.py "app:create_app()" --bind 0.0.0.0:$port
 }
 
 __main() {
   local port=$1
-  # Uncomment this if you implement MySQL check
-  # check_mysql
+  # Production creates and upgrades the schema here instead of in every worker
+  if [ "$FM_ENV_CONFIG" = "production" ]; then
+    check_mysql
+  fi
   run_gunicorn $port
 }
 
 port="$1"
 
-__main $port
\ No newline at end of file
+__main $port
@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration
+
+Settings come from the GUNICORN_* options in config/app_config.py for the
+current FM_ENV_CONFIG environment (see config/gunicorn_profile.py).
+GUNICORN_PROFILE in the environment selects another profile for one run,
+and command line options still override everything, e.g.:
+
+    gunicorn -c gunicorn.conf.py "app:create_app()" --bind 0.0.0.0:8091
+    GUNICORN_PROFILE=gevent gunicorn -c gunicorn.conf.py "app:create_app()"
+"""
+
+import os
+from config import Config
+from config.gunicorn_profile import get_gunicorn_settings
+
+_settings = get_gunicorn_settings(Config, profile=os.getenv('GUNICORN_PROFILE'))
+
+if _settings['worker_class'] == 'gevent':
+    # Patch before the app (and its locks and sockets) is imported by --preload
+    from gevent import monkey
+    monkey.patch_all()
+
+globals().update(_settings)
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before any worker is forked
+    if server.cfg.preload_app:
+        from app import prepare_server
+        prepare_server(server.app.wsgi())
+
+
+def post_worker_init(worker):
+    # Without --preload the master has no app; the first worker warms the shared caches
+    if not worker.cfg.preload_app and worker.age == 1:
+        from app import prepare_worker
+        prepare_worker(worker.wsgi)
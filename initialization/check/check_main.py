@@ -0,0 +1,102 @@
+"""
+Pre-start check and schema migration
+
+Runs once before the gunicorn master starts (see dockerfiles/sh/run_gunicorn.sh),
+so workers do not each connect to MySQL and run db.create_all() on startup:
+
+1. Wait for the database to accept connections
+2. Create missing tables, columns and indexes
+3. Check that the PDF storage root is a writable directory
+
+Exits with status 1 if any step fails.
+"""
+
+import os
+import sys
+import time
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger('startup_check')
+
+
+def wait_for_database(db, retries, interval):
+    """
+    Wait until the database accepts connections
+
+    Args:
+        db (SQLAlchemy): Flask-SQLAlchemy instance (requires an app context)
+        retries (int): Number of connection attempts
+        interval (float): Seconds between attempts
+
+    Returns:
+        bool: Whether the database is reachable
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            return True
+        except SQLAlchemyError as e:
+            logger.warning(f"Database not reachable (attempt {attempt}/{retries}): {str(e)}")
+            if attempt < retries:
+                time.sleep(interval)
+    return False
+
+
+def check_storage(pdf_root):
+    """
+    Check that the PDF storage root is a writable directory
+
+    Args:
+        pdf_root (str): PDF_ROOT_PATH
+
+    Returns:
+        bool: Whether PDFs can be stored
+    """
+    if not os.path.isdir(pdf_root):
+        logger.error(f"PDF_ROOT_PATH {pdf_root} is not a directory")
+        return False
+    if not os.access(pdf_root, os.W_OK | os.X_OK):
+        logger.error(f"PDF_ROOT_PATH {pdf_root} is not writable")
+        return False
+    return True
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [%(levelname)s] %(message)s')
+
+    from app import create_app
+    from models import db
+    from utils.schema_utils import upgrade_schema
+
+    started = time.perf_counter()
+    app = create_app()
+
+    with app.app_context():
+        config = app.config
+        if not wait_for_database(db, config.get('STARTUP_CHECK_DB_RETRIES', 10),
+                                 config.get('STARTUP_CHECK_DB_RETRY_INTERVAL', 3)):
+            logger.error("Database check failed")
+            return 1
+
+        try:
+            changes = upgrade_schema(db)
+        except SQLAlchemyError as e:
+            logger.error(f"Schema migration failed: {str(e)}")
+            return 1
+        for table, change in changes.items():
+            logger.info(f"Upgraded {table}: columns {change['columns']}, indexes {change['indexes']}")
+
+        if not check_storage(config.get('PDF_ROOT_PATH', '/app/downloads')):
+            return 1
+
+        db.engine.dispose()
+
+    logger.info(f"Startup checks passed in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
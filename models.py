@@ -13,6 +13,15 @@ class Article(db.Model):
     for better database performance, with PMID as a unique indexed field for lookups.
     """
     __tablename__ = 'articles'
+    __table_args__ = (
+        # Composite indexes for the metadata query endpoint; InnoDB and SQLite append the
+        # primary key to every secondary index, so each also serves the ORDER BY id keyset
+        db.Index('ix_articles_journal_year', 'journal', 'year'),
+        db.Index('ix_articles_year', 'year'),
+        db.Index('ix_articles_has_pdf_download_attempted', 'has_pdf', 'download_attempted'),
+        db.Index('ix_articles_download_attempted_has_pdf', 'download_attempted', 'has_pdf'),
+        db.Index('ix_articles_updated_at_id', 'updated_at', 'id'),
+    )
     
     # Database primary key (surrogate key)
     id = db.Column(db.Integer, primary_key=True, 
@@ -47,6 +56,14 @@ class Article(db.Model):
     # File storage information
     relative_path = db.Column(db.String(255), nullable=True,
                              comment="Relative path to the PDF file in the storage system")
+    content_hash = db.Column(db.String(64), index=True, nullable=True,
+                            comment="SHA-256 of the PDF bytes, names the content-addressed blob and serves as strong ETag")
+    size = db.Column(db.BigInteger, nullable=True,
+                    comment="Size of the PDF file in bytes")
+    file_mtime_ns = db.Column(db.BigInteger, nullable=True,
+                             comment="Modification time (ns) of the PDF file when it was last verified")
+    pdf_valid = db.Column(db.Boolean, nullable=True,
+                         comment="Cached verification verdict for the PDF file, valid while size and file_mtime_ns match. NULL if never verified")
     
     # Download status
     download_attempted = db.Column(db.Boolean, default=False,
@@ -61,21 +78,93 @@ class Article(db.Model):
     def __repr__(self):
         return f"<Article pmid={self.pmid}, title={self.title}>"
     
+    # Fields of to_dict, in order; also the columns of metadata exports
+    DICT_FIELDS = (
+        'id', 'pmid', 'doi', 'title', 'authors', 'journal', 'year',
+        'has_pdf', 'has_abstract', 'full_text_available', 'commercial_use_allowed',
+        'relative_path', 'content_hash', 'size', 'pdf_valid', 'download_attempted',
+        'created_at', 'updated_at'
+    )
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'pmid': self.pmid,
-            'doi': self.doi,
-            'title': self.title,
-            'authors': self.authors,
-            'journal': self.journal,
-            'year': self.year,
-            'has_pdf': self.has_pdf,
-            'has_abstract': self.has_abstract,
-            'full_text_available': self.full_text_available,
-            'commercial_use_allowed': self.commercial_use_allowed,
-            'relative_path': self.relative_path,
-            'download_attempted': self.download_attempted,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        return Article.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """
+        Build the to_dict representation from an Article or a row of DICT_FIELDS columns
+        
+        Exports select plain rows instead of loading one Article per row.
+        """
+        data = {field: getattr(row, field) for field in Article.DICT_FIELDS}
+        for field in ('created_at', 'updated_at'):
+            data[field] = data[field].isoformat() if data[field] else None
+        return data
+
+class ApiKey(db.Model):
+    """
+    API key with its usage policy.
+    
+    Only the SHA-256 of the key is stored. Policy columns left NULL use
+    API_KEY_DEFAULT_POLICY. Read when API_KEY_SOURCE is 'database'.
+    """
+    __tablename__ = 'api_keys'
+    
+    key_hash = db.Column(db.String(64), primary_key=True,
+                        comment="SHA-256 hex digest of the API key")
+    name = db.Column(db.String(100), unique=True, nullable=False,
+                    comment="Client name, identifies the key in usage counters and logs")
+    
+    # Policy
+    requests_per_second = db.Column(db.Float, nullable=True,
+                                   comment="Sustained request rate, NULL for the default")
+    burst = db.Column(db.Integer, nullable=True,
+                     comment="Requests allowed at once above the sustained rate, NULL for the default")
+    max_concurrent_downloads = db.Column(db.Integer, nullable=True,
+                                        comment="Cache misses downloaded at the same time, NULL for the default")
+    daily_miss_budget = db.Column(db.Integer, nullable=True,
+                                 comment="Cache misses downloaded per UTC day, NULL for the default")
+    
+    enabled = db.Column(db.Boolean, default=True, nullable=False,
+                       comment="Disabled keys are rejected")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow,
+                          comment="Timestamp when the key was created")
+    
+    def __repr__(self):
+        return f"<ApiKey name={self.name}>"
+
+
+class RateLimitBucket(db.Model):
+    """
+    Token bucket state for the cluster-wide outbound rate limiter.
+    
+    Only used when RATE_LIMIT_BACKEND is 'mysql'; one row per upstream domain.
+    """
+    __tablename__ = 'rate_limit_buckets'
+    
+    bucket = db.Column(db.String(255), primary_key=True,
+                      comment="Bucket name, the upstream domain")
+    tokens = db.Column(db.Float(precision=53), nullable=False,
+                      comment="Available tokens, negative while requests are reserved ahead")
+    last_refill = db.Column(db.Float(precision=53), nullable=False,
+                           comment="Unix time of the last bucket update")
+
+
+class ArticleAccess(db.Model):
+    """
+    Aggregated PDF access counts per PMID.
+    
+    Kept out of the articles table so that counting hits does not write to
+    article rows; workers add their in-memory counts with batched upserts.
+    """
+    __tablename__ = 'article_access_stats'
+    
+    pmid = db.Column(db.String(20), primary_key=True,
+                    comment="PubMed ID of the accessed article")
+    hit_count = db.Column(db.BigInteger, nullable=False, default=0,
+                         comment="Number of times the PDF was served")
+    last_accessed = db.Column(db.DateTime, nullable=False, index=True,
+                             comment="Time the PDF was last served, indexed for retention and eviction queries")
+    
+    def __repr__(self):
+        return f"<ArticleAccess pmid={self.pmid}, hit_count={self.hit_count}>"
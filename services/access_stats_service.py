@@ -0,0 +1,222 @@
+"""
+PDF access tracking
+
+Each worker counts served PDFs per PMID in memory and adds the counts to
+the article_access_stats table (models.ArticleAccess) every
+ACCESS_STATS_FLUSH_INTERVAL seconds, or earlier once
+ACCESS_STATS_MAX_PENDING PMIDs are pending, with batched multi-row upserts.
+A request only updates a dict, and the database sees one statement per
+batch of PMIDs instead of one write per hit. Counts of a failed flush are
+kept for the next one; counts still pending when a worker is killed are
+lost, which is acceptable for retention and tiering statistics.
+"""
+
+from flask import current_app
+from sqlalchemy import func
+from datetime import datetime
+import os
+import atexit
+import logging
+import threading
+from models import db, ArticleAccess
+
+logger = logging.getLogger(__name__)
+
+ACCESS_FIELDS = ('hit_count', 'last_accessed')
+
+_tracker_lock = threading.Lock()
+
+
+def upsert_access_counts(rows):
+    """
+    Add access counts to the stats table in one statement
+
+    Args:
+        rows (list): Dicts with pmid, hit_count to add and last_accessed
+    """
+    table = ArticleAccess.__table__
+    # A consistent key order keeps concurrent upserts from deadlocking on MySQL
+    rows = sorted(rows, key=lambda row: row['pmid'])
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(
+            hit_count=table.c.hit_count + statement.inserted.hit_count,
+            last_accessed=func.greatest(table.c.last_accessed, statement.inserted.last_accessed),
+        )
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.pmid],
+            set_={
+                'hit_count': table.c.hit_count + statement.excluded.hit_count,
+                'last_accessed': func.max(table.c.last_accessed, statement.excluded.last_accessed),
+            },
+        )
+    else:
+        raise ValueError(f"Access stats upserts are not implemented for {dialect}")
+    with db.engine.begin() as connection:
+        connection.execute(statement)
+
+
+class AccessTracker:
+    """Per-process access counts, flushed to the database in batches"""
+
+    def __init__(self, app, flush_interval=30.0, max_pending=10000, batch_size=500):
+        """
+        Args:
+            app (Flask): App whose database receives the counts
+            flush_interval (float): Seconds between flushes
+            max_pending (int): Pending PMIDs that trigger an early flush
+            batch_size (int): Rows per upsert statement
+        """
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._thread = None
+
+    def _start(self):
+        # Threads do not survive fork; each worker flushes its own counts
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with _tracker_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # Counts inherited from the parent are flushed by the parent
+            self._pending = {}
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='access-stats', daemon=True)
+            self._thread.start()
+            atexit.register(self._flush_at_exit)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                logger.warning(f"Flushing access stats failed: {str(e)}")
+
+    def _flush_at_exit(self):
+        if self._pid != os.getpid():
+            return
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception as e:
+            logger.warning(f"Flushing access stats at exit failed: {str(e)}")
+
+    def record(self, pmid, when=None):
+        """
+        Count one access to a PMID's PDF
+
+        Args:
+            pmid (str): PubMed ID
+            when (datetime, optional): Access time, defaults to now (UTC)
+        """
+        self._start()
+        when = when or datetime.utcnow()
+        with self._lock:
+            entry = self._pending.get(pmid)
+            if entry is None:
+                self._pending[pmid] = [1, when]
+            else:
+                entry[0] += 1
+                entry[1] = max(entry[1], when)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def pending(self):
+        """
+        Returns:
+            int: PMIDs with counts not yet flushed
+        """
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """
+        Write pending counts to the database; needs an app context
+
+        Returns:
+            int: Number of PMIDs written
+
+        Raises:
+            SQLAlchemyError: If an upsert fails; its counts and later ones are kept pending
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        rows = [{'pmid': pmid, 'hit_count': count, 'last_accessed': when}
+                for pmid, (count, when) in pending.items()]
+        for start in range(0, len(rows), self.batch_size):
+            try:
+                upsert_access_counts(rows[start:start + self.batch_size])
+            except Exception:
+                # Earlier batches are committed; merge the rest back for the next flush
+                with self._lock:
+                    for row in rows[start:]:
+                        entry = self._pending.setdefault(row['pmid'], [0, row['last_accessed']])
+                        entry[0] += row['hit_count']
+                        entry[1] = max(entry[1], row['last_accessed'])
+                raise
+        return len(rows)
+
+
+def get_access_tracker():
+    """Get the access tracker of the current app, creating it on first use"""
+    extensions = current_app.extensions
+    if 'access_tracker' not in extensions:
+        with _tracker_lock:
+            if 'access_tracker' not in extensions:
+                config = current_app.config
+                extensions['access_tracker'] = AccessTracker(
+                    current_app._get_current_object(),
+                    flush_interval=config.get('ACCESS_STATS_FLUSH_INTERVAL', 30),
+                    max_pending=config.get('ACCESS_STATS_MAX_PENDING', 10000),
+                    batch_size=config.get('ACCESS_STATS_BATCH_SIZE', 500),
+                )
+    return extensions['access_tracker']
+
+
+def record_access(pmid):
+    """
+    Count a served PDF, if ACCESS_STATS_ENABLED
+
+    Args:
+        pmid (str): PubMed ID
+    """
+    if current_app.config.get('ACCESS_STATS_ENABLED', True):
+        get_access_tracker().record(pmid)
+
+
+def add_access_stats(articles):
+    """
+    Add hit_count and last_accessed to article dicts with one query
+
+    Args:
+        articles (list): Article.to_dict results
+
+    Returns:
+        list: The same dicts; hit_count is 0 and last_accessed None for never accessed PDFs
+    """
+    pmids = [article['pmid'] for article in articles]
+    stats = {}
+    if pmids:
+        rows = db.session.query(ArticleAccess.pmid, ArticleAccess.hit_count, ArticleAccess.last_accessed) \
+            .filter(ArticleAccess.pmid.in_(pmids)).all()
+        stats = {row.pmid: row for row in rows}
+    for article in articles:
+        row = stats.get(article['pmid'])
+        article['hit_count'] = row.hit_count if row else 0
+        article['last_accessed'] = row.last_accessed.isoformat() if row else None
+    return articles
@@ -0,0 +1,99 @@
+"""
+Admission control and load shedding
+
+Every API request except long polls, exports and health probes is counted
+as in flight from before_request to teardown, and its proxy queue time is taken from ADMISSION_REQUEST_START_HEADER when
+the proxy sets it. get_pdf_by_pmid asks admit_download() before it waits for
+a download; a request joining a download that is already queued or running
+is always admitted, as it adds no upstream work. See utils.admission for how
+the limit adapts.
+"""
+
+from flask import current_app, g, request
+from contextlib import contextmanager
+from types import SimpleNamespace
+import threading
+from config.gunicorn_profile import get_gunicorn_settings
+from services.download_scheduler import get_scheduler
+from utils.admission import SOURCE_DOWNLOAD_QUEUE, SOURCE_REQUEST_QUEUE, AdmissionController, parse_request_start
+
+_controller_lock = threading.Lock()
+
+# Requests that park a thread without downloading (long polls, streaming exports) or
+# cost nothing (probes); counting them would shed misses while no download is queued
+UNCOUNTED_ENDPOINTS = frozenset([
+    'api.get_changes', 'api.export_articles', 'api.health_check', 'api.liveness_probe', 'api.readiness_probe',
+])
+
+
+def _worker_concurrency(config):
+    """Requests one gunicorn worker handles at once with the configured profile"""
+    settings = get_gunicorn_settings(
+        SimpleNamespace(**{key: value for key, value in config.items() if key.startswith('GUNICORN_')}))
+    return settings.get('worker_connections') or settings['threads']
+
+
+def get_admission_controller():
+    """Get the admission controller of the current app, creating it on first use"""
+    extensions = current_app.extensions
+    if 'admission_controller' not in extensions:
+        with _controller_lock:
+            if 'admission_controller' not in extensions:
+                config = current_app.config
+                concurrency = _worker_concurrency(config)
+                # A sync worker runs one request at a time; only the waiting limit applies
+                max_in_flight = config.get('ADMISSION_MAX_IN_FLIGHT') or (concurrency if concurrency > 1 else None)
+                # By default a quarter of the worker's threads stays free for hits
+                max_waiting = config.get('ADMISSION_MAX_WAITING') or max(1, concurrency * 3 // 4)
+                extensions['admission_controller'] = AdmissionController(
+                    max_waiting,
+                    max_in_flight=max_in_flight,
+                    min_waiting=config.get('ADMISSION_MIN_WAITING', 1),
+                    target_delay=config.get('ADMISSION_TARGET_DELAY', 1.0),
+                    interval=config.get('ADMISSION_INTERVAL', 5.0),
+                    retry_after=config.get('ADMISSION_RETRY_AFTER', 5),
+                )
+    return extensions['admission_controller']
+
+
+def track_request_start():
+    """before_request hook: count the request as in flight and record its proxy queue time"""
+    if not current_app.config.get('ADMISSION_ENABLED', True) or request.endpoint in UNCOUNTED_ENDPOINTS:
+        return
+    controller = get_admission_controller()
+    header = current_app.config.get('ADMISSION_REQUEST_START_HEADER')
+    delay = parse_request_start(request.headers.get(header)) if header else None
+    if delay is not None:
+        controller.record_delay(SOURCE_REQUEST_QUEUE, delay)
+    controller.request_started()
+    g.admission_counted = True
+
+
+def track_request_end(exc=None):
+    """teardown_request hook: end a request counted by track_request_start"""
+    if g.pop('admission_counted', False):
+        get_admission_controller().request_finished()
+
+
+@contextmanager
+def admit_download(pmid):
+    """
+    Admit a request that waits for the download of a PMID
+
+    Args:
+        pmid (str): PubMed ID
+
+    Raises:
+        Overloaded: If the download would be new and the worker is shedding load
+    """
+    if not current_app.config.get('ADMISSION_ENABLED', True):
+        yield
+        return
+    controller = get_admission_controller()
+    scheduler = get_scheduler()
+    controller.record_delay(SOURCE_DOWNLOAD_QUEUE, scheduler.oldest_wait('interactive'))
+    controller.acquire(check=not scheduler.pending(pmid))
+    try:
+        yield
+    finally:
+        controller.release()
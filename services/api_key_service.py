@@ -0,0 +1,281 @@
+"""
+API keys and per-key policies
+
+Every key has a policy limiting its request rate, its concurrent downloads
+(cache misses handed to PubCrawler) and its downloads per UTC day, so one
+batch client cannot fill every worker with misses. Keys come from the config
+(API_KEYS and API_KEY_POLICIES) and, with API_KEY_SOURCE 'database', from the
+api_keys table, which stores only key hashes. The loaded keys are cached per
+app for API_KEY_CACHE_TTL seconds.
+
+Limits are enforced host-wide: token buckets, download slots and usage
+counters live in small files under API_KEY_STATE_DIR (on /dev/shm by
+default), shared by all workers.
+"""
+
+from flask import current_app, g, has_request_context
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import os
+import time
+import hashlib
+import logging
+import tempfile
+from utils.host_state import FileCounters, FileSemaphore
+from utils.rate_limiter import FileRateLimiter
+
+logger = logging.getLogger(__name__)
+
+POLICY_FIELDS = ('requests_per_second', 'burst', 'max_concurrent_downloads', 'daily_miss_budget')
+USAGE_FIELDS = ('requests', 'rate_limited', 'misses', 'quota_rejected')
+
+
+class QuotaExceeded(Exception):
+    """Raised when a request exceeds a limit of its API key policy"""
+
+    def __init__(self, message, limit, retry_after):
+        super().__init__(message)
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+def hash_api_key(api_key):
+    """Return the SHA-256 hex digest under which a key is stored and cached"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+def make_policy(name, overrides=None, config=None):
+    """
+    Build a policy from the default policy and per-key overrides
+
+    Args:
+        name (str): Key name, used for usage counters and logs
+        overrides (dict): Policy fields to override, None values mean unlimited
+        config: Config mapping, defaults to the current app's
+
+    Returns:
+        dict: Policy with a name and all POLICY_FIELDS (None is unlimited)
+    """
+    config = current_app.config if config is None else config
+    policy = dict.fromkeys(POLICY_FIELDS)
+    policy.update(config.get('API_KEY_DEFAULT_POLICY') or {})
+    policy.update(overrides or {})
+    policy['name'] = name
+    return policy
+
+
+def load_api_keys(config=None):
+    """
+    Load all accepted API keys with their policies
+
+    Args:
+        config: Config mapping, defaults to the current app's
+
+    Returns:
+        dict: {key hash: policy}
+    """
+    config = current_app.config if config is None else config
+    keys = {}
+    for api_key in config.get('API_KEYS') or []:
+        keys[hash_api_key(api_key)] = make_policy(f'key-{hash_api_key(api_key)[:12]}', config=config)
+    for api_key, overrides in (config.get('API_KEY_POLICIES') or {}).items():
+        overrides = dict(overrides)
+        name = overrides.pop('name', None) or f'key-{hash_api_key(api_key)[:12]}'
+        keys[hash_api_key(api_key)] = make_policy(name, overrides, config=config)
+
+    if config.get('API_KEY_SOURCE', 'config') == 'database':
+        from models import ApiKey
+
+        for row in ApiKey.query.filter(ApiKey.enabled.is_(True)).all():
+            overrides = {field: getattr(row, field) for field in POLICY_FIELDS if getattr(row, field) is not None}
+            keys[row.key_hash] = make_policy(row.name, overrides, config=config)
+    return keys
+
+
+def get_api_key_policy(api_key):
+    """
+    Get the policy of an API key from the per-app cache
+
+    Args:
+        api_key (str): Key sent by the client
+
+    Returns:
+        dict: Policy, or None if the key is not accepted
+    """
+    cache = current_app.extensions.get('api_keys')
+    now = time.monotonic()
+    if cache is None or now - cache[0] > current_app.config.get('API_KEY_CACHE_TTL', 60):
+        cache = (now, load_api_keys())
+        current_app.extensions['api_keys'] = cache
+    return cache[1].get(hash_api_key(api_key))
+
+
+def get_state_dir(config=None):
+    """Directory of the shared per-key state, on tmpfs where available"""
+    config = current_app.config if config is None else config
+    state_dir = config.get('API_KEY_STATE_DIR')
+    if state_dir:
+        return state_dir
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'pmid-pdf-api-keys')
+
+
+def _get_state():
+    """Shared limiter, semaphore and counters of the current app"""
+    state = current_app.extensions.get('api_key_state')
+    if state is None:
+        state_dir = get_state_dir()
+        state = {
+            'buckets': FileRateLimiter(os.path.join(state_dir, 'buckets')),
+            'downloads': FileSemaphore(os.path.join(state_dir, 'downloads')),
+            'usage': FileCounters(os.path.join(state_dir, 'usage'), USAGE_FIELDS),
+        }
+        current_app.extensions['api_key_state'] = state
+    return state
+
+
+def _usage_key(name, day=None):
+    if day is None:
+        day = datetime.utcnow().date()
+        _prune_on_rollover(day)
+    return f"{name}.{day.isoformat()}"
+
+
+def _prune_on_rollover(today):
+    """Drop expired usage counters the first time this process counts on a new day"""
+    state = _get_state()
+    if state.get('usage_day') == today:
+        return
+    state['usage_day'] = today
+    try:
+        removed = prune_usage(today=today)
+    except OSError as e:
+        logger.warning(f"Could not prune API key usage counters: {str(e)}")
+        return
+    if removed:
+        logger.info(f"Pruned {removed} expired API key usage counters")
+
+
+def prune_usage(retention_days=None, today=None):
+    """
+    Delete per-day usage counters older than the retention window
+
+    Every key gets one counter file per UTC day, so without pruning the state
+    directory (on tmpfs) grows by one file per key and day.
+
+    Args:
+        retention_days (int): Days of counters to keep including today,
+            defaults to API_KEY_USAGE_RETENTION_DAYS
+        today (date): Current UTC day, defaults to today
+
+    Returns:
+        int: Number of counters deleted
+    """
+    if retention_days is None:
+        retention_days = current_app.config.get('API_KEY_USAGE_RETENTION_DAYS', 31)
+    oldest = (today or datetime.utcnow().date()) - timedelta(days=max(1, retention_days) - 1)
+    usage = _get_state()['usage']
+    removed = 0
+    for key in usage.keys():
+        try:
+            day = datetime.strptime(key.rsplit('.', 1)[-1], '%Y-%m-%d').date()
+        except ValueError:
+            continue
+        if day < oldest:
+            usage.remove(key)
+            removed += 1
+    return removed
+
+
+def _seconds_until_tomorrow():
+    now = datetime.utcnow()
+    return (datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) - now).total_seconds()
+
+
+def check_request_rate(policy):
+    """
+    Count a request against its key's rate limit
+
+    Args:
+        policy (dict): Policy of the request's key
+
+    Returns:
+        float: 0 if the request may proceed, else seconds until it may be retried
+    """
+    state = _get_state()
+    rate = policy.get('requests_per_second')
+    wait = 0.0
+    if rate:
+        burst = policy.get('burst') or max(1.0, rate)
+        wait = state['buckets'].try_acquire(policy['name'], rate, burst)
+    if wait > 0:
+        state['usage'].add(_usage_key(policy['name']), rate_limited=1)
+    else:
+        state['usage'].add(_usage_key(policy['name']), requests=1)
+    return wait
+
+
+def get_request_policy():
+    """Return the API key policy of the current request, or None outside of keyed requests"""
+    return g.get('api_key_policy') if has_request_context() else None
+
+
+@contextmanager
+def download_slot(policy):
+    """
+    Reserve a download for an API key
+
+    Takes one of the key's concurrent download slots and counts the download
+    against its daily miss budget. Without a policy (CLI commands, internal
+    work) nothing is enforced.
+
+    Args:
+        policy (dict): Policy of the key the download is made for, or None
+
+    Raises:
+        QuotaExceeded: If all download slots are taken or the daily budget is spent
+    """
+    if policy is None:
+        yield
+        return
+
+    state = _get_state()
+    usage_key = _usage_key(policy['name'])
+    max_downloads = policy.get('max_concurrent_downloads')
+    fd = None
+    if max_downloads is not None:
+        fd = state['downloads'].try_acquire(policy['name'], max_downloads)
+        if fd is None:
+            state['usage'].add(usage_key, quota_rejected=1)
+            raise QuotaExceeded(f"At most {max_downloads} concurrent downloads are allowed for this API key",
+                                'max_concurrent_downloads', 5)
+    try:
+        # Count first, so concurrent workers cannot both take the last download
+        usage = state['usage'].add(usage_key, misses=1)
+        budget = policy.get('daily_miss_budget')
+        if budget is not None and usage['misses'] > budget:
+            state['usage'].add(usage_key, misses=-1, quota_rejected=1)
+            raise QuotaExceeded(f"Daily download budget of {budget} is spent for this API key",
+                                'daily_miss_budget', _seconds_until_tomorrow())
+        yield
+    finally:
+        if fd is not None:
+            state['downloads'].release(fd)
+
+
+def get_usage(policy, day=None):
+    """
+    Get the usage of an API key on a UTC day
+
+    Args:
+        policy (dict): Policy of the key
+        day (date): Day, defaults to today
+
+    Returns:
+        dict: Counters from USAGE_FIELDS, plus the active downloads for today
+    """
+    state = _get_state()
+    usage = state['usage'].get(_usage_key(policy['name'], day))
+    if day is None and policy.get('max_concurrent_downloads'):
+        usage['active_downloads'] = state['downloads'].count(policy['name'], policy['max_concurrent_downloads'])
+    return usage
@@ -1,6 +1,13 @@
 from models import db, Article
+from sqlalchemy import or_
 from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta
+import base64
+import binascii
+import json
 import logging
+import time
+from services.pmid_status_service import record_article_status
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +27,225 @@ def get_article_by_pmid(pmid):
         logger.error(f"Database error retrieving article with PMID {pmid}: {str(e)}")
         return None
 
+def get_articles_by_pmids(pmids):
+    """
+    Get articles from database for several PMIDs with a single query
+    
+    Args:
+        pmids (list): PubMed IDs
+        
+    Returns:
+        dict: {pmid: Article} for the PMIDs found
+    """
+    try:
+        return {article.pmid: article for article in Article.query.filter(Article.pmid.in_(list(pmids))).all()}
+    except SQLAlchemyError as e:
+        logger.error(f"Database error retrieving {len(pmids)} articles: {str(e)}")
+        return {}
+
+def get_articles_by_dois(dois):
+    """
+    Get articles from database for several normalized DOIs with a single query
+    
+    Args:
+        dois (list): Normalized (lowercase) DOIs
+        
+    Returns:
+        dict: {doi: Article} for the DOIs found
+    """
+    try:
+        articles = Article.query.filter(Article.doi.in_(list(dois))).all()
+        return {article.doi: article for article in articles}
+    except SQLAlchemyError as e:
+        logger.error(f"Database error retrieving {len(dois)} articles by DOI: {str(e)}")
+        return {}
+
+def _get_sort_column(filters):
+    """
+    Choose the keyset sort column for a set of filters
+    
+    A range on updated_at or year without a more selective equality filter
+    is served by walking that column's index, so results follow that column.
+    Everything else is ordered by id.
+    """
+    if filters.get('updated_from') is not None or filters.get('updated_to') is not None:
+        return Article.updated_at
+    has_equality = any(filters.get(name) is not None for name in ('journal', 'year', 'has_pdf', 'download_attempted'))
+    if not has_equality and (filters.get('year_from') is not None or filters.get('year_to') is not None):
+        return Article.year
+    return None
+
+def encode_cursor(article, sort_column=None):
+    """
+    Encode the keyset position after an article as an opaque cursor
+    
+    Args:
+        article (Article): Last article of a page
+        sort_column (Column, optional): Keyset sort column in addition to id
+        
+    Returns:
+        str: URL-safe cursor
+    """
+    value = getattr(article, sort_column.key) if sort_column is not None else None
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([value, article.id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort_column=None):
+    """
+    Decode a cursor created by encode_cursor
+    
+    Args:
+        cursor (str): Cursor from a previous page
+        sort_column (Column, optional): Keyset sort column the cursor was created for
+        
+    Returns:
+        tuple: (sort value, id)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if sort_column is Article.updated_at:
+            value = datetime.fromisoformat(value)
+        elif sort_column is Article.year:
+            value = int(value)
+        return value, int(last_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def build_articles_query(journal=None, year=None, year_from=None, year_to=None, has_pdf=None,
+                         download_attempted=None, updated_from=None, updated_to=None, cursor=None):
+    """
+    Build a filtered article query in keyset order
+    
+    Filters left as None are not applied. Instead of OFFSET, a page continues
+    after the (sort value, id) position encoded in the previous page's cursor,
+    so deep pages cost the same as the first one.
+    
+    Args:
+        journal (str, optional): Exact journal name
+        year (int, optional): Exact publication year
+        year_from (int, optional): Minimum publication year
+        year_to (int, optional): Maximum publication year
+        has_pdf (bool, optional): PDF availability
+        download_attempted (bool, optional): Whether a download was attempted
+        updated_from (datetime, optional): Minimum updated_at (inclusive)
+        updated_to (datetime, optional): Maximum updated_at (exclusive)
+        cursor (str, optional): Cursor returned with the previous page
+        
+    Returns:
+        tuple: (Query, sort column or None when ordered by id only)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    sort_column = _get_sort_column({
+        'journal': journal, 'year': year, 'year_from': year_from, 'year_to': year_to,
+        'has_pdf': has_pdf, 'download_attempted': download_attempted,
+        'updated_from': updated_from, 'updated_to': updated_to
+    })
+    query = Article.query
+    if journal is not None:
+        query = query.filter(Article.journal == journal)
+    if year is not None:
+        query = query.filter(Article.year == year)
+    if year_from is not None:
+        query = query.filter(Article.year >= year_from)
+    if year_to is not None:
+        query = query.filter(Article.year <= year_to)
+    if has_pdf is not None:
+        query = query.filter(Article.has_pdf == has_pdf)
+    if download_attempted is not None:
+        query = query.filter(Article.download_attempted == download_attempted)
+    if updated_from is not None:
+        query = query.filter(Article.updated_at >= updated_from)
+    if updated_to is not None:
+        query = query.filter(Article.updated_at < updated_to)
+    
+    if cursor is not None:
+        value, last_id = decode_cursor(cursor, sort_column)
+        if sort_column is None:
+            query = query.filter(Article.id > last_id)
+        else:
+            # Written out instead of a row-value comparison so MySQL can use a range scan
+            query = query.filter(sort_column >= value,
+                                 or_(sort_column > value, Article.id > last_id))
+    
+    if sort_column is None:
+        return query.order_by(Article.id), None
+    return query.order_by(sort_column, Article.id), sort_column
+
+def list_articles(limit=100, **filters):
+    """
+    Get one page of articles matching the filters
+    
+    Args:
+        limit (int): Maximum number of articles
+        **filters: Filters and cursor of build_articles_query
+        
+    Returns:
+        tuple: (list of Article, next cursor or None if this is the last page)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+        SQLAlchemyError: If the query fails
+    """
+    query, sort_column = build_articles_query(**filters)
+    # One extra row tells whether another page exists without a COUNT query
+    articles = query.limit(limit + 1).all()
+    if len(articles) > limit:
+        articles = articles[:limit]
+        return articles, encode_cursor(articles[-1], sort_column)
+    return articles, None
+
+def list_changes(cursor=None, since=None, limit=1000, settle_seconds=2, wait=0, poll_interval=1.0):
+    """
+    Get articles changed after a change feed position, ordered by (updated_at, id)
+    
+    Rows newer than settle_seconds are held back: updated_at is set when a
+    transaction writes the row, not when it commits, so a slow transaction
+    can commit a row older than one already returned. Holding back the
+    newest rows keeps such a row from being skipped by the next cursor.
+    
+    With wait, an empty result is retried every poll_interval seconds
+    until a change settles or wait seconds have passed (long polling).
+    
+    Args:
+        cursor (str, optional): next_cursor of the previous page
+        since (datetime, optional): Start time (inclusive) when no cursor is given
+        limit (int): Maximum number of articles
+        settle_seconds (float): Age before a change is returned
+        wait (float): Seconds to wait for a change when there is none
+        poll_interval (float): Seconds between queries while waiting
+        
+    Returns:
+        tuple: (list of to_dict rows, cursor after the last row, or the given cursor if none)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+        SQLAlchemyError: If the query fails
+    """
+    wait_until = time.monotonic() + wait
+    # Plain rows: pages are large and only serialized
+    columns = [getattr(Article, field) for field in Article.DICT_FIELDS]
+    while True:
+        horizon = datetime.utcnow() - timedelta(seconds=settle_seconds)
+        query, sort_column = build_articles_query(updated_from=since if cursor is None else None,
+                                                  updated_to=horizon, cursor=cursor)
+        rows = query.with_entities(*columns).limit(limit).all()
+        remaining = wait_until - time.monotonic()
+        if rows or remaining <= 0:
+            break
+        # End the transaction so the next poll reads a new snapshot (MySQL REPEATABLE READ)
+        db.session.rollback()
+        time.sleep(min(remaining, poll_interval))
+    if not rows:
+        return [], cursor
+    return [Article.row_to_dict(row) for row in rows], encode_cursor(rows[-1], sort_column)
+
 def save_article(article_data):
     """
     Save article to database
@@ -40,6 +266,7 @@ def save_article(article_data):
             article = article_data
             
         db.session.commit()
+        record_article_status(article)
         return article
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -0,0 +1,167 @@
+"""
+DOI resolution service
+
+Resolves DOIs to PMIDs through the local articles table with one bulk query,
+falling back to PubMed (NCBI E-utilities, the upstream PubCrawler uses) for
+DOIs that are not stored yet. Resolved DOIs then take the regular PMID path,
+so downloads and caching are shared with PMID requests.
+"""
+
+from flask import current_app
+import logging
+from services.db_service import get_articles_by_dois, get_article_by_pmid, save_article
+from services.pdf_service import get_pdf_by_pmid
+from services.rate_limit_service import enable_outbound_rate_limit, get_ncbi_api_key
+from utils.doi_utils import normalize_doi
+from utils.circuit_breaker import CircuitOpenError
+from utils.rate_limiter import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+ESEARCH_URL = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi'
+
+
+class DOIResolutionError(Exception):
+    """Raised when PubMed cannot be queried for a DOI"""
+
+
+def lookup_pmid_remote(doi):
+    """
+    Look up the PMID of a DOI in PubMed
+
+    Args:
+        doi (str): Normalized DOI
+
+    Returns:
+        str: PMID, or None if PubMed has no unique match
+
+    Raises:
+        DOIResolutionError: If PubMed cannot be reached or answers with an error
+    """
+    import requests
+
+    params = {
+        'db': 'pubmed',
+        'term': f'"{doi}"[doi]',
+        'retmode': 'json',
+        'email': current_app.config.get('NCBI_EMAIL', 'your.email@example.com')
+    }
+    api_key = get_ncbi_api_key()
+    if api_key:
+        params['api_key'] = api_key
+
+    enable_outbound_rate_limit()
+    try:
+        response = requests.get(ESEARCH_URL, params=params,
+                                timeout=current_app.config.get('DOI_REMOTE_TIMEOUT', 10))
+        response.raise_for_status()
+        ids = response.json()['esearchresult']['idlist']
+    except (requests.RequestException, RateLimitExceeded, CircuitOpenError, ValueError, KeyError) as e:
+        raise DOIResolutionError(f"PubMed lookup failed for DOI {doi}: {str(e)}") from e
+
+    return ids[0] if len(ids) == 1 else None
+
+
+def _remember_doi(pmid, doi):
+    """Store a remotely resolved DOI on a known article so the next lookup is local"""
+    article = get_article_by_pmid(pmid)
+    if article is not None and not article.doi:
+        article.doi = doi
+        save_article(article)
+
+
+def resolve_dois(dois, remote=True):
+    """
+    Resolve DOIs to PMIDs
+
+    All DOIs are looked up locally with one query; misses are resolved one by
+    one in PubMed, at most DOI_REMOTE_LOOKUP_MAX per call.
+
+    Args:
+        dois (list): DOIs as given by the client
+        remote (bool): Whether to query PubMed for local misses
+
+    Returns:
+        dict: {doi: {'pmid': str or None, 'source': 'local', 'pubmed', 'error' or None}}
+              keyed by the DOIs as given
+    """
+    normalized = {doi: normalize_doi(doi) for doi in dois}
+    articles = get_articles_by_dois([value for value in normalized.values() if value])
+
+    results = {}
+    remote_budget = current_app.config.get('DOI_REMOTE_LOOKUP_MAX', 20) if remote else 0
+    remote_cache = {}
+
+    for doi, key in normalized.items():
+        if key is None:
+            results[doi] = {'pmid': None, 'source': None}
+        elif key in articles:
+            results[doi] = {'pmid': articles[key].pmid, 'source': 'local'}
+        elif key in remote_cache:
+            results[doi] = remote_cache[key]
+        elif remote_budget > 0:
+            remote_budget -= 1
+            try:
+                pmid = lookup_pmid_remote(key)
+                if pmid:
+                    _remember_doi(pmid, key)
+                remote_cache[key] = {'pmid': pmid, 'source': 'pubmed' if pmid else None}
+            except DOIResolutionError as e:
+                logger.error(str(e))
+                remote_cache[key] = {'pmid': None, 'source': 'error'}
+            results[doi] = remote_cache[key]
+        else:
+            results[doi] = {'pmid': None, 'source': None}
+
+    return results
+
+
+def resolve_doi(doi):
+    """
+    Resolve a single DOI to a PMID
+
+    Args:
+        doi (str): DOI as given by the client
+
+    Returns:
+        str: PMID, or None if the DOI is unknown
+
+    Raises:
+        DOIResolutionError: If the DOI is not stored and PubMed cannot be queried
+    """
+    key = normalize_doi(doi)
+    if key is None:
+        return None
+    article = get_articles_by_dois([key]).get(key)
+    if article is not None:
+        return article.pmid
+
+    pmid = lookup_pmid_remote(key)
+    if pmid:
+        _remember_doi(pmid, key)
+    return pmid
+
+
+def get_pdf_by_doi(doi, deadline=None):
+    """
+    Get PDF information for a DOI, downloading it like a PMID request if needed
+
+    Args:
+        doi (str): DOI as given by the client
+        deadline (Deadline): Stop waiting for a download after this deadline
+
+    Returns:
+        tuple: (pmid or None if unresolved, PDF information or None)
+
+    Raises:
+        DOIResolutionError: If the DOI is not stored and PubMed cannot be queried
+    """
+    pmid = resolve_doi(doi)
+    if pmid is None:
+        return None, None
+
+    pdf_info = get_pdf_by_pmid(pmid, deadline)
+    if pdf_info:
+        # Downloads without a DOI in their metadata would otherwise need PubMed again
+        _remember_doi(pmid, normalize_doi(doi))
+    return pmid, pdf_info
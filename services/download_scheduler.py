@@ -0,0 +1,317 @@
+"""
+Download scheduler
+
+Cache misses are downloaded by a fixed set of scheduler threads per worker
+process instead of by whichever request thread needs them, so interactive
+requests do not compete equally with bulk work for PubCrawler capacity.
+
+Work is queued in three priority classes:
+
+    interactive  misses of client requests waiting for the PDF
+    batch        prefetch requests (POST /api/prefetch)
+    background   low-priority prefetches, e.g. backfills
+
+Queued interactive items are always dispatched first, and
+DOWNLOAD_SCHEDULER_RESERVED_INTERACTIVE threads never take bulk items, so a
+backfill cannot hold every thread. Within a class, items are dispatched by
+weighted fair queuing per API key (self-clocked fair queuing): each key's
+items get virtual finish tags spaced 1/weight apart, so a key with a long
+queue cannot starve a key that just arrived. An interactive request for a
+PMID queued as bulk work promotes the queued item.
+
+A download submitted with a deadline is cancelled once the deadlines of all
+its waiters passed: it is dropped from the queue, or stops at its next
+outgoing request if it is running (see utils.deadline).
+"""
+
+from flask import current_app
+from concurrent.futures import Future
+from collections import deque
+import os
+import time
+import heapq
+import logging
+import threading
+import itertools
+from services.api_key_service import QuotaExceeded, download_slot
+from utils.deadline import Deadline, DeadlineExceeded, deadline_scope
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = ('interactive', 'batch', 'background')
+
+# Waits kept per class for the percentiles in stats()
+WAIT_SAMPLES = 1000
+
+_scheduler_lock = threading.Lock()
+
+
+class _Task:
+    __slots__ = ('pmid', 'priority', 'policy', 'deadline', 'future', 'queued_at', 'not_before', 'entry')
+
+    def __init__(self, pmid, priority, policy, deadline):
+        self.pmid = pmid
+        self.priority = priority
+        self.policy = policy
+        # Own copy, extended as more waiters join the task
+        self.deadline = Deadline()
+        self.deadline.expires_at = deadline.expires_at if deadline is not None else None
+        self.future = Future()
+        self.queued_at = time.monotonic()
+        self.not_before = 0.0
+        self.entry = None
+
+    @property
+    def key(self):
+        return self.policy['name'] if self.policy else ''
+
+
+class DownloadScheduler:
+    """Priority classes with weighted fair queuing per API key inside each class"""
+
+    def __init__(self, app, download, workers=4, reserved_interactive=1, weights=None):
+        """
+        Args:
+            app (Flask): App whose context downloads run in
+            download (callable): download(pmid) returning PDF information or None
+            workers (int): Download threads
+            reserved_interactive (int): Threads that only take interactive items
+            weights (dict): API key name to fair-queuing weight, default 1
+        """
+        self.app = app
+        self.download = download
+        self.workers = max(1, workers)
+        self.reserved_interactive = min(max(0, reserved_interactive), self.workers - 1)
+        self.weights = weights or {}
+        self._cond = threading.Condition()
+        self._queues = {name: [] for name in PRIORITY_CLASSES}
+        self._virtual_time = dict.fromkeys(PRIORITY_CLASSES, 0.0)
+        self._last_finish = {name: {} for name in PRIORITY_CLASSES}
+        self._tasks = {}
+        self._running = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._running_by_key = {}
+        self._depth = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._dispatched = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._waits = {name: deque(maxlen=WAIT_SAMPLES) for name in PRIORITY_CLASSES}
+        self._seq = itertools.count()
+        self._pid = os.getpid()
+        self._threads = []
+
+    def _start(self):
+        # Threads do not survive fork; start them in the process that uses the scheduler
+        if self._threads and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._threads = [threading.Thread(target=self._run, name=f'download-{i}', daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _enqueue(self, task):
+        """Queue a task with its fair-queuing finish tag; caller holds the lock"""
+        name = task.key
+        last_finish = self._last_finish[task.priority]
+        start = max(self._virtual_time[task.priority], last_finish.get(name, 0.0))
+        finish = start + 1.0 / self.weights.get(name, 1.0)
+        last_finish[name] = finish
+        task.entry = [finish, next(self._seq), task]
+        heapq.heappush(self._queues[task.priority], task.entry)
+        self._depth[task.priority] += 1
+
+    def submit(self, pmid, priority='interactive', policy=None, deadline=None):
+        """
+        Queue a download, or join the one already queued or running for the PMID
+
+        Args:
+            pmid (str): PubMed ID
+            priority (str): One of PRIORITY_CLASSES
+            policy (dict): API key policy the download counts against
+            deadline (Deadline): Cancel the download after this deadline, None to always finish it
+
+        Returns:
+            Future: Resolves to the PDF information or None
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        with self._cond:
+            self._start()
+            task = self._tasks.get(pmid)
+            if task is not None:
+                task.deadline.extend(deadline)
+                # Promote a queued item when a more urgent request needs it
+                if task.entry is not None and PRIORITY_CLASSES.index(priority) < PRIORITY_CLASSES.index(task.priority):
+                    task.entry[2] = None
+                    self._depth[task.priority] -= 1
+                    task.priority = priority
+                    task.policy = policy or task.policy
+                    self._enqueue(task)
+                    self._cond.notify()
+                return task.future
+            task = _Task(pmid, priority, policy, deadline)
+            self._tasks[pmid] = task
+            self._enqueue(task)
+            self._cond.notify()
+        return task.future
+
+    def _eligible(self, task, now):
+        """Bulk items wait while their key is at its download limit instead of failing"""
+        if task.priority == 'interactive':
+            return True
+        limit = task.policy.get('max_concurrent_downloads') if task.policy else None
+        return task.not_before <= now and (limit is None or self._running_by_key.get(task.key, 0) < limit)
+
+    def _pop(self, allow_bulk):
+        """
+        Take the next task to run; caller holds the lock
+
+        Returns:
+            tuple: (task or None, whether ineligible tasks are waiting)
+        """
+        now = time.monotonic()
+        deferred = []
+        found = None
+        for name in PRIORITY_CLASSES:
+            if found is not None or (name != 'interactive' and not allow_bulk):
+                break
+            queue = self._queues[name]
+            while queue:
+                entry = heapq.heappop(queue)
+                task = entry[2]
+                if task is None:
+                    continue  # Promoted to another class
+                if task.deadline.expired():
+                    # Nobody waits for it any more
+                    self._depth[name] -= 1
+                    self._tasks.pop(task.pmid, None)
+                    task.future.set_exception(DeadlineExceeded(f"Download of PMID {task.pmid} cancelled in the queue"))
+                    continue
+                if not self._eligible(task, now):
+                    deferred.append((name, entry))
+                    continue
+                self._virtual_time[name] = entry[0]
+                self._depth[name] -= 1
+                task.entry = None
+                found = task
+                break
+        for name, entry in deferred:
+            heapq.heappush(self._queues[name], entry)
+        return found, bool(deferred)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    bulk_running = sum(self._running[name] for name in PRIORITY_CLASSES[1:])
+                    task, deferred = self._pop(bulk_running < self.workers - self.reserved_interactive)
+                    if task is not None:
+                        break
+                    self._cond.wait(timeout=1.0 if deferred else None)
+                priority = task.priority
+                self._running[priority] += 1
+                self._running_by_key[task.key] = self._running_by_key.get(task.key, 0) + 1
+                self._dispatched[priority] += 1
+                self._waits[priority].append(time.monotonic() - task.queued_at)
+
+            requeue = None
+            try:
+                with self.app.app_context(), deadline_scope(task.deadline):
+                    with download_slot(task.policy):
+                        result = self.download(task.pmid)
+                task.future.set_result(result)
+            except QuotaExceeded as e:
+                # Other workers hold the key's slots; bulk items retry later, interactive callers get the 429
+                if priority != 'interactive' and e.limit == 'max_concurrent_downloads':
+                    requeue = e.retry_after
+                else:
+                    task.future.set_exception(e)
+            except Exception as e:
+                task.future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running[priority] -= 1
+                    self._running_by_key[task.key] -= 1
+                    if requeue is not None:
+                        task.not_before = time.monotonic() + requeue
+                        self._enqueue(task)
+                    else:
+                        self._tasks.pop(task.pmid, None)
+                    # A freed slot may let another thread take queued bulk work
+                    self._cond.notify_all()
+
+    def pending(self, pmid):
+        """Whether a download of the PMID is queued or running"""
+        with self._cond:
+            return pmid in self._tasks
+
+    def _oldest_wait(self, name, now):
+        """Wait of the longest queued item of a class, None if none is queued; caller holds the lock"""
+        queued = [entry[2].queued_at for entry in self._queues[name] if entry[2] is not None]
+        return now - min(queued) if queued else None
+
+    def oldest_wait(self, priority='interactive'):
+        """
+        Args:
+            priority (str): One of PRIORITY_CLASSES
+
+        Returns:
+            float: Seconds the longest queued item of the class has waited, 0 if none is queued
+        """
+        with self._cond:
+            return self._oldest_wait(priority, time.monotonic()) or 0.0
+
+    def stats(self):
+        """
+        Queue depth, running downloads and wait times per priority class
+
+        Returns:
+            dict: {class: {'queued', 'running', 'dispatched', 'wait_avg', 'wait_p95', 'oldest_wait'}}
+        """
+        now = time.monotonic()
+        with self._cond:
+            stats = {}
+            for name in PRIORITY_CLASSES:
+                waits = sorted(self._waits[name])
+                oldest_wait = self._oldest_wait(name, now)
+                stats[name] = {
+                    'queued': self._depth[name],
+                    'running': self._running[name],
+                    'dispatched': self._dispatched[name],
+                    'wait_avg': round(sum(waits) / len(waits), 3) if waits else None,
+                    'wait_p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                    'oldest_wait': round(oldest_wait, 3) if oldest_wait is not None else None,
+                }
+        return stats
+
+
+def get_scheduler():
+    """Get the download scheduler of the current app, creating it on first use"""
+    extensions = current_app.extensions
+    with _scheduler_lock:
+        if 'download_scheduler' not in extensions:
+            from services.pdf_service import download_pdf_with_pubcrawler
+
+            config = current_app.config
+            extensions['download_scheduler'] = DownloadScheduler(
+                current_app._get_current_object(),
+                download_pdf_with_pubcrawler,
+                workers=config.get('DOWNLOAD_SCHEDULER_WORKERS', 4),
+                reserved_interactive=config.get('DOWNLOAD_SCHEDULER_RESERVED_INTERACTIVE', 1),
+                weights=config.get('DOWNLOAD_SCHEDULER_WEIGHTS'),
+            )
+    return extensions['download_scheduler']
+
+
+def schedule_download(pmid, priority='interactive', policy=None, deadline=None):
+    """
+    Queue a download on the scheduler of this process
+
+    Args:
+        pmid (str): PubMed ID
+        priority (str): One of PRIORITY_CLASSES
+        policy (dict): API key policy the download counts against
+        deadline (Deadline): Cancel the download after this deadline, None to always finish it
+
+    Returns:
+        Future: Resolves to the PDF information or None, or raises QuotaExceeded or DeadlineExceeded
+    """
+    return get_scheduler().submit(pmid, priority, policy, deadline)
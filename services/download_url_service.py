@@ -0,0 +1,80 @@
+"""
+Signed direct-download URLs
+
+With PDF_DELIVERY 'url' (or ?delivery=url) the PDF routes resolve a PMID to
+a signed, expiring URL of the hot-tier file instead of sending its bytes.
+The URL is served by the download route (api.downloads), which only checks
+the signature: no API key lookup, no database query and no response
+logging, so a cache or CDN can be put in front of it. Setting
+SIGNED_URL_BASE points the URLs at a CDN or static server that verifies the
+same signature (see utils.signed_url) instead.
+"""
+
+from flask import current_app, url_for
+from datetime import datetime
+from urllib.parse import quote
+import os
+import posixpath
+from utils.signed_url import make_expiry, sign_path, verify_signature
+
+DELIVERY_STREAM = 'stream'
+DELIVERY_URL = 'url'
+
+
+def get_signing_secrets(config=None):
+    """
+    Secrets accepted for signed URLs
+
+    Args:
+        config: Config mapping, defaults to the current app's
+
+    Returns:
+        list: The signing secret (SIGNED_URL_SECRET, else SECRET_KEY) followed by
+            SIGNED_URL_PREVIOUS_SECRETS, which are still accepted during a rotation
+    """
+    config = current_app.config if config is None else config
+    secret = config.get('SIGNED_URL_SECRET') or config.get('SECRET_KEY')
+    return [secret] + list(config.get('SIGNED_URL_PREVIOUS_SECRETS') or [])
+
+
+def create_download_url(pdf_path):
+    """
+    Create a signed URL for a file in the hot tier
+
+    Args:
+        pdf_path (str): Absolute path of the PDF under PDF_ROOT_PATH
+
+    Returns:
+        dict: {'url': signed URL, 'expires_at': ISO 8601 UTC expiry}
+    """
+    config = current_app.config
+    path = os.path.relpath(pdf_path, config['PDF_ROOT_PATH']).replace(os.sep, '/')
+    expires = make_expiry(config.get('SIGNED_URL_TTL', 3600), config.get('SIGNED_URL_EXPIRY_STEP', 300))
+    signature = sign_path(get_signing_secrets()[0], path, expires)
+
+    base = config.get('SIGNED_URL_BASE')
+    if base:
+        url = f"{base.rstrip('/')}/{quote(path)}?expires={expires}&sig={signature}"
+    else:
+        url = url_for('downloads.get_signed_file', path=path, expires=expires, sig=signature, _external=True)
+    return {'url': url, 'expires_at': datetime.utcfromtimestamp(expires).isoformat() + 'Z'}
+
+
+def resolve_signed_path(path, expires, signature):
+    """
+    Check a signed URL and map it to a file
+
+    Args:
+        path (str): Path from the URL, relative to PDF_ROOT_PATH
+        expires (str): expires parameter
+        signature (str): sig parameter
+
+    Returns:
+        str: Absolute path, or None if the signature is invalid or expired or the path leaves the root
+    """
+    if not verify_signature(get_signing_secrets(), path, expires, signature):
+        return None
+    normalized = posixpath.normpath(path)
+    if normalized.startswith(('/', '../')) or normalized in ('.', '..'):
+        return None
+    return os.path.join(current_app.config['PDF_ROOT_PATH'], *normalized.split('/'))
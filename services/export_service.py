@@ -0,0 +1,270 @@
+"""
+Bulk export of article metadata
+
+Streams the filtered articles table as NDJSON, CSV, Parquet or Arrow IPC,
+optionally gzip or zstd compressed, in bounded memory: rows come from a
+server-side cursor (yield_per) as plain column tuples rather than Article
+objects, and encoded output is handed out in chunks as it is produced.
+Parquet and Arrow require pyarrow, zstd requires zstandard.
+"""
+
+from flask import current_app
+from sqlalchemy import func
+import io
+import csv
+import zlib
+import logging
+from models import Article, ArticleAccess
+from services.access_stats_service import ACCESS_FIELDS
+from services.db_service import build_articles_query
+from utils.json_utils import dumps
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NDJSON = 'ndjson'
+FORMAT_CSV = 'csv'
+FORMAT_PARQUET = 'parquet'
+FORMAT_ARROW = 'arrow'
+EXPORT_FORMATS = (FORMAT_NDJSON, FORMAT_CSV, FORMAT_PARQUET, FORMAT_ARROW)
+
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_ZSTD = 'zstd'
+EXPORT_COMPRESSIONS = (COMPRESSION_GZIP, COMPRESSION_ZSTD)
+
+MIMETYPES = {
+    FORMAT_NDJSON: 'application/x-ndjson',
+    FORMAT_CSV: 'text/csv',
+    FORMAT_PARQUET: 'application/vnd.apache.parquet',
+    FORMAT_ARROW: 'application/vnd.apache.arrow.stream',
+    COMPRESSION_GZIP: 'application/gzip',
+    COMPRESSION_ZSTD: 'application/zstd',
+}
+EXTENSIONS = {
+    FORMAT_NDJSON: 'ndjson', FORMAT_CSV: 'csv', FORMAT_PARQUET: 'parquet', FORMAT_ARROW: 'arrows',
+    COMPRESSION_GZIP: 'gz', COMPRESSION_ZSTD: 'zst',
+}
+
+# Output is yielded once this many bytes are buffered
+CHUNK_SIZE = 256 * 1024
+
+# Article.to_dict fields followed by the access stats
+EXPORT_FIELDS = Article.DICT_FIELDS + ACCESS_FIELDS
+
+
+def check_export_options(export_format, compression=None):
+    """
+    Check that a format and compression are known and their libraries installed
+
+    Args:
+        export_format (str): One of EXPORT_FORMATS
+        compression (str, optional): One of EXPORT_COMPRESSIONS
+
+    Raises:
+        ValueError: If the format or compression is unknown or not available
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if compression is not None and compression not in EXPORT_COMPRESSIONS:
+        raise ValueError(f"Unknown export compression: {compression}")
+    if export_format in (FORMAT_PARQUET, FORMAT_ARROW):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError(f"Export format '{export_format}' requires pyarrow")
+    if compression == COMPRESSION_ZSTD:
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise ValueError("zstd compression requires zstandard")
+
+
+def get_export_filename(export_format, compression=None):
+    """
+    Returns:
+        str: Download filename, e.g. articles.csv.gz
+    """
+    name = f"articles.{EXTENSIONS[export_format]}"
+    return f"{name}.{EXTENSIONS[compression]}" if compression else name
+
+
+def get_export_mimetype(export_format, compression=None):
+    """
+    Returns:
+        str: Content type of the export
+    """
+    return MIMETYPES[compression or export_format]
+
+
+def iter_export_rows(**filters):
+    """
+    Stream the EXPORT_FIELDS columns of the filtered articles in id order
+
+    Args:
+        **filters: Filters of build_articles_query, without cursor
+
+    Yields:
+        Row: Row with one attribute per EXPORT_FIELDS entry
+    """
+    query, _ = build_articles_query(**filters)
+    columns = [getattr(Article, field) for field in Article.DICT_FIELDS]
+    # Primary key lookup per row; articles never accessed have no stats row
+    columns += [func.coalesce(ArticleAccess.hit_count, 0).label('hit_count'), ArticleAccess.last_accessed]
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 5000)
+    query = (query.outerjoin(ArticleAccess, ArticleAccess.pmid == Article.pmid)
+             .with_entities(*columns)
+             .execution_options(stream_results=True)
+             .yield_per(batch_size))
+    yield from query
+
+
+def _row_to_dict(row):
+    data = Article.row_to_dict(row)
+    data['hit_count'] = row.hit_count
+    data['last_accessed'] = row.last_accessed.isoformat() if row.last_accessed else None
+    return data
+
+
+class _ChunkSink(io.RawIOBase):
+    """Writable file collecting bytes until they are taken, for pyarrow writers"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _encode_ndjson(rows):
+    buffer = []
+    size = 0
+    for row in rows:
+        line = dumps(_row_to_dict(row)) + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _encode_csv(rows):
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow(_row_to_dict(row).values())
+        if text.tell() >= CHUNK_SIZE:
+            yield text.getvalue().encode('utf-8')
+            text.seek(0)
+            text.truncate()
+    yield text.getvalue().encode('utf-8')
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    types = {
+        'id': pa.int64(), 'year': pa.int32(), 'size': pa.int64(), 'hit_count': pa.int64(),
+        'created_at': pa.timestamp('us'), 'updated_at': pa.timestamp('us'), 'last_accessed': pa.timestamp('us'),
+    }
+    for field in ('has_pdf', 'has_abstract', 'full_text_available', 'commercial_use_allowed',
+                  'pdf_valid', 'download_attempted'):
+        types[field] = pa.bool_()
+    return pa.schema([(field, types.get(field, pa.string())) for field in EXPORT_FIELDS])
+
+
+def _encode_columnar(rows, export_format):
+    import pyarrow as pa
+
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    if export_format == FORMAT_PARQUET:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema)
+        write = writer.write_table
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 5000)
+    batch = []
+
+    def flush():
+        # Columnar types keep datetimes native instead of to_dict's ISO strings
+        columns = [pa.array([row[i] for row in batch], type=schema.field(i).type)
+                   for i in range(len(EXPORT_FIELDS))]
+        record_batch = pa.RecordBatch.from_arrays(columns, schema=schema)
+        # One Parquet row group or Arrow record batch per database batch
+        write(pa.Table.from_batches([record_batch]) if export_format == FORMAT_PARQUET else record_batch)
+        batch.clear()
+
+    for row in rows:
+        batch.append(tuple(row))
+        if len(batch) >= batch_size:
+            flush()
+            yield sink.take()
+    if batch:
+        flush()
+    writer.close()
+    yield sink.take()
+
+
+def _compress(chunks, compression):
+    if compression == COMPRESSION_GZIP:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    else:
+        import zstandard
+        compressor = zstandard.ZstdCompressor().compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(export_format=FORMAT_NDJSON, compression=None, **filters):
+    """
+    Stream an export of the filtered articles
+
+    NDJSON and CSV rows match Article.to_dict plus hit_count and
+    last_accessed; CSV writes NULL as an empty field. Parquet and Arrow keep the column types, with timestamps in UTC.
+
+    Args:
+        export_format (str): One of EXPORT_FORMATS
+        compression (str, optional): One of EXPORT_COMPRESSIONS
+        **filters: Filters of build_articles_query, without cursor
+
+    Yields:
+        bytes: Encoded chunks of the export
+
+    Raises:
+        ValueError: If the format or compression is not available
+    """
+    check_export_options(export_format, compression)
+    rows = iter_export_rows(**filters)
+    if export_format == FORMAT_NDJSON:
+        chunks = _encode_ndjson(rows)
+    elif export_format == FORMAT_CSV:
+        chunks = _encode_csv(rows)
+    else:
+        chunks = _encode_columnar(rows, export_format)
+    if compression:
+        chunks = _compress(chunks, compression)
+    return (chunk for chunk in chunks if chunk)
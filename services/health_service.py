@@ -0,0 +1,204 @@
+"""
+Health checks for liveness and readiness probes
+
+Dependency checks (database ping, connection pool saturation, the storage
+mount, free disk space and the upstream circuit breakers) run on a
+background thread every HEALTH_CHECK_INTERVAL seconds. Probes only read the
+last report, so they cost no database queries or filesystem calls and a
+hung dependency (a stalled NFS mount, an exhausted pool) cannot hang them:
+the report then goes stale and the replica reports itself not ready.
+"""
+
+from flask import current_app
+from sqlalchemy import text
+import os
+import time
+import logging
+import threading
+from models import db
+from utils.circuit_breaker import OPEN
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = 'ok'
+STATUS_DEGRADED = 'degraded'
+STATUS_FAILED = 'failed'
+STATUS_STARTING = 'starting'
+
+# A failure of these takes the replica out of rotation; others only degrade it
+CRITICAL_CHECKS = ('database', 'storage')
+
+_monitor_lock = threading.Lock()
+
+
+def check_database():
+    """Ping the database through the connection pool"""
+    started = time.monotonic()
+    with db.engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+    return STATUS_OK, {'latency_ms': round((time.monotonic() - started) * 1000, 1)}
+
+
+def check_pool():
+    """Share of the pool's connections checked out"""
+    pool = db.engine.pool
+    if not hasattr(pool, 'checkedout'):
+        # SQLite pools have no fixed size
+        return STATUS_OK, {'pool': type(pool).__name__}
+    checked_out = pool.checkedout()
+    capacity = pool.size() + max(0, getattr(pool, '_max_overflow', 0))
+    saturation = checked_out / capacity if capacity else 0.0
+    threshold = current_app.config.get('HEALTH_POOL_SATURATION_DEGRADED', 0.9)
+    status = STATUS_DEGRADED if saturation >= threshold else STATUS_OK
+    return status, {'checked_out': checked_out, 'capacity': capacity, 'saturation': round(saturation, 3)}
+
+
+def check_storage():
+    """PDF_ROOT_PATH is mounted, writable and has free space"""
+    root = current_app.config['PDF_ROOT_PATH']
+    if not os.path.isdir(root) or not os.access(root, os.R_OK | os.W_OK | os.X_OK):
+        return STATUS_FAILED, {'path': root, 'error': 'not a readable and writable directory'}
+    stat = os.statvfs(root)
+    free = stat.f_bavail * stat.f_frsize
+    minimum = current_app.config.get('HEALTH_MIN_FREE_BYTES', 1024 ** 3)
+    # Low space stops new downloads, stored PDFs are still served
+    status = STATUS_DEGRADED if free < minimum else STATUS_OK
+    return status, {'free_bytes': free, 'min_free_bytes': minimum}
+
+
+def check_upstreams():
+    """Open circuit breakers of this process"""
+    from services.upstream_service import get_breakers
+
+    breakers = get_breakers().snapshot()
+    open_upstreams = [name for name, breaker in breakers.items() if breaker['state'] == OPEN]
+    # Cached PDFs are still served while downloads from an upstream are rejected
+    return (STATUS_DEGRADED if open_upstreams else STATUS_OK), {'open': open_upstreams}
+
+
+CHECKS = {
+    'database': check_database,
+    'pool': check_pool,
+    'storage': check_storage,
+    'upstreams': check_upstreams,
+}
+
+
+class HealthMonitor:
+    """Runs the checks periodically and keeps the last report for probes"""
+
+    def __init__(self, app, checks=None, interval=5.0, stale_after=30.0, clock=time.monotonic):
+        """
+        Args:
+            app (Flask): App whose dependencies are checked
+            checks (dict): {name: function returning (status, details)}, defaults to CHECKS
+            interval (float): Seconds between check runs
+            stale_after (float): Age after which a report no longer counts as ready
+            clock (callable): Monotonic clock, replaceable in tests
+        """
+        self.app = app
+        self.checks = CHECKS if checks is None else checks
+        self.interval = interval
+        self.stale_after = stale_after
+        self.clock = clock
+        self._last = None
+        self._pid = None
+        self._thread = None
+        self._run_lock = threading.Lock()
+
+    def _start(self):
+        # Threads do not survive fork; start the checker in the process serving probes
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with _monitor_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._last = None
+            self._thread = threading.Thread(target=self._loop, name='health-monitor', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                with self._run_lock, self.app.app_context():
+                    self.run_checks()
+            except Exception as e:
+                logger.error(f"Health checks failed to run: {str(e)}")
+            time.sleep(self.interval)
+
+    def run_checks(self):
+        """
+        Run all checks and publish the report; needs an app context
+
+        Returns:
+            dict: Report
+        """
+        checks = {}
+        for name, check in self.checks.items():
+            started = self.clock()
+            try:
+                status, details = check()
+            except Exception as e:
+                status, details = STATUS_FAILED, {'error': str(e)}
+            checks[name] = {'status': status, 'duration_ms': round((self.clock() - started) * 1000, 1), **details}
+        db.session.remove()
+
+        failed = [name for name, check in checks.items() if check['status'] == STATUS_FAILED]
+        if any(name in CRITICAL_CHECKS for name in failed):
+            status = STATUS_FAILED
+        elif failed or any(check['status'] == STATUS_DEGRADED for check in checks.values()):
+            status = STATUS_DEGRADED
+        else:
+            status = STATUS_OK
+        for name in failed:
+            logger.warning(f"Health check {name} failed: {checks[name].get('error')}")
+        report = {'status': status, 'checked_at': time.time(), 'checks': checks}
+        # Replaced as a whole, so probes never see a half-written report
+        self._last = (report, self.clock())
+        return report
+
+    def report(self):
+        """
+        Get the last report, starting the checker if needed
+
+        The first probe of a new worker runs the checks itself rather than
+        reporting not ready until the checker's first run, as workers are
+        replaced all the time (GUNICORN_MAX_REQUESTS).
+
+        Returns:
+            dict: Report with 'status', 'ready', 'age' and per-check 'checks'
+        """
+        self._start()
+        if self._last is None:
+            with self._run_lock:
+                if self._last is None:
+                    try:
+                        with self.app.app_context():
+                            self.run_checks()
+                    except Exception as e:
+                        logger.error(f"Health checks failed to run: {str(e)}")
+        last = self._last
+        if last is None:
+            return {'status': STATUS_STARTING, 'ready': False, 'age': None, 'checks': {}}
+        report, finished = last
+        age = self.clock() - finished
+        if age > self.stale_after:
+            # The checker is stuck on a dependency that no longer answers
+            return {**report, 'status': STATUS_FAILED, 'ready': False, 'age': round(age, 1)}
+        return {**report, 'ready': report['status'] != STATUS_FAILED, 'age': round(age, 1)}
+
+
+def get_health_monitor():
+    """Get the health monitor of the current app, creating it on first use"""
+    extensions = current_app.extensions
+    if 'health_monitor' not in extensions:
+        with _monitor_lock:
+            if 'health_monitor' not in extensions:
+                config = current_app.config
+                extensions['health_monitor'] = HealthMonitor(
+                    current_app._get_current_object(),
+                    interval=config.get('HEALTH_CHECK_INTERVAL', 5),
+                    stale_after=config.get('HEALTH_STALE_AFTER', 30),
+                )
+    return extensions['health_monitor']
@@ -1,27 +1,77 @@
 from flask import current_app
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 import os
+import json
 import logging
 from services.db_service import get_article_by_pmid, save_article
+from services.storage_service import (
+    resolve_pdf_path, ingest_pdf, quarantine_pdf, get_blob_path, get_shard_path, move_into_shard
+)
+from services.tier_service import open_cold_pdf, replicate_to_cold, touch_hot_file
+from services.text_service import extract_in_background
+from services.search_service import remove_from_index
+from services.api_key_service import get_request_policy
+from services.download_scheduler import schedule_download
+from services.admission_service import admit_download
+from services.pmid_status_service import get_pmid_status
+from services.upstream_service import (
+    NCBI_UPSTREAM, TRANSIENT_FAILURES, UpstreamUnavailable, check_upstream, record_download_failure
+)
+from services.rate_limit_service import (
+    enable_outbound_rate_limit, get_ncbi_api_key, get_rate_for_host, get_rate_limits, NCBI_DOMAINS
+)
+from utils.deadline import DeadlineExceeded, current_deadline
+from utils.doi_utils import normalize_doi
+from utils.pdf_utils import verify_pdf_file
+from utils.pmid_status import FAILED, UNKNOWN
 
 logger = logging.getLogger(__name__)
 
-def get_pdf_by_pmid(pmid):
+# 'cache' of get_pdf_by_pmid results: served from storage or downloaded for this request
+CACHE_HIT = 'hit'
+CACHE_MISS = 'miss'
+
+def _as_miss(pdf_info):
+    # Download results are shared by every request that joined the download
+    return {**pdf_info, 'cache': CACHE_MISS} if pdf_info else pdf_info
+
+def get_pdf_by_pmid(pmid, deadline=None):
     """
     Get PDF information for a given PMID from the database or download it using PubCrawler
     
     Args:
         pmid (str): PubMed ID
+        deadline (Deadline): Stop waiting for a download after this deadline
         
     Returns:
-        dict: PDF information or None if not found
+        dict: PDF information with 'cache' set to CACHE_HIT or CACHE_MISS, or None if not found
+        
+    Raises:
+        QuotaExceeded: If the API key of the current request may not download now
+        Overloaded: If the PDF needs a new download and the worker is shedding load
+        DeadlineExceeded: If the deadline passed first; the download continues in the
+            background unless REQUEST_DEADLINE_ACTION is 'cancel'
     """
     # 1. Check if PDF exists in database
     pdf_info = get_pdf_from_database(pmid)
     if pdf_info:
+        pdf_info['cache'] = CACHE_HIT
         return pdf_info
     
-    # 2. If not found in database or file doesn't exist, download using PubCrawler
-    return download_pdf_with_pubcrawler(pmid)
+    # 2. If not found in database or file doesn't exist, download using PubCrawler.
+    # Misses go through the download scheduler, ahead of queued bulk downloads,
+    # unless the worker sheds new downloads to keep serving hits
+    with admit_download(pmid):
+        if deadline is None:
+            return _as_miss(schedule_download(pmid, 'interactive', get_request_policy()).result())
+        
+        cancel = current_app.config.get('REQUEST_DEADLINE_ACTION', 'continue') == 'cancel'
+        future = schedule_download(pmid, 'interactive', get_request_policy(), deadline if cancel else None)
+        try:
+            return _as_miss(future.result(timeout=deadline.remaining()))
+        except FuturesTimeoutError:
+            raise DeadlineExceeded(f"Download of PMID {pmid} did not finish within the request deadline",
+                                   continuing=not cancel)
 
 
 def get_pdf_from_database(pmid):
@@ -34,31 +84,103 @@ def get_pdf_from_database(pmid):
     Returns:
         dict: PDF information or None if not found
     """
+    # Unknown and failed PMIDs are answered from the status set without a query
+    if get_pmid_status(pmid) in (FAILED, UNKNOWN):
+        return None
+    
     article = get_article_by_pmid(pmid)
     
     if not article or not article.has_pdf:
         return None
     
-    # Build absolute path to PDF file
-    pdf_path = os.path.join(current_app.config['PDF_ROOT_PATH'], article.relative_path, 'article.pdf')
+    # Build absolute path to PDF file (per-PMID entry or content-addressed blob)
+    pdf_path = resolve_pdf_path(article)
     
-    # Verify if PDF file actually exists
-    if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
+    # Verify the file, reusing the cached verdict while its size and mtime are unchanged
+    if pdf_path and is_pdf_file_valid(article, pdf_path):
         return {
             'pmid': pmid,
             'pdf_path': pdf_path,
+            'content_hash': article.content_hash,
+            'title': article.title,
+            'authors': article.authors,
+            'journal': article.journal,
+            'year': article.year
+        }
+    
+    # Not in the hot tier: stream it from the cold tier while caching it locally
+    cold_pdf = open_cold_pdf(article) if article.has_pdf else None
+    if cold_pdf:
+        pdf_stream, size = cold_pdf
+        return {
+            'pmid': pmid,
+            'pdf_stream': pdf_stream,
+            'size': size,
+            'content_hash': article.content_hash,
             'title': article.title,
             'authors': article.authors,
             'journal': article.journal,
             'year': article.year
         }
     else:
-        # PDF file doesn't exist, update database record
+        # PDF file doesn't exist or is broken, update database record
         article.has_pdf = False
         save_article(article)
+        remove_from_index(pmid)
         return None
 
 
+def is_pdf_file_valid(article, pdf_path):
+    """
+    Check an article's PDF file, verifying it only when it changed
+    
+    A verdict stored on the article is reused as long as the file's size and
+    mtime match, so a hit costs a single stat() call. Files that fail
+    verification are quarantined and the article is re-queued for download.
+    
+    Args:
+        article: Article record object
+        pdf_path (str): Absolute path to the PDF file
+        
+    Returns:
+        bool: True if the file exists and is a valid PDF
+    """
+    try:
+        stat = os.stat(pdf_path)
+    except OSError:
+        return False
+    
+    if stat.st_size == 0:
+        return False
+    
+    if current_app.config.get('PDF_HOT_TIER_QUOTA_BYTES'):
+        touch_hot_file(pdf_path, stat)
+    
+    if not current_app.config.get('PDF_VERIFY_ENABLED', True):
+        return True
+    
+    if (article.pdf_valid is not None
+            and article.size == stat.st_size
+            and article.file_mtime_ns == stat.st_mtime_ns):
+        return article.pdf_valid
+    
+    result = verify_pdf_file(pdf_path, current_app.config.get('PDF_MIN_PAGES', 1))
+    article.pdf_valid = result.valid
+    article.size = stat.st_size
+    article.file_mtime_ns = stat.st_mtime_ns
+    
+    if not result.valid:
+        logger.warning(f"Invalid PDF for PMID {article.pmid}: {result.reason}")
+        quarantine_pdf(article.pmid, pdf_path)
+        # Re-queue: the next request or bulk run downloads the article again
+        article.has_pdf = False
+        article.download_attempted = False
+        remove_from_index(article.pmid)
+    
+    save_article(article)
+    return result.valid
+
+
 def download_pdf_with_pubcrawler(pmid):
     """
     Download PDF using PubCrawler
@@ -68,23 +190,51 @@ def download_pdf_with_pubcrawler(pmid):
         
     Returns:
         dict: PDF information or None if download failed
+        
+    Raises:
+        UpstreamUnavailable: If NCBI's circuit breaker is open, or the download failed
+            because an upstream timed out, refused connections or answered 429/5xx
+        DeadlineExceeded: If the deadline of the scheduled download passed during the crawl
     """
+    # Every crawl starts at NCBI; fail fast while it is known to be down
+    check_upstream(NCBI_UPSTREAM)
+    
     try:
         # Initialize PubCrawler
         crawler = initialize_pubcrawler()
         
         # Process PMID with PubCrawler
         result = crawler.process_pmid(pmid)
-        
-        if result['success'] and result['has_pdf']:
-            return process_successful_download(pmid, result)
-        else:
-            handle_failed_download(pmid, result)
-            return None
-            
+    except DeadlineExceeded:
+        logger.info(f"Download of PMID {pmid} cancelled after its request deadline")
+        raise
     except Exception as e:
-        logger.error(f"Error using PubCrawler for PMID {pmid}: {str(e)}")
+        category, upstream = record_download_failure(error=e)
+        logger.error(f"Error using PubCrawler for PMID {pmid} ({category}, {upstream}): {str(e)}")
+        if category in TRANSIENT_FAILURES:
+            raise UpstreamUnavailable(str(e), upstream, category, getattr(e, 'retry_after', 30)) from e
         return None
+    
+    if result['success'] and result['has_pdf']:
+        try:
+            return process_successful_download(pmid, result)
+        except Exception as e:
+            logger.error(f"Error storing the download of PMID {pmid}: {str(e)}")
+            return None
+    
+    deadline = current_deadline()
+    if deadline is not None and deadline.expired():
+        # The crawler may have turned the cancellation into a failed result
+        logger.info(f"Download of PMID {pmid} cancelled after its request deadline")
+        raise DeadlineExceeded(f"Download of PMID {pmid} cancelled after its request deadline")
+    
+    category, upstream = record_download_failure(result=result)
+    if category in TRANSIENT_FAILURES:
+        # Not an answer about the article, so it is not recorded as attempted
+        logger.error(f"Download of PMID {pmid} failed upstream ({category}, {upstream}): {result.get('error')}")
+        raise UpstreamUnavailable(result.get('error') or category, upstream, category)
+    handle_failed_download(pmid, result)
+    return None
 
 
 def initialize_pubcrawler():
@@ -96,12 +246,17 @@ def initialize_pubcrawler():
     """
     from pubcrawler import PubCrawler
     
+    # The shared per-domain limit applies across workers; the crawler's own limit is per instance
+    enable_outbound_rate_limit()
+    api_key = get_ncbi_api_key()
+    ncbi_rate = get_rate_for_host(NCBI_DOMAINS[0], get_rate_limits())[1]
+    
     return PubCrawler(
         email=current_app.config.get('NCBI_EMAIL', 'your.email@example.com'),
         base_dir=current_app.config.get('PDF_ROOT_PATH', '/app/downloads'),
-        # api_key=current_app.config.get('NCBI_API_KEY', None),
+        api_key=api_key,
         max_concurrent_downloads=5,
-        requests_per_second=3.0
+        requests_per_second=ncbi_rate or 3.0
     )
 
 
@@ -116,25 +271,54 @@ def process_successful_download(pmid, result):
     Returns:
         dict: PDF information
     """
+    # Place the download in its shard, if the sharded layout is enabled
+    full_path = result['path']
+    shard_path = get_shard_path(pmid)
+    if shard_path:
+        full_path = move_into_shard(full_path, shard_path)
+    
     # Extract relative path from result
     base_dir = current_app.config.get('PDF_ROOT_PATH', '/app/downloads')
-    relative_path = os.path.relpath(result['path'], base_dir)
+    relative_path = os.path.relpath(full_path, base_dir)
     
     # Build absolute path to PDF file
-    pdf_path = os.path.join(result['path'], 'article.pdf')
+    pdf_path = os.path.join(full_path, 'article.pdf')
+    
+    # Reject paywall pages and truncated downloads before they are stored
+    if current_app.config.get('PDF_VERIFY_ENABLED', True):
+        verification = verify_pdf_file(pdf_path, current_app.config.get('PDF_MIN_PAGES', 1))
+        if not verification.valid:
+            quarantine_pdf(pmid, pdf_path)
+            handle_failed_download(pmid, {'error': f"Invalid PDF: {verification.reason}"})
+            return None
+    
+    # Hash the file and move it into the blob store if content-addressed
+    file_info = ingest_pdf(pdf_path)
+    stored_path = pdf_path if os.path.exists(pdf_path) else get_blob_path(file_info['content_hash'])
+    stat = os.stat(stored_path)
+    file_info.update({
+        'file_mtime_ns': stat.st_mtime_ns,
+        'pdf_valid': True if current_app.config.get('PDF_VERIFY_ENABLED', True) else None
+    })
     
     # Update or create database record
     article = get_article_by_pmid(pmid)
     
     if article:
-        update_existing_article(article, relative_path)
+        update_existing_article(article, relative_path, file_info)
     else:
-        article = create_new_article(pmid, result['path'], relative_path)
+        article = create_new_article(pmid, full_path, relative_path, file_info)
+    
+    if article:
+        replicate_to_cold(article)
+        if current_app.config.get('TEXT_EXTRACT_ON_DOWNLOAD', True):
+            extract_in_background(article)
     
     # Return PDF information
     return {
         'pmid': pmid,
-        'pdf_path': pdf_path,
+        'pdf_path': resolve_pdf_path(article) if article else pdf_path,
+        'content_hash': file_info['content_hash'],
         'title': article.title if hasattr(article, 'title') else '',
         'authors': article.authors if hasattr(article, 'authors') else '',
         'journal': article.journal if hasattr(article, 'journal') else '',
@@ -142,20 +326,23 @@ def process_successful_download(pmid, result):
     }
 
 
-def update_existing_article(article, relative_path):
+def update_existing_article(article, relative_path, file_info):
     """
     Update existing article record
     
     Args:
         article: Article record object
         relative_path (str): Relative path
+        file_info (dict): Content hash, size and verification state of the stored PDF
     """
     article.has_pdf = True
     article.relative_path = relative_path
+    for key, value in file_info.items():
+        setattr(article, key, value)
     save_article(article)
 
 
-def create_new_article(pmid, full_path, relative_path):
+def create_new_article(pmid, full_path, relative_path, file_info):
     """
     Create new article record
     
@@ -163,6 +350,7 @@ def create_new_article(pmid, full_path, relative_path):
         pmid (str): PubMed ID
         full_path (str): Full path
         relative_path (str): Relative path
+        file_info (dict): Content hash, size and verification state of the stored PDF
         
     Returns:
         article: Created article record
@@ -177,7 +365,7 @@ def create_new_article(pmid, full_path, relative_path):
         # Create new article record
         new_article = {
             'pmid': pmid,
-            'doi': metadata.get('doi'),
+            'doi': normalize_doi(metadata.get('doi')),
             'title': metadata.get('title'),
             'authors': metadata.get('authors', ''),
             'journal': metadata.get('journal'),
@@ -187,7 +375,8 @@ def create_new_article(pmid, full_path, relative_path):
             'full_text_available': True,
             'commercial_use_allowed': False,  # Default value, may need to be adjusted
             'relative_path': relative_path,
-            'download_attempted': True
+            'download_attempted': True,
+            **file_info
         }
     else:
         # If no metadata file exists, create a basic record
@@ -195,7 +384,8 @@ def create_new_article(pmid, full_path, relative_path):
             'pmid': pmid,
             'has_pdf': True,
             'relative_path': relative_path,
-            'download_attempted': True
+            'download_attempted': True,
+            **file_info
         }
     
     return save_article(new_article)
@@ -0,0 +1,149 @@
+"""
+PMID status lookups
+
+Keeps a PmidStatusSet (utils.pmid_status) of every article that has a PDF or
+whose download failed, so "is this PMID known at all" is answered without a
+database query. The set is bulk-loaded with a streaming query, by the
+gunicorn master before it forks the workers when PMID_STATUS_PRELOAD is set
+and --preload is on (app.prepare_server), so they share it, or on first use
+otherwise, including when the preload failed.
+save_article updates it in place; changes made by other hosts and by CLI
+commands are picked up from updated_at every PMID_STATUS_REFRESH_INTERVAL
+seconds.
+"""
+
+from flask import current_app
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+import time
+import logging
+import threading
+from models import db, Article
+from utils.pmid_status import PmidStatusSet, parse_pmid
+
+logger = logging.getLogger(__name__)
+
+# Overlap between refreshes, for clock skew between hosts writing updated_at
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+_load_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def _stream_statuses(query):
+    batch_size = current_app.config.get('PMID_STATUS_LOAD_BATCH', 50000)
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+
+def load_pmid_status():
+    """
+    Bulk-load the PMID status set of the current app from the articles table
+
+    Returns:
+        PmidStatusSet: Loaded set
+    """
+    started = time.monotonic()
+    watermark = datetime.utcnow() - REFRESH_OVERLAP
+    status_set = PmidStatusSet(current_app.config.get('PMID_STATUS_CAPACITY', 64_000_000))
+    # Articles without a PDF or an attempt have the same status as unknown PMIDs
+    query = db.session.query(Article.pmid, Article.has_pdf, Article.download_attempted).filter(
+        or_(Article.has_pdf.is_(True), Article.download_attempted.is_(True))
+    )
+    loaded = status_set.load(_stream_statuses(query))
+    current_app.extensions['pmid_status'] = {'set': status_set, 'watermark': watermark, 'checked': time.monotonic()}
+    logger.info(f"Loaded the status of {loaded} PMIDs in {time.monotonic() - started:.1f}s "
+                f"({status_set.stats()['memory_bytes'] // (1024 * 1024)} MiB shared)")
+    return status_set
+
+
+def refresh_pmid_status(status):
+    """
+    Apply articles updated since the last load or refresh
+
+    Args:
+        status (dict): State from current_app.extensions['pmid_status']
+
+    Returns:
+        int: Number of articles applied
+    """
+    watermark = datetime.utcnow() - REFRESH_OVERLAP
+    query = db.session.query(Article.pmid, Article.has_pdf, Article.download_attempted).filter(
+        Article.updated_at >= status['watermark']
+    )
+    applied = 0
+    for pmid, has_pdf, attempted in _stream_statuses(query):
+        pmid = parse_pmid(pmid)
+        if pmid is not None and status['set'].set(pmid, bool(has_pdf), bool(attempted)):
+            applied += 1
+    status['watermark'] = watermark
+    return applied
+
+
+def get_pmid_status_set():
+    """
+    Get the PMID status set of the current app, loading or refreshing it if due
+
+    Returns:
+        PmidStatusSet: Status set, or None if PMID_STATUS_ENABLED is off or loading failed
+    """
+    config = current_app.config
+    if not config.get('PMID_STATUS_ENABLED', True):
+        return None
+    extensions = current_app.extensions
+    interval = config.get('PMID_STATUS_REFRESH_INTERVAL', 60)
+    if 'pmid_status' not in extensions or extensions['pmid_status']['set'] is None:
+        with _load_lock:
+            status = extensions.get('pmid_status')
+            if status is None or (status['set'] is None and time.monotonic() - status['checked'] > interval):
+                try:
+                    load_pmid_status()
+                except Exception as e:
+                    # Answer from the database until the next attempt
+                    db.session.rollback()
+                    logger.warning(f"Loading the PMID status set failed: {str(e)}")
+                    extensions['pmid_status'] = {'set': None, 'watermark': None, 'checked': time.monotonic()}
+
+    status = extensions['pmid_status']
+    if status['set'] is not None and time.monotonic() - status['checked'] > interval \
+            and _refresh_lock.acquire(blocking=False):
+        # One thread refreshes, the others keep answering from the current set
+        try:
+            status['checked'] = time.monotonic()
+            refresh_pmid_status(status)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Refreshing the PMID status set failed: {str(e)}")
+        finally:
+            _refresh_lock.release()
+    return status['set']
+
+
+def get_pmid_status(pmid):
+    """
+    Look up the status of a PMID
+
+    Args:
+        pmid (str): PubMed ID
+
+    Returns:
+        str: 'has_pdf', 'failed' or 'unknown', or None if the set cannot answer
+            (disabled, or the PMID is beyond PMID_STATUS_CAPACITY)
+    """
+    status_set = get_pmid_status_set()
+    pmid = parse_pmid(pmid)
+    if status_set is None or pmid is None:
+        return None
+    return status_set.get(pmid)
+
+
+def record_article_status(article):
+    """
+    Update the status set after an article was saved
+
+    Args:
+        article (Article): Saved article
+    """
+    status = current_app.extensions.get('pmid_status')
+    pmid = parse_pmid(article.pmid)
+    if status is not None and status['set'] is not None and pmid is not None:
+        status['set'].set(pmid, bool(article.has_pdf), bool(article.download_attempted))
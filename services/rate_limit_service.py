@@ -0,0 +1,210 @@
+"""
+Outbound rate limiting
+
+Every PubCrawler instance throttles itself, but there is one instance per
+request and worker, so the real outbound rate grows with the number of
+workers and replicas. This service puts a token bucket per upstream domain
+in front of all outgoing HTTP requests: the buckets are shared by all
+workers of a host (RATE_LIMIT_BACKEND 'host') or by the whole cluster
+('mysql' or 'redis').
+
+Requests are limited at the transport, by wrapping requests.Session.send,
+so PubCrawler's own requests, redirects to publisher sites and the DOI
+lookups all count against the bucket of the host they are sent to. The same
+hook passes every request through its upstream's circuit breaker
+(services.upstream_service) and stops downloads whose request deadline
+passed (utils.deadline).
+"""
+
+from flask import current_app
+import os
+import logging
+import tempfile
+import threading
+from urllib.parse import urlsplit
+from services.upstream_service import NCBI_DOMAINS, get_breakers, get_upstream, send_through_breaker
+from utils.deadline import current_deadline
+from utils.rate_limiter import FileRateLimiter, RedisRateLimiter, SQLRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Limiter and limits used by the transport hook, which may run outside an app context
+_active = None
+_active_lock = threading.Lock()
+_original_send = None
+
+
+def get_ncbi_api_key(config=None):
+    """
+    Get the configured NCBI API key
+
+    Args:
+        config: Config mapping, defaults to the current app's
+
+    Returns:
+        str: API key, or None if unset or still the placeholder from secrets.py
+    """
+    config = current_app.config if config is None else config
+    api_key = config.get('NCBI_API_KEY')
+    if not api_key or api_key.startswith('your_'):
+        return None
+    return api_key
+
+
+def get_rate_limits(config=None):
+    """
+    Get the per-domain rate limits, with the NCBI allowance raised if an API key is set
+
+    Args:
+        config: Config mapping, defaults to the current app's
+
+    Returns:
+        dict: {domain or '*': requests per second}
+    """
+    config = current_app.config if config is None else config
+    limits = dict(config.get('RATE_LIMITS') or {})
+    if get_ncbi_api_key(config):
+        ncbi_rate = config.get('RATE_LIMIT_NCBI_WITH_API_KEY', 10.0)
+        for domain in limits:
+            if domain != '*' and _in_domain(domain, NCBI_DOMAINS):
+                limits[domain] = ncbi_rate
+    return limits
+
+
+def _in_domain(host, domains):
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+def get_rate_for_host(host, limits):
+    """
+    Find the bucket and rate of an upstream host
+
+    The most specific configured domain wins: the host itself, then its parent
+    domains, then the '*' default.
+
+    Args:
+        host (str): Host name
+        limits (dict): Limits from get_rate_limits
+
+    Returns:
+        tuple: (bucket name, requests per second), rate is None if unlimited
+    """
+    host = (host or '').lower().rstrip('.')
+    labels = host.split('.')
+    for i in range(len(labels)):
+        domain = '.'.join(labels[i:])
+        if domain in limits:
+            return domain, limits[domain]
+    # Unlisted hosts get a bucket each, at the default rate
+    return host, limits.get('*')
+
+
+def get_state_dir(config=None):
+    """Directory of the host-wide bucket files, on tmpfs where available"""
+    config = current_app.config if config is None else config
+    state_dir = config.get('RATE_LIMIT_STATE_DIR')
+    if state_dir:
+        return state_dir
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'pmid-pdf-api-ratelimit')
+
+
+def create_rate_limiter(config=None):
+    """
+    Create the rate limiter configured by RATE_LIMIT_BACKEND
+
+    Args:
+        config: Config mapping, defaults to the current app's
+
+    Returns:
+        RateLimiter: Limiter, or None if outbound rate limiting is disabled
+
+    Raises:
+        ValueError: If the backend is unknown or misconfigured
+    """
+    config = current_app.config if config is None else config
+    backend = config.get('RATE_LIMIT_BACKEND', 'host')
+    if not backend:
+        return None
+    if backend == 'host':
+        return FileRateLimiter(get_state_dir(config))
+    if backend == 'redis':
+        url = config.get('RATE_LIMIT_REDIS_URL')
+        if not url:
+            raise ValueError("RATE_LIMIT_BACKEND 'redis' needs RATE_LIMIT_REDIS_URL")
+        return RedisRateLimiter(url)
+    if backend == 'mysql':
+        from models import db, RateLimitBucket
+        return SQLRateLimiter(db.get_engine(current_app), RateLimitBucket.__table__)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+
+
+def acquire(url):
+    """
+    Wait for a token of the bucket an outgoing request belongs to
+
+    Args:
+        url (str): Request URL
+
+    Returns:
+        float: Seconds waited
+
+    Raises:
+        RateLimitExceeded: If the request would wait longer than RATE_LIMIT_MAX_WAIT
+    """
+    active = _active
+    if active is None or active['limiter'] is None:
+        return 0.0
+    bucket, rate = get_rate_for_host(urlsplit(url).hostname, active['limits'])
+    if not rate:
+        return 0.0
+    wait = active['limiter'].acquire(bucket, rate, max(1.0, rate * active['burst']),
+                                     max_wait=active['max_wait'])
+    if wait > 1:
+        logger.info(f"Outbound request to {bucket} delayed {wait:.1f}s by the rate limit")
+    return wait
+
+
+def _outbound_send(self, request, **kwargs):
+    # Downloads nobody waits for any more stop at their next request
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+    # Fail fast before waiting for a token of an upstream that is down
+    get_breakers().get(get_upstream(urlsplit(request.url).hostname)).check()
+    acquire(request.url)
+    return send_through_breaker(_original_send, self, request, **kwargs)
+
+
+def enable_outbound_rate_limit():
+    """
+    Rate limit and guard all requests sent through the requests library, once per process
+
+    Configured from the current app; later calls are no-ops. Circuit breakers
+    are installed even if RATE_LIMIT_BACKEND disables rate limiting.
+
+    Returns:
+        bool: Whether outbound requests are rate limited
+    """
+    global _active, _original_send
+    if _active is not None:
+        return _active['limiter'] is not None
+    with _active_lock:
+        if _active is None:
+            limiter = create_rate_limiter()
+            get_breakers()
+            import requests
+
+            config = current_app.config
+            _active = {
+                'limiter': limiter,
+                'limits': get_rate_limits(config),
+                'burst': config.get('RATE_LIMIT_BURST', 1.0),
+                'max_wait': config.get('RATE_LIMIT_MAX_WAIT', 30),
+            }
+            if _original_send is None:
+                _original_send = requests.Session.send
+                requests.Session.send = _outbound_send
+            if limiter is not None:
+                logger.info(f"Outbound rate limit enabled ({config.get('RATE_LIMIT_BACKEND')}): {_active['limits']}")
+    return _active['limiter'] is not None
@@ -0,0 +1,234 @@
+"""
+Local full-text search service
+
+Searches the extracted text of stored PDFs through the on-disk BM25 index in
+utils.search_index. The index lives in SEARCH_INDEX_PATH (by default
+PDF_ROOT_PATH/.search-index) and is memory-mapped by every worker.
+
+Newly extracted articles are queued as small marker files in the index's
+pending/ directory, so any worker can pick them up, and are flushed into a
+new segment once SEARCH_INDEX_FLUSH_DOCS are queued or the oldest has
+waited SEARCH_INDEX_FLUSH_INTERVAL seconds. Articles that lose their PDF
+are queued with an empty marker and flushed as tombstones.
+"""
+
+from flask import current_app
+from concurrent.futures import ThreadPoolExecutor
+import os
+import gzip
+import time
+import zlib
+import logging
+from services.db_service import get_articles_by_pmids
+from utils.search_index import IndexWriter, SearchIndex, tokenize
+
+logger = logging.getLogger(__name__)
+
+PENDING_DIR = 'pending'
+
+# Flushes run on a single background thread per process
+_flush_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='search-flush')
+_last_flush_check = 0.0
+
+
+def get_index_path(config=None):
+    """
+    Get the directory of the search index
+
+    Args:
+        config (dict, optional): App config, defaults to the current app's
+
+    Returns:
+        str: Absolute index directory
+    """
+    config = config or current_app.config
+    return config.get('SEARCH_INDEX_PATH') or os.path.join(config['PDF_ROOT_PATH'], '.search-index')
+
+
+def get_search_index():
+    """
+    Get the read-only index handle of the current app
+
+    Returns:
+        SearchIndex: Index handle shared by all requests in this process
+    """
+    extensions = current_app.extensions
+    if 'search_index' not in extensions:
+        extensions['search_index'] = SearchIndex(get_index_path())
+    return extensions['search_index']
+
+
+def queue_for_indexing(index_path, pmid, text_path):
+    """
+    Queue an article's extracted text for the next index flush
+
+    Args:
+        index_path (str): Index directory
+        pmid (str): PubMed ID
+        text_path (str): Path to the article's article.txt.gz, '' to remove the article
+    """
+    if not str(pmid).isdigit():
+        return
+    pending_dir = os.path.join(index_path, PENDING_DIR)
+    os.makedirs(pending_dir, exist_ok=True)
+    marker = os.path.join(pending_dir, str(pmid))
+    tmp_path = f"{marker}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text_path)
+    os.replace(tmp_path, marker)
+
+
+def remove_from_index(pmid):
+    """
+    Queue the removal of an article that lost its PDF (missing or quarantined) from the index
+
+    Args:
+        pmid (str): PubMed ID
+    """
+    if not current_app.config.get('SEARCH_INDEX_ENABLED', True):
+        return
+    try:
+        queue_for_indexing(get_index_path(), pmid, '')
+    except OSError as e:
+        logger.error(f"Could not queue PMID {pmid} for removal from the index: {str(e)}")
+
+
+def make_indexing_callback(pmid, text_path):
+    """
+    Create a future callback that queues an article once its text is extracted
+
+    The callback may run outside the app context, so configuration is captured here.
+
+    Args:
+        pmid (str): PubMed ID
+        text_path (str): Path the text is extracted to
+
+    Returns:
+        callable: Callback for Future.add_done_callback
+    """
+    config = current_app.config
+    index_path = get_index_path()
+    options = {
+        'max_segments': config.get('SEARCH_INDEX_MAX_SEGMENTS', 8),
+        'flush_docs': config.get('SEARCH_INDEX_FLUSH_DOCS', 100),
+        'flush_interval': config.get('SEARCH_INDEX_FLUSH_INTERVAL', 60)
+    }
+
+    def callback(future):
+        if future.cancelled() or future.exception():
+            return
+        try:
+            queue_for_indexing(index_path, pmid, text_path)
+            _flush_executor.submit(maybe_flush_pending, index_path, **options)
+        except OSError as e:
+            logger.error(f"Could not queue PMID {pmid} for indexing: {str(e)}")
+
+    return callback
+
+
+def maybe_flush_pending(index_path, max_segments=8, flush_docs=100, flush_interval=60):
+    """
+    Flush pending articles if enough are queued or the oldest waited long enough
+
+    Returns:
+        int: Number of indexed articles
+    """
+    pending_dir = os.path.join(index_path, PENDING_DIR)
+    try:
+        markers = [entry for entry in os.scandir(pending_dir) if entry.name.isdigit()]
+    except FileNotFoundError:
+        return 0
+    if not markers:
+        return 0
+
+    oldest = min(entry.stat().st_mtime for entry in markers)
+    if len(markers) < flush_docs and time.time() - oldest < flush_interval:
+        return 0
+    return flush_pending(index_path, max_segments)
+
+
+def flush_pending(index_path, max_segments=8):
+    """
+    Index all pending articles into a new segment
+
+    Args:
+        index_path (str): Index directory
+        max_segments (int): Merge small segments beyond this count
+
+    Returns:
+        int: Number of indexed articles
+    """
+    pending_dir = os.path.join(index_path, PENDING_DIR)
+    with IndexWriter(index_path, max_segments=max_segments) as writer:
+        try:
+            markers = [entry for entry in os.scandir(pending_dir) if entry.name.isdigit()]
+        except FileNotFoundError:
+            return 0
+
+        documents = {}
+        flushed = []
+        for entry in markers:
+            mtime = None
+            try:
+                mtime = entry.stat().st_mtime_ns
+                with open(entry.path) as f:
+                    text_path = f.read().strip()
+                if not text_path:
+                    # Tombstone: the article has no PDF any more
+                    documents[int(entry.name)] = []
+                else:
+                    with gzip.open(text_path, 'rt', encoding='utf-8') as f:
+                        documents[int(entry.name)] = tokenize(f.read())
+            except (OSError, EOFError, zlib.error) as e:
+                # A truncated text file must not block the queue; its marker is dropped
+                logger.warning(f"Skipping PMID {entry.name} for indexing: {str(e)}")
+            if mtime is not None:
+                flushed.append((entry.path, mtime))
+
+        writer.add_documents(documents)
+
+    for path, mtime in flushed:
+        try:
+            # Keep markers re-queued while this flush was running
+            if os.stat(path).st_mtime_ns == mtime:
+                os.remove(path)
+        except OSError:
+            pass
+
+    logger.info(f"Indexed {len(documents)} articles")
+    return len(documents)
+
+
+def search_articles(query, limit=20):
+    """
+    Search the local corpus and attach article metadata
+
+    Args:
+        query (str): Free-text query
+        limit (int): Maximum number of results
+
+    Returns:
+        tuple: ([(pmid, score, Article or None)] best first, number of matching documents)
+            Articles that lost their PDF since they were indexed are left out.
+    """
+    global _last_flush_check
+    config = current_app.config
+    interval = config.get('SEARCH_INDEX_FLUSH_INTERVAL', 60)
+    if time.time() - _last_flush_check > interval:
+        # Picks up articles queued by processes that went idle before flushing
+        _last_flush_check = time.time()
+        _flush_executor.submit(maybe_flush_pending, get_index_path(),
+                               config.get('SEARCH_INDEX_MAX_SEGMENTS', 8),
+                               config.get('SEARCH_INDEX_FLUSH_DOCS', 100), interval)
+
+    results, matches = get_search_index().search(query, limit)
+    articles = get_articles_by_pmids([str(pmid) for pmid, _ in results])
+    hits = []
+    for pmid, score in results:
+        article = articles.get(str(pmid))
+        # Until the tombstone queued by remove_from_index is flushed
+        if article is not None and not article.has_pdf:
+            matches -= 1
+            continue
+        hits.append((str(pmid), score, article))
+    return hits, matches
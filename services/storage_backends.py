@@ -0,0 +1,172 @@
+"""
+Storage backends for the cold PDF tier
+
+Keys are paths relative to PDF_ROOT_PATH (e.g. '123/45/article.pdf'), so an
+object in the cold tier mirrors the file it was copied from in the hot tier.
+"""
+
+import os
+import shutil
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Read size used when streaming objects
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+class StorageBackend:
+    """Interface implemented by cold tier backends"""
+
+    def exists(self, key):
+        """Return True if an object is stored under key"""
+        raise NotImplementedError
+
+    def size(self, key):
+        """Return the object size in bytes, or None if it does not exist"""
+        raise NotImplementedError
+
+    def iter_chunks(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield the object's bytes in chunks"""
+        raise NotImplementedError
+
+    def put_file(self, key, path):
+        """Store the file at path under key"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove the object stored under key"""
+        raise NotImplementedError
+
+
+class DirectoryBackend(StorageBackend):
+    """
+    Cold tier on a plain directory
+
+    Useful for a slower network mount, and as a stand-in for the object store in tests.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def size(self, key):
+        try:
+            return os.path.getsize(self._path(key))
+        except OSError:
+            return None
+
+    def iter_chunks(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        with open(self._path(key), 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+
+    def put_file(self, key, path):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, target)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Backend(StorageBackend):
+    """
+    Cold tier on an S3-compatible object store (AWS S3, MinIO, Ceph RGW, ...)
+
+    Requires boto3, which is imported on first use so deployments without a
+    cold tier do not need it installed.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region_name=None,
+                 access_key_id=None, secret_access_key=None):
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client(
+                's3',
+                endpoint_url=self.endpoint_url,
+                region_name=self.region_name,
+                aws_access_key_id=self.access_key_id,
+                aws_secret_access_key=self.secret_access_key
+            )
+        return self._client
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def size(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))['ContentLength']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key):
+        return self.size(key) is not None
+
+    def iter_chunks(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+        try:
+            for chunk in body.iter_chunks(chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+    def put_file(self, key, path):
+        self.client.upload_file(path, self.bucket, self._key(key),
+                                ExtraArgs={'ContentType': 'application/pdf'})
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+def create_backend(options):
+    """
+    Create a cold tier backend from its configuration
+
+    Args:
+        options (dict): Backend options with a 'type' of 'directory' or 's3'
+
+    Returns:
+        StorageBackend: Configured backend, or None if options is empty
+    """
+    if not options:
+        return None
+
+    options = dict(options)
+    backend_type = options.pop('type', 'directory')
+
+    if backend_type == 'directory':
+        return DirectoryBackend(**options)
+    if backend_type == 's3':
+        return S3Backend(**options)
+
+    raise ValueError(f"Unknown storage backend type: {backend_type}")
@@ -0,0 +1,284 @@
+from flask import current_app
+import os
+import hashlib
+import shutil
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Read size used when hashing PDF files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+LAYOUT_LEGACY = 'legacy'
+LAYOUT_CONTENT_ADDRESSED = 'content_addressed'
+
+SHARD_BY_PMID = 'pmid'
+SHARD_BY_HASH = 'hash'
+
+
+def is_content_addressed():
+    """
+    Check whether the content-addressed storage layout is enabled
+
+    Returns:
+        bool: True if PDFs are stored as sha256-named blobs
+    """
+    return current_app.config.get('PDF_STORAGE_LAYOUT', LAYOUT_LEGACY) == LAYOUT_CONTENT_ADDRESSED
+
+
+def compute_content_hash(path):
+    """
+    Compute the SHA-256 hash and size of a file without loading it into memory
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        tuple: (hex digest, size in bytes)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def get_blob_path(content_hash, root=None):
+    """
+    Build the absolute path of a content-addressed blob
+
+    Blobs are fanned out by the first two byte pairs of the hash
+    (e.g. .blobs/ab/cd/abcd....pdf) to keep directories small.
+
+    Args:
+        content_hash (str): SHA-256 hex digest
+        root (str, optional): Storage root, defaults to PDF_ROOT_PATH
+
+    Returns:
+        str: Absolute blob path
+    """
+    root = root or current_app.config['PDF_ROOT_PATH']
+    blob_dir = current_app.config.get('PDF_BLOB_DIR', '.blobs')
+    return os.path.join(root, blob_dir, content_hash[:2], content_hash[2:4], f"{content_hash}.pdf")
+
+
+def get_article_pdf_path(article):
+    """
+    Build the per-PMID path of an article's PDF file
+
+    Args:
+        article (Article): Article record
+
+    Returns:
+        str: Absolute path to article.pdf, or None if the article has no path
+    """
+    if article.relative_path is None:
+        return None
+    return os.path.join(current_app.config['PDF_ROOT_PATH'], article.relative_path, 'article.pdf')
+
+
+def get_shard_path(pmid, config=None):
+    """
+    Build the sharded directory of a PMID, relative to PDF_ROOT_PATH
+
+    'pmid' fans out by the trailing digits, which are evenly distributed
+    while the leading ones follow PubMed's numbering; 'hash' by a prefix of
+    the MD5 of the PMID.
+
+    Args:
+        pmid (str): PubMed ID
+        config: Config mapping, defaults to the current app's
+
+    Returns:
+        str: Relative directory (e.g. shards/678/345/12345678), or None if PDF_SHARD_LAYOUT is unset
+    """
+    config = current_app.config if config is None else config
+    layout = config.get('PDF_SHARD_LAYOUT')
+    if not layout:
+        return None
+    depth = config.get('PDF_SHARD_DEPTH', 2)
+    if layout == SHARD_BY_PMID:
+        width = config.get('PDF_SHARD_WIDTH') or 3
+        digits = str(pmid).zfill(depth * width)
+        levels = [digits[len(digits) - (i + 1) * width:len(digits) - i * width] for i in range(depth)]
+    elif layout == SHARD_BY_HASH:
+        width = config.get('PDF_SHARD_WIDTH') or 2
+        digest = hashlib.md5(str(pmid).encode('utf-8')).hexdigest()
+        levels = [digest[i * width:(i + 1) * width] for i in range(depth)]
+    else:
+        raise ValueError(f"Unknown PDF_SHARD_LAYOUT: {layout}")
+    return '/'.join([config.get('PDF_SHARD_DIR', 'shards'), *levels, str(pmid)])
+
+
+def move_into_shard(source_dir, relative_dir):
+    """
+    Move a freshly downloaded article directory to its sharded location
+
+    Args:
+        source_dir (str): Absolute directory written by PubCrawler
+        relative_dir (str): Target from get_shard_path
+
+    Returns:
+        str: Absolute target directory
+    """
+    target_dir = os.path.join(current_app.config['PDF_ROOT_PATH'], *relative_dir.split('/'))
+    if os.path.abspath(source_dir) == os.path.abspath(target_dir):
+        return target_dir
+    os.makedirs(os.path.dirname(target_dir), exist_ok=True)
+    try:
+        os.rename(source_dir, target_dir)
+    except OSError:
+        # Re-download of a sharded article: replace its files one by one
+        os.makedirs(target_dir, exist_ok=True)
+        for entry in os.scandir(source_dir):
+            shutil.move(entry.path, os.path.join(target_dir, entry.name))
+        shutil.rmtree(source_dir, ignore_errors=True)
+    return target_dir
+
+
+def link_tree(source_dir, target_dir):
+    """
+    Recreate a directory tree with hardlinks to its files
+
+    Files that cannot be linked (another filesystem) are copied. Existing
+    target files are replaced, so an interrupted run can be repeated.
+
+    Args:
+        source_dir (str): Existing directory
+        target_dir (str): Directory to create
+    """
+    for directory, _, files in os.walk(source_dir):
+        target = os.path.join(target_dir, os.path.relpath(directory, source_dir))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            source_path = os.path.join(directory, name)
+            target_path = os.path.join(target, name)
+            if os.path.exists(target_path) and os.path.samefile(source_path, target_path):
+                continue
+            try:
+                _replace_with_link(source_path, target_path)
+            except OSError:
+                shutil.copy2(source_path, target_path)
+
+
+def resolve_pdf_path(article):
+    """
+    Resolve the file that holds an article's PDF bytes
+
+    The per-PMID entry is preferred. In the content-addressed layout the
+    blob is used when the entry is missing (pointer mode or a lost link).
+
+    Args:
+        article (Article): Article record
+
+    Returns:
+        str: Absolute path to the PDF bytes, or None if it cannot be resolved
+    """
+    pdf_path = get_article_pdf_path(article)
+    if pdf_path and os.path.exists(pdf_path):
+        return pdf_path
+
+    if article.content_hash and is_content_addressed():
+        blob_path = get_blob_path(article.content_hash)
+        if os.path.exists(blob_path):
+            return blob_path
+
+    return pdf_path
+
+
+def ingest_pdf(pdf_path):
+    """
+    Hash a freshly stored PDF and, in the content-addressed layout, deduplicate it
+
+    When a blob with the same hash already exists the per-PMID file is replaced
+    by a hardlink to it; otherwise the file becomes the blob. In pointer mode, or
+    when hardlinks are not supported by the filesystem, the file is moved into
+    the blob store and the database hash is the only pointer to it.
+
+    Args:
+        pdf_path (str): Absolute path to the per-PMID article.pdf
+
+    Returns:
+        dict: {'content_hash': str, 'size': int}
+    """
+    content_hash, size = compute_content_hash(pdf_path)
+    info = {'content_hash': content_hash, 'size': size}
+
+    if not is_content_addressed():
+        return info
+
+    blob_path = get_blob_path(content_hash)
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    use_hardlinks = current_app.config.get('PDF_BLOB_LINK_MODE', 'hardlink') == 'hardlink'
+
+    try:
+        if os.path.exists(blob_path):
+            if os.path.samefile(blob_path, pdf_path):
+                return info
+            if use_hardlinks:
+                _replace_with_link(blob_path, pdf_path)
+            else:
+                os.remove(pdf_path)
+        elif use_hardlinks:
+            _replace_with_link(pdf_path, blob_path)
+        else:
+            shutil.move(pdf_path, blob_path)
+    except OSError as e:
+        # Hardlinks unsupported (e.g. cross-device): fall back to a DB pointer
+        logger.warning(f"Falling back to blob pointer for {pdf_path}: {str(e)}")
+        if not os.path.exists(blob_path):
+            shutil.move(pdf_path, blob_path)
+        elif os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+    return info
+
+
+def _replace_with_link(source, target):
+    """
+    Atomically make target a hardlink to source
+
+    Args:
+        source (str): Existing file
+        target (str): Path to (re)place with a link to source
+    """
+    # Unique per thread: ingests and migration workers may link the same target at once
+    tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.link(source, tmp_path)
+    try:
+        os.replace(tmp_path, target)
+    finally:
+        # rename() leaves both names in place when target already is a link to source
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+
+
+def quarantine_pdf(pmid, pdf_path):
+    """
+    Move a bad PDF out of the serving tree
+
+    Args:
+        pmid (str): PubMed ID
+        pdf_path (str): Absolute path to the bad file
+
+    Returns:
+        str: Path of the quarantined file, or None if it could not be moved
+    """
+    quarantine_dir = os.path.join(current_app.config['PDF_ROOT_PATH'],
+                                  current_app.config.get('PDF_QUARANTINE_DIR', '.quarantine'),
+                                  str(pmid))
+    target = os.path.join(quarantine_dir, f"{int(time.time())}-{os.path.basename(pdf_path)}")
+
+    try:
+        os.makedirs(quarantine_dir, exist_ok=True)
+        shutil.move(pdf_path, target)
+    except OSError as e:
+        logger.error(f"Failed to quarantine {pdf_path} for PMID {pmid}: {str(e)}")
+        return None
+
+    logger.warning(f"Quarantined PDF for PMID {pmid}: {target}")
+    return target
@@ -0,0 +1,287 @@
+"""
+Full-text extraction service
+
+Article text is extracted in a process pool, so extraction uses all cores
+without blocking request workers, and stored gzip-compressed next to the
+PDF (article.txt.gz) with a metadata stamp (article.txt.json). The stamp
+records the extractor version and the source PDF's hash and size; text is
+re-extracted only when either changes.
+"""
+
+from flask import current_app
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import os
+import gzip
+import logging
+import threading
+import multiprocessing
+from types import SimpleNamespace
+from services.search_service import make_indexing_callback
+from services.storage_service import resolve_pdf_path
+from services.tier_service import open_cold_pdf
+from utils.text_utils import (
+    EXTRACTOR_VERSION, TEXT_FILE_NAME, TextExtractionError, extract_to_file, read_text_meta
+)
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_puller = None
+_pool_lock = threading.Lock()
+_in_flight = {}
+
+
+def _get_pool(replace_broken=False):
+    """Get the extraction process pool, creating it on first use in this process"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and replace_broken:
+            # A crashed child (e.g. killed by the OOM killer) makes the pool unusable
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            # Spawned children only import utils.text_utils, not the whole app
+            _pool = ProcessPoolExecutor(
+                max_workers=current_app.config.get('TEXT_EXTRACTION_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    return _pool
+
+
+def get_text_dir(article):
+    """
+    Get the directory holding an article's extracted text (its PDF directory)
+
+    Args:
+        article (Article): Article record
+
+    Returns:
+        str: Absolute directory path, or None if the article has no storage path
+    """
+    if article.relative_path is None:
+        return None
+    return os.path.join(current_app.config['PDF_ROOT_PATH'], article.relative_path)
+
+
+def is_text_current(article, meta):
+    """
+    Check whether a text stamp matches the current extractor and the article's PDF
+
+    Args:
+        article (Article): Article record
+        meta (dict): Metadata stamp read from article.txt.json
+
+    Returns:
+        bool: True if the stored text can be served as is
+    """
+    return bool(meta
+                and meta.get('version') == EXTRACTOR_VERSION
+                and meta.get('content_hash') == article.content_hash
+                and meta.get('size') == article.size)
+
+
+def get_current_text_path(article):
+    """
+    Get the path of an article's extracted text if it is up to date
+
+    Args:
+        article (Article): Article record
+
+    Returns:
+        str: Path to article.txt.gz, or None if it is missing or stale
+    """
+    text_dir = get_text_dir(article)
+    if text_dir and is_text_current(article, read_text_meta(text_dir)):
+        return os.path.join(text_dir, TEXT_FILE_NAME)
+    return None
+
+
+def submit_extraction(article):
+    """
+    Queue text extraction for an article in the process pool
+
+    Concurrent requests for the same article in this process share one job.
+    A PDF that is only in the cold tier is pulled into the hot tier by the
+    job, not by the caller.
+
+    Args:
+        article (Article): Article record with a stored PDF
+
+    Returns:
+        Future: Resolves to the metadata stamp of the extracted text, or fails
+            with TextExtractionError if the PDF is not stored anywhere
+
+    Raises:
+        TextExtractionError: If the article has no storage path
+    """
+    text_dir = get_text_dir(article)
+    if text_dir is None:
+        raise TextExtractionError(f"PDF file not available for PMID {article.pmid}")
+
+    with _pool_lock:
+        future = _in_flight.get(text_dir)
+        if future is not None:
+            return future
+        future = Future()
+        _in_flight[text_dir] = future
+    future.add_done_callback(lambda _: _forget(text_dir))
+    if current_app.config.get('SEARCH_INDEX_ENABLED', True):
+        future.add_done_callback(make_indexing_callback(article.pmid, os.path.join(text_dir, TEXT_FILE_NAME)))
+
+    # Detached copy: the job may outlive the caller's session
+    source = SimpleNamespace(pmid=article.pmid, relative_path=article.relative_path,
+                             content_hash=article.content_hash, size=article.size)
+    pdf_path = resolve_pdf_path(source)
+    try:
+        if pdf_path and os.path.exists(pdf_path):
+            _start_extraction(future, pdf_path, text_dir, source)
+        else:
+            _get_puller().submit(_pull_and_extract, current_app._get_current_object(), future, text_dir, source)
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _get_puller():
+    """Get the thread pool pulling cold-tier PDFs for extraction"""
+    global _puller
+    with _pool_lock:
+        if _puller is None:
+            _puller = ThreadPoolExecutor(max_workers=current_app.config.get('TEXT_EXTRACTION_WORKERS', 2),
+                                         thread_name_prefix='text-pull')
+    return _puller
+
+
+def _pull_and_extract(app, future, text_dir, source):
+    with app.app_context():
+        try:
+            pdf_path = _ensure_local_pdf(source)
+            if pdf_path is None:
+                raise TextExtractionError(f"PDF file not available for PMID {source.pmid}")
+            _start_extraction(future, pdf_path, text_dir, source)
+        except Exception as e:
+            future.set_exception(e)
+
+
+def _start_extraction(future, pdf_path, text_dir, source):
+    """Run extract_to_file in the process pool and resolve future with its result"""
+    stamp = {'content_hash': source.content_hash, 'size': source.size}
+    try:
+        job = _get_pool().submit(extract_to_file, pdf_path, text_dir, stamp)
+    except BrokenProcessPool:
+        job = _get_pool(replace_broken=True).submit(extract_to_file, pdf_path, text_dir, stamp)
+
+    def resolve(job):
+        if job.exception() is not None:
+            future.set_exception(job.exception())
+        else:
+            future.set_result(job.result())
+    job.add_done_callback(resolve)
+
+
+def _forget(text_dir):
+    with _pool_lock:
+        _in_flight.pop(text_dir, None)
+
+
+def _ensure_local_pdf(article):
+    """
+    Make sure an article's PDF is in the hot tier, pulling it from the cold tier if needed
+
+    Returns:
+        str: Local path to the PDF, or None if it is not stored anywhere
+    """
+    pdf_path = resolve_pdf_path(article)
+    if pdf_path and os.path.exists(pdf_path):
+        return pdf_path
+
+    cold_pdf = open_cold_pdf(article)
+    if cold_pdf is None:
+        return None
+    pdf_stream, _ = cold_pdf
+    for _ in pdf_stream:
+        pass
+
+    pdf_path = resolve_pdf_path(article)
+    return pdf_path if pdf_path and os.path.exists(pdf_path) else None
+
+
+def get_article_text_path(article, timeout=None):
+    """
+    Get the path of an article's extracted text, extracting it first if needed
+
+    Args:
+        article (Article): Article record with a stored PDF
+        timeout (float, optional): Seconds to wait for a pending extraction
+
+    Returns:
+        str: Path to article.txt.gz
+
+    Raises:
+        concurrent.futures.TimeoutError: If extraction is still running after timeout
+        TextExtractionError: If the text cannot be extracted
+    """
+    text_path = get_current_text_path(article)
+    if text_path:
+        return text_path
+
+    submit_extraction(article).result(timeout=timeout)
+    return os.path.join(get_text_dir(article), TEXT_FILE_NAME)
+
+
+def read_article_text(article, timeout=None):
+    """
+    Get an article's extracted text, extracting it first if needed
+
+    Args:
+        article (Article): Article record with a stored PDF
+        timeout (float, optional): Seconds to wait for a pending extraction
+
+    Returns:
+        str: Article text
+    """
+    with gzip.open(get_article_text_path(article, timeout), 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def iter_article_text(article, chunk_size=64 * 1024, max_length=None, timeout=None):
+    """
+    Yield an article's extracted text in chunks without loading all of it
+
+    Args:
+        article (Article): Article record with a stored PDF
+        chunk_size (int): Maximum characters per chunk
+        max_length (int, optional): Stop after this many characters
+        timeout (float, optional): Seconds to wait for a pending extraction
+
+    Yields:
+        str: Text chunks
+    """
+    text_path = get_article_text_path(article, timeout)
+    remaining = max_length
+    with gzip.open(text_path, 'rt', encoding='utf-8') as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def extract_in_background(article):
+    """
+    Queue text extraction for a newly stored PDF without waiting for it
+
+    Args:
+        article (Article): Article record with a stored PDF
+    """
+    pmid = article.pmid
+    try:
+        if get_current_text_path(article) is None:
+            future = submit_extraction(article)
+            future.add_done_callback(lambda f: f.exception() and logger.error(
+                f"Text extraction failed for PMID {pmid}: {str(f.exception())}"))
+    except Exception as e:
+        logger.error(f"Could not queue text extraction for PMID {pmid}: {str(e)}")
@@ -0,0 +1,355 @@
+"""
+Tiered PDF storage
+
+PDF_ROOT_PATH is the hot tier: a bounded local cache evicted in LRU order
+once it exceeds PDF_HOT_TIER_QUOTA_BYTES. The optional cold tier (an
+S3-compatible object store or a plain directory) holds the whole corpus.
+New downloads are replicated to the cold tier in the background, cold hits
+are streamed to the client while being written into the hot tier.
+
+Recency is tracked in the files' atime, which is updated explicitly on hits,
+so it is shared by all workers and survives restarts. Eviction needs a scan
+of the whole hot tier, so workers only add the bytes they write to a running
+usage total shared by the host, and the tree is scanned once that total is
+over the quota, at most once per PDF_HOT_TIER_EVICT_INTERVAL on the host.
+"""
+
+from flask import current_app
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+import fcntl
+import logging
+import threading
+from services.storage_backends import create_backend
+from services.storage_service import get_article_pdf_path, get_blob_path, is_content_addressed
+
+logger = logging.getLogger(__name__)
+
+# Hits refresh the atime at most this often (seconds)
+ATIME_RESOLUTION = 60
+EVICTION_LOCK_FILE = '.tier-eviction.lock'
+USAGE_FILE = '.tier-usage'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_cold_backend():
+    """
+    Get the cold tier backend configured for the current app
+
+    Returns:
+        StorageBackend: Cold tier backend, or None if tiering is disabled
+    """
+    extensions = current_app.extensions
+    if 'pdf_cold_storage' not in extensions:
+        extensions['pdf_cold_storage'] = create_backend(current_app.config.get('PDF_COLD_STORAGE'))
+    return extensions['pdf_cold_storage']
+
+
+def _submit(app, fn, *args):
+    """Run fn(app, *args) on the shared background thread pool"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('PDF_TIER_BACKGROUND_WORKERS', 4),
+                thread_name_prefix='pdf-tier'
+            )
+    return _executor.submit(fn, app, *args)
+
+
+def get_cold_key(article):
+    """
+    Get the cold tier key of an article's PDF
+
+    In the content-addressed layout the blob is the unit of storage, so
+    duplicate PDFs are stored once in the cold tier as well.
+
+    Args:
+        article (Article): Article record
+
+    Returns:
+        str: Key relative to PDF_ROOT_PATH, or None if the article has no file
+    """
+    if article.content_hash and is_content_addressed():
+        pdf_path = get_blob_path(article.content_hash)
+    else:
+        pdf_path = get_article_pdf_path(article)
+    if pdf_path is None:
+        return None
+    return os.path.relpath(pdf_path, current_app.config['PDF_ROOT_PATH'])
+
+
+def touch_hot_file(pdf_path, stat):
+    """
+    Record a hit on a hot file by refreshing its atime (mtime is preserved)
+
+    Args:
+        pdf_path (str): Absolute path to the file
+        stat (os.stat_result): Result of a previous stat() call
+    """
+    now_ns = time.time_ns()
+    if now_ns - stat.st_atime_ns < ATIME_RESOLUTION * 1_000_000_000:
+        return
+    try:
+        os.utime(pdf_path, ns=(now_ns, stat.st_mtime_ns))
+    except OSError:
+        pass
+
+
+def open_cold_pdf(article):
+    """
+    Open an article's PDF from the cold tier
+
+    Args:
+        article (Article): Article record
+
+    Returns:
+        tuple: (chunk iterator, size in bytes), or None if the PDF is not in the cold tier
+    """
+    backend = get_cold_backend()
+    key = get_cold_key(article) if backend else None
+    if key is None:
+        return None
+
+    try:
+        size = backend.size(key)
+    except Exception as e:
+        logger.error(f"Cold tier lookup failed for {key}: {str(e)}")
+        return None
+    if size is None:
+        return None
+
+    app = current_app._get_current_object()
+    hot_path = os.path.join(app.config['PDF_ROOT_PATH'], key)
+    return _stream_and_cache(app, backend, key, hot_path), size
+
+
+def _stream_and_cache(app, backend, key, hot_path):
+    """
+    Stream a cold object to the client while writing it into the hot tier
+
+    If the client disconnects early, the promotion is finished in the background.
+    """
+    tmp_path = f"{hot_path}.{os.getpid()}.{threading.get_ident()}.part"
+    completed = False
+    written = 0
+
+    try:
+        os.makedirs(os.path.dirname(hot_path), exist_ok=True)
+        cache_file = open(tmp_path, 'wb')
+    except OSError as e:
+        logger.warning(f"Cannot cache {key} in hot tier: {str(e)}")
+        cache_file = None
+
+    try:
+        for chunk in backend.iter_chunks(key):
+            if cache_file is not None:
+                cache_file.write(chunk)
+                written += len(chunk)
+            yield chunk
+        if cache_file is not None:
+            cache_file.close()
+            os.replace(tmp_path, hot_path)
+            completed = True
+            _submit(app, _evict_if_needed, written)
+    finally:
+        if cache_file is not None and not completed:
+            cache_file.close()
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            _submit(app, _promote, key, hot_path)
+
+
+def _promote(app, key, hot_path):
+    if os.path.exists(hot_path):
+        return
+    with app.app_context():
+        tmp_path = f"{hot_path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            os.makedirs(os.path.dirname(hot_path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                for chunk in get_cold_backend().iter_chunks(key):
+                    f.write(chunk)
+            os.replace(tmp_path, hot_path)
+            size = os.path.getsize(hot_path)
+        except Exception as e:
+            logger.error(f"Failed to promote {key} to hot tier: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+    _evict_if_needed(app, size)
+
+
+def replicate_to_cold(article):
+    """
+    Upload an article's PDF to the cold tier on a background thread
+
+    Args:
+        article (Article): Article record with a stored PDF
+    """
+    if get_cold_backend() is None:
+        return
+    key = get_cold_key(article)
+    if key is None:
+        return
+    app = current_app._get_current_object()
+    hot_path = os.path.join(app.config['PDF_ROOT_PATH'], key)
+    _submit(app, _replicate, key, hot_path)
+
+
+def _replicate(app, key, hot_path):
+    with app.app_context():
+        try:
+            backend = get_cold_backend()
+            if not backend.exists(key):
+                backend.put_file(key, hot_path)
+            size = os.path.getsize(hot_path)
+        except Exception as e:
+            logger.error(f"Failed to replicate {key} to cold tier: {str(e)}")
+            return
+    # New downloads are what grows the hot tier, and the file can be evicted now
+    _evict_if_needed(app, size)
+
+
+def _update_hot_usage(root, added=0, usage=None):
+    """
+    Add to (or, with usage, reset) the host's running hot tier usage total
+
+    Returns:
+        int: Usage in bytes, or None while no scan has measured it
+    """
+    fd = os.open(os.path.join(root, USAGE_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if usage is None:
+            data = os.pread(fd, 32, 0).strip()
+            if not data:
+                return None
+            usage = int(data) + added
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, str(usage).encode(), 0)
+        return usage
+    finally:
+        os.close(fd)
+
+
+def _evict_if_needed(app, added=0):
+    """
+    Count bytes written to the hot tier and evict once the running total exceeds the quota
+
+    Args:
+        app (Flask): Application
+        added (int): Bytes just written to the hot tier
+    """
+    quota = app.config.get('PDF_HOT_TIER_QUOTA_BYTES', 0)
+    if not quota:
+        return
+    root = app.config['PDF_ROOT_PATH']
+    try:
+        usage = _update_hot_usage(root, added)
+    except (OSError, ValueError):
+        usage = None
+    if usage is not None and usage <= quota:
+        return
+
+    # Over quota, or not measured yet: scan, at most once per interval on the host
+    try:
+        last_run = os.stat(os.path.join(root, EVICTION_LOCK_FILE)).st_mtime
+    except FileNotFoundError:
+        last_run = 0
+    if time.time() - last_run < app.config.get('PDF_HOT_TIER_EVICT_INTERVAL', 300):
+        return
+    with app.app_context():
+        try:
+            evict_hot_tier()
+        except Exception as e:
+            logger.error(f"Hot tier eviction failed: {str(e)}")
+
+
+def evict_hot_tier():
+    """
+    Evict least recently used PDFs until the hot tier is below its low watermark
+
+    Only files present in the cold tier are evicted. Hardlinked names (the
+    content-addressed layout) are grouped by inode and removed together.
+    A lock file ensures a single worker on the host evicts at a time. The
+    scan also resets the host's running usage total.
+
+    Returns:
+        dict: {'usage': bytes before eviction, 'evicted': files removed, 'freed': bytes freed},
+              or None if another process is already evicting
+    """
+    root = current_app.config['PDF_ROOT_PATH']
+    quota = current_app.config.get('PDF_HOT_TIER_QUOTA_BYTES', 0)
+    target = quota * current_app.config.get('PDF_HOT_TIER_LOW_WATERMARK', 0.9)
+    backend = get_cold_backend()
+
+    with open(os.path.join(root, EVICTION_LOCK_FILE), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        # The lock file's mtime is the time of the last scan on this host
+        os.utime(lock_file.fileno())
+
+        inodes = _scan_hot_files(root)
+        usage = sum(entry['size'] for entry in inodes.values())
+        stats = {'usage': usage, 'evicted': 0, 'freed': 0}
+        if not quota or usage <= quota:
+            _update_hot_usage(root, usage=usage)
+            return stats
+
+        for entry in sorted(inodes.values(), key=lambda entry: entry['atime']):
+            if usage <= target:
+                break
+            keys = [os.path.relpath(path, root) for path in entry['paths']]
+            if not any(backend.exists(key) for key in keys):
+                continue
+            for path in entry['paths']:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            usage -= entry['size']
+            stats['evicted'] += 1
+            stats['freed'] += entry['size']
+        _update_hot_usage(root, usage=usage)
+
+    logger.info(f"Hot tier eviction: {stats}")
+    return stats
+
+
+def _scan_hot_files(root):
+    """
+    Collect the PDF files in the hot tier grouped by inode
+
+    Returns:
+        dict: {(dev, ino): {'size': int, 'atime': int, 'paths': [str]}}
+    """
+    skip_dirs = {current_app.config.get('PDF_QUARANTINE_DIR', '.quarantine')}
+    inodes = {}
+    stack = [root]
+
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in skip_dirs:
+                    stack.append(entry.path)
+            elif entry.name.endswith('.pdf'):
+                stat = entry.stat(follow_symlinks=False)
+                inode = inodes.setdefault((stat.st_dev, stat.st_ino),
+                                          {'size': stat.st_size, 'atime': stat.st_atime_ns, 'paths': []})
+                inode['atime'] = max(inode['atime'], stat.st_atime_ns)
+                inode['paths'].append(entry.path)
+
+    return inodes
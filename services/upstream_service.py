@@ -0,0 +1,232 @@
+"""
+Upstream failure handling
+
+Classifies crawler failures and guards every outgoing request with a
+circuit breaker per upstream: NCBI, and each publisher by registered domain.
+Breakers live in each worker process and are fed by the requests transport
+hook (services.rate_limit_service), so a dead publisher or an NCBI outage
+makes later downloads fail fast instead of tying up download threads until
+the crawl times out.
+
+Failure classes:
+    timeout, connection_error, server_error, rate_limited  upstream trouble,
+        counted by the breakers and not recorded as a download attempt
+    circuit_open      the breaker of the upstream is open
+    forbidden, not_found, not_open_access, parse_error, unknown
+        article-specific, the download attempt is recorded
+"""
+
+from flask import current_app, has_app_context
+import re
+import logging
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+from utils.circuit_breaker import BreakerRegistry, CircuitOpenError
+from utils.rate_limiter import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+NCBI_UPSTREAM = 'ncbi'
+NCBI_DOMAINS = ('ncbi.nlm.nih.gov',)
+
+TRANSIENT_FAILURES = frozenset({'timeout', 'connection_error', 'server_error', 'rate_limited', 'circuit_open'})
+
+# Matched in order against PubCrawler's error messages
+_ERROR_PATTERNS = (
+    ('circuit_open', re.compile(r'circuit open', re.I)),
+    ('timeout', re.compile(r'timed? ?out|timeout', re.I)),
+    ('rate_limited', re.compile(r'\b429\b|too many requests|rate limit', re.I)),
+    ('forbidden', re.compile(r'\b403\b|forbidden', re.I)),
+    ('server_error', re.compile(r'\b5\d\d\b|service unavailable|bad gateway|internal server error', re.I)),
+    ('connection_error', re.compile(r'connection (?:refused|reset|aborted|error)|name resolution|max retries', re.I)),
+    ('not_found', re.compile(r'\b404\b|not found', re.I)),
+    ('not_open_access', re.compile(r'open access|no pdf|not available|paywall|no full ?text|subscription', re.I)),
+    ('parse_error', re.compile(r'parse|decode|malformed|invalid (?:xml|json|html)', re.I)),
+)
+_NCBI_PATTERN = re.compile(r'ncbi|pubmed|entrez|eutils|pmc', re.I)
+
+_registry = None
+_registry_lock = threading.Lock()
+_failure_counts = Counter()
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when a download failed or was skipped because an upstream is failing"""
+
+    def __init__(self, message, upstream, category, retry_after=30):
+        super().__init__(message)
+        self.upstream = upstream
+        self.category = category
+        self.retry_after = retry_after
+
+
+def get_upstream(host):
+    """
+    Map a host to its breaker name
+
+    Args:
+        host (str): Host name
+
+    Returns:
+        str: 'ncbi' for NCBI hosts, else the registered domain (last two labels)
+    """
+    host = (host or '').lower().rstrip('.')
+    if any(host == domain or host.endswith('.' + domain) for domain in NCBI_DOMAINS):
+        return NCBI_UPSTREAM
+    return '.'.join(host.split('.')[-2:]) or 'unknown'
+
+
+def get_breakers():
+    """
+    Get the breaker registry of this process
+
+    Configured from the current app on first use; the transport hook may run
+    outside an app context and then uses the registry as configured.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                config = current_app.config if has_app_context() else {}
+                _registry = BreakerRegistry(
+                    window=config.get('BREAKER_WINDOW', 20),
+                    min_calls=config.get('BREAKER_MIN_CALLS', 10),
+                    error_rate=config.get('BREAKER_ERROR_RATE', 0.5),
+                    open_seconds=config.get('BREAKER_OPEN_SECONDS', 30),
+                    max_open_seconds=config.get('BREAKER_MAX_OPEN_SECONDS', 300),
+                    half_open_probes=config.get('BREAKER_HALF_OPEN_PROBES', 1),
+                )
+    return _registry
+
+
+def classify_status(status_code):
+    """Failure class of an HTTP status, or None if the upstream answered normally"""
+    if status_code == 429:
+        return 'rate_limited'
+    if status_code >= 500:
+        return 'server_error'
+    return None
+
+
+def classify_exception(error):
+    """
+    Classify an exception raised by the crawler or the requests library
+
+    Args:
+        error (Exception): Exception
+
+    Returns:
+        str: Failure class
+    """
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(error, RateLimitExceeded):
+        return 'rate_limited'
+    if isinstance(error, TimeoutError):
+        return 'timeout'
+    try:
+        import requests
+    except ImportError:
+        requests = None
+    if requests is not None:
+        if isinstance(error, requests.Timeout):
+            return 'timeout'
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            return classify_status(status) or ('forbidden' if status == 403 else 'not_found' if status == 404 else 'unknown')
+        if isinstance(error, requests.ConnectionError):
+            return 'connection_error'
+    if isinstance(error, ConnectionError):
+        return 'connection_error'
+    if isinstance(error, (ValueError, KeyError)):
+        return 'parse_error'
+    return classify_message(str(error))
+
+
+def classify_message(message):
+    """Classify a crawler error message"""
+    for category, pattern in _ERROR_PATTERNS:
+        if pattern.search(message or ''):
+            return category
+    return 'unknown'
+
+
+def _failure_upstream(error=None, message=''):
+    """Best guess of the upstream a failure came from"""
+    if isinstance(error, CircuitOpenError):
+        return error.upstream
+    request = getattr(error, 'request', None)
+    url = getattr(request, 'url', None)
+    if url:
+        return get_upstream(urlsplit(url).hostname)
+    return NCBI_UPSTREAM if _NCBI_PATTERN.search(message or str(error or '')) else 'publisher'
+
+
+def record_download_failure(error=None, result=None):
+    """
+    Classify and count a failed download
+
+    Args:
+        error (Exception): Exception raised by the crawler, if any
+        result (dict): PubCrawler result, if the crawler returned one
+
+    Returns:
+        tuple: (failure class, upstream)
+    """
+    message = str(error) if error is not None else (result or {}).get('error', '')
+    category = classify_exception(error) if error is not None else classify_message(message)
+    upstream = _failure_upstream(error, message)
+    _failure_counts[category] += 1
+    return category, upstream
+
+
+def check_upstream(upstream):
+    """
+    Fail fast if the breaker of an upstream is open
+
+    Raises:
+        UpstreamUnavailable: If the breaker is open
+    """
+    try:
+        # Half-open breakers let the crawl through, its first request to the upstream is the probe
+        get_breakers().get(upstream).check()
+    except CircuitOpenError as e:
+        raise UpstreamUnavailable(str(e), upstream, 'circuit_open', e.retry_after) from e
+
+
+def send_through_breaker(send, session, request, **kwargs):
+    """
+    Send a request through the breaker of its upstream
+
+    Args:
+        send (callable): Original requests.Session.send
+        session: Session sending the request
+        request: Prepared request
+
+    Raises:
+        CircuitOpenError: If the upstream's breaker is open
+    """
+    breaker = get_breakers().get(get_upstream(urlsplit(request.url).hostname))
+    probe = breaker.allow()
+    try:
+        response = send(session, request, **kwargs)
+    except Exception as e:
+        breaker.record(False, classify_exception(e), probe=probe)
+        raise
+    category = classify_status(response.status_code)
+    breaker.record(category is None, category, probe=probe)
+    return response
+
+
+def get_metrics():
+    """
+    Breaker states and download failure counts of this process
+
+    Returns:
+        dict: {'breakers': {upstream: state}, 'download_failures': {class: count}}
+    """
+    return {
+        'breakers': get_breakers().snapshot(),
+        'download_failures': dict(_failure_counts),
+    }
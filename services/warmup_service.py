@@ -0,0 +1,164 @@
+"""
+Hot-set cache warming
+
+`flask logs analyze --write-hot-set` stores the most requested PMIDs in a
+hot-set file (HOT_SET_FILE, one PMID per line, most requested first). A new
+server warms from it at startup, in the preloaded gunicorn master before the
+workers fork, or in the background in the first worker without --preload
+(see gunicorn.conf.py). It looks the articles up in batches, which loads
+the PMID status set and the database's buffer pool with the rows the first
+requests will read, and asks the kernel to read their PDFs into the page
+cache, up to HOT_SET_WARM_MAX_BYTES.
+"""
+
+from flask import current_app
+import os
+import time
+import logging
+import threading
+from models import db
+from services.db_service import get_articles_by_pmids
+from services.pmid_status_service import get_pmid_status_set
+from services.storage_service import resolve_pdf_path
+from utils.pmid_status import parse_pmid
+
+logger = logging.getLogger(__name__)
+
+HOT_SET_FILE = '.hot-set'
+LOOKUP_BATCH = 500
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def get_hot_set_path():
+    """
+    Returns:
+        str: HOT_SET_FILE, or .hot-set in PDF_ROOT_PATH
+    """
+    return current_app.config.get('HOT_SET_FILE') or os.path.join(current_app.config['PDF_ROOT_PATH'], HOT_SET_FILE)
+
+
+def write_hot_set(path, pmids):
+    """
+    Atomically write a hot-set file
+
+    Args:
+        path (str): Hot-set file
+        pmids (list): PMIDs, most requested first
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        for pmid in pmids:
+            f.write(f"{pmid}\n")
+    os.replace(tmp_path, path)
+
+
+def read_hot_set(path, limit=None):
+    """
+    Read a hot-set file
+
+    Args:
+        path (str): Hot-set file
+        limit (int, optional): Maximum number of PMIDs
+
+    Returns:
+        list: Valid PMIDs in file order, empty if the file does not exist
+    """
+    pmids = []
+    try:
+        with open(path) as f:
+            for line in f:
+                if limit is not None and len(pmids) >= limit:
+                    break
+                if parse_pmid(line.strip()) is not None:
+                    pmids.append(line.strip())
+    except FileNotFoundError:
+        pass
+    return pmids
+
+
+def _prefetch_file(path):
+    """Start reading a file into the page cache; returns its size or None if it is missing"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        size = os.fstat(fd).st_size
+        if hasattr(os, 'posix_fadvise'):
+            # Asynchronous readahead, the kernel reads while we continue
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while os.read(fd, READ_CHUNK_SIZE):
+                pass
+        return size
+    finally:
+        os.close(fd)
+
+
+def warm_hot_set(limit=None, max_bytes=None):
+    """
+    Warm the caches for the PMIDs of the hot-set file
+
+    Args:
+        limit (int, optional): Maximum number of PMIDs, defaults to HOT_SET_SIZE
+        max_bytes (int, optional): Page cache budget, defaults to HOT_SET_WARM_MAX_BYTES
+
+    Returns:
+        dict: Counts of PMIDs read, articles found, files prefetched and their bytes
+    """
+    config = current_app.config
+    limit = config.get('HOT_SET_SIZE', 10000) if limit is None else limit
+    max_bytes = config.get('HOT_SET_WARM_MAX_BYTES', 2 * 1024 ** 3) if max_bytes is None else max_bytes
+    pmids = read_hot_set(get_hot_set_path(), limit)
+    stats = {'pmids': len(pmids), 'articles': 0, 'files': 0, 'bytes': 0}
+    if not pmids:
+        return stats
+
+    get_pmid_status_set()
+    for start in range(0, len(pmids), LOOKUP_BATCH):
+        batch = pmids[start:start + LOOKUP_BATCH]
+        articles = get_articles_by_pmids(batch)
+        stats['articles'] += len(articles)
+        # Most requested first, so the budget goes to the hottest files
+        for pmid in batch:
+            article = articles.get(pmid)
+            if article is None or not article.has_pdf or stats['bytes'] >= max_bytes:
+                continue
+            path = resolve_pdf_path(article)
+            size = _prefetch_file(path) if path else None
+            if size is not None:
+                stats['files'] += 1
+                stats['bytes'] += size
+        # Nothing is kept in the session; the warmed state lives in the database and the kernel
+        db.session.expunge_all()
+    db.session.remove()
+    return stats
+
+
+def run_warmup(app):
+    """
+    Warm the caches from the hot-set file, logging instead of raising errors
+
+    Args:
+        app (Flask): App to warm
+    """
+    started = time.monotonic()
+    try:
+        with app.app_context():
+            stats = warm_hot_set()
+    except Exception as e:
+        logger.warning(f"Cache warmup failed: {str(e)}")
+        return
+    if stats['pmids']:
+        logger.info(f"Warmed {stats['articles']} hot articles and {stats['files']} files "
+                    f"({stats['bytes'] // (1024 * 1024)} MiB) in {time.monotonic() - started:.1f}s")
+
+
+def start_warmup(app):
+    """
+    Warm the caches from the hot-set file on a background thread
+
+    Args:
+        app (Flask): App to warm
+    """
+    threading.Thread(target=run_warmup, args=(app,), name='cache-warmup', daemon=True).start()
@@ -0,0 +1,81 @@
+import json
+import unittest
+from datetime import datetime
+from unittest import mock
+from flask import Flask
+from models import db, Article, ArticleAccess
+from services import access_stats_service
+from services.access_stats_service import AccessTracker, add_access_stats
+from services.export_service import iter_export
+
+class AccessStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['PMID_STATUS_ENABLED'] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.tracker = AccessTracker(self.app, flush_interval=3600, batch_size=2)
+        # Flushed explicitly by the tests
+        self.tracker._start = lambda: None
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def stats(self):
+        return {row.pmid: (row.hit_count, row.last_accessed) for row in ArticleAccess.query.all()}
+
+    def test_flush_aggregates_and_upserts(self):
+        for day in (1, 3, 2):
+            self.tracker.record('1', datetime(2026, 1, day))
+        for pmid in ('2', '3'):
+            self.tracker.record(pmid, datetime(2026, 1, 1))
+        self.assertEqual(self.tracker.flush(), 3)
+        self.assertEqual(self.tracker.pending(), 0)
+
+        self.tracker.record('1', datetime(2025, 12, 1))
+        self.tracker.flush()
+        self.assertEqual(self.stats(), {
+            '1': (4, datetime(2026, 1, 3)),
+            '2': (1, datetime(2026, 1, 1)),
+            '3': (1, datetime(2026, 1, 1)),
+        })
+
+    def test_failed_batches_stay_pending(self):
+        for pmid in ('1', '2', '3', '4'):
+            self.tracker.record(pmid, datetime(2026, 1, 1))
+        upsert = access_stats_service.upsert_access_counts
+        calls = []
+
+        def fail_second_batch(rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError('database down')
+            upsert(rows)
+
+        with mock.patch.object(access_stats_service, 'upsert_access_counts', fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.tracker.flush()
+        self.assertEqual(self.tracker.pending(), 2)
+        self.tracker.flush()
+        self.assertEqual(sorted(count for count, _ in self.stats().values()), [1, 1, 1, 1])
+
+    def test_exposed_in_articles_and_export(self):
+        db.session.add_all([Article(pmid='1'), Article(pmid='2')])
+        db.session.commit()
+        self.tracker.record('2', datetime(2026, 1, 1))
+        self.tracker.flush()
+
+        articles = add_access_stats([{'pmid': '1'}, {'pmid': '2'}])
+        self.assertEqual([(a['hit_count'], a['last_accessed']) for a in articles],
+                         [(0, None), (1, '2026-01-01T00:00:00')])
+        rows = [json.loads(line) for line in b''.join(iter_export('ndjson')).splitlines()]
+        self.assertEqual([(row['pmid'], row['hit_count']) for row in rows], [('1', 0), ('2', 1)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from config import Config
+from app import create_app
+from models import db, Article
+from services.admission_service import get_admission_controller, track_request_end, track_request_start
+from services.download_scheduler import DownloadScheduler
+from utils.admission import (
+    REASON_IN_FLIGHT, REASON_WAITING, SOURCE_DOWNLOAD_QUEUE, AdmissionController, Overloaded, parse_request_start
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class AdmissionControllerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.controller = AdmissionController(8, max_in_flight=4, target_delay=1.0, interval=5.0, clock=self.clock)
+
+    def window(self, *delays):
+        for delay in delays:
+            self.controller.record_delay(SOURCE_DOWNLOAD_QUEUE, delay)
+        self.clock.now += 5
+        return self.controller.stats()['limit']
+
+    def test_limit_follows_standing_queue(self):
+        # A burst drains within the interval; a standing queue does not
+        self.assertEqual(self.window(3.0, 0.2, 4.0), 8)
+        self.assertEqual(self.window(2.0, 3.0), 4)
+        self.assertEqual(self.window(2.0), 2)
+        self.assertEqual(self.window(9.0), 1)
+        self.assertEqual(self.window(9.0), 1)
+        self.assertEqual(self.window(), 2)
+        self.assertEqual(self.window(0.1), 3)
+
+    def test_waiting_and_in_flight_limits(self):
+        self.window(5.0)
+        for _ in range(4):
+            self.controller.acquire()
+        with self.assertRaises(Overloaded) as raised:
+            self.controller.acquire()
+        self.assertEqual(raised.exception.reason, REASON_WAITING)
+        self.assertEqual(raised.exception.retry_after, 5)
+        # Joining a running download adds no upstream work
+        self.controller.acquire(check=False)
+        self.controller.release()
+        self.controller.release()
+        self.controller.acquire()
+
+        for _ in range(4):
+            self.controller.request_started()
+        with self.assertRaises(Overloaded) as raised:
+            self.controller.acquire()
+        self.assertEqual(raised.exception.reason, REASON_IN_FLIGHT)
+        self.controller.request_finished()
+        self.controller.release()
+        self.controller.acquire()
+        self.assertEqual(self.controller.stats()['rejected'], {REASON_WAITING: 1, REASON_IN_FLIGHT: 1})
+
+    def test_parse_request_start(self):
+        now = 1700000010.0
+        self.assertAlmostEqual(parse_request_start('t=1700000009.750', now), 0.25)
+        self.assertAlmostEqual(parse_request_start('1700000009500', now), 0.5)
+        self.assertAlmostEqual(parse_request_start('t=1700000008000000', now), 2.0)
+        self.assertEqual(parse_request_start('1700000020', now), 0.0)
+        self.assertIsNone(parse_request_start('soon', now))
+        self.assertIsNone(parse_request_start(None, now))
+
+class LoadSheddingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+        class TestConfig(type(Config)):
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            PDF_ROOT_PATH = os.path.join(self.work_dir, 'pdfs')
+            API_KEY_STATE_DIR = os.path.join(self.work_dir, 'state')
+            API_KEYS = ['key']
+            PMID_STATUS_ENABLED = False
+            ACCESS_STATS_ENABLED = False
+            PDF_VERIFY_ENABLED = False
+            ADMISSION_MAX_WAITING = 1
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.release = threading.Event()
+        with self.app.app_context():
+            db.create_all()
+            os.makedirs(os.path.join(self.work_dir, 'pdfs', '3'))
+            with open(os.path.join(self.work_dir, 'pdfs', '3', 'article.pdf'), 'wb') as f:
+                f.write(b'%PDF-1.4 hit')
+            db.session.add(Article(pmid='3', has_pdf=True, relative_path='3'))
+            db.session.commit()
+            self.app.extensions['download_scheduler'] = DownloadScheduler(
+                self.app, lambda pmid: self.release.wait(5) and None, workers=1, reserved_interactive=0)
+            self.controller = get_admission_controller()
+
+    def tearDown(self):
+        self.release.set()
+        shutil.rmtree(self.work_dir)
+
+    def get(self, path):
+        return self.client.get(path, headers={'X-API-Key': 'key'})
+
+    def wait_for(self, waiting):
+        for _ in range(100):
+            if self.controller.stats()['waiting'] == waiting:
+                return
+            time.sleep(0.02)
+        self.fail(f"{waiting} requests never waited for downloads")
+
+    def test_new_misses_are_shed_while_hits_are_served(self):
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(self.get('/api/pdf/1'))) for _ in range(2)]
+        threads[0].start()
+        self.wait_for(1)
+
+        response = self.get('/api/pdf/2')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json['code'], 'SERVICE_OVERLOADED')
+        self.assertEqual(response.headers['Retry-After'], '5')
+
+        # Another request for the running download joins it
+        threads[1].start()
+        self.wait_for(2)
+        self.assertEqual(self.get('/api/pdf/3').headers['X-Cache'], 'hit')
+
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual([response.status_code for response in responses], [404, 404])
+        stats = self.get('/api/admission').json['data']
+        self.assertEqual((stats['waiting'], stats['admitted'], stats['rejected']), (0, 2, {'waiting': 1}))
+
+    def test_long_polls_and_probes_are_not_in_flight(self):
+        for path in ('/api/changes', '/api/articles/export', '/api/health/ready'):
+            with self.app.test_request_context(path):
+                track_request_start()
+                self.assertEqual(self.controller.stats()['in_flight'], 0, path)
+                track_request_end()
+        with self.app.test_request_context('/api/pdf/1'):
+            track_request_start()
+            self.assertEqual(self.controller.stats()['in_flight'], 1)
+            track_request_end()
+        self.assertEqual(self.controller.stats()['in_flight'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
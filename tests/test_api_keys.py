@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from config import Config
+from app import create_app
+from services.api_key_service import prune_usage
+from utils.host_state import FileCounters, FileSemaphore
+
+class HostStateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def test_semaphore_slots(self):
+        semaphore = FileSemaphore(self.state_dir)
+        first = semaphore.try_acquire('key', 2)
+        second = semaphore.try_acquire('key', 2)
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertIsNone(semaphore.try_acquire('key', 2))
+        self.assertEqual(semaphore.count('key', 2), 2)
+        semaphore.release(first)
+        self.assertEqual(semaphore.count('key', 2), 1)
+        semaphore.release(semaphore.try_acquire('key', 2))
+        semaphore.release(second)
+
+    def test_counters(self):
+        counters = FileCounters(self.state_dir, ('requests', 'misses'))
+        self.assertEqual(counters.get('key'), {'requests': 0, 'misses': 0})
+        counters.add('key', requests=2)
+        self.assertEqual(counters.add('key', requests=1, misses=1), {'requests': 3, 'misses': 1})
+        self.assertEqual(counters.keys(), ['key'])
+
+class ApiKeyPolicyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+        class TestConfig(type(Config)):
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            PDF_ROOT_PATH = os.path.join(self.work_dir, 'pdfs')
+            API_KEY_STATE_DIR = os.path.join(self.work_dir, 'state')
+            API_KEYS = ['open-key']
+            API_KEY_POLICIES = {'batch-key': {'name': 'batch', 'requests_per_second': 1, 'burst': 2}}
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_unknown_key_is_rejected(self):
+        self.assertEqual(self.client.get('/api/usage', headers={'X-API-Key': 'other'}).status_code, 401)
+
+    def test_rate_limit_returns_429_with_retry_after(self):
+        headers = {'X-API-Key': 'batch-key'}
+        statuses = [self.client.get('/api/usage', headers=headers).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        response = self.client.get('/api/usage', headers=headers)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(response.json['code'], 'RATE_LIMITED')
+
+        usage = self.client.get('/api/usage', headers={'X-API-Key': 'open-key'}).json['data']
+        self.assertEqual(usage['usage']['requests'], 1)
+        self.assertEqual(usage['policy']['daily_miss_budget'], Config.API_KEY_DEFAULT_POLICY['daily_miss_budget'])
+
+    def _add_usage(self, *days):
+        usage = FileCounters(os.path.join(self.work_dir, 'state', 'usage'), ('requests',))
+        for day in days:
+            usage.add(f'batch.{day.isoformat()}', requests=1)
+        return usage
+
+    def test_expired_usage_is_pruned_on_first_count_of_a_day(self):
+        today = datetime.utcnow().date()
+        usage = self._add_usage(today - timedelta(days=40), today - timedelta(days=31), today - timedelta(days=30))
+        usage.add('unrelated', requests=1)
+
+        self.client.get('/api/usage', headers={'X-API-Key': 'batch-key'})
+        self.assertEqual(usage.keys(), sorted([f'batch.{(today - timedelta(days=30)).isoformat()}',
+                                               f'batch.{today.isoformat()}', 'unrelated']))
+
+    def test_prune_usage(self):
+        usage = self._add_usage(date(2024, 1, 1), date(2024, 1, 9), date(2024, 1, 10))
+        with self.app.app_context():
+            self.assertEqual(prune_usage(1, today=date(2024, 1, 10)), 2)
+        self.assertEqual(usage.keys(), ['batch.2024-01-10'])
+
+        self._add_usage(date(2000, 1, 1))
+        result = self.app.test_cli_runner().invoke(args=['apikeys', 'prune-usage', '--days', '7'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Deleted 2 expired usage counters', result.output)
+        self.assertEqual(usage.keys(), [])
+
+if __name__ == '__main__':
+    unittest.main()
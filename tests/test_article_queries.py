@@ -0,0 +1,117 @@
+import unittest
+import itertools
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from models import db, Article
+from services.db_service import build_articles_query, list_articles, list_changes
+
+FILTERS = {
+    'journal': 'Nature',
+    'year': 2001,
+    'year_from': 2000,
+    'year_to': 2010,
+    'has_pdf': True,
+    'download_attempted': False,
+    'updated_from': datetime(2020, 1, 1),
+    'updated_to': datetime(2021, 1, 1),
+}
+
+class ArticleQueryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def explain(self, **filters):
+        query, _ = build_articles_query(**filters)
+        compiled = query.limit(101).statement.compile(dialect=db.engine.dialect)
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f"EXPLAIN QUERY PLAN {compiled}",
+                           [compiled.params[name] for name in compiled.positiontup])
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            connection.close()
+
+    def test_every_filter_combination_uses_an_index(self):
+        for count in range(1, len(FILTERS) + 1):
+            for names in itertools.combinations(FILTERS, count):
+                filters = {name: FILTERS[name] for name in names}
+                plan = self.explain(**filters)
+                self.assertTrue(any(step.startswith('SEARCH articles USING') for step in plan),
+                                f"{names}: {plan}")
+
+    def test_range_filters_walk_the_index_in_order(self):
+        for name in ('year_from', 'year_to', 'updated_from', 'updated_to'):
+            plan = self.explain(**{name: FILTERS[name]})
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, name)
+
+    def test_keyset_pages_cover_all_matches_once(self):
+        for n in range(1, 11):
+            db.session.add(Article(pmid=str(n), year=2000 + n % 3, has_pdf=n % 2 == 0,
+                                   updated_at=datetime(2020, 1, 1 + n % 4)))
+        db.session.commit()
+
+        for filters in ({'has_pdf': True}, {'year_from': 2000}, {'updated_from': datetime(2020, 1, 2)}):
+            seen = []
+            cursor = None
+            while True:
+                articles, cursor = list_articles(limit=3, cursor=cursor, **filters)
+                seen.extend(article.pmid for article in articles)
+                if cursor is None:
+                    break
+            expected = [article.pmid for article in build_articles_query(**filters)[0].all()]
+            self.assertEqual(seen, expected, filters)
+            self.assertEqual(len(set(seen)), len(seen))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            list_articles(cursor='not-a-cursor')
+
+    def test_change_feed(self):
+        for n in range(1, 6):
+            # Equal timestamps exercise the id tiebreak
+            db.session.add(Article(pmid=str(n), updated_at=datetime(2020, 1, 1 + n // 2)))
+        db.session.commit()
+
+        changes, cursor = list_changes(limit=2)
+        self.assertEqual([change['pmid'] for change in changes], ['1', '2'])
+        changes, cursor = list_changes(cursor, limit=10)
+        self.assertEqual([change['pmid'] for change in changes], ['3', '4', '5'])
+        self.assertEqual(list_changes(cursor), ([], cursor))
+
+        article = Article.query.filter_by(pmid='2').one()
+        article.title = 'Updated'
+        db.session.commit()
+        # Not settled yet
+        self.assertEqual(list_changes(cursor, settle_seconds=60), ([], cursor))
+        changes, _ = list_changes(cursor, settle_seconds=0)
+        self.assertEqual([change['pmid'] for change in changes], ['2'])
+
+        changes, _ = list_changes(since=datetime(2020, 1, 3), settle_seconds=0)
+        self.assertEqual([change['pmid'] for change in changes], ['4', '5', '2'])
+
+    def test_change_feed_long_poll(self):
+        db.session.add(Article(pmid='1', updated_at=datetime.utcnow() - timedelta(seconds=0.2)))
+        db.session.commit()
+        started = time.monotonic()
+        changes, _ = list_changes(settle_seconds=0.5, wait=5, poll_interval=0.1)
+        self.assertEqual([change['pmid'] for change in changes], ['1'])
+        self.assertLess(time.monotonic() - started, 2)
+        started = time.monotonic()
+        self.assertEqual(list_changes(since=datetime.utcnow(), settle_seconds=0, wait=0.3, poll_interval=0.1), ([], None))
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+
+if __name__ == '__main__':
+    unittest.main()
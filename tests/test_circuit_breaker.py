@@ -0,0 +1,91 @@
+import unittest
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from services.upstream_service import classify_message, classify_status, get_upstream
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class CircuitBreakerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('pub.example', window=10, min_calls=4, error_rate=0.5,
+                                      open_seconds=30, max_open_seconds=100, clock=self.clock)
+
+    def trip(self):
+        for _ in range(4):
+            self.breaker.record(False, 'timeout', probe=self.breaker.allow())
+
+    def test_opens_at_error_rate(self):
+        for success in (True, False, True):
+            self.breaker.record(success, None if success else 'server_error', probe=self.breaker.allow())
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record(False, 'timeout', probe=self.breaker.allow())
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.allow()
+        self.assertEqual(raised.exception.upstream, 'pub.example')
+        self.assertEqual(raised.exception.retry_after, 30)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.check()
+        snapshot = self.breaker.snapshot()
+        self.assertEqual(snapshot['rejected'], 2)
+        self.assertEqual(snapshot['failures'], {'server_error': 1, 'timeout': 1})
+
+    def test_successful_probe_closes(self):
+        self.trip()
+        self.clock.now = 30
+        self.breaker.check()
+        probe = self.breaker.allow()
+        self.assertTrue(probe)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow()
+        self.breaker.record(True, probe=probe)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertFalse(self.breaker.allow())
+
+    def test_failed_probe_doubles_open_time(self):
+        self.trip()
+        self.clock.now = 30
+        self.breaker.record(False, 'timeout', probe=self.breaker.allow())
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now = 89
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.check()
+        self.clock.now = 90
+        self.breaker.record(False, 'timeout', probe=self.breaker.allow())
+        self.clock.now = 189
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow()
+        self.clock.now = 190
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.snapshot()['opened'], 3)
+
+class FailureClassificationTestCase(unittest.TestCase):
+    def test_classify_message(self):
+        self.assertEqual(classify_message('Read timed out after 30s'), 'timeout')
+        self.assertEqual(classify_message('HTTP 503 Service Unavailable'), 'server_error')
+        self.assertEqual(classify_message('429 Too Many Requests'), 'rate_limited')
+        self.assertEqual(classify_message('403 Forbidden'), 'forbidden')
+        self.assertEqual(classify_message('Article is not open access'), 'not_open_access')
+        self.assertEqual(classify_message('Connection refused'), 'connection_error')
+        self.assertEqual(classify_message('something odd'), 'unknown')
+
+    def test_classify_status(self):
+        self.assertIsNone(classify_status(200))
+        self.assertIsNone(classify_status(404))
+        self.assertEqual(classify_status(429), 'rate_limited')
+        self.assertEqual(classify_status(502), 'server_error')
+
+    def test_get_upstream(self):
+        self.assertEqual(get_upstream('eutils.ncbi.nlm.nih.gov'), 'ncbi')
+        self.assertEqual(get_upstream('www.ncbi.nlm.nih.gov'), 'ncbi')
+        self.assertEqual(get_upstream('link.springer.com'), 'springer.com')
+        self.assertEqual(get_upstream('Example.ORG.'), 'example.org')
+
+if __name__ == '__main__':
+    unittest.main()
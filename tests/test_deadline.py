@@ -0,0 +1,43 @@
+import unittest
+from utils.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope, parse_deadline
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class DeadlineTestCase(unittest.TestCase):
+    def test_parse_deadline_caps_client_value(self):
+        self.assertAlmostEqual(parse_deadline('10', 25, 60).remaining(), 10, places=1)
+        self.assertAlmostEqual(parse_deadline('600', 25, 60).remaining(), 60, places=1)
+        self.assertAlmostEqual(parse_deadline(None, 25, 60).remaining(), 25, places=1)
+        self.assertAlmostEqual(parse_deadline(None, None, 60).remaining(), 60, places=1)
+        self.assertIsNone(parse_deadline(None, None, None))
+        for value in ('0', '-5', 'soon', 'nan'):
+            with self.assertRaises(ValueError):
+                parse_deadline(value, 25, 60)
+
+    def test_expiry_and_extend(self):
+        clock = FakeClock()
+        deadline = Deadline(5, clock=clock)
+        deadline.extend(Deadline(10, clock=clock))
+        clock.now += 9
+        self.assertFalse(deadline.expired())
+        clock.now += 1
+        with self.assertRaises(DeadlineExceeded):
+            deadline.check()
+        deadline.extend(None)
+        self.assertIsNone(deadline.remaining())
+        self.assertFalse(deadline.expired())
+
+    def test_scope(self):
+        deadline = Deadline(5)
+        self.assertIsNone(current_deadline())
+        with deadline_scope(deadline):
+            self.assertIs(current_deadline(), deadline)
+        self.assertIsNone(current_deadline())
+
+if __name__ == '__main__':
+    unittest.main()
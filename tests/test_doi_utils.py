@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+from flask import Flask
+from models import db, Article
+from commands.articles import articles_cli
+from services import doi_service
+from services.doi_service import DOIResolutionError, resolve_dois
+from utils.doi_utils import normalize_doi
+
+class NormalizeDOITestCase(unittest.TestCase):
+    def test_strips_prefixes_and_lowercases(self):
+        self.assertEqual(normalize_doi('10.1038/NATURE12373'), '10.1038/nature12373')
+        self.assertEqual(normalize_doi(' https://doi.org/10.1038/Nature12373 '), '10.1038/nature12373')
+        self.assertEqual(normalize_doi('http://dx.doi.org/10.1038/nature12373'), '10.1038/nature12373')
+        self.assertEqual(normalize_doi('doi: 10.1038/nature12373'), '10.1038/nature12373')
+
+    def test_rejects_non_dois(self):
+        for value in (None, '', '12345678', '10.1038', 'nature12373'):
+            self.assertIsNone(normalize_doi(value), value)
+
+class ResolveDOIsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SQLALCHEMY_TRACK_MODIFICATIONS=False,
+                               PMID_STATUS_ENABLED=False, DOI_REMOTE_LOOKUP_MAX=2)
+        db.init_app(self.app)
+        self.app.cli.add_command(articles_cli)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([
+            Article(pmid='1', doi='10.1000/local'),
+            Article(pmid='2'),
+            Article(pmid='3', doi='https://doi.org/10.1000/LEGACY'),
+            Article(pmid='4', doi='not a doi'),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_local_remote_and_cache(self):
+        remote = {'10.1000/remote': '2', '10.1000/unknown': None}
+        with mock.patch.object(doi_service, 'lookup_pmid_remote', side_effect=remote.get) as lookup:
+            results = resolve_dois(['doi:10.1000/LOCAL', '10.1000/remote', 'https://doi.org/10.1000/Remote',
+                                    '10.1000/unknown', '10.1000/over-budget', 'junk'])
+        self.assertEqual(results, {
+            'doi:10.1000/LOCAL': {'pmid': '1', 'source': 'local'},
+            '10.1000/remote': {'pmid': '2', 'source': 'pubmed'},
+            'https://doi.org/10.1000/Remote': {'pmid': '2', 'source': 'pubmed'},
+            '10.1000/unknown': {'pmid': None, 'source': None},
+            '10.1000/over-budget': {'pmid': None, 'source': None},
+            'junk': {'pmid': None, 'source': None},
+        })
+        # One PubMed query per distinct DOI, within DOI_REMOTE_LOOKUP_MAX
+        self.assertEqual(lookup.call_count, 2)
+
+        # The remotely resolved DOI was stored, so the next lookup is local
+        with mock.patch.object(doi_service, 'lookup_pmid_remote', side_effect=DOIResolutionError('down')):
+            self.assertEqual(resolve_dois(['10.1000/remote', '10.1000/missing']), {
+                '10.1000/remote': {'pmid': '2', 'source': 'local'},
+                '10.1000/missing': {'pmid': None, 'source': 'error'},
+            })
+            self.assertEqual(resolve_dois(['10.1000/missing'], remote=False)['10.1000/missing']['source'], None)
+
+    def test_normalize_stored_dois(self):
+        with mock.patch.object(doi_service, 'lookup_pmid_remote', return_value=None):
+            self.assertEqual(resolve_dois(['10.1000/legacy'])['10.1000/legacy']['source'], None)
+        result = self.app.test_cli_runner().invoke(args=['articles', 'normalize-dois', '--batch-size', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('1 DOIs normalized, 1 values', result.output)
+        self.assertEqual(resolve_dois(['10.1000/legacy'], remote=False)['10.1000/legacy'],
+                         {'pmid': '3', 'source': 'local'})
+        self.assertEqual(Article.query.filter_by(pmid='4').one().doi, 'not a doi')
+
+if __name__ == '__main__':
+    unittest.main()
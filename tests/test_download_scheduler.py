@@ -0,0 +1,106 @@
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from flask import Flask
+from services.download_scheduler import DownloadScheduler
+from utils.deadline import Deadline, DeadlineExceeded, current_deadline
+
+class DownloadSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config['API_KEY_STATE_DIR'] = self.state_dir
+        self.order = []
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        shutil.rmtree(self.state_dir)
+
+    def download(self, pmid):
+        if pmid == 'blocker':
+            self.release.wait(5)
+        if pmid == 'slow':
+            while not self.release.is_set():
+                current_deadline().check()
+                time.sleep(0.01)
+        self.order.append(pmid)
+        return {'pmid': pmid}
+
+    def policy(self, name):
+        return {'name': name, 'requests_per_second': None, 'burst': None,
+                'max_concurrent_downloads': None, 'daily_miss_budget': None}
+
+    def test_interactive_runs_before_queued_bulk_work(self):
+        scheduler = DownloadScheduler(self.app, self.download, workers=1, reserved_interactive=0)
+        scheduler.submit('blocker', 'background')
+        time.sleep(0.1)
+        bulk = [scheduler.submit(f'b{i}', 'background') for i in range(3)]
+        batch = scheduler.submit('batch', 'batch')
+        interactive = scheduler.submit('i', 'interactive')
+        self.assertEqual(scheduler.stats()['background']['queued'], 3)
+        self.release.set()
+        self.assertEqual(interactive.result(5), {'pmid': 'i'})
+        batch.result(5)
+        for future in bulk:
+            future.result(5)
+        self.assertEqual(self.order, ['blocker', 'i', 'batch', 'b0', 'b1', 'b2'])
+        self.assertEqual(scheduler.stats()['background']['dispatched'], 4)
+
+    def test_fair_queuing_between_keys(self):
+        scheduler = DownloadScheduler(self.app, self.download, workers=1, reserved_interactive=0)
+        scheduler.submit('blocker', 'batch')
+        time.sleep(0.1)
+        futures = [scheduler.submit(f'a{i}', 'batch', self.policy('a')) for i in range(4)]
+        futures += [scheduler.submit(f'b{i}', 'batch', self.policy('b')) for i in range(2)]
+        self.release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual(self.order, ['blocker', 'a0', 'b0', 'a1', 'b1', 'a2', 'a3'])
+
+    def test_interactive_request_promotes_queued_item(self):
+        scheduler = DownloadScheduler(self.app, self.download, workers=1, reserved_interactive=0)
+        scheduler.submit('blocker', 'background')
+        time.sleep(0.1)
+        queued = [scheduler.submit(f'b{i}', 'background') for i in range(3)]
+        promoted = scheduler.submit('b2', 'interactive')
+        self.assertIs(promoted, queued[2])
+        self.release.set()
+        for future in queued:
+            future.result(5)
+        self.assertEqual(self.order, ['blocker', 'b2', 'b0', 'b1'])
+
+    def test_reserved_thread_serves_interactive_work(self):
+        scheduler = DownloadScheduler(self.app, self.download, workers=2, reserved_interactive=1)
+        scheduler.submit('blocker', 'batch')
+        time.sleep(0.1)
+        queued = scheduler.submit('b0', 'batch')
+        self.assertEqual(scheduler.submit('i', 'interactive').result(5), {'pmid': 'i'})
+        self.assertFalse(queued.done())
+        self.release.set()
+        queued.result(5)
+
+    def test_queued_download_dropped_after_deadline(self):
+        scheduler = DownloadScheduler(self.app, self.download, workers=1, reserved_interactive=0)
+        scheduler.submit('blocker', 'interactive')
+        time.sleep(0.1)
+        expired = scheduler.submit('late', 'interactive', deadline=Deadline(0.05))
+        kept = scheduler.submit('joined', 'interactive', deadline=Deadline(0.05))
+        self.assertIs(scheduler.submit('joined', 'batch'), kept)
+        time.sleep(0.1)
+        self.release.set()
+        with self.assertRaises(DeadlineExceeded):
+            expired.result(5)
+        self.assertEqual(kept.result(5), {'pmid': 'joined'})
+        self.assertNotIn('late', self.order)
+
+    def test_running_download_sees_deadline(self):
+        scheduler = DownloadScheduler(self.app, self.download, workers=1, reserved_interactive=0)
+        future = scheduler.submit('slow', 'interactive', deadline=Deadline(0.1))
+        with self.assertRaises(DeadlineExceeded):
+            future.result(5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from flask import Flask
+from models import db, Article
+from commands.export import export_cli
+from services import export_service
+from services.export_service import check_export_options, get_export_filename, iter_export
+
+class ArticleExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['EXPORT_BATCH_SIZE'] = 2
+        self.app.config['PMID_STATUS_ENABLED'] = False
+        db.init_app(self.app)
+        self.app.cli.add_command(export_cli)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([
+            Article(pmid=str(pmid), title=f'Title, "{pmid}"', journal='Nature' if pmid % 2 else 'Cell',
+                    year=2000 + pmid % 3, has_pdf=pmid % 2 == 1, created_at=datetime(2020, 1, 1))
+            for pmid in range(1, 8)
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_ndjson_matches_to_dict(self):
+        lines = b''.join(iter_export('ndjson', journal='Nature')).splitlines()
+        expected = [{**article.to_dict(), 'hit_count': 0, 'last_accessed': None}
+                    for article in Article.query.filter_by(journal='Nature').order_by(Article.id)]
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_csv_in_small_chunks(self):
+        original = export_service.CHUNK_SIZE
+        export_service.CHUNK_SIZE = 1
+        try:
+            chunks = list(iter_export('csv', has_pdf=False))
+        finally:
+            export_service.CHUNK_SIZE = original
+        self.assertGreater(len(chunks), 1)
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+        self.assertEqual([row['pmid'] for row in rows], ['2', '4', '6'])
+        self.assertEqual(rows[0]['title'], 'Title, "2"')
+        self.assertEqual(rows[0]['doi'], '')
+
+    def test_gzip(self):
+        data = gzip.decompress(b''.join(iter_export('ndjson', 'gzip', year=2001)))
+        self.assertEqual([json.loads(line)['pmid'] for line in data.splitlines()], ['1', '4', '7'])
+        self.assertEqual(get_export_filename('ndjson', 'gzip'), 'articles.ndjson.gz')
+
+    def test_unavailable_options(self):
+        with self.assertRaises(ValueError):
+            check_export_options('xml')
+        with self.assertRaises(ValueError):
+            check_export_options('csv', 'bzip2')
+
+    def test_cli(self):
+        fd, path = tempfile.mkstemp(suffix='.csv.gz')
+        os.close(fd)
+        try:
+            result = self.app.test_cli_runner().invoke(
+                args=['export', 'articles', '-o', path, '--format', 'csv', '--compression', 'gzip', '--has-pdf'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with gzip.open(path, 'rt') as f:
+                self.assertEqual([row['pmid'] for row in csv.DictReader(f)], ['1', '3', '5', '7'])
+        finally:
+            os.remove(path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from config.gunicorn_profile import get_gunicorn_settings
+
+class ProfileConfig:
+    GUNICORN_PROFILE = 'gthread'
+    GUNICORN_WORKERS = None
+    GUNICORN_THREADS = None
+    GUNICORN_CONCURRENCY_PER_CPU = 16
+    GUNICORN_WORKER_CONNECTIONS = 1000
+    GUNICORN_MAX_REQUESTS = 5000
+    GUNICORN_MAX_REQUESTS_JITTER = 500
+
+class GunicornProfileTestCase(unittest.TestCase):
+    def test_sizes_from_cpu_count(self):
+        sync = get_gunicorn_settings(ProfileConfig, profile='sync', cpu_count=4)
+        self.assertEqual((sync['worker_class'], sync['workers'], sync['threads']), ('sync', 9, 1))
+
+        gthread = get_gunicorn_settings(ProfileConfig, cpu_count=4)
+        self.assertEqual((gthread['worker_class'], gthread['workers'], gthread['threads']), ('gthread', 4, 16))
+
+        gevent = get_gunicorn_settings(ProfileConfig, profile='gevent', cpu_count=4)
+        self.assertEqual((gevent['workers'], gevent['worker_connections']), (4, 1000))
+        self.assertEqual((gevent['max_requests'], gevent['max_requests_jitter']), (5000, 500))
+
+    def test_explicit_counts_win(self):
+        class Fixed(ProfileConfig):
+            GUNICORN_WORKERS = 3
+            GUNICORN_THREADS = 5
+        settings = get_gunicorn_settings(Fixed, cpu_count=16)
+        self.assertEqual((settings['workers'], settings['threads']), (3, 5))
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            get_gunicorn_settings(ProfileConfig, profile='eventlet')
+
+if __name__ == '__main__':
+    unittest.main()
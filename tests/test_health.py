@@ -0,0 +1,84 @@
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from models import db
+from api.routes import api_bp
+from services.health_service import (
+    STATUS_DEGRADED, STATUS_FAILED, STATUS_OK, HealthMonitor, check_storage, get_health_monitor
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class HealthMonitorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SQLALCHEMY_TRACK_MODIFICATIONS=False,
+                               PDF_ROOT_PATH=self.root)
+        db.init_app(self.app)
+        self.clock = FakeClock()
+        self.results = {'database': (STATUS_OK, {}), 'storage': (STATUS_OK, {}), 'upstreams': (STATUS_OK, {})}
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def monitor(self):
+        checks = {name: (lambda name=name: self.results[name]) for name in self.results}
+        return HealthMonitor(self.app, checks=checks, interval=3600, stale_after=30, clock=self.clock)
+
+    def test_report_states(self):
+        monitor = self.monitor()
+        monitor._start = lambda: None
+        # The first probe runs the checks instead of waiting for the checker thread
+        self.assertEqual(monitor.report()['status'], STATUS_OK)
+        self.assertTrue(monitor.report()['ready'])
+
+        with self.app.app_context():
+            self.results['upstreams'] = (STATUS_DEGRADED, {'open': ['ncbi']})
+            monitor.run_checks()
+            report = monitor.report()
+            self.assertEqual((report['status'], report['ready']), (STATUS_DEGRADED, True))
+            self.assertEqual(report['checks']['upstreams']['open'], ['ncbi'])
+
+            self.results['database'] = None  # unpacking fails like a raising check
+            monitor.run_checks()
+            report = monitor.report()
+            self.assertEqual((report['status'], report['ready']), (STATUS_FAILED, False))
+            self.assertIn('error', report['checks']['database'])
+
+            self.results['database'] = (STATUS_OK, {})
+            monitor.run_checks()
+            self.clock.now += 31
+            self.assertFalse(monitor.report()['ready'])
+
+    def test_storage_check(self):
+        with self.app.app_context():
+            self.assertEqual(check_storage()[0], STATUS_OK)
+            self.app.config['HEALTH_MIN_FREE_BYTES'] = 1 << 62
+            self.assertEqual(check_storage()[0], STATUS_DEGRADED)
+            shutil.rmtree(self.root)
+            self.assertEqual(check_storage()[0], STATUS_FAILED)
+
+    def test_probes(self):
+        self.app.register_blueprint(api_bp, url_prefix='/api')
+        client = self.app.test_client()
+        self.assertEqual(client.get('/api/health/live').status_code, 200)
+        with self.app.app_context():
+            monitor = get_health_monitor()
+            monitor._start = lambda: None
+            monitor.checks = {'database': lambda: (STATUS_FAILED, {})}
+            self.assertEqual(client.get('/api/health/ready').status_code, 503)
+            monitor.checks = {'database': lambda: (STATUS_OK, {})}
+            monitor.run_checks()
+        response = client.get('/api/health/ready')
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertIn('database', client.get('/api/health').json['data']['checks'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import datetime
+import unittest
+from enum import Enum
+from flask import Flask
+from api.schemas import ArticleMetadata, MCPContext
+from utils.json_utils import dumps, get_json_encoder, orjson
+
+ENCODERS = ('stdlib', 'orjson') if orjson is not None else ('stdlib',)
+
+class Color(Enum):
+    RED = 'red'
+
+class JsonEncoderTestCase(unittest.TestCase):
+    def test_matches_stdlib_json(self):
+        value = {
+            'title': 'Étude über Zellen – 细胞', 'authors': ['A', 'B'], 'year': 2024, 'score': 1.5,
+            'has_pdf': True, 'doi': None, 'nested': {'ids': [1, 2, 3], 'empty': {}}, 'quote': 'say "hi"\n',
+        }
+        expected = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        for name in ENCODERS:
+            self.assertEqual(get_json_encoder(name)(value), expected, name)
+
+    def test_default_types(self):
+        value = {
+            'at': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456),
+            'utc': datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            'on': datetime.date(2024, 1, 2),
+            'color': Color.RED,
+            'tags': {'x'},
+            1: 'int key',
+        }
+        for name in ENCODERS:
+            self.assertEqual(json.loads(get_json_encoder(name)(value)), {
+                'at': '2024-01-02T03:04:05.123456', 'utc': '2024-01-02T03:04:05+00:00', 'on': '2024-01-02',
+                'color': 'red', 'tags': ['x'], '1': 'int key',
+            }, name)
+            with self.assertRaises(TypeError):
+                get_json_encoder(name)({'value': object()})
+
+    def test_pydantic_models(self):
+        metadata = ArticleMetadata(pmid='1', title='Title', authors='Doe J', has_pdf=True, has_abstract=False,
+                                   full_text_available=False, commercial_use_allowed=False)
+        context = MCPContext(query='q', pmid='1', article_metadata=metadata, pdf_content=None)
+        for name in ENCODERS:
+            self.assertEqual(json.loads(get_json_encoder(name)({'context': context})), {'context': context.dict()}, name)
+            self.assertEqual(get_json_encoder(name)(context), get_json_encoder(name)(context.dict()), name)
+
+    def test_encoder_selection(self):
+        with self.assertRaises(ValueError):
+            get_json_encoder('simplejson')
+        self.assertIs(get_json_encoder('auto'), get_json_encoder('orjson' if orjson is not None else 'stdlib'))
+
+        app = Flask(__name__)
+        app.config['JSON_ENCODER'] = 'stdlib'
+        with app.app_context():
+            self.assertEqual(dumps({'a': 'é'}), '{"a":"é"}'.encode('utf-8'))
+        self.assertEqual(dumps([1, None]), b'[1,null]')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from models import db, Article
+from commands.logs import logs_cli
+from services.warmup_service import read_hot_set, warm_hot_set, write_hot_set
+from utils.log_analysis import LogStats, analyze_file, find_log_files, parse_response_line
+
+PREFIX = '[2026-01-01T00:00:00] [INFO] [pmid-pdf-api] MESSAGE=Response Info: IP: 127.0.0.1, '
+
+def response_line(path, runtime, body='{}', extra=''):
+    return f"{PREFIX}Path: {path}, Query: {{}}, Json: {body} Runtime: {runtime:.3f}{extra}\n"
+
+class LogParsingTestCase(unittest.TestCase):
+    def test_parse_lines(self):
+        entry = parse_response_line(response_line('/api/pdf/123', 0.25, extra=' Status: 200 Cache: miss'))
+        self.assertEqual((entry['pmid'], entry['runtime'], entry['status'], entry['outcome']),
+                         ('123', 0.25, 200, 'miss'))
+        # Lines written before Status and Cache were logged
+        error = '{"status":"error","code":"PDF_NOT_AVAILABLE","message":"Runtime: 1"}'
+        entry = parse_response_line(response_line('/api/pdf/7', 0.1, body=error))
+        self.assertEqual((entry['status'], entry['outcome']), (None, 'PDF_NOT_AVAILABLE'))
+        self.assertEqual(parse_response_line(response_line('/api/articles', 0.1))['outcome'], 'ok')
+        self.assertIsNone(parse_response_line('[ts] [INFO] [app] REQUEST_URL=/api/pdf/1 REQUEST_METHOD=GET'))
+
+    def test_stats_merge_and_summary(self):
+        first, second = LogStats(), LogStats()
+        for i in range(1, 101):
+            first.add({'pmid': '1', 'runtime': i / 1000, 'outcome': 'hit'})
+        second.add({'pmid': '2', 'runtime': 2.0, 'outcome': 'miss'})
+        for _ in range(3):
+            second.add({'pmid': '3', 'runtime': 0.5, 'outcome': 'PDF_NOT_AVAILABLE'})
+        summary = first.merge(second).summary(top=2)
+
+        self.assertEqual(summary['requests'], 104)
+        p50 = summary['outcomes']['hit']['latency_ms'][0.5]
+        self.assertTrue(50 <= p50 <= 51, p50)
+        self.assertEqual(summary['top_pmids'], [('1', 100), ('3', 3)])
+        self.assertAlmostEqual(summary['miss_rate'], 1 / 101, places=4)
+        self.assertAlmostEqual(summary['repeat_failure_rate'], 2 / 3, places=4)
+
+class HotSetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SQLALCHEMY_TRACK_MODIFICATIONS=False,
+                               PDF_ROOT_PATH=self.root, PMID_STATUS_ENABLED=False)
+        db.init_app(self.app)
+        self.app.cli.add_command(logs_cli)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_analyze_writes_hot_set(self):
+        day_dir = os.path.join(self.root, 'logs', '2026-01', '01')
+        os.makedirs(day_dir)
+        with open(os.path.join(day_dir, 'api_calls.log'), 'w') as f:
+            f.write(response_line('/api/pdf/5', 0.01, extra=' Status: 200 Cache: hit') * 3)
+            f.write(response_line('/api/pdf/6', 0.01, body='{"status":"error","code":"PDF_NOT_AVAILABLE"}'))
+        with open(os.path.join(day_dir, 'api_calls.log.1'), 'w') as f:
+            f.write(response_line('/api/pdf/7', 0.9, extra=' Status: 200 Cache: miss'))
+        self.assertEqual(len(find_log_files(os.path.join(self.root, 'logs'))), 2)
+        self.assertEqual(analyze_file(os.path.join(day_dir, 'api_calls.log')).requests, 4)
+
+        result = self.app.test_cli_runner().invoke(
+            args=['logs', 'analyze', '--log-dir', os.path.join(self.root, 'logs'), '--workers', '2', '--write-hot-set'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Miss rate: 0.25', result.output)
+        self.assertEqual(read_hot_set(os.path.join(self.root, '.hot-set')), ['5', '7'])
+
+    def test_warm_hot_set(self):
+        os.makedirs(os.path.join(self.root, '5'))
+        with open(os.path.join(self.root, '5', 'article.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4' + b'x' * 100)
+        db.session.add_all([Article(pmid='5', has_pdf=True, relative_path='5'), Article(pmid='6', has_pdf=False)])
+        db.session.commit()
+        write_hot_set(os.path.join(self.root, '.hot-set'), ['5', '6', '8', 'junk'])
+
+        stats = warm_hot_set()
+        self.assertEqual(stats, {'pmids': 3, 'articles': 2, 'files': 1, 'bytes': 108})
+        self.assertEqual(warm_hot_set(max_bytes=0)['files'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from config import Config
+from app import create_app
+from models import db, Article
+from utils.text_utils import EXTRACTOR_VERSION, TEXT_FILE_NAME, TEXT_META_FILE_NAME
+
+TEXT = 'Aspirin lowers fever.'
+
+class MCPContextsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+        class TestConfig(type(Config)):
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            PDF_ROOT_PATH = os.path.join(self.work_dir, 'pdfs')
+            API_KEY_STATE_DIR = os.path.join(self.work_dir, 'state')
+            API_KEYS = ['key']
+            PMID_STATUS_ENABLED = False
+            ACCESS_STATS_ENABLED = False
+            SEARCH_INDEX_ENABLED = False
+            MCP_TEXT_CHUNK_SIZE = 8
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            # Cached text with a current stamp, so nothing is extracted
+            text_dir = os.path.join(self.work_dir, 'pdfs', '1')
+            os.makedirs(text_dir)
+            with gzip.open(os.path.join(text_dir, TEXT_FILE_NAME), 'wt', encoding='utf-8') as f:
+                f.write(TEXT)
+            with open(os.path.join(text_dir, TEXT_META_FILE_NAME), 'w') as f:
+                json.dump({'version': EXTRACTOR_VERSION, 'content_hash': 'abc', 'size': 10}, f)
+            db.session.add(Article(pmid='1', title='Aspirin', has_pdf=True, relative_path='1',
+                                   content_hash='abc', size=10))
+            db.session.add(Article(pmid='2', title='No PDF', has_pdf=False))
+            db.session.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def post(self, **body):
+        response = self.client.post('/api/mcp/contexts', json=body, headers={'X-API-Key': 'key'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data().splitlines()
+        # Every line is compact JSON, as the standard library would write it
+        for line in lines:
+            self.assertEqual(line, json.dumps(json.loads(line), ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        return [json.loads(line) for line in lines]
+
+    def test_batch_streams_text_in_chunks(self):
+        lines = self.post(pmids=['1', '2', '3'], query='fever')
+
+        self.assertEqual([(line['type'], line['pmid']) for line in lines], [
+            ('context', '1'), ('pdf_content', '1'), ('pdf_content', '1'), ('pdf_content', '1'), ('end', '1'),
+            ('context', '2'), ('end', '2'),
+            ('error', '3'),
+        ])
+        self.assertEqual(lines[0]['query'], 'fever')
+        self.assertEqual(lines[0]['article_metadata']['title'], 'Aspirin')
+        self.assertNotIn('pdf_content', lines[0])
+        self.assertEqual([line['seq'] for line in lines[1:4]], [0, 1, 2])
+        self.assertEqual(''.join(line['text'] for line in lines[1:4]), TEXT)
+        self.assertEqual(lines[4], {'type': 'end', 'pmid': '1', 'chars': len(TEXT), 'truncated': False})
+        self.assertEqual(lines[6]['chars'], 0)
+        self.assertEqual(lines[7]['code'], 'ARTICLE_NOT_FOUND')
+
+    def test_truncated_only_when_text_was_cut(self):
+        for max_text_length, truncated in ((len(TEXT) + 1, False), (len(TEXT), False), (len(TEXT) - 1, True),
+                                           (8, True), (0, True)):
+            lines = self.post(pmids=['1'], max_text_length=max_text_length)
+            text = ''.join(line['text'] for line in lines if line['type'] == 'pdf_content')
+            self.assertEqual(text, TEXT[:max_text_length])
+            self.assertEqual(lines[-1], {'type': 'end', 'pmid': '1', 'chars': len(text), 'truncated': truncated},
+                             max_text_length)
+
+    def test_selected_fields(self):
+        lines = self.post(pmids=['1'], fields=['pmid'])
+        self.assertEqual(lines, [{'type': 'context', 'pmid': '1'}])
+
+        response = self.client.post('/api/mcp/contexts', json={'pmids': ['1'], 'fields': ['abstract']},
+                                    headers={'X-API-Key': 'key'})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import tempfile
+from utils.pdf_utils import verify_pdf_file
+
+VALID_PDF = (
+    b"%PDF-1.4\n"
+    b"1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n"
+    b"2 0 obj << /Type /Pages /Kids [3 0 R] /Count 1 >> endobj\n"
+    b"3 0 obj << /Type /Page /Parent 2 0 R >> endobj\n"
+    b"xref\n0 4\ntrailer << /Root 1 0 R >>\nstartxref\n120\n%%EOF\n"
+)
+
+class PDFVerificationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, content):
+        path = os.path.join(self.tmp_dir, "article.pdf")
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_valid_pdf(self):
+        result = verify_pdf_file(self.write(VALID_PDF))
+        self.assertTrue(result.valid)
+        self.assertEqual(result.pages, 1)
+
+    def test_html_paywall_page(self):
+        result = verify_pdf_file(self.write(b"<!DOCTYPE html><html><body>Subscribe</body></html>"))
+        self.assertFalse(result.valid)
+        self.assertIn("header", result.reason)
+
+    def test_truncated_pdf(self):
+        result = verify_pdf_file(self.write(VALID_PDF[:-30]))
+        self.assertFalse(result.valid)
+        self.assertIn("truncated", result.reason)
+
+    def test_pdf_without_pages(self):
+        result = verify_pdf_file(self.write(VALID_PDF.replace(b"/Type /Page /Parent", b"/Parent")))
+        self.assertFalse(result.valid)
+        self.assertEqual(result.pages, 0)
+
+    def test_pages_tree_is_not_counted_as_page(self):
+        result = verify_pdf_file(self.write(VALID_PDF), min_pages=2)
+        self.assertFalse(result.valid)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime
+from flask import Flask
+from app import create_app, prepare_server
+from config import Config
+from models import db, Article
+from services.db_service import save_article
+from services.pmid_status_service import get_pmid_status, get_pmid_status_set
+from utils.pmid_status import FAILED, HAS_PDF, UNKNOWN, PmidStatusSet, parse_pmid
+
+class PmidStatusSetTestCase(unittest.TestCase):
+    def test_parse_pmid(self):
+        self.assertEqual(parse_pmid('12345'), 12345)
+        self.assertEqual(parse_pmid(7), 7)
+        for value in ('', '0', '0123', '-1', '12a', '1e5', ' 1', '1' * 11):
+            self.assertIsNone(parse_pmid(value))
+
+    def test_get_and_set(self):
+        status_set = PmidStatusSet(1000)
+        self.assertEqual(status_set.get(17), UNKNOWN)
+        status_set.set(17, has_pdf=False, failed=True)
+        status_set.set(18, has_pdf=True, failed=True)
+        self.assertEqual(status_set.get(17), FAILED)
+        self.assertEqual(status_set.get(18), HAS_PDF)
+        self.assertEqual(status_set.get(16), UNKNOWN)
+        status_set.set(17, has_pdf=False, failed=False)
+        self.assertEqual(status_set.get(17), UNKNOWN)
+        self.assertIsNone(status_set.get(1000))
+        self.assertFalse(status_set.set(5000, True, True))
+        self.assertEqual(status_set.stats()[HAS_PDF], 1)
+
+    def test_load(self):
+        status_set = PmidStatusSet(100)
+        loaded = status_set.load([('1', True, True), ('2', False, True), ('x', True, True), ('500', True, True)])
+        self.assertEqual(loaded, 2)
+        self.assertEqual([status_set.get(pmid) for pmid in (1, 2, 3)], [HAS_PDF, FAILED, UNKNOWN])
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_shared_with_forked_children(self):
+        status_set = PmidStatusSet(100)
+        pid = os.fork()
+        if pid == 0:
+            status_set.set(42, has_pdf=True, failed=False)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(status_set.get(42), HAS_PDF)
+
+class PmidStatusServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['PMID_STATUS_CAPACITY'] = 10000
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([
+            Article(pmid='10', has_pdf=True, download_attempted=True),
+            Article(pmid='11', has_pdf=False, download_attempted=True),
+            Article(pmid='12', has_pdf=False, download_attempted=False),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_load_and_save(self):
+        self.assertEqual([get_pmid_status(pmid) for pmid in ('10', '11', '12', '13', '20000', 'x')],
+                         [HAS_PDF, FAILED, UNKNOWN, UNKNOWN, None, None])
+        save_article({'pmid': '13', 'has_pdf': True, 'download_attempted': True})
+        self.assertEqual(get_pmid_status('13'), HAS_PDF)
+
+    def test_refresh_picks_up_other_writers(self):
+        get_pmid_status_set()
+        # Written by another process, e.g. a CLI command
+        db.session.execute(Article.__table__.update().where(Article.pmid == '11').values(
+            has_pdf=True, updated_at=datetime.utcnow()))
+        db.session.commit()
+        self.assertEqual(get_pmid_status('11'), FAILED)
+        self.app.extensions['pmid_status']['checked'] -= 3600
+        self.assertEqual(get_pmid_status('11'), HAS_PDF)
+
+class ServerPreloadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+        class TestConfig(type(Config)):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(self.work_dir, 'articles.db')
+            PDF_ROOT_PATH = self.work_dir
+            API_KEY_STATE_DIR = os.path.join(self.work_dir, 'state')
+            AUTO_CREATE_SCHEMA = False
+            PMID_STATUS_PRELOAD = True
+            PMID_STATUS_CAPACITY = 10000
+            HOT_SET_WARM_ON_START = True
+
+        self.app = create_app(TestConfig)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_preload_waits_for_schema(self):
+        # create_app no longer touches the database or starts the warmer, so the pre-start
+        # check can create the schema
+        self.assertNotIn('pmid_status', self.app.extensions)
+        prepare_server(self.app)
+        self.assertNotIn('pmid_status', self.app.extensions)
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Article(pmid='10', has_pdf=True, download_attempted=True))
+            db.session.commit()
+            db.session.remove()
+        with mock.patch('services.warmup_service.warm_hot_set', return_value={'pmids': 0}) as warm:
+            prepare_server(self.app)
+        warm.assert_called_once_with()
+        self.assertIn('pmid_status', self.app.extensions)
+        with self.app.app_context():
+            self.assertEqual(get_pmid_status('10'), HAS_PDF)
+
+if __name__ == '__main__':
+    unittest.main()
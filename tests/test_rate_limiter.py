@@ -0,0 +1,75 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+from utils.rate_limiter import take_tokens, FileRateLimiter, RateLimitExceeded
+from services.rate_limit_service import get_rate_for_host, get_rate_limits
+
+def _acquire_many(state_dir, count, queue):
+    limiter = FileRateLimiter(state_dir)
+    for _ in range(count):
+        limiter.acquire('example.org', rate=20, burst=1)
+        queue.put(time.time())
+
+class TakeTokensTestCase(unittest.TestCase):
+    def test_refills_up_to_burst(self):
+        self.assertEqual(take_tokens(0.0, 0.0, 10.0, 1.0, 2.0, 1, 5), (1.0, 10.0, 0.0, True))
+
+    def test_reserves_ahead_and_waits(self):
+        tokens, last, wait, granted = take_tokens(0.5, 10.0, 10.0, 2.0, 2.0, 1, 5)
+        self.assertEqual((tokens, wait, granted), (-0.5, 0.25, True))
+
+    def test_rejects_without_reserving(self):
+        tokens, last, wait, granted = take_tokens(-10.0, 10.0, 10.0, 1.0, 1.0, 1, 5)
+        self.assertFalse(granted)
+        self.assertEqual((tokens, wait), (-10.0, 11.0))
+
+class FileRateLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def test_limit_is_shared_between_processes(self):
+        queue = multiprocessing.Queue()
+        started = time.time()
+        processes = [multiprocessing.Process(target=_acquire_many, args=(self.state_dir, 5, queue))
+                     for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        times = sorted(queue.get() for _ in range(15))
+        # One token of burst, then 20 per second for all processes together
+        self.assertGreaterEqual(times[-1] - started, 14 / 20 - 0.05)
+
+    def test_rejects_over_max_wait(self):
+        limiter = FileRateLimiter(self.state_dir)
+        limiter.acquire('example.org', rate=0.1, burst=1)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire('example.org', rate=0.1, burst=1, max_wait=1)
+        self.assertEqual(os.listdir(self.state_dir), ['example.org.bucket'])
+
+    def test_try_acquire_does_not_wait(self):
+        limiter = FileRateLimiter(self.state_dir)
+        self.assertEqual(limiter.try_acquire('key', rate=2, burst=1), 0.0)
+        self.assertAlmostEqual(limiter.try_acquire('key', rate=2, burst=1), 0.5, delta=0.05)
+
+class RateLimitsTestCase(unittest.TestCase):
+    limits = {'ncbi.nlm.nih.gov': 3.0, '*': 5.0}
+
+    def test_most_specific_domain_wins(self):
+        self.assertEqual(get_rate_for_host('eutils.ncbi.nlm.nih.gov', self.limits), ('ncbi.nlm.nih.gov', 3.0))
+        self.assertEqual(get_rate_for_host('www.example.org', self.limits), ('www.example.org', 5.0))
+
+    def test_api_key_raises_ncbi_rate(self):
+        config = {'RATE_LIMITS': self.limits, 'RATE_LIMIT_NCBI_WITH_API_KEY': 10.0}
+        self.assertEqual(get_rate_limits(dict(config, NCBI_API_KEY='your_ncbi_api_key_here')), self.limits)
+        self.assertEqual(get_rate_limits(dict(config, NCBI_API_KEY='abc123')),
+                         {'ncbi.nlm.nih.gov': 10.0, '*': 5.0})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import unittest
+from unittest import mock
+from flask import Flask
+from api import response_handler
+from api.response_handler import ApiResponse, ErrorCode
+from api.schemas import ArticleMetadata
+
+class ApiResponseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_success_encodes_pydantic_models(self):
+        metadata = ArticleMetadata(pmid='1', title='Title', has_pdf=True, has_abstract=False,
+                                   full_text_available=False, commercial_use_allowed=False)
+        for encoder in ('stdlib', 'auto'):
+            self.app.config['JSON_ENCODER'] = encoder
+            response, status_code = ApiResponse.success(data={'results': [metadata]})
+            self.assertEqual(status_code, 200)
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(json.loads(response.get_data())['data']['results'][0], metadata.dict())
+
+    def test_static_error_bodies_are_reused(self):
+        first, status_code = ApiResponse.error("Invalid or missing API key", ErrorCode.INVALID_API_KEY, status_code=401)
+        second, _ = ApiResponse.error("Invalid or missing API key", ErrorCode.INVALID_API_KEY, status_code=401)
+        self.assertEqual(status_code, 401)
+        self.assertIsNot(first, second)
+        self.assertEqual(first.get_data(), second.get_data())
+        self.assertEqual(json.loads(first.get_data()), {
+            'status': 'error', 'code': 'INVALID_API_KEY', 'message': "Invalid or missing API key", 'details': None
+        })
+
+    def test_static_error_bodies_follow_the_encoder(self):
+        self.app.config['JSON_ENCODER'] = 'stdlib'
+        stdlib_body = ApiResponse.error("Article not found", 'ARTICLE_NOT_FOUND', status_code=404)[0].get_data()
+        with mock.patch.object(response_handler, 'get_app_json_encoder', return_value=lambda obj: b'{"other":1}'):
+            response, _ = ApiResponse.error("Article not found", 'ARTICLE_NOT_FOUND', status_code=404)
+        self.assertEqual(response.get_data(), b'{"other":1}')
+        self.assertEqual(ApiResponse.error("Article not found", 'ARTICLE_NOT_FOUND', status_code=404)[0].get_data(),
+                         stdlib_body)
+
+    def test_warning_without_details(self):
+        for encoder in ('stdlib', 'auto'):
+            self.app.config['JSON_ENCODER'] = encoder
+            response, status_code = ApiResponse.warning("Extraction in progress", 'TEXT_EXTRACTION_PENDING', status_code=202)
+            self.assertEqual(status_code, 202)
+            self.assertEqual(json.loads(response.get_data()), {
+                'status': 'warning', 'code': 'TEXT_EXTRACTION_PENDING', 'message': "Extraction in progress",
+                'details': None
+            })
+
+    def test_error_with_details(self):
+        response, status_code = ApiResponse.error("Not found", 'ARTICLE_NOT_FOUND', details={'pmid': '1'}, status_code=404)
+        self.assertEqual(status_code, 404)
+        self.assertEqual(json.loads(response.get_data())['details'], {'pmid': '1'})
+
+if __name__ == '__main__':
+    unittest.main()
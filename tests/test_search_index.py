@@ -0,0 +1,163 @@
+import os
+import gzip
+import unittest
+import shutil
+import tempfile
+from flask import Flask
+from models import db, Article
+from services.search_service import (
+    PENDING_DIR, flush_pending, queue_for_indexing, remove_from_index, search_articles
+)
+from utils.search_index import IndexWriter, SearchIndex, tokenize, read_manifest
+
+class SearchIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index_path = tempfile.mkdtemp()
+        self.index = SearchIndex(self.index_path, refresh_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.index_path)
+
+    def add(self, documents, max_segments=8):
+        with IndexWriter(self.index_path, max_segments=max_segments) as writer:
+            writer.add_documents({pmid: tokenize(text) for pmid, text in documents.items()})
+
+    def test_ranks_documents_by_relevance(self):
+        self.add({
+            1: "Kinase inhibitors in breast cancer",
+            2: "Kinase kinase kinase signalling",
+            3: "Protein folding in yeast",
+        })
+        results, matches = self.index.search("kinase")
+        self.assertEqual(matches, 2)
+        self.assertEqual([pmid for pmid, _ in results], [2, 1])
+
+    def test_unknown_terms_and_stopwords(self):
+        self.add({1: "Protein folding"})
+        self.assertEqual(self.index.search("ribosome"), ([], 0))
+        self.assertEqual(self.index.search("the of and"), ([], 0))
+
+    def test_newer_segment_supersedes_document(self):
+        self.add({1: "kinase inhibitors", 2: "kinase assays"})
+        self.add({1: "protein folding"})
+        results, _ = self.index.search("kinase")
+        self.assertEqual([pmid for pmid, _ in results], [2])
+        results, _ = self.index.search("folding")
+        self.assertEqual([pmid for pmid, _ in results], [1])
+
+    def test_merge_keeps_latest_versions(self):
+        for pmid in range(1, 6):
+            self.add({pmid: f"kinase study number{pmid}"}, max_segments=3)
+        self.add({3: "protein folding"}, max_segments=3)
+        self.assertLessEqual(len(read_manifest(self.index_path)['segments']), 3)
+
+        with IndexWriter(self.index_path) as writer:
+            writer.merge()
+        self.assertEqual(len(read_manifest(self.index_path)['segments']), 1)
+
+        results, matches = self.index.search("kinase")
+        self.assertEqual(sorted(pmid for pmid, _ in results), [1, 2, 4, 5])
+        self.assertEqual(matches, 4)
+        self.assertEqual(self.index.search("folding")[0][0][0], 3)
+
+    def stats(self):
+        self.index.refresh()
+        return self.index.stats()
+
+    def test_statistics_count_live_documents_only(self):
+        self.add({1: "kinase inhibitors breast", 2: "kinase assays", 3: "protein folding"})
+        self.add({1: "kinase"})
+        self.assertEqual(self.stats()['doc_count'], 3)
+        self.assertEqual(self.stats()['total_length'], 1 + 2 + 2)
+
+        # Tombstones hide older versions and are not documents themselves
+        self.add({2: "", 9: ""})
+        self.assertEqual(self.stats()['doc_count'], 2)
+        self.assertEqual(self.stats()['total_length'], 1 + 2)
+        results, matches = self.index.search("kinase")
+        self.assertEqual(([pmid for pmid, _ in results], matches), ([1], 1))
+
+        # A partial merge keeps the tombstones, a full one drops them
+        self.add({3: "protein folding yeast"})
+        with IndexWriter(self.index_path) as writer:
+            writer.merge(start=1)
+        self.assertEqual(self.stats()['doc_count'], 2)
+        self.assertEqual(self.index.search("assays"), ([], 0))
+        with IndexWriter(self.index_path) as writer:
+            writer.merge()
+        self.assertEqual(self.stats(), {'doc_count': 2, 'total_length': 1 + 3, 'segments': 1})
+        self.assertEqual(self.index.segments[0].doc_count, 2)
+        self.assertEqual(self.index.search("assays"), ([], 0))
+
+class FlushPendingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index_path = tempfile.mkdtemp()
+        self.pending_dir = os.path.join(self.index_path, PENDING_DIR)
+
+    def tearDown(self):
+        shutil.rmtree(self.index_path)
+
+    def queue(self, pmid, data):
+        text_path = os.path.join(self.index_path, f'{pmid}.txt.gz')
+        with open(text_path, 'wb') as f:
+            f.write(data)
+        queue_for_indexing(self.index_path, pmid, text_path)
+
+    def test_broken_markers_do_not_block_the_queue(self):
+        # A marker that vanishes before it is read
+        os.makedirs(self.pending_dir)
+        os.symlink(os.path.join(self.index_path, 'missing'), os.path.join(self.pending_dir, '9'))
+        self.assertEqual(flush_pending(self.index_path), 0)
+
+        self.queue('1', gzip.compress(b'kinase inhibitors'))
+        self.queue('2', gzip.compress(b'protein folding')[:12])
+        self.assertEqual(flush_pending(self.index_path), 1)
+        self.assertEqual(sorted(os.listdir(self.pending_dir)), ['9'])
+        results, _ = SearchIndex(self.index_path, refresh_interval=0).search("kinase")
+        self.assertEqual([pmid for pmid, _ in results], [1])
+
+    def test_empty_marker_removes_article(self):
+        self.queue('1', gzip.compress(b'kinase inhibitors'))
+        self.queue('2', gzip.compress(b'kinase assays'))
+        flush_pending(self.index_path)
+        queue_for_indexing(self.index_path, '2', '')
+        self.assertEqual(flush_pending(self.index_path), 1)
+
+        index = SearchIndex(self.index_path, refresh_interval=0)
+        results, _ = index.search("kinase")
+        self.assertEqual([pmid for pmid, _ in results], [1])
+        self.assertEqual(index.stats()['doc_count'], 1)
+
+class SearchArticlesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index_path = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SQLALCHEMY_TRACK_MODIFICATIONS=False,
+                               PDF_ROOT_PATH=self.index_path, SEARCH_INDEX_PATH=self.index_path)
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.index_path)
+
+    def test_articles_without_pdf_are_not_returned(self):
+        with IndexWriter(self.index_path) as writer:
+            writer.add_documents({1: tokenize("kinase inhibitors"), 2: tokenize("kinase assays")})
+        db.session.add_all([Article(pmid='1', has_pdf=True), Article(pmid='2', has_pdf=False)])
+        db.session.commit()
+
+        results, matches = search_articles("kinase")
+        self.assertEqual(([pmid for pmid, _, _ in results], matches), (['1'], 1))
+
+        remove_from_index('2')
+        self.assertEqual(os.listdir(os.path.join(self.index_path, PENDING_DIR)), ['2'])
+        self.assertEqual(flush_pending(self.index_path), 1)
+        self.assertEqual(SearchIndex(self.index_path, refresh_interval=0).search("kinase")[1], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from models import db, Article
+from commands.storage import storage_cli
+from services.storage_service import get_shard_path, link_tree, move_into_shard
+
+class ShardPathTestCase(unittest.TestCase):
+    def test_pmid_layout(self):
+        config = {'PDF_SHARD_LAYOUT': 'pmid'}
+        self.assertEqual(get_shard_path('12345678', config), 'shards/678/345/12345678')
+        self.assertEqual(get_shard_path('42', config), 'shards/042/000/42')
+        config.update(PDF_SHARD_DEPTH=1, PDF_SHARD_WIDTH=2, PDF_SHARD_DIR='by-pmid')
+        self.assertEqual(get_shard_path('12345678', config), 'by-pmid/78/12345678')
+
+    def test_hash_layout(self):
+        path = get_shard_path('12345678', {'PDF_SHARD_LAYOUT': 'hash'})
+        self.assertRegex(path, r'^shards/[0-9a-f]{2}/[0-9a-f]{2}/12345678$')
+        self.assertEqual(path, get_shard_path('12345678', {'PDF_SHARD_LAYOUT': 'hash'}))
+
+    def test_unset_and_unknown(self):
+        self.assertIsNone(get_shard_path('1', {}))
+        with self.assertRaises(ValueError):
+            get_shard_path('1', {'PDF_SHARD_LAYOUT': 'date'})
+
+class ShardMigrationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI='sqlite://',
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            PDF_ROOT_PATH=self.root,
+            PDF_SHARD_LAYOUT='pmid',
+            PMID_STATUS_ENABLED=False,
+        )
+        db.init_app(self.app)
+        self.app.cli.add_command(storage_cli)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _write_article_dir(self, relative_path, content=b'%PDF-1.4'):
+        directory = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.join(directory, 'figures'), exist_ok=True)
+        with open(os.path.join(directory, 'article.pdf'), 'wb') as f:
+            f.write(content)
+        with open(os.path.join(directory, 'figures', 'fig1.png'), 'wb') as f:
+            f.write(b'png')
+        return directory
+
+    def test_link_tree_is_repeatable(self):
+        source = self._write_article_dir('old/1')
+        target = os.path.join(self.root, 'new', '1')
+        link_tree(source, target)
+        link_tree(source, target)
+        self.assertTrue(os.path.samefile(os.path.join(source, 'article.pdf'), os.path.join(target, 'article.pdf')))
+        self.assertTrue(os.path.exists(os.path.join(target, 'figures', 'fig1.png')))
+
+    def test_move_into_existing_shard(self):
+        move_into_shard(self._write_article_dir('crawl/7'), 'shards/007/000/7')
+        target = move_into_shard(self._write_article_dir('crawl/7', b'%PDF-1.7'), 'shards/007/000/7')
+        with open(os.path.join(target, 'article.pdf'), 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.7')
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'crawl', '7')))
+
+    def test_migrate_layout(self):
+        self._write_article_dir('2020/12345678')
+        db.session.add_all([
+            Article(pmid='12345678', relative_path='2020/12345678', has_pdf=True),
+            Article(pmid='99', relative_path='missing/99', has_pdf=True),
+            Article(pmid='100', has_pdf=False),
+        ])
+        db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=['storage', 'migrate-layout', '--grace', '0'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('1 directories moved', result.output)
+        self.assertEqual(Article.query.filter_by(pmid='12345678').one().relative_path, 'shards/678/345/12345678')
+        self.assertEqual(Article.query.filter_by(pmid='99').one().relative_path, 'missing/99')
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'shards', '678', '345', '12345678', 'article.pdf')))
+        self.assertFalse(os.path.exists(os.path.join(self.root, '2020')))
+
+        # Only the missing directory is left
+        result = self.app.test_cli_runner().invoke(args=['storage', 'migrate-layout', '--dry-run'])
+        self.assertIn('Done: 1 directories to move', result.output)
+
+if __name__ == '__main__':
+    unittest.main()
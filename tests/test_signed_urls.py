@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from flask import Flask
+from api.downloads import downloads_bp
+from services.download_url_service import create_download_url
+from utils.signed_url import make_expiry, sign_path, verify_signature
+
+class SignedUrlTestCase(unittest.TestCase):
+    def test_sign_and_verify(self):
+        signature = sign_path('secret', 'ab/cd/file.pdf', 2000)
+        self.assertTrue(verify_signature(['secret'], 'ab/cd/file.pdf', '2000', signature, now=1000))
+        self.assertTrue(verify_signature(['new', 'secret'], 'ab/cd/file.pdf', '2000', signature, now=1000))
+        self.assertFalse(verify_signature(['secret'], 'ab/cd/file.pdf', '2000', signature, now=2001))
+        self.assertFalse(verify_signature(['secret'], 'ab/cd/other.pdf', '2000', signature, now=1000))
+        self.assertFalse(verify_signature(['secret'], 'ab/cd/file.pdf', '2001', signature, now=1000))
+        self.assertFalse(verify_signature(['secret'], 'ab/cd/file.pdf', 'x', signature, now=1000))
+        self.assertFalse(verify_signature(['secret'], 'ab/cd/file.pdf', '2000', 'é', now=1000))
+
+    def test_expiry_rounding(self):
+        self.assertEqual(make_expiry(3600, 300, now=1000), 4800)
+        self.assertEqual(make_expiry(3600, 300, now=1200), 4800)
+        self.assertEqual(make_expiry(3600, 0, now=1000.5), 4601)
+
+class DownloadRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, '123'))
+        self.pdf_path = os.path.join(self.root, '123', 'article.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4 test')
+        self.app = Flask(__name__)
+        self.app.config.update(PDF_ROOT_PATH=self.root, SECRET_KEY='secret', SERVER_NAME='pdf.example.org')
+        self.app.register_blueprint(downloads_bp, url_prefix='/files')
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_signed_url_serves_file(self):
+        with self.app.app_context():
+            download = create_download_url(self.pdf_path)
+        response = self.client.get(download['url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'%PDF-1.4 test')
+        self.assertIn('public', response.headers['Cache-Control'])
+
+    def test_rejects_tampered_and_expired_urls(self):
+        with self.app.app_context():
+            url = create_download_url(self.pdf_path)['url']
+        self.assertEqual(self.client.get(url.replace('123/', '124/')).status_code, 403)
+        signature = sign_path('secret', '123/article.pdf', int(time.time()) - 1)
+        expired = f'/files/123/article.pdf?expires={int(time.time()) - 1}&sig={signature}'
+        self.assertEqual(self.client.get(expired).status_code, 403)
+        signature = sign_path('secret', '../x.pdf', int(time.time()) + 60)
+        self.assertEqual(self.client.get(f'/files/../x.pdf?expires={int(time.time()) + 60}&sig={signature}').status_code, 403)
+
+    def test_base_url(self):
+        self.app.config['SIGNED_URL_BASE'] = 'https://cdn.example.org/pdfs/'
+        with self.app.app_context():
+            url = create_download_url(self.pdf_path)['url']
+        self.assertTrue(url.startswith('https://cdn.example.org/pdfs/123/article.pdf?expires='))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from flask import Flask
+from models import db, Article
+from commands.storage import storage_cli
+from services.storage_service import (
+    _replace_with_link, compute_content_hash, get_blob_path, ingest_pdf, resolve_pdf_path
+)
+
+class ContentAddressedStorageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI='sqlite://',
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            PDF_ROOT_PATH=self.root,
+            PDF_STORAGE_LAYOUT='content_addressed',
+            PMID_STATUS_ENABLED=False,
+        )
+        db.init_app(self.app)
+        self.app.cli.add_command(storage_cli)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _write_pdf(self, pmid, content):
+        directory = os.path.join(self.root, pmid)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'article.pdf')
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_identical_bytes_share_one_blob(self):
+        first = self._write_pdf('1', b'%PDF-1.4 same')
+        second = self._write_pdf('2', b'%PDF-1.4 same')
+        info = ingest_pdf(first)
+        self.assertEqual(ingest_pdf(second), info)
+        self.assertEqual(info, dict(zip(('content_hash', 'size'), compute_content_hash(first))))
+
+        blob_path = get_blob_path(info['content_hash'])
+        self.assertTrue(os.path.samefile(first, blob_path))
+        self.assertTrue(os.path.samefile(second, blob_path))
+        # Ingesting again is a no-op
+        self.assertEqual(ingest_pdf(first), info)
+
+    def test_pointer_mode_and_fallback_to_blob(self):
+        self.app.config['PDF_BLOB_LINK_MODE'] = 'pointer'
+        path = self._write_pdf('3', b'%PDF-1.4 pointer')
+        info = ingest_pdf(path)
+        self.assertFalse(os.path.exists(path))
+        article = Article(pmid='3', relative_path='3', content_hash=info['content_hash'])
+        self.assertEqual(resolve_pdf_path(article), get_blob_path(info['content_hash']))
+
+        # The legacy layout only knows the per-PMID path
+        self.app.config['PDF_STORAGE_LAYOUT'] = 'legacy'
+        self.assertEqual(resolve_pdf_path(article), path)
+        self.assertIsNone(resolve_pdf_path(Article(pmid='4')))
+
+    def test_legacy_entry_wins_over_blob(self):
+        path = self._write_pdf('5', b'%PDF-1.4 legacy')
+        article = Article(pmid='5', relative_path='5', content_hash='0' * 64)
+        self.assertEqual(resolve_pdf_path(article), path)
+
+    def test_concurrent_links_to_one_target(self):
+        source = self._write_pdf('6', b'%PDF-1.4 link')
+        target = os.path.join(self.root, 'target.pdf')
+        errors = []
+
+        def link():
+            try:
+                for _ in range(50):
+                    _replace_with_link(source, target)
+            except OSError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=link) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertTrue(os.path.samefile(source, target))
+
+    def test_migrate_cas(self):
+        for pmid in ('7', '8'):
+            self._write_pdf(pmid, b'%PDF-1.4 duplicate')
+        db.session.add_all([Article(pmid=pmid, has_pdf=True, relative_path=pmid) for pmid in ('7', '8', '9')])
+        db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=['storage', 'migrate-cas', '--workers', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('2 files, 1 duplicates', result.output)
+        self.assertIn('1 missing files', result.output)
+        hashes = {article.pmid: article.content_hash for article in Article.query.all()}
+        self.assertEqual(hashes['7'], hashes['8'])
+        self.assertIsNone(hashes['9'])
+        self.assertTrue(os.path.samefile(os.path.join(self.root, '7', 'article.pdf'),
+                                         os.path.join(self.root, '8', 'article.pdf')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from config import Config
+from app import create_app
+from models import db, Article
+from services import text_service
+from services.db_service import get_article_by_pmid
+from services.storage_service import compute_content_hash
+from utils import text_utils
+from utils.text_utils import (
+    EXTRACTOR_VERSION, TEXT_FILE_NAME, TEXT_META_FILE_NAME, TextExtractionError, extract_to_file, read_text_meta
+)
+
+
+def make_pdf(*lines):
+    """Build a one-page PDF showing each line of text"""
+    stream = b"BT /F1 12 Tf 72 720 Td 14 TL " + b" ".join(
+        b"(" + line.encode('latin-1') + b") '" for line in lines) + b" ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += str(number).encode() + b" 0 obj\n" + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer << /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+
+class ExtractToFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.text_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.text_dir, 'article.pdf')
+        with open(self.pdf_path, 'wb') as f:
+            f.write(make_pdf('Aspirin lowers fever', 'in adults'))
+
+    def tearDown(self):
+        shutil.rmtree(self.text_dir)
+
+    def test_text_and_stamp_are_written(self):
+        meta = extract_to_file(self.pdf_path, self.text_dir, {'content_hash': 'abc', 'size': 42})
+
+        with gzip.open(os.path.join(self.text_dir, TEXT_FILE_NAME), 'rt', encoding='utf-8') as f:
+            text = f.read()
+        self.assertIn('Aspirin lowers fever', text)
+        self.assertIn('in adults', text)
+        self.assertEqual(read_text_meta(self.text_dir), meta)
+        self.assertEqual((meta['version'], meta['content_hash'], meta['size'], meta['pages'], meta['chars']),
+                         (EXTRACTOR_VERSION, 'abc', 42, 1, len(text)))
+        self.assertEqual(sorted(os.listdir(self.text_dir)), ['article.pdf', TEXT_FILE_NAME, TEXT_META_FILE_NAME])
+
+    def test_unreadable_stamp(self):
+        self.assertIsNone(read_text_meta(self.text_dir))
+        with open(os.path.join(self.text_dir, TEXT_META_FILE_NAME), 'w') as f:
+            f.write('{"version"')
+        self.assertIsNone(read_text_meta(self.text_dir))
+
+
+class TextServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+        class TestConfig(type(Config)):
+            SQLALCHEMY_DATABASE_URI = 'sqlite://'
+            PDF_ROOT_PATH = os.path.join(self.work_dir, 'pdfs')
+            API_KEY_STATE_DIR = os.path.join(self.work_dir, 'state')
+            API_KEYS = ['key']
+            PMID_STATUS_ENABLED = False
+            ACCESS_STATS_ENABLED = False
+            PDF_VERIFY_ENABLED = False
+            SEARCH_INDEX_ENABLED = False
+            PDF_COLD_STORAGE = {'type': 'directory', 'root': os.path.join(self.work_dir, 'cold')}
+            TEXT_EXTRACTION_WAIT = 10
+
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        # Extract in threads: the process pool runs the same extract_to_file
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        patcher = mock.patch.object(text_service, '_get_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.pool.shutdown()
+        db.session.remove()
+        self.context.pop()
+        shutil.rmtree(self.work_dir)
+
+    def _add_article(self, pmid, *lines, legacy=False):
+        pdf_dir = os.path.join(self.work_dir, 'pdfs', pmid)
+        os.makedirs(pdf_dir)
+        pdf_path = os.path.join(pdf_dir, 'article.pdf')
+        with open(pdf_path, 'wb') as f:
+            f.write(make_pdf(*lines))
+        content_hash, size = (None, None) if legacy else compute_content_hash(pdf_path)
+        article = Article(pmid=pmid, has_pdf=True, relative_path=pmid, content_hash=content_hash, size=size)
+        db.session.add(article)
+        db.session.commit()
+        return article
+
+    def test_text_is_extracted_once(self):
+        article = self._add_article('1', 'Cached text')
+        self.assertIsNone(text_service.get_current_text_path(article))
+
+        self.assertIn('Cached text', text_service.read_article_text(article, timeout=10))
+        text_path = text_service.get_current_text_path(article)
+        self.assertEqual(text_path, os.path.join(self.work_dir, 'pdfs', '1', TEXT_FILE_NAME))
+
+        with mock.patch.object(text_service, 'submit_extraction') as submit:
+            self.assertEqual(text_service.get_article_text_path(article), text_path)
+        submit.assert_not_called()
+        self.assertEqual(''.join(text_service.iter_article_text(article, chunk_size=3, max_length=6)), 'Cached')
+
+    def test_extractor_version_change_reextracts(self):
+        article = self._add_article('1', 'Versioned text')
+        text_service.get_article_text_path(article, timeout=10)
+        self.assertEqual(read_text_meta(text_service.get_text_dir(article))['version'], EXTRACTOR_VERSION)
+
+        with mock.patch.object(text_utils, 'EXTRACTOR_VERSION', EXTRACTOR_VERSION + 1), \
+                mock.patch.object(text_service, 'EXTRACTOR_VERSION', EXTRACTOR_VERSION + 1):
+            self.assertIsNone(text_service.get_current_text_path(article))
+            text_service.get_article_text_path(article, timeout=10)
+            self.assertEqual(read_text_meta(text_service.get_text_dir(article))['version'], EXTRACTOR_VERSION + 1)
+            self.assertIsNotNone(text_service.get_current_text_path(article))
+
+    def test_changed_pdf_reextracts(self):
+        article = self._add_article('1', 'Old text')
+        text_service.get_article_text_path(article, timeout=10)
+
+        with open(os.path.join(self.work_dir, 'pdfs', '1', 'article.pdf'), 'wb') as f:
+            f.write(make_pdf('New text'))
+        article.content_hash, article.size = compute_content_hash(os.path.join(self.work_dir, 'pdfs', '1', 'article.pdf'))
+        self.assertIsNone(text_service.get_current_text_path(article))
+        self.assertIn('New text', text_service.read_article_text(article, timeout=10))
+
+    def test_get_text_route(self):
+        article = self._add_article('1', 'Served text')
+        headers = {'X-API-Key': 'key', 'Accept-Encoding': 'identity'}
+
+        response = self.client.get('/api/text/1', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/plain')
+        self.assertIn('Served text', response.get_data(as_text=True))
+        self.assertEqual(response.headers['ETag'], f'"{article.content_hash}-text-v{EXTRACTOR_VERSION}"')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+
+        response = self.client.get('/api/text/1', headers={'X-API-Key': 'key', 'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Served text', gzip.decompress(response.get_data()).decode('utf-8'))
+
+        response = self.client.get('/api/text/2', headers=headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json['code'], 'PDF_NOT_AVAILABLE')
+
+    def test_legacy_article_etag_uses_text_file(self):
+        self._add_article('1', 'Legacy text', legacy=True)
+
+        response = self.client.get('/api/text/1', headers={'X-API-Key': 'key'})
+        self.assertEqual(response.status_code, 200)
+        stat = os.stat(os.path.join(self.work_dir, 'pdfs', '1', TEXT_FILE_NAME))
+        self.assertEqual(response.headers['ETag'], f'"{stat.st_size}-{stat.st_mtime_ns}-text-v{EXTRACTOR_VERSION}"')
+        with open(os.path.join(self.work_dir, 'pdfs', '1', TEXT_META_FILE_NAME)) as f:
+            self.assertIsNone(json.load(f)['content_hash'])
+
+    def test_cold_pdf_is_pulled_once_by_the_job(self):
+        article = self._add_article('1', 'Cold text')
+        hot_path = os.path.join(self.work_dir, 'pdfs', '1', 'article.pdf')
+        os.makedirs(os.path.join(self.work_dir, 'cold', '1'))
+        shutil.move(hot_path, os.path.join(self.work_dir, 'cold', '1', 'article.pdf'))
+
+        with mock.patch.object(text_service, 'open_cold_pdf', wraps=text_service.open_cold_pdf) as open_cold:
+            first = text_service.submit_extraction(article)
+            self.assertIs(text_service.submit_extraction(article), first)
+            first.result(timeout=10)
+        self.assertEqual(open_cold.call_count, 1)
+        self.assertTrue(os.path.exists(hot_path))
+        self.assertIn('Cold text', text_service.read_article_text(article))
+
+    def test_missing_pdf_fails_the_job(self):
+        article = self._add_article('1', 'Gone')
+        os.remove(os.path.join(self.work_dir, 'pdfs', '1', 'article.pdf'))
+
+        with self.assertRaises(TextExtractionError):
+            text_service.submit_extraction(article).result(timeout=10)
+
+    def test_pending_extraction_answers_202(self):
+        self._add_article('1', 'Slow text')
+        self.app.config['TEXT_EXTRACTION_WAIT'] = 0
+
+        with mock.patch.object(text_service, '_start_extraction') as start:
+            response = self.client.get('/api/text/1', headers={'X-API-Key': 'key'})
+        start.assert_called_once()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json['code'], 'TEXT_EXTRACTION_PENDING')
+        self.assertEqual(response.headers['Retry-After'], '10')
+        text_service._forget(text_service.get_text_dir(get_article_by_pmid('1')))
+
+    def test_unparseable_pdf(self):
+        article = self._add_article('1', 'Broken')
+        with open(os.path.join(self.work_dir, 'pdfs', '1', 'article.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4 not really')
+
+        response = self.client.get('/api/text/1', headers={'X-API-Key': 'key'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json['code'], 'TEXT_EXTRACTION_FAILED')
+        self.assertIsNone(text_service.get_current_text_path(article))
+
+
+if __name__ == '__main__':
+    unittest.main()
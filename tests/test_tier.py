@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask
+from models import Article
+from services import tier_service
+from services.tier_service import evict_hot_tier, open_cold_pdf, replicate_to_cold
+
+class DirectoryTierTestCase(unittest.TestCase):
+    def setUp(self):
+        self.hot = tempfile.mkdtemp()
+        self.cold = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            PDF_ROOT_PATH=self.hot,
+            PDF_COLD_STORAGE={'type': 'directory', 'root': self.cold},
+            PDF_HOT_TIER_QUOTA_BYTES=250,
+            PDF_HOT_TIER_LOW_WATERMARK=0.9,
+            PDF_HOT_TIER_EVICT_INTERVAL=0,
+        )
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        # Run background work inline
+        patcher = mock.patch.object(tier_service, '_submit', lambda app, fn, *args: fn(app, *args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.app_context.pop()
+        shutil.rmtree(self.hot, ignore_errors=True)
+        shutil.rmtree(self.cold, ignore_errors=True)
+
+    def _write_hot(self, pmid, content, atime=None):
+        os.makedirs(os.path.join(self.hot, pmid), exist_ok=True)
+        path = os.path.join(self.hot, pmid, 'article.pdf')
+        with open(path, 'wb') as f:
+            f.write(content)
+        if atime is not None:
+            os.utime(path, (atime, os.stat(path).st_mtime))
+        return path
+
+    def test_replicate(self):
+        self._write_hot('1', b'%PDF-1.4 one')
+        replicate_to_cold(Article(pmid='1', relative_path='1'))
+        with open(os.path.join(self.cold, '1', 'article.pdf'), 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 one')
+
+    def test_replication_evicts_below_low_watermark(self):
+        # The oldest file is not in the cold tier yet, so the next oldest goes
+        paths = [self._write_hot(pmid, b'x' * 100, atime=1000 + i) for i, pmid in enumerate(('1', '2', '3'))]
+        for pmid in ('2', '3'):
+            replicate_to_cold(Article(pmid=pmid, relative_path=pmid))
+        self.assertEqual([os.path.exists(path) for path in paths], [True, False, True])
+        self.assertEqual(evict_hot_tier(), {'usage': 200, 'evicted': 0, 'freed': 0})
+
+    def test_scan_runs_only_over_quota_and_interval(self):
+        with mock.patch.object(tier_service, '_scan_hot_files', wraps=tier_service._scan_hot_files) as scan:
+            # The first write measures the hot tier, later ones add to the running total
+            for pmid in ('1', '2'):
+                self._write_hot(pmid, b'x' * 100, atime=1000 + int(pmid))
+                replicate_to_cold(Article(pmid=pmid, relative_path=pmid))
+            self.assertEqual(scan.call_count, 1)
+
+            self.app.config['PDF_HOT_TIER_EVICT_INTERVAL'] = 300
+            self._write_hot('3', b'x' * 100, atime=1003)
+            replicate_to_cold(Article(pmid='3', relative_path='3'))
+            self.assertEqual(scan.call_count, 1)
+            with open(os.path.join(self.hot, tier_service.USAGE_FILE)) as f:
+                self.assertEqual(f.read(), '300')
+
+            self.app.config['PDF_HOT_TIER_EVICT_INTERVAL'] = 0
+            tier_service._evict_if_needed(self.app)
+            self.assertEqual(scan.call_count, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.hot, '1', 'article.pdf')))
+        with open(os.path.join(self.hot, tier_service.USAGE_FILE)) as f:
+            self.assertEqual(f.read(), '200')
+
+    def test_cold_hit_is_promoted(self):
+        path = self._write_hot('4', b'%PDF-1.4 cold')
+        article = Article(pmid='4', relative_path='4', has_pdf=True)
+        replicate_to_cold(article)
+        os.remove(path)
+
+        chunks, size = open_cold_pdf(article)
+        self.assertEqual(size, len(b'%PDF-1.4 cold'))
+        self.assertEqual(b''.join(chunks), b'%PDF-1.4 cold')
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 cold')
+        self.assertIsNone(open_cold_pdf(Article(pmid='5', relative_path='5')))
+
+if __name__ == '__main__':
+    unittest.main()
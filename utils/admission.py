@@ -0,0 +1,186 @@
+"""
+Admission control for cache misses
+
+A hit is served in milliseconds, but a miss holds its request thread until
+the download finishes. When misses arrive faster than the upstreams deliver
+them they take every thread, hits queue behind them and latency grows until
+gunicorn kills the worker. The controller admits a request that would start
+a download only while fewer than `limit` requests of the worker wait on
+downloads and fewer than `max_in_flight` requests are in progress, so some
+threads stay free for hits; other misses fail at once with Overloaded, and
+hits are never checked.
+
+The limit adapts to queue delay, as in CoDel: delay samples are collected
+per source (the wait of the oldest queued download, the time requests spent
+in the proxy and gunicorn queues) for `interval` seconds. If the smallest
+sample of a source exceeded `target_delay`, that queue never drained during
+the interval, which is a standing queue rather than a burst, and the limit
+is multiplied by `decrease`. Otherwise it grows by a tenth (at least one)
+back towards `max_waiting`.
+"""
+
+import math
+import time
+import threading
+from collections import Counter
+
+REASON_IN_FLIGHT = 'in_flight'
+REASON_WAITING = 'waiting'
+
+SOURCE_DOWNLOAD_QUEUE = 'download_queue'
+SOURCE_REQUEST_QUEUE = 'request_queue'
+
+
+class Overloaded(Exception):
+    """Raised instead of starting a download while the worker sheds load"""
+
+    def __init__(self, message, reason, retry_after):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def parse_request_start(value, now=None):
+    """
+    Get the queue time of a request from a proxy's X-Request-Start header
+
+    Args:
+        value (str): Header value, e.g. 't=1700000000.123' (nginx ${msec}), or
+            an epoch time in seconds, milliseconds or microseconds
+        now (float, optional): Current epoch time, defaults to time.time()
+
+    Returns:
+        float: Seconds since the proxy received the request, None if the value is malformed
+    """
+    if not value:
+        return None
+    try:
+        started = float(value.strip().lstrip('t='))
+    except ValueError:
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    now = time.time() if now is None else now
+    # Clocks of proxy and app host may differ slightly
+    return max(0.0, now - started)
+
+
+class AdmissionController:
+    """Per-worker limit on requests waiting for downloads, adapted to queue delay"""
+
+    def __init__(self, max_waiting, max_in_flight=None, min_waiting=1, target_delay=1.0, interval=5.0,
+                 decrease=0.5, retry_after=5, clock=time.monotonic):
+        """
+        Args:
+            max_waiting (int): Upper bound of the limit on requests waiting for downloads
+            max_in_flight (int, optional): Requests in progress, this one included, at which misses are refused
+            min_waiting (int): Lower bound of the limit, so downloads keep making progress
+            target_delay (float): Acceptable standing queue delay in seconds
+            interval (float): Seconds per delay window and limit update
+            decrease (float): Factor applied to the limit after a window above the target
+            retry_after (float): Minimum Retry-After of refused requests
+            clock (callable): Monotonic clock
+        """
+        self.max_waiting = max(1, max_waiting)
+        self.min_waiting = min(max(1, min_waiting), self.max_waiting)
+        self.max_in_flight = max_in_flight
+        self.target_delay = target_delay
+        self.interval = interval
+        self.decrease = decrease
+        self.retry_after = retry_after
+        self.clock = clock
+        self.limit = float(self.max_waiting)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = Counter()
+        self.delay = 0.0
+        self._lock = threading.Lock()
+        self._window_start = clock()
+        self._window_min = {}
+
+    def _roll(self, now):
+        """Close the delay window and adapt the limit once it is over; caller holds the lock"""
+        if now - self._window_start < self.interval:
+            return
+        # Without samples (no misses, no header) nothing is queued
+        self.delay = max(self._window_min.values(), default=0.0)
+        if self.delay > self.target_delay:
+            self.limit = max(float(self.min_waiting), self.limit * self.decrease)
+        else:
+            self.limit = min(float(self.max_waiting), self.limit + max(1.0, self.limit / 10))
+        self._window_start = now
+        self._window_min = {}
+
+    def record_delay(self, source, seconds):
+        """
+        Add a queue delay sample
+
+        Args:
+            source (str): Queue the sample comes from, e.g. SOURCE_DOWNLOAD_QUEUE
+            seconds (float): Time spent waiting in the queue
+        """
+        with self._lock:
+            self._roll(self.clock())
+            current = self._window_min.get(source)
+            if current is None or seconds < current:
+                self._window_min[source] = seconds
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def acquire(self, check=True):
+        """
+        Count a request that waits for a download
+
+        Args:
+            check (bool): Refuse it when overloaded; False for requests joining a running download
+
+        Raises:
+            Overloaded: If the worker is at its in-flight or waiting limit
+        """
+        with self._lock:
+            self._roll(self.clock())
+            if check:
+                reason = None
+                if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+                    reason = REASON_IN_FLIGHT
+                elif self.waiting >= int(self.limit):
+                    reason = REASON_WAITING
+                if reason is not None:
+                    self.rejected[reason] += 1
+                    retry_after = max(self.retry_after, math.ceil(self.delay))
+                    raise Overloaded(f"Server overloaded ({self.waiting} requests waiting for downloads, "
+                                     f"{self.in_flight} in flight), retry in {retry_after}s", reason, retry_after)
+            self.waiting += 1
+            self.admitted += 1
+
+    def release(self):
+        """End a request counted by acquire()"""
+        with self._lock:
+            self.waiting -= 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Current limit, waiting and in-flight requests, admitted and rejected counts, last window delay
+        """
+        with self._lock:
+            self._roll(self.clock())
+            return {
+                'limit': int(self.limit),
+                'max_waiting': self.max_waiting,
+                'max_in_flight': self.max_in_flight,
+                'waiting': self.waiting,
+                'in_flight': self.in_flight,
+                'admitted': self.admitted,
+                'rejected': dict(self.rejected),
+                'delay': round(self.delay, 3),
+            }
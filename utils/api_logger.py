@@ -15,13 +15,16 @@ class ApiLogger:
     
     Log format follows the standard:
     [TIMESTAMP] [LOG_LEVEL] [APP_NAME] REQUEST_URL=... REQUEST_METHOD=... REQUEST_DATA={...} MESSAGE=...
-    [TIMESTAMP] [LOG_LEVEL] [APP_NAME] MESSAGE=响应 Info: Path:..., Query:..., Json:... Runtime:...
+    [TIMESTAMP] [LOG_LEVEL] [APP_NAME] MESSAGE=响应 Info: Path:..., Query:..., Json:... Runtime:... Status:... [Cache:...]
+    
+    Cache is the X-Cache header (hit or miss) of PDF responses; see utils.log_analysis.
     """
     
     def __init__(self, app=None, log_dir='logs', app_name='pmid-pdf-api'):
         self.log_dir = log_dir
         self.logger = None
         self.app_name = app_name
+        self.skip_prefixes = ('/static',)
         
         if app:
             self.init_app(app)
@@ -32,6 +35,10 @@ class ApiLogger:
         if not os.path.exists(self.log_dir):
             os.makedirs(self.log_dir)
         
+        # Signed downloads and probes are served without logging, like static files
+        self.skip_prefixes = ('/static', app.config.get('SIGNED_URL_PREFIX', '/files') + '/',
+                              app.config.get('API_PREFIX', '/api') + '/health/')
+        
         # Set up logger
         self.logger = logging.getLogger('api_logger')
         self.logger.setLevel(logging.INFO)
@@ -79,7 +86,7 @@ class ApiLogger:
     def _before_request(self):
         """Log request information before processing"""
         # Skip logging for static files
-        if request.path.startswith('/static'):
+        if request.path.startswith(self.skip_prefixes):
             return
         
         # Store start time for duration calculation
@@ -117,7 +124,7 @@ class ApiLogger:
     def _after_request(self, response):
         """Log response information after processing"""
         # Skip logging for static files
-        if request.path.startswith('/static'):
+        if request.path.startswith(self.skip_prefixes):
             return response
         
         # Ensure handlers are up to date with current date
@@ -144,9 +151,14 @@ class ApiLogger:
             # Get client IP address
             client_ip = request.remote_addr
             
+            # Outcome fields for log analysis
+            outcome = f"Status: {response.status_code}"
+            if response.headers.get('X-Cache'):
+                outcome += f" Cache: {response.headers['X-Cache']}"
+            
             # Format log entry according to the specified format
             timestamp = datetime.datetime.now().isoformat()
-            log_message = f"[{timestamp}] [INFO] [{self.app_name}] MESSAGE=Response Info: IP: {client_ip}, Path: {request.path}, Query: {json.dumps(query_params)}, Json: {response_body} Runtime: {duration:.3f}"
+            log_message = f"[{timestamp}] [INFO] [{self.app_name}] MESSAGE=Response Info: IP: {client_ip}, Path: {request.path}, Query: {json.dumps(query_params)}, Json: {response_body} Runtime: {duration:.3f} {outcome}"
             
             # Log the formatted message
             self.logger.info(log_message)
@@ -0,0 +1,161 @@
+"""
+Circuit breakers for upstream services
+
+A breaker tracks the outcome of the most recent calls to one upstream. Once
+at least `min_calls` of the last `window` calls were made and the share of
+failures reaches `error_rate`, it opens: calls fail immediately with
+CircuitOpenError instead of waiting for the upstream to time out. After
+`open_seconds` it turns half-open and lets `half_open_probes` calls through;
+a successful probe closes it, a failed one opens it again for twice as long,
+up to `max_open_seconds`.
+"""
+
+import time
+import threading
+from collections import deque, Counter
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"Circuit open for upstream {upstream}, retry in {retry_after:.0f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker with half-open probes"""
+
+    def __init__(self, name, window=20, min_calls=10, error_rate=0.5, open_seconds=30,
+                 max_open_seconds=300, half_open_probes=1, clock=time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._open_seconds = open_seconds
+        self._open_until = 0.0
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+        self.failures = Counter()
+
+    def allow(self):
+        """
+        Check whether a call may be made now
+
+        Returns:
+            bool: True if the call is a half-open probe, False for a regular call
+
+        Raises:
+            CircuitOpenError: If the breaker is open or all probes are in flight
+        """
+        with self._lock:
+            now = self.clock()
+            if self.state == OPEN and now >= self._open_until:
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(1.0, self._open_until - now))
+
+    def check(self):
+        """
+        Fail if calls are rejected now, without taking a half-open probe
+
+        Raises:
+            CircuitOpenError: If the breaker is open and not yet due for probing
+        """
+        with self._lock:
+            now = self.clock()
+            if self.state == OPEN and now < self._open_until:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, max(1.0, self._open_until - now))
+
+    def record(self, success, category=None, probe=False):
+        """
+        Record the outcome of a call allowed by allow()
+
+        Args:
+            success (bool): Whether the upstream answered normally
+            category (str): Failure class, counted in the metrics
+            probe (bool): Value returned by allow() for this call
+        """
+        with self._lock:
+            if not success:
+                self.failures[category or 'error'] += 1
+            if probe:
+                self._probes -= 1
+                if self.state != HALF_OPEN:
+                    return
+                if success:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    self._open_seconds = self.base_open_seconds
+                else:
+                    self._open_seconds = min(self._open_seconds * 2, self.max_open_seconds)
+                    self._trip()
+                return
+            if self.state != CLOSED:
+                return
+            self._outcomes.append(success)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._outcomes.count(False) / calls >= self.error_rate:
+                self._trip()
+
+    def _trip(self):
+        self.state = OPEN
+        self._open_until = self.clock() + self._open_seconds
+        self.opened += 1
+
+    def snapshot(self):
+        """
+        Current state and counters for metrics
+
+        Returns:
+            dict: State, recent error rate, seconds until half-open, open and reject counts, failures per class
+        """
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'recent_calls': calls,
+                'recent_error_rate': round(self._outcomes.count(False) / calls, 3) if calls else 0.0,
+                'retry_in': round(max(0.0, self._open_until - self.clock()), 1) if self.state == OPEN else None,
+                'opened': self.opened,
+                'rejected': self.rejected,
+                'failures': dict(self.failures),
+            }
+
+
+class BreakerRegistry:
+    """Breakers created on demand per upstream name with shared settings"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(name, **self.settings))
+        return breaker
+
+    def snapshot(self):
+        return {name: breaker.snapshot() for name, breaker in sorted(self._breakers.items())}
@@ -0,0 +1,106 @@
+"""
+Request deadlines
+
+A Deadline is the time budget of a request. It is handed from the route to
+the download it waits for; the thread running the download makes it
+current with deadline_scope(), and the outbound transport hook checks
+current_deadline() before each request, so a crawl whose deadline passed
+stops at its next HTTP request instead of running until the worker is killed.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passed before its download finished"""
+
+    def __init__(self, message, continuing=False):
+        super().__init__(message)
+        self.continuing = continuing
+
+
+class Deadline:
+    """Point in time after which work for a request is no longer wanted"""
+
+    def __init__(self, seconds=None, clock=time.monotonic):
+        """
+        Args:
+            seconds (float): Budget from now, None for no deadline
+            clock (callable): Monotonic clock
+        """
+        self.clock = clock
+        self.expires_at = None if seconds is None else clock() + seconds
+
+    def remaining(self):
+        """Seconds left, None without a deadline"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        return self.expires_at is not None and self.clock() >= self.expires_at
+
+    def check(self):
+        """
+        Raises:
+            DeadlineExceeded: If the deadline passed
+        """
+        if self.expired():
+            raise DeadlineExceeded("Request deadline exceeded")
+
+    def extend(self, other):
+        """
+        Extend this deadline to also cover another waiter's
+
+        Args:
+            other (Deadline): Deadline of the other waiter, None if it waits without one
+        """
+        if other is None or other.expires_at is None:
+            self.expires_at = None
+        elif self.expires_at is not None:
+            self.expires_at = max(self.expires_at, other.expires_at)
+
+
+def parse_deadline(value, default, maximum):
+    """
+    Build a request's deadline from the seconds a client asked for
+
+    Args:
+        value (str): Header value in seconds, or None
+        default (float): Budget if the client sent none, None for no deadline
+        maximum (float): Upper bound of any budget, None for no bound
+
+    Returns:
+        Deadline: Deadline, or None if the request has none
+
+    Raises:
+        ValueError: If the value is not a positive number
+    """
+    seconds = default
+    if value:
+        seconds = float(value)
+        if not seconds > 0:
+            raise ValueError(f"Deadline must be a positive number of seconds: {value}")
+    if maximum is not None:
+        seconds = maximum if seconds is None else min(seconds, maximum)
+    return None if seconds is None else Deadline(seconds)
+
+
+def current_deadline():
+    """Deadline of the work running in this thread, or None"""
+    return getattr(_local, 'deadline', None)
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """Make a deadline current in this thread while the block runs"""
+    previous = current_deadline()
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
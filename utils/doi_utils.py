@@ -0,0 +1,24 @@
+"""
+DOI utilities
+"""
+
+import re
+
+_DOI_PREFIX = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+
+
+def normalize_doi(doi):
+    """
+    Normalize a DOI for storage and comparison
+
+    DOIs are case-insensitive, so they are lowercased; URL and 'doi:'
+    prefixes are removed.
+
+    Args:
+        doi (str): DOI as given by a client or in crawler metadata
+
+    Returns:
+        str: Normalized DOI, or None if it is not a DOI
+    """
+    doi = _DOI_PREFIX.sub('', (doi or '').strip()).lower()
+    return doi if doi.startswith('10.') and '/' in doi else None
@@ -31,11 +31,15 @@ class ErrorCodes(Enum):
     ARTICLE_NOT_FOUND = (1200, "ARTICLE_NOT_FOUND")
     PDF_NOT_AVAILABLE = (1201, "PDF_NOT_AVAILABLE")
     PDF_DOWNLOAD_FAILED = (1202, "PDF_DOWNLOAD_FAILED")
+    TEXT_EXTRACTION_FAILED = (1203, "TEXT_EXTRACTION_FAILED")
+    TEXT_EXTRACTION_PENDING = (1204, "TEXT_EXTRACTION_PENDING")
+    PDF_DOWNLOAD_PENDING = (1205, "PDF_DOWNLOAD_PENDING")
     
     # Request errors (1400-1499)
     INVALID_REQUEST = (1400, "INVALID_REQUEST")
     MISSING_PARAMETER = (1401, "MISSING_PARAMETER")
     INVALID_PARAMETER = (1402, "INVALID_PARAMETER")
+    DEADLINE_EXCEEDED = (1403, "DEADLINE_EXCEEDED")
     
     # External service errors (1300-1399)
     PUBMED_SERVICE_ERROR = (1300, "PUBMED_SERVICE_ERROR")
@@ -43,6 +47,8 @@ class ErrorCodes(Enum):
     
     # Internal server errors (9000-9999)
     INTERNAL_SERVER_ERROR = (9000, "INTERNAL_SERVER_ERROR")
+    SERVICE_UNAVAILABLE = (9001, "SERVICE_UNAVAILABLE")
+    SERVICE_OVERLOADED = (9002, "SERVICE_OVERLOADED")
     
     def __init__(self, code: int, identifier: str):
         self.code = code
@@ -80,12 +86,18 @@ class ErrorCodes(Enum):
             cls.ARTICLE_NOT_FOUND: "Article not found",
             cls.PDF_NOT_AVAILABLE: "PDF not available for this article",
             cls.PDF_DOWNLOAD_FAILED: "Failed to download PDF",
+            cls.TEXT_EXTRACTION_FAILED: "Failed to extract text from PDF",
+            cls.TEXT_EXTRACTION_PENDING: "Text extraction is in progress, retry later",
+            cls.PDF_DOWNLOAD_PENDING: "PDF download is in progress, retry later",
             cls.INVALID_REQUEST: "Invalid request",
             cls.MISSING_PARAMETER: "Required parameter is missing",
             cls.INVALID_PARAMETER: "Parameter has invalid value",
+            cls.DEADLINE_EXCEEDED: "Request deadline exceeded",
             cls.PUBMED_SERVICE_ERROR: "Error communicating with PubMed service",
             cls.EXTERNAL_SERVICE_ERROR: "Error communicating with external service",
-            cls.INTERNAL_SERVER_ERROR: "Internal server error"
+            cls.INTERNAL_SERVER_ERROR: "Internal server error",
+            cls.SERVICE_UNAVAILABLE: "Service is not ready to handle requests",
+            cls.SERVICE_OVERLOADED: "Service is overloaded, retry later"
         }
         
         return messages.get(error_code, "Unknown error")
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Host-wide state shared by worker processes through small flock-guarded files
+
+Kept on a tmpfs such as /dev/shm, these behave like shared memory that
+needs no setup in the gunicorn master and is cleaned up by the kernel when
+a worker dies: its slot locks are released together with its descriptors.
+
+    FileSemaphore  counting semaphore made of N slot files locked with flock
+    FileCounters   named integer counters per key, e.g. daily usage
+"""
+
+import os
+import re
+import fcntl
+import struct
+import threading
+
+
+def _file_name(key):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+
+
+class FileSemaphore:
+    """Counting semaphore shared by all processes on a host"""
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+
+    def try_acquire(self, key, limit):
+        """
+        Take one of `limit` slots of a semaphore without waiting
+
+        flock locks belong to the open file description, so every call opens
+        its own descriptors and threads of one process exclude each other too.
+
+        Args:
+            key (str): Semaphore name
+            limit (int): Number of slots
+
+        Returns:
+            int: Descriptor holding the slot, for release(), or None if all slots are taken
+        """
+        name = _file_name(key)
+        for slot in range(limit):
+            fd = os.open(os.path.join(self.state_dir, f'{name}.slot{slot}'), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    @staticmethod
+    def release(fd):
+        """Release a slot taken by try_acquire"""
+        os.close(fd)
+
+    def count(self, key, limit):
+        """Return how many of the first `limit` slots are taken"""
+        name = _file_name(key)
+        taken = 0
+        for slot in range(limit):
+            path = os.path.join(self.state_dir, f'{name}.slot{slot}')
+            if not os.path.exists(path):
+                continue
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                taken += 1
+            finally:
+                os.close(fd)
+        return taken
+
+
+class FileCounters:
+    """Fixed sets of named 64-bit counters per key, shared by all processes on a host"""
+
+    def __init__(self, state_dir, fields):
+        self.state_dir = state_dir
+        self.fields = tuple(fields)
+        self._struct = struct.Struct('<' + 'q' * len(self.fields))
+        self._lock = threading.Lock()
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.state_dir, _file_name(key) + '.counters')
+
+    def _read(self, fd):
+        data = os.pread(fd, self._struct.size, 0)
+        if len(data) != self._struct.size:
+            return [0] * len(self.fields)
+        return list(self._struct.unpack(data))
+
+    def add(self, key, **amounts):
+        """
+        Add to counters of a key atomically
+
+        Args:
+            key (str): Counter set name
+            **amounts: Amount per field name
+
+        Returns:
+            dict: Counter values after the update
+        """
+        with self._lock:
+            fd = os.open(self._path(key), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                values = self._read(fd)
+                for field, amount in amounts.items():
+                    values[self.fields.index(field)] += amount
+                os.pwrite(fd, self._struct.pack(*values), 0)
+            finally:
+                os.close(fd)
+        return dict(zip(self.fields, values))
+
+    def get(self, key):
+        """
+        Read the counters of a key
+
+        Returns:
+            dict: Counter values, all 0 for an unknown key
+        """
+        try:
+            fd = os.open(self._path(key), os.O_RDONLY)
+        except FileNotFoundError:
+            return dict.fromkeys(self.fields, 0)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            return dict(zip(self.fields, self._read(fd)))
+        finally:
+            os.close(fd)
+
+    def keys(self):
+        """List the keys that have counters"""
+        suffix = '.counters'
+        return sorted(name[:-len(suffix)] for name in os.listdir(self.state_dir) if name.endswith(suffix))
+
+    def remove(self, key):
+        """Delete the counters of a key"""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,88 @@
+"""
+JSON encoding utilities
+
+Provides a pluggable JSON encoder returning UTF-8 bytes. orjson is used when
+installed (JSON_ENCODER = 'auto' or 'orjson'), with the standard library as
+fallback. Pydantic models, datetimes and enums are encoded directly through a
+default hook, without building an intermediate dict of the whole model first.
+"""
+
+import json
+import datetime
+from enum import Enum
+from functools import lru_cache
+from flask import current_app, has_app_context
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """Encode types the JSON encoders do not support natively"""
+    if isinstance(obj, BaseModel):
+        # Shallow field mapping, nested models go through this hook again
+        return dict(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def get_json_encoder(name='auto'):
+    """
+    Get a JSON encoder function by name
+
+    Args:
+        name (str): 'auto', 'orjson' or 'stdlib'
+
+    Returns:
+        callable: Function encoding an object to UTF-8 JSON bytes
+    """
+    if name == 'stdlib':
+        return _stdlib_dumps
+    if name == 'orjson':
+        if orjson is None:
+            raise ImportError("JSON_ENCODER is 'orjson' but orjson is not installed")
+        return _orjson_dumps
+    if name == 'auto':
+        return _orjson_dumps if orjson is not None else _stdlib_dumps
+    raise ValueError(f"Unknown JSON encoder: {name}")
+
+
+def get_app_json_encoder():
+    """
+    Get the JSON encoder configured for the current app ('auto' outside an app context)
+
+    Returns:
+        callable: Function encoding an object to UTF-8 JSON bytes
+    """
+    name = current_app.config.get('JSON_ENCODER', 'auto') if has_app_context() else 'auto'
+    return get_json_encoder(name)
+
+
+def dumps(obj):
+    """
+    Encode an object to JSON bytes with the encoder configured for the current app
+
+    Args:
+        obj: Object to encode
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    return get_app_json_encoder()(obj)
@@ -0,0 +1,199 @@
+"""
+API access log analysis
+
+Parses the response lines written by utils.api_logger:
+
+    [TIMESTAMP] [INFO] [APP] MESSAGE=Response Info: IP: ..., Path: ..., Query: {...}, Json: {...} Runtime: 0.012 Status: 200 Cache: hit
+
+Status and Cache were added later; for older lines the outcome is taken
+from the status and code at the start of the JSON body. Each file is
+summarized into a LogStats whose counters and latency histograms merge
+exactly, so files can be analyzed in parallel and combined.
+"""
+
+import os
+import re
+import math
+from collections import Counter
+
+RESPONSE_MARKER = 'MESSAGE=Response Info: '
+LOG_FILE_PATTERN = re.compile(r'^api_calls\.log(\.\d+)?$')
+PATH_PATTERN = re.compile(r'Path: (\S*), Query: ')
+BODY_STATUS_PATTERN = re.compile(r'\{"status":\s*"(\w+)"(?:,\s*"code":\s*"(\w+)")?')
+PMID_PATH_PATTERN = re.compile(r'^/api/(?:pdf|text|mcp)/([1-9][0-9]{0,9})$')
+
+OUTCOME_HIT = 'hit'
+OUTCOME_MISS = 'miss'
+OUTCOME_OK = 'ok'
+
+# Error codes of a PMID whose PDF could not be provided
+FAILURE_CODES = frozenset(['PDF_NOT_AVAILABLE', 'PDF_DOWNLOAD_FAILED', 'ARTICLE_NOT_FOUND'])
+
+# Latency histogram buckets grow by 2%, so percentiles are within 2% of the exact value
+BUCKET_BASE = 1.02
+BUCKET_MIN_MS = 0.1
+
+
+def find_log_files(log_dir):
+    """
+    Find API log files, including rotated backups (api_calls.log.1 ...)
+
+    Args:
+        log_dir (str): Log root, e.g. logs
+
+    Returns:
+        list: Paths, largest first so parallel workers finish together
+    """
+    paths = []
+    for directory, _, files in os.walk(log_dir):
+        paths.extend(os.path.join(directory, name) for name in files if LOG_FILE_PATTERN.match(name))
+    return sorted(paths, key=lambda path: -os.path.getsize(path))
+
+
+def parse_response_line(line):
+    """
+    Parse an API log response line
+
+    Args:
+        line (str): Log line
+
+    Returns:
+        dict: path, pmid, runtime (seconds), status (int or None), outcome; None for other lines
+    """
+    start = line.find(RESPONSE_MARKER)
+    if start < 0:
+        return None
+    match = PATH_PATTERN.search(line, start)
+    body_start = line.find(', Json: ', start)
+    body_end = line.rfind(' Runtime: ')
+    if not match or body_start < 0 or body_end < body_start:
+        return None
+    fields = line[body_end + len(' Runtime: '):].split()
+    try:
+        runtime = float(fields[0])
+    except (IndexError, ValueError):
+        return None
+    extra = dict(zip(fields[1::2], fields[2::2]))
+
+    status = int(extra['Status:']) if extra.get('Status:', '').isdigit() else None
+    body = BODY_STATUS_PATTERN.match(line, body_start + len(', Json: '))
+    if 'Cache:' in extra:
+        outcome = extra['Cache:']
+    elif body and body.group(1) == 'error':
+        outcome = body.group(2) or 'error'
+    elif status is not None and status >= 400:
+        outcome = f'http_{status}'
+    else:
+        outcome = OUTCOME_OK
+
+    path = match.group(1)
+    pmid = PMID_PATH_PATTERN.match(path)
+    return {
+        'path': path,
+        'pmid': pmid.group(1) if pmid else None,
+        'runtime': runtime,
+        'status': status,
+        'outcome': outcome,
+    }
+
+
+def _bucket(runtime):
+    ms = max(runtime * 1000, BUCKET_MIN_MS)
+    return int(math.log(ms / BUCKET_MIN_MS, BUCKET_BASE))
+
+
+def _bucket_upper_ms(bucket):
+    return BUCKET_MIN_MS * BUCKET_BASE ** (bucket + 1)
+
+
+class LogStats:
+    """Mergeable counters and latency histograms of analyzed log lines"""
+
+    def __init__(self):
+        self.requests = 0
+        self.latency = {}
+        self.pmid_requests = Counter()
+        self.pmid_failures = Counter()
+        self.outcomes = Counter()
+
+    def add(self, entry):
+        """
+        Args:
+            entry (dict): Result of parse_response_line
+        """
+        self.requests += 1
+        outcome = entry['outcome']
+        self.outcomes[outcome] += 1
+        self.latency.setdefault(outcome, Counter())[_bucket(entry['runtime'])] += 1
+        pmid = entry['pmid']
+        if pmid:
+            self.pmid_requests[pmid] += 1
+            if outcome in FAILURE_CODES:
+                self.pmid_failures[pmid] += 1
+
+    def merge(self, other):
+        """Add the counts of another LogStats"""
+        self.requests += other.requests
+        self.outcomes.update(other.outcomes)
+        self.pmid_requests.update(other.pmid_requests)
+        self.pmid_failures.update(other.pmid_failures)
+        for outcome, histogram in other.latency.items():
+            self.latency.setdefault(outcome, Counter()).update(histogram)
+        return self
+
+    def percentiles(self, outcome, quantiles=(0.5, 0.9, 0.99)):
+        """
+        Returns:
+            dict: {quantile: latency in ms}, each at most 2% above the exact value
+        """
+        histogram = self.latency.get(outcome) or Counter()
+        total = sum(histogram.values())
+        result = {}
+        for quantile in quantiles:
+            rank = max(1, math.ceil(quantile * total))
+            seen = 0
+            for bucket in sorted(histogram):
+                seen += histogram[bucket]
+                if seen >= rank:
+                    result[quantile] = round(_bucket_upper_ms(bucket), 1)
+                    break
+        return result
+
+    def summary(self, top=20):
+        """
+        Returns:
+            dict: Requests, latency percentiles per outcome, top PMIDs, miss and repeat-failure rates
+        """
+        lookups = self.outcomes[OUTCOME_HIT] + self.outcomes[OUTCOME_MISS]
+        failures = sum(self.pmid_failures.values())
+        return {
+            'requests': self.requests,
+            'outcomes': {
+                outcome: {'count': count, 'latency_ms': self.percentiles(outcome)}
+                for outcome, count in self.outcomes.most_common()
+            },
+            'top_pmids': self.pmid_requests.most_common(top),
+            'miss_rate': round(self.outcomes[OUTCOME_MISS] / lookups, 4) if lookups else None,
+            # Failures of a PMID that had already failed: requests that could have been refused early
+            'repeat_failure_rate': round(
+                sum(count - 1 for count in self.pmid_failures.values()) / failures, 4) if failures else None,
+        }
+
+
+def analyze_file(path):
+    """
+    Summarize one log file
+
+    Args:
+        path (str): Log file
+
+    Returns:
+        LogStats: Counts of the file's response lines
+    """
+    stats = LogStats()
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            entry = parse_response_line(line)
+            if entry is not None:
+                stats.add(entry)
+    return stats
@@ -6,8 +6,36 @@ which is a standard for communicating context between systems and large language
 """
 
 from api.schemas import MCPContext, ArticleMetadata
+from utils.json_utils import dumps
 import json
 
+# Fields of MCPContext that callers can select
+MCP_CONTEXT_FIELDS = ('query', 'pmid', 'article_metadata', 'pdf_content')
+
+def create_article_metadata(pmid, article):
+    """
+    Create the metadata object of an article
+    
+    Args:
+        pmid (str): PubMed ID
+        article (Article): Article object from database
+        
+    Returns:
+        ArticleMetadata: Article metadata
+    """
+    return ArticleMetadata(
+        pmid=pmid,
+        doi=article.doi,
+        title=article.title,
+        authors=article.authors,
+        journal=article.journal,
+        year=article.year,
+        has_pdf=article.has_pdf,
+        has_abstract=article.has_abstract,
+        full_text_available=article.full_text_available,
+        commercial_use_allowed=article.commercial_use_allowed
+    )
+
 def create_mcp_context(pmid, article=None, pdf_content=None, query=None):
     """
     Create an MCP context object for a given PMID and article
@@ -21,21 +49,7 @@ def create_mcp_context(pmid, article=None, pdf_content=None, query=None):
     Returns:
         MCPContext: MCP context object
     """
-    article_metadata = None
-    
-    if article:
-        article_metadata = ArticleMetadata(
-            pmid=pmid,
-            doi=article.doi,
-            title=article.title,
-            authors=article.authors,
-            journal=article.journal,
-            year=article.year,
-            has_pdf=article.has_pdf,
-            has_abstract=article.has_abstract,
-            full_text_available=article.full_text_available,
-            commercial_use_allowed=article.commercial_use_allowed
-        )
+    article_metadata = create_article_metadata(pmid, article) if article else None
     
     return MCPContext(
         query=query or f"Information about PMID: {pmid}",
@@ -44,17 +58,104 @@ def create_mcp_context(pmid, article=None, pdf_content=None, query=None):
         pdf_content=pdf_content
     )
 
-def serialize_mcp_context(context):
+def create_mcp_context_with_text(pmid, article, query=None, timeout=None):
+    """
+    Create an MCP context with the article's extracted full text as pdf_content
+    
+    Args:
+        pmid (str): PubMed ID
+        article (Article): Article object from database
+        query (str, optional): Original user query
+        timeout (float, optional): Seconds to wait if the text still has to be extracted
+        
+    Returns:
+        MCPContext: MCP context object
+    """
+    from services.text_service import read_article_text
+    
+    pdf_content = read_article_text(article, timeout=timeout) if article and article.has_pdf else None
+    return create_mcp_context(pmid, article=article, pdf_content=pdf_content, query=query)
+
+def select_mcp_fields(context, fields=None):
+    """
+    Select fields of an MCP context for serialization
+    
+    Nested models are kept as models, the JSON encoder serializes them directly.
+    
+    Args:
+        context (MCPContext): MCP context object
+        fields (list, optional): Field names to include, all fields if None
+        
+    Returns:
+        dict: Selected fields
+    """
+    return {name: getattr(context, name) for name in (fields or MCP_CONTEXT_FIELDS)}
+
+def serialize_mcp_context(context, fields=None):
     """
     Serialize MCP context to JSON
     
     Args:
         context (MCPContext): MCP context object
+        fields (list, optional): Field names to include, all fields if None
         
     Returns:
         str: JSON string
     """
-    return json.dumps(context.dict(), ensure_ascii=False)
+    return dumps(select_mcp_fields(context, fields)).decode('utf-8')
+
+def iter_mcp_context_ndjson(context, article=None, fields=None, max_text_length=None,
+                            chunk_size=64 * 1024, timeout=None):
+    """
+    Stream an MCP context as NDJSON lines
+    
+    The first line holds the context without pdf_content. If pdf_content is
+    selected, the article text follows in 'pdf_content' chunk lines read from
+    the compressed text cache, and an 'end' line closes the context. Failures
+    are reported as an 'error' line so the rest of a batch can continue.
+    
+    Args:
+        context (MCPContext): MCP context object without pdf_content
+        article (Article, optional): Article object whose text is streamed
+        fields (list, optional): Field names to include, all fields if None
+        max_text_length (int, optional): Maximum number of text characters
+        chunk_size (int): Maximum characters per text chunk line
+        timeout (float, optional): Seconds to wait if the text still has to be extracted
+        
+    Yields:
+        bytes: NDJSON lines
+    """
+    from services.text_service import iter_article_text
+    
+    fields = list(fields or MCP_CONTEXT_FIELDS)
+    header = select_mcp_fields(context, [name for name in fields if name != 'pdf_content'])
+    yield dumps({'type': 'context', 'pmid': context.pmid, **header}) + b'\n'
+    
+    if 'pdf_content' not in fields:
+        return
+    
+    if not article or not article.has_pdf:
+        yield dumps({'type': 'end', 'pmid': context.pmid, 'chars': 0, 'pdf_content': None}) + b'\n'
+        return
+    
+    chars = 0
+    truncated = False
+    # Read one character past the limit to tell whether any text was cut off
+    read_length = None if max_text_length is None else max_text_length + 1
+    try:
+        for seq, chunk in enumerate(iter_article_text(article, chunk_size, read_length, timeout)):
+            if max_text_length is not None and chars + len(chunk) > max_text_length:
+                chunk = chunk[:max_text_length - chars]
+                truncated = True
+            if chunk:
+                chars += len(chunk)
+                yield dumps({'type': 'pdf_content', 'pmid': context.pmid, 'seq': seq, 'text': chunk}) + b'\n'
+    except Exception as e:
+        yield dumps({'type': 'error', 'pmid': context.pmid, 'message': str(e) or type(e).__name__}) + b'\n'
+        return
+    
+    yield dumps({'type': 'end', 'pmid': context.pmid, 'chars': chars, 'truncated': truncated}) + b'\n'
+
 
 def deserialize_mcp_context(json_str):
     """
@@ -0,0 +1,104 @@
+"""
+PDF file utilities
+
+Lightweight structural checks that catch the common bad downloads
+(HTML paywall pages, truncated transfers, empty documents) without
+parsing the whole document.
+"""
+
+import os
+import re
+
+# The header may be preceded by junk, readers accept it within the first 1024 bytes
+HEADER_WINDOW = 1024
+# %%EOF must appear within the last 1024 bytes, startxref shortly before it
+TRAILER_WINDOW = 2048
+SCAN_CHUNK_SIZE = 1024 * 1024
+
+PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+OBJECT_STREAM_MARKER = b'/ObjStm'
+
+
+class PDFVerificationResult:
+    """Verdict of a PDF structural check"""
+
+    def __init__(self, valid, reason=None, pages=None):
+        self.valid = valid
+        self.reason = reason
+        self.pages = pages
+
+    def __bool__(self):
+        return self.valid
+
+    def __repr__(self):
+        return f"<PDFVerificationResult valid={self.valid}, reason={self.reason}, pages={self.pages}>"
+
+
+def verify_pdf_file(path, min_pages=1):
+    """
+    Check that a file looks like a complete PDF document
+
+    Checks the %PDF- header, the startxref/%%EOF trailer and that at least
+    min_pages page objects are present. Page objects packed into compressed
+    object streams cannot be counted without decompressing, so such files
+    pass the page check when the header and trailer are intact.
+
+    Args:
+        path (str): Path to the file
+        min_pages (int): Minimum number of pages required
+
+    Returns:
+        PDFVerificationResult: Verdict with the failure reason, if any
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            head = f.read(HEADER_WINDOW)
+            if b'%PDF-' not in head:
+                return PDFVerificationResult(False, 'missing %PDF- header')
+
+            f.seek(max(0, size - TRAILER_WINDOW))
+            tail = f.read()
+            if b'%%EOF' not in tail[-HEADER_WINDOW:]:
+                return PDFVerificationResult(False, 'missing %%EOF marker (truncated file)')
+            if b'startxref' not in tail:
+                return PDFVerificationResult(False, 'missing startxref (truncated file)')
+
+            if min_pages <= 0:
+                return PDFVerificationResult(True)
+
+            f.seek(0)
+            pages, has_object_streams = _count_pages(f, min_pages)
+    except OSError as e:
+        return PDFVerificationResult(False, f'unreadable file: {str(e)}')
+
+    if pages < min_pages and not has_object_streams:
+        return PDFVerificationResult(False, f'only {pages} page(s) found', pages=pages)
+    return PDFVerificationResult(True, pages=pages)
+
+
+def _count_pages(f, limit):
+    """
+    Count page objects in a file, stopping once limit is reached
+
+    Args:
+        f: Binary file object positioned at the start
+        limit (int): Stop counting after this many pages
+
+    Returns:
+        tuple: (page count, whether compressed object streams were seen)
+    """
+    pages = 0
+    has_object_streams = False
+    carry = b''
+
+    for chunk in iter(lambda: f.read(SCAN_CHUNK_SIZE), b''):
+        window = carry + chunk
+        # Matches lying entirely in the carried-over bytes were counted already
+        pages += sum(1 for match in PAGE_PATTERN.finditer(window) if match.end() > len(carry))
+        has_object_streams = has_object_streams or OBJECT_STREAM_MARKER in window
+        if pages >= limit:
+            break
+        carry = window[-32:]
+
+    return pages, has_object_streams
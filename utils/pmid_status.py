@@ -0,0 +1,132 @@
+"""
+Compact PMID status set
+
+PMIDs are dense positive integers (about 40 million today), so the status
+of every PMID fits in two flat bitmaps indexed by the PMID itself, one for
+"has a PDF" and one for "download failed". At 64 million PMIDs each bitmap
+is 8 MB and a lookup is two byte reads. Sorted arrays or roaring containers
+only pay off for sparse sets; over a dense ID space the flat bitmap is both
+smaller and faster.
+
+The bitmaps live in anonymous shared memory. Created before gunicorn forks
+its workers, they are shared by all of them, and an update made by one
+worker is seen by the others.
+"""
+
+import re
+import mmap
+import multiprocessing
+
+HAS_PDF = 'has_pdf'
+FAILED = 'failed'
+UNKNOWN = 'unknown'
+
+# PubMed IDs are positive integers without leading zeros
+PMID_PATTERN = re.compile(r'^[1-9][0-9]{0,9}$')
+
+
+def parse_pmid(value):
+    """
+    Parse a PMID as given by a client
+
+    Args:
+        value: PMID as a string or integer
+
+    Returns:
+        int: PMID, or None if it is not a valid PMID
+    """
+    value = str(value)
+    if not PMID_PATTERN.match(value):
+        return None
+    return int(value)
+
+
+class PmidStatusSet:
+    """has_pdf and failed bitmaps over PMIDs 0 .. capacity - 1"""
+
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity (int): Number of PMIDs covered; larger PMIDs are not tracked
+        """
+        self.capacity = capacity
+        size = max(1, (capacity + 7) // 8)
+        # Anonymous mmaps are MAP_SHARED, so forked workers share the pages
+        self._has_pdf = mmap.mmap(-1, size)
+        self._failed = mmap.mmap(-1, size)
+        self._lock = multiprocessing.Lock()
+
+    def get(self, pmid):
+        """
+        Get the status of a PMID
+
+        Args:
+            pmid (int): PMID
+
+        Returns:
+            str: HAS_PDF, FAILED or UNKNOWN, or None if the PMID is not covered
+        """
+        if not 0 < pmid < self.capacity:
+            return None
+        index, mask = pmid >> 3, 1 << (pmid & 7)
+        if self._has_pdf[index] & mask:
+            return HAS_PDF
+        if self._failed[index] & mask:
+            return FAILED
+        return UNKNOWN
+
+    def set(self, pmid, has_pdf, failed):
+        """
+        Set the status of a PMID
+
+        Args:
+            pmid (int): PMID
+            has_pdf (bool): Whether a PDF is stored
+            failed (bool): Whether a download was attempted without result
+
+        Returns:
+            bool: False if the PMID is not covered
+        """
+        if not 0 < pmid < self.capacity:
+            return False
+        # Bits share bytes, so concurrent read-modify-writes must not interleave
+        with self._lock:
+            self._write(pmid, has_pdf, failed)
+        return True
+
+    def _write(self, pmid, has_pdf, failed):
+        index, mask = pmid >> 3, 1 << (pmid & 7)
+        for bitmap, value in ((self._has_pdf, has_pdf), (self._failed, failed and not has_pdf)):
+            byte = bitmap[index]
+            bitmap[index] = byte | mask if value else byte & ~mask
+
+    def load(self, rows):
+        """
+        Bulk-set statuses before the set is shared, without locking
+
+        Args:
+            rows: Iterable of (pmid string, has_pdf, download_attempted), e.g. a streaming query
+
+        Returns:
+            int: Number of rows covered by the set
+        """
+        loaded = 0
+        capacity = self.capacity
+        for pmid, has_pdf, attempted in rows:
+            pmid = parse_pmid(pmid)
+            if pmid is not None and pmid < capacity:
+                self._write(pmid, bool(has_pdf), bool(attempted))
+                loaded += 1
+        return loaded
+
+    def stats(self):
+        """
+        Returns:
+            dict: Capacity, shared memory used and number of PMIDs per status
+        """
+        return {
+            'capacity': self.capacity,
+            'memory_bytes': len(self._has_pdf) + len(self._failed),
+            HAS_PDF: int.from_bytes(self._has_pdf[:], 'little').bit_count(),
+            FAILED: int.from_bytes(self._failed[:], 'little').bit_count(),
+        }
@@ -0,0 +1,226 @@
+"""
+Token-bucket rate limiters shared between processes
+
+Each bucket is identified by a key (an upstream domain) and refills at
+`rate` tokens per second up to `burst` tokens. Taking tokens that are not
+available yet reserves them: the bucket goes negative and the caller sleeps
+until its turn, so waiting callers are served in order instead of polling.
+A caller that would have to wait longer than max_wait is rejected without
+reserving anything.
+
+Backends:
+    FileRateLimiter   all processes of one host, state in a small file per
+                      bucket guarded by flock (use a tmpfs such as /dev/shm)
+    RedisRateLimiter  all hosts, state in a Redis-protocol store updated by
+                      an atomic Lua script using the server clock
+    SQLRateLimiter    all hosts, state in a database row locked with
+                      SELECT ... FOR UPDATE
+"""
+
+import os
+import re
+import time
+import fcntl
+import struct
+import threading
+
+_STATE = struct.Struct('<dd')  # tokens, last refill time
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a token would not be available within max_wait seconds"""
+
+
+def take_tokens(tokens, last, now, rate, burst, count, max_wait):
+    """
+    Apply one token request to a bucket state
+
+    Args:
+        tokens (float): Tokens in the bucket, negative if reserved ahead
+        last (float): Time of the last update
+        now (float): Current time
+        rate (float): Tokens added per second
+        burst (float): Bucket capacity
+        count (float): Tokens requested
+        max_wait (float): Longest acceptable wait in seconds
+
+    Returns:
+        tuple: (new tokens, new last, seconds to wait, granted); a rejected
+               request reserves nothing and the wait is when it could succeed
+    """
+    tokens = min(burst, tokens + max(0.0, now - last) * rate)
+    if tokens >= count:
+        return tokens - count, now, 0.0, True
+    wait = (count - tokens) / rate
+    if wait > max_wait:
+        return tokens, now, wait, False
+    return tokens - count, now, wait, True
+
+
+class RateLimiter:
+    """Base class: subclasses implement _take for their shared state"""
+
+    def acquire(self, key, rate, burst, count=1, max_wait=30.0):
+        """
+        Take tokens from a bucket, sleeping until they are available
+
+        Args:
+            key (str): Bucket name
+            rate (float): Tokens added per second
+            burst (float): Bucket capacity
+            count (float): Tokens to take
+            max_wait (float): Longest acceptable wait in seconds
+
+        Returns:
+            float: Seconds waited
+
+        Raises:
+            RateLimitExceeded: If the tokens would not be available within max_wait
+        """
+        wait, granted = self._take(key, float(rate), float(burst), float(count), float(max_wait))
+        if not granted:
+            raise RateLimitExceeded(f"Rate limit for {key} ({rate}/s) would delay the request over {max_wait}s")
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self, key, rate, burst, count=1):
+        """
+        Take tokens from a bucket only if they are available now
+
+        Args:
+            key (str): Bucket name
+            rate (float): Tokens added per second
+            burst (float): Bucket capacity
+            count (float): Tokens to take
+
+        Returns:
+            float: 0 if the tokens were taken, else seconds until they would be available
+        """
+        wait, granted = self._take(key, float(rate), float(burst), float(count), 0.0)
+        return 0.0 if granted else wait
+
+    def _take(self, key, rate, burst, count, max_wait):
+        """Apply take_tokens to the shared state, returning (wait, granted)"""
+        raise NotImplementedError
+
+
+class FileRateLimiter(RateLimiter):
+    """Buckets shared by all processes on a host through flock-guarded state files"""
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        self._files = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _get_fd(self, key):
+        # flock locks belong to the open file description, which a forked child
+        # would share with its parent, so every process opens its own
+        if self._pid != os.getpid():
+            self._files = {}
+            self._pid = os.getpid()
+        fd = self._files.get(key)
+        if fd is None:
+            name = re.sub(r'[^A-Za-z0-9_.-]', '_', key) + '.bucket'
+            fd = os.open(os.path.join(self.state_dir, name), os.O_RDWR | os.O_CREAT, 0o644)
+            self._files[key] = fd
+        return fd
+
+    def _take(self, key, rate, burst, count, max_wait):
+        # flock does not exclude threads sharing a descriptor, so serialize them first
+        with self._lock:
+            fd = self._get_fd(key)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(fd, _STATE.size, 0)
+                now = time.time()
+                tokens, last = _STATE.unpack(data) if len(data) == _STATE.size else (burst, now)
+                tokens, last, wait, granted = take_tokens(tokens, last, now, rate, burst, count, max_wait)
+                os.pwrite(fd, _STATE.pack(tokens, last), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        return wait, granted
+
+
+# KEYS[1] bucket; ARGV rate, burst, count, max_wait. Returns {granted, wait}.
+_REDIS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local count = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+local tokens = tonumber(state[1]) or burst
+local last = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+local wait = 0
+local granted = 1
+if tokens < count then
+    wait = (count - tokens) / rate
+    if wait > max_wait then
+        granted = 0
+    end
+end
+if granted == 1 then
+    tokens = tokens - count
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'last', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return {granted, tostring(wait)}
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """Buckets shared by all hosts through a Redis-protocol store"""
+
+    def __init__(self, url, prefix='pmid-pdf-api:rate:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_REDIS_SCRIPT)
+
+    def _take(self, key, rate, burst, count, max_wait):
+        granted, wait = self._script(keys=[self.prefix + key], args=[rate, burst, count, max_wait])
+        return float(wait), granted == 1
+
+
+class SQLRateLimiter(RateLimiter):
+    """
+    Buckets shared by all hosts through rows of a database table
+
+    The table needs a string bucket column and float tokens and last_refill columns.
+    Times come from the local clock, so hosts should be NTP-synchronized.
+    """
+
+    def __init__(self, engine, table):
+        self.engine = engine
+        self.table = table
+
+    def _take(self, key, rate, burst, count, max_wait):
+        from sqlalchemy import select
+        from sqlalchemy.exc import IntegrityError
+
+        table = self.table
+        for _ in range(2):
+            try:
+                with self.engine.begin() as conn:
+                    row = conn.execute(
+                        select(table.c.tokens, table.c.last_refill).where(table.c.bucket == key).with_for_update()
+                    ).first()
+                    now = time.time()
+                    tokens, last = (row.tokens, row.last_refill) if row else (burst, now)
+                    tokens, last, wait, granted = take_tokens(tokens, last, now, rate, burst, count, max_wait)
+                    values = {'tokens': tokens, 'last_refill': last}
+                    if row:
+                        conn.execute(table.update().where(table.c.bucket == key).values(**values))
+                    else:
+                        conn.execute(table.insert().values(bucket=key, **values))
+                return wait, granted
+            except IntegrityError:
+                # Another host created the row first, retry against it
+                continue
+        raise RateLimitExceeded(f"Could not update rate limit bucket {key}")
@@ -0,0 +1,84 @@
+"""
+Schema utilities
+
+db.create_all() only creates missing tables. These helpers bring existing
+tables up to date with the models by adding missing columns and indexes,
+which is all the additive model changes in this project need.
+"""
+
+from sqlalchemy import inspect, text
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(engine, table):
+    """
+    Add model columns that are missing from an existing table
+
+    Args:
+        engine: SQLAlchemy engine
+        table (Table): SQLAlchemy table object
+
+    Returns:
+        list: Names of the added columns
+    """
+    existing = {column['name'] for column in inspect(engine).get_columns(table.name)}
+    added = []
+
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.append(column.name)
+            logger.info(f"Added column {table.name}.{column.name}")
+
+    return added
+
+
+def create_missing_indexes(engine, table):
+    """
+    Create model indexes that are missing from an existing table
+
+    Args:
+        engine: SQLAlchemy engine
+        table (Table): SQLAlchemy table object
+
+    Returns:
+        list: Names of the created indexes
+    """
+    existing = {index['name'] for index in inspect(engine).get_indexes(table.name)}
+    created = []
+
+    for index in table.indexes:
+        if index.name in existing:
+            continue
+        index.create(bind=engine)
+        created.append(index.name)
+        logger.info(f"Created index {index.name} on {table.name}")
+
+    return created
+
+
+def upgrade_schema(db):
+    """
+    Create missing tables, then add missing columns and indexes to existing ones
+
+    Args:
+        db (SQLAlchemy): Flask-SQLAlchemy instance (requires an app context)
+
+    Returns:
+        dict: {table name: {'columns': [...], 'indexes': [...]}} for changed tables
+    """
+    db.create_all()
+    changes = {}
+
+    for table in db.metadata.sorted_tables:
+        columns = add_missing_columns(db.engine, table)
+        indexes = create_missing_indexes(db.engine, table)
+        if columns or indexes:
+            changes[table.name] = {'columns': columns, 'indexes': indexes}
+
+    return changes
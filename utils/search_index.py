@@ -0,0 +1,609 @@
+"""
+On-disk inverted index with BM25 ranking
+
+The index is a directory of immutable segments listed in manifest.json,
+oldest first. A document (PMID) in a newer segment supersedes the same PMID
+in older ones; an empty document is a tombstone that removes the PMID from
+the index. Each segment holds:
+
+- docs.bin: fixed-width (pmid uint64, length uint32) records sorted by PMID;
+  a document's position in this table is its document number
+- postings.bin: per term, varint-encoded (document number delta, term frequency) pairs
+- lexicon.bin: term count, an offset table into the term strings, fixed-width
+  (postings offset, postings length, document frequency) records and the
+  UTF-8 terms, sorted bytewise so terms are found by binary search
+- meta.json: document count and total document length, the number of
+  tombstones, and the number and total length of the live documents in
+  older segments it supersedes, so BM25 statistics count live documents only
+
+All files are memory-mapped read-only, so the page cache holding them is
+shared by every process on the host, and lookups need no per-process
+term dictionary. Updates write a new segment and swap the manifest
+atomically; small segments are merged to keep their number bounded.
+"""
+
+import os
+import re
+import json
+import math
+import mmap
+import time
+import fcntl
+import heapq
+import shutil
+import struct
+from array import array
+from collections import Counter, defaultdict
+
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.lock'
+
+DOC_RECORD = struct.Struct('<QI')
+TERM_RECORD = struct.Struct('<QII')
+COUNT = struct.Struct('<I')
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 40
+STOPWORDS = frozenset((
+    'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from', 'has', 'have', 'in',
+    'into', 'is', 'it', 'its', 'not', 'of', 'on', 'or', 'that', 'the', 'their', 'these',
+    'this', 'to', 'was', 'were', 'which', 'with'
+))
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    """
+    Split text into lowercase index terms
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        list: Terms in document order
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if MIN_TOKEN_LENGTH <= len(token) <= MAX_TOKEN_LENGTH and token not in STOPWORDS]
+
+
+def _encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_postings(buf, offset, length):
+    """Yield (document number, term frequency) pairs from an encoded postings list"""
+    end = offset + length
+    doc = 0
+    values = []
+    value = shift = 0
+    for position in range(offset, end):
+        byte = buf[position]
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+        if len(values) == 2:
+            doc += values[0]
+            yield doc, values[1]
+            values = []
+
+
+def _map_file(path):
+    """Memory-map a file read-only (empty files map to empty bytes)"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SegmentWriter:
+    """
+    Writes one segment directory
+
+    Documents must be added sorted by PMID before the terms, and terms must
+    be added in bytewise sorted order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        os.makedirs(self.tmp_path)
+        self.postings_file = open(os.path.join(self.tmp_path, 'postings.bin'), 'wb')
+        self.postings_offset = 0
+        self.terms = []
+        self.records = []
+        self.doc_count = 0
+        self.total_length = 0
+        self.deleted_count = 0
+        # Live versions in older segments superseded by this one, set by the caller
+        self.replaced_count = 0
+        self.replaced_length = 0
+
+    def add_documents(self, docs):
+        """
+        Args:
+            docs (list): (pmid, document length) tuples sorted by PMID
+        """
+        with open(os.path.join(self.tmp_path, 'docs.bin'), 'wb') as f:
+            for pmid, length in docs:
+                f.write(DOC_RECORD.pack(pmid, length))
+                self.doc_count += 1
+                self.total_length += length
+                if not length:
+                    self.deleted_count += 1
+
+    def add_term(self, term, postings):
+        """
+        Args:
+            term (bytes): UTF-8 encoded term
+            postings (list): (document number, term frequency) tuples sorted by document number
+        """
+        encoded = bytearray()
+        previous = 0
+        for doc, tf in postings:
+            _encode_varint(doc - previous, encoded)
+            _encode_varint(tf, encoded)
+            previous = doc
+        self.postings_file.write(encoded)
+        self.terms.append(term)
+        self.records.append((self.postings_offset, len(encoded), len(postings)))
+        self.postings_offset += len(encoded)
+
+    def close(self):
+        """Write the lexicon and metadata and move the segment into place"""
+        self.postings_file.close()
+
+        with open(os.path.join(self.tmp_path, 'lexicon.bin'), 'wb') as f:
+            f.write(COUNT.pack(len(self.terms)))
+            offset = 0
+            offsets = array('I', [0])
+            for term in self.terms:
+                offset += len(term)
+                offsets.append(offset)
+            f.write(offsets.tobytes())
+            for record in self.records:
+                f.write(TERM_RECORD.pack(*record))
+            for term in self.terms:
+                f.write(term)
+
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as f:
+            json.dump({'doc_count': self.doc_count, 'total_length': self.total_length,
+                       'deleted_count': self.deleted_count, 'replaced_count': self.replaced_count,
+                       'replaced_length': self.replaced_length, 'term_count': len(self.terms),
+                       'created_at': time.time()}, f)
+
+        os.rename(self.tmp_path, self.path)
+
+
+def _count_replaced(pmids, older_segments):
+    """
+    Count the live versions of documents that a new segment supersedes
+
+    Args:
+        pmids (iterable): PMIDs of the new segment
+        older_segments (list): Segments the new one is added after, oldest first
+
+    Returns:
+        tuple: (number of documents, total length)
+    """
+    count = length = 0
+    for pmid in pmids:
+        for segment in reversed(older_segments):
+            current = segment.find(pmid)
+            if current is not None:
+                # A tombstone is not live and was never counted
+                if current:
+                    count += 1
+                    length += current
+                break
+    return count, length
+
+
+def write_segment(path, documents, older_segments=()):
+    """
+    Build a segment from tokenized documents
+
+    Args:
+        path (str): Segment directory to create
+        documents (dict): {pmid (int): list of terms}, an empty list removes the PMID
+        older_segments (list): Live segments the new one is added after, oldest first
+    """
+    writer = SegmentWriter(path)
+    pmids = sorted(documents)
+    writer.add_documents([(pmid, len(documents[pmid])) for pmid in pmids])
+    writer.replaced_count, writer.replaced_length = _count_replaced(pmids, older_segments)
+
+    postings = defaultdict(list)
+    for doc, pmid in enumerate(pmids):
+        for term, tf in Counter(documents[pmid]).items():
+            postings[term.encode('utf-8')].append((doc, tf))
+
+    for term in sorted(postings):
+        writer.add_term(term, postings[term])
+    writer.close()
+
+
+class Segment:
+    """Read-only, memory-mapped view of a segment"""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.docs = _map_file(os.path.join(path, 'docs.bin'))
+        self.postings = _map_file(os.path.join(path, 'postings.bin'))
+        self.lexicon = _map_file(os.path.join(path, 'lexicon.bin'))
+
+        self.doc_count = len(self.docs) // DOC_RECORD.size
+        self.term_count = COUNT.unpack_from(self.lexicon, 0)[0] if self.lexicon else 0
+        self._offsets_start = COUNT.size
+        self._records_start = self._offsets_start + (self.term_count + 1) * 4
+        self._terms_start = self._records_start + self.term_count * TERM_RECORD.size
+
+    def doc(self, number):
+        """Return (pmid, length) of a document number"""
+        return DOC_RECORD.unpack_from(self.docs, number * DOC_RECORD.size)
+
+    def find(self, pmid):
+        """Return the length of the segment's document for pmid (binary search), None if absent"""
+        low, high = 0, self.doc_count
+        while low < high:
+            middle = (low + high) // 2
+            current, length = self.doc(middle)
+            if current < pmid:
+                low = middle + 1
+            elif current > pmid:
+                high = middle
+            else:
+                return length
+        return None
+
+    def contains(self, pmid):
+        """Check whether the segment holds a document (or tombstone) for pmid"""
+        return self.find(pmid) is not None
+
+    def live_stats(self):
+        """Return (live documents, their total length) this segment adds to the index"""
+        meta = self.meta
+        return (meta['doc_count'] - meta.get('deleted_count', 0) - meta.get('replaced_count', 0),
+                meta['total_length'] - meta.get('replaced_length', 0))
+
+    def _term(self, index):
+        start, end = struct.unpack_from('<II', self.lexicon, self._offsets_start + index * 4)
+        return self.lexicon[self._terms_start + start:self._terms_start + end]
+
+    def _record(self, index):
+        return TERM_RECORD.unpack_from(self.lexicon, self._records_start + index * TERM_RECORD.size)
+
+    def lookup(self, term):
+        """
+        Find a term in the lexicon
+
+        Args:
+            term (bytes): UTF-8 encoded term
+
+        Returns:
+            tuple: (postings offset, postings length, document frequency), or None
+        """
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            current = self._term(middle)
+            if current < term:
+                low = middle + 1
+            elif current > term:
+                high = middle
+            else:
+                return self._record(middle)
+        return None
+
+    def iter_postings(self, record):
+        """Yield (document number, term frequency) pairs for a lexicon record"""
+        offset, length, _ = record
+        return _decode_postings(self.postings, offset, length)
+
+    def iter_terms(self):
+        """Yield (term, record) in sorted order"""
+        for index in range(self.term_count):
+            yield self._term(index), self._record(index)
+
+    def close(self):
+        for buf in (self.docs, self.postings, self.lexicon):
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+def read_manifest(index_path):
+    """
+    Read the list of live segments
+
+    Returns:
+        dict: {'generation': int, 'segments': [segment names, oldest first]}
+    """
+    try:
+        with open(os.path.join(index_path, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'generation': 0, 'segments': []}
+
+
+def _write_manifest(index_path, manifest):
+    tmp_path = os.path.join(index_path, f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(index_path, MANIFEST_FILE))
+
+
+class IndexWriter:
+    """
+    Exclusive writer for an index directory
+
+    Holds a host-wide lock file while open, so concurrent workers serialize
+    their updates. Use as a context manager.
+    """
+
+    def __init__(self, index_path, max_segments=8):
+        self.index_path = index_path
+        self.max_segments = max_segments
+        self._lock_file = None
+
+    def __enter__(self):
+        os.makedirs(self.index_path, exist_ok=True)
+        self._lock_file = open(os.path.join(self.index_path, LOCK_FILE), 'w')
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+
+    def _new_segment_name(self, manifest):
+        manifest['generation'] += 1
+        return f"seg-{manifest['generation']:08d}"
+
+    def add_documents(self, documents):
+        """
+        Add or replace documents by writing a new segment
+
+        Args:
+            documents (dict): {pmid (int): list of terms}, an empty list removes the PMID
+        """
+        if not documents:
+            return
+        manifest = read_manifest(self.index_path)
+        name = self._new_segment_name(manifest)
+        segments = [Segment(os.path.join(self.index_path, existing)) for existing in manifest['segments']]
+        try:
+            write_segment(os.path.join(self.index_path, name), documents, segments)
+        finally:
+            for segment in segments:
+                segment.close()
+        manifest['segments'].append(name)
+        _write_manifest(self.index_path, manifest)
+
+        if len(manifest['segments']) > self.max_segments:
+            # Keep the (large) base segment, merge the newer small ones
+            self.merge(start=1)
+
+    def replace_all(self, segment_names):
+        """
+        Make the given (already written) segments the whole index
+
+        Args:
+            segment_names (list): Segment names, oldest first
+        """
+        manifest = read_manifest(self.index_path)
+        old = manifest['segments']
+        manifest['segments'] = list(segment_names)
+        _write_manifest(self.index_path, manifest)
+        self._remove_segments(set(old) - set(segment_names))
+
+    def new_segment_path(self):
+        """Reserve a segment name and return its path"""
+        manifest = read_manifest(self.index_path)
+        name = self._new_segment_name(manifest)
+        _write_manifest(self.index_path, manifest)
+        return os.path.join(self.index_path, name)
+
+    def merge(self, start=0):
+        """
+        Merge the segments from position start onwards into one segment
+
+        Superseded document versions are dropped, and so are tombstones when
+        no older segment is left for them to hide. Readers keep using the
+        old files they have mapped until they reload the manifest.
+        """
+        manifest = read_manifest(self.index_path)
+        names = manifest['segments'][start:]
+        if len(names) < 2 and not (start == 0 and names):
+            return
+
+        merged_name = self._new_segment_name(manifest)
+        older = [Segment(os.path.join(self.index_path, name)) for name in manifest['segments'][:start]]
+        segments = [Segment(os.path.join(self.index_path, name)) for name in names]
+        try:
+            merge_segments(os.path.join(self.index_path, merged_name), segments, older)
+        finally:
+            for segment in older + segments:
+                segment.close()
+
+        manifest['segments'] = manifest['segments'][:start] + [merged_name]
+        _write_manifest(self.index_path, manifest)
+        self._remove_segments(names)
+
+    def _remove_segments(self, names):
+        # Mapped files stay readable for processes that still use them
+        for name in names:
+            shutil.rmtree(os.path.join(self.index_path, name), ignore_errors=True)
+
+
+def _iter_doc_keys(segment, index):
+    for number in range(segment.doc_count):
+        yield segment.doc(number)[0], -index, number
+
+
+def _iter_term_keys(segment, index):
+    for term, record in segment.iter_terms():
+        yield term, index, record
+
+
+def merge_segments(path, segments, older_segments=()):
+    """
+    Write a segment holding the latest version of every document in segments
+
+    Args:
+        path (str): Segment directory to create
+        segments (list): Segments, oldest first
+        older_segments (list): Segments kept before the merged ones, oldest first;
+            without them tombstones are dropped
+    """
+    # Documents are sorted by PMID in each segment: a k-way merge gives the new
+    # document order, and the newest segment wins for duplicate PMIDs
+    mappings = [array('i', [-1]) * segment.doc_count for segment in segments]
+    streams = [_iter_doc_keys(segment, index) for index, segment in enumerate(segments)]
+    docs = []
+    previous = None
+    for pmid, negative_index, number in heapq.merge(*streams):
+        if pmid == previous:
+            continue
+        previous = pmid
+        length = segments[-negative_index].doc(number)[1]
+        if not length and not older_segments:
+            continue
+        mappings[-negative_index][number] = len(docs)
+        docs.append((pmid, length))
+
+    writer = SegmentWriter(path)
+    writer.add_documents(docs)
+    writer.replaced_count, writer.replaced_length = _count_replaced((pmid for pmid, _ in docs), older_segments)
+
+    term_streams = [_iter_term_keys(segment, index) for index, segment in enumerate(segments)]
+    current_term = None
+    postings = []
+    for term, index, record in heapq.merge(*term_streams, key=lambda item: (item[0], item[1])):
+        if term != current_term:
+            if postings:
+                writer.add_term(current_term, sorted(postings))
+            current_term = bytes(term)
+            postings = []
+        mapping = mappings[index]
+        for number, tf in segments[index].iter_postings(record):
+            if mapping[number] >= 0:
+                postings.append((mapping[number], tf))
+    if postings:
+        writer.add_term(current_term, sorted(postings))
+
+    writer.close()
+
+
+class SearchIndex:
+    """
+    Read-only handle on an index directory
+
+    The manifest is re-checked at most once per refresh_interval seconds, so
+    new segments written by any process become visible without a restart.
+    """
+
+    def __init__(self, index_path, refresh_interval=1.0):
+        self.index_path = index_path
+        self.refresh_interval = refresh_interval
+        self.segments = []
+        self._manifest_mtime = None
+        self._checked_at = 0.0
+
+    def refresh(self):
+        """Reload the segment list if the manifest changed"""
+        now = time.time()
+        if now - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(os.path.join(self.index_path, MANIFEST_FILE)).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+
+        manifest = read_manifest(self.index_path)
+        current = {segment.name: segment for segment in self.segments}
+        segments = []
+        for name in manifest['segments']:
+            try:
+                segments.append(current.get(name) or Segment(os.path.join(self.index_path, name)))
+            except OSError:
+                # Removed by a concurrent merge, the next refresh picks up the new manifest
+                return
+        self.segments = segments
+        self._manifest_mtime = mtime
+
+    def stats(self):
+        """Return live document, length and segment totals"""
+        live = [segment.live_stats() for segment in self.segments]
+        doc_count = sum(count for count, _ in live)
+        total_length = sum(length for _, length in live)
+        return {'doc_count': doc_count, 'total_length': total_length, 'segments': len(self.segments)}
+
+    def search(self, query, limit=20):
+        """
+        Rank documents for a query with BM25
+
+        Args:
+            query (str): Free-text query
+            limit (int): Maximum number of results
+
+        Returns:
+            tuple: ([(pmid, score)] best first, number of matching documents)
+        """
+        self.refresh()
+        segments = self.segments
+        terms = list(dict.fromkeys(token.encode('utf-8') for token in tokenize(query)))
+        stats = self.stats()
+        if not terms or not stats['doc_count']:
+            return [], 0
+
+        doc_count = stats['doc_count']
+        average_length = stats['total_length'] / doc_count or 1.0
+        # pmid -> [segment index, score]; only the newest version of a document counts
+        scores = {}
+
+        for term in terms:
+            records = [(index, segment.lookup(term)) for index, segment in enumerate(segments)]
+            records = [(index, record) for index, record in records if record]
+            df = sum(record[2] for _, record in records)
+            if not df:
+                continue
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+            for index, record in records:
+                segment = segments[index]
+                for number, tf in segment.iter_postings(record):
+                    pmid, length = segment.doc(number)
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    score = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    entry = scores.get(pmid)
+                    if entry is None or entry[0] < index:
+                        scores[pmid] = [index, score]
+                    elif entry[0] == index:
+                        entry[1] += score
+
+        ranked = sorted(scores.items(), key=lambda item: item[1][1], reverse=True)
+        results = []
+        matches = 0
+        for pmid, (index, score) in ranked:
+            # Skip documents superseded by a newer version without these terms
+            if any(segment.contains(pmid) for segment in segments[index + 1:]):
+                continue
+            matches += 1
+            if len(results) < limit:
+                results.append((pmid, score))
+        return results, matches
@@ -0,0 +1,81 @@
+"""
+HMAC-signed, expiring URLs
+
+A signed URL carries a path relative to the PDF root, a Unix expiry time and
+a signature:
+
+    <base>/<path>?expires=<unix time>&sig=<signature>
+
+The signature is HMAC-SHA256 over "<path>\\n<expires>" with a shared secret,
+encoded as unpadded URL-safe base64, so any server holding the secret (the
+download route, a CDN edge function, a static file server) can check it
+without a database.
+"""
+
+import hmac
+import math
+import time
+import base64
+import hashlib
+
+
+def sign_path(secret, path, expires):
+    """
+    Compute the signature of a path and expiry time
+
+    Args:
+        secret (str): Signing secret
+        path (str): Path relative to the PDF root, with forward slashes
+        expires (int): Unix time after which the URL is rejected
+
+    Returns:
+        str: Unpadded URL-safe base64 HMAC-SHA256
+    """
+    digest = hmac.new(secret.encode('utf-8'), f"{path}\n{int(expires)}".encode('utf-8'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+def make_expiry(ttl, step=0, now=None):
+    """
+    Expiry time for a new URL
+
+    Rounding up to a multiple of `step` keeps the URL of a file identical for
+    `step` seconds, so caches in front of the download route see repeated
+    URLs instead of a new one per resolution.
+
+    Args:
+        ttl (int): Minimum lifetime in seconds
+        step (int): Rounding in seconds, 0 for none
+        now (float): Current Unix time
+
+    Returns:
+        int: Unix expiry time
+    """
+    expires = (time.time() if now is None else now) + ttl
+    if step:
+        return int(math.ceil(expires / step) * step)
+    return int(math.ceil(expires))
+
+
+def verify_signature(secrets, path, expires, signature, now=None):
+    """
+    Check a signed URL's parameters
+
+    Args:
+        secrets (list): Accepted secrets, the current one first
+        path (str): Path from the URL
+        expires (str): expires parameter
+        signature (str): sig parameter
+
+    Returns:
+        bool: True if the signature matches one of the secrets and has not expired
+    """
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < (time.time() if now is None else now) or not signature:
+        return False
+    signature = signature.encode('utf-8')
+    return any(hmac.compare_digest(sign_path(secret, path, expires).encode('ascii'), signature)
+               for secret in secrets if secret)
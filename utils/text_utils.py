@@ -0,0 +1,122 @@
+"""
+PDF text extraction utilities
+
+These functions run in extraction worker processes, so this module avoids
+importing Flask or the application and only depends on the standard library
+plus an optional PDF backend: pypdf if installed, otherwise poppler's
+pdftotext command line tool.
+"""
+
+import os
+import gzip
+import json
+import shutil
+import subprocess
+import time
+
+# Bump when the extraction output changes so cached text is recomputed
+EXTRACTOR_VERSION = 1
+
+TEXT_FILE_NAME = 'article.txt.gz'
+TEXT_META_FILE_NAME = 'article.txt.json'
+
+
+class TextExtractionError(Exception):
+    """Raised when no text can be extracted from a PDF"""
+
+
+def extract_text(pdf_path):
+    """
+    Extract the text of a PDF file
+
+    Args:
+        pdf_path (str): Path to the PDF file
+
+    Returns:
+        tuple: (text, page count)
+
+    Raises:
+        TextExtractionError: If no extraction backend is available or the file cannot be parsed
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        PdfReader = None
+
+    if PdfReader is not None:
+        try:
+            reader = PdfReader(pdf_path)
+            pages = [page.extract_text() or '' for page in reader.pages]
+        except Exception as e:
+            raise TextExtractionError(f"pypdf failed: {str(e)}")
+        return '\n\f'.join(pages), len(pages)
+
+    if shutil.which('pdftotext'):
+        try:
+            output = subprocess.run(['pdftotext', '-enc', 'UTF-8', pdf_path, '-'],
+                                    capture_output=True, check=True, timeout=300).stdout
+        except (subprocess.SubprocessError, OSError) as e:
+            raise TextExtractionError(f"pdftotext failed: {str(e)}")
+        text = output.decode('utf-8', errors='replace')
+        return text, text.count('\f')
+
+    raise TextExtractionError("No PDF text extraction backend available (install pypdf or poppler-utils)")
+
+
+def extract_to_file(pdf_path, text_dir, source):
+    """
+    Extract a PDF's text and store it gzip-compressed with a metadata stamp
+
+    The text is written before the metadata file, each atomically, so a
+    reader never sees a stamp for text that is not complete.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        text_dir (str): Directory to write article.txt.gz and article.txt.json into
+        source (dict): Identity of the source PDF (content_hash, size) recorded in the stamp
+
+    Returns:
+        dict: The metadata stamp
+    """
+    started = time.time()
+    text, pages = extract_text(pdf_path)
+
+    text_path = os.path.join(text_dir, TEXT_FILE_NAME)
+    tmp_path = f"{text_path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        f.write(text)
+    os.replace(tmp_path, text_path)
+
+    meta = {
+        'version': EXTRACTOR_VERSION,
+        'content_hash': source.get('content_hash'),
+        'size': source.get('size'),
+        'pages': pages,
+        'chars': len(text),
+        'extracted_at': time.time(),
+        'duration': round(time.time() - started, 3)
+    }
+    meta_path = os.path.join(text_dir, TEXT_META_FILE_NAME)
+    tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+    return meta
+
+
+def read_text_meta(text_dir):
+    """
+    Read the metadata stamp of extracted text
+
+    Args:
+        text_dir (str): Directory holding the extracted text
+
+    Returns:
+        dict: Metadata stamp, or None if there is no (readable) stamp
+    """
+    try:
+        with open(os.path.join(text_dir, TEXT_META_FILE_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None